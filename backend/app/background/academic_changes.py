@@ -0,0 +1,97 @@
+"""
+Background jobs: Phát hiện thay đổi dữ liệu trường (điểm mới, đổi phòng, báo nghỉ) và đẩy qua Zalo.
+
+  - sync_academic_changes (mỗi ACADEMIC_CHANGE_SYNC_HOURS): sync grades + TKB của
+    chủ tài khoản. AcademicService._write_cache_batch so content hash → dữ liệu không
+    đổi thì không ghi lại; thay đổi thì diff và ghi academic_change_events.
+  - push_academic_changes (mỗi ACADEMIC_CHANGE_PUSH_MINUTES): gom các sự kiện chưa
+    gửi của chủ tài khoản thành MỘT tin Zalo (format_change_event, không qua LLM)
+    rồi đặt notified_at. Gửi lỗi → giữ nguyên notified_at NULL, lượt sau gửi lại.
+
+Sự kiện sinh ra từ POST /api/academic/sync hay refresh nền cũng đi chung outbox này.
+Zalo chỉ có chat của chủ tài khoản (ZALO_CHAT_ID) → sự kiện chưa gửi của user khác
+không có nơi nhận và bị xóa ở mỗi lượt push thay vì tồn đọng mãi.
+"""
+
+import logging
+from datetime import datetime, timezone
+
+from app.core.database import get_supabase_client
+from app.core.zalo import send_zalo_message
+from app.features.academic.changes import format_change_event
+
+logger = logging.getLogger(__name__)
+
+CHANGE_SYNC_DATASETS = ["grades", "timetable"]
+MAX_EVENTS_PER_PUSH = 30
+
+
+async def sync_academic_changes():
+    """Re-sync the owner's grades and timetable so changes land in academic_change_events."""
+    from app.background.scheduler import _get_owner_user_id  # scheduler import module này
+    from app.features.academic.service import AcademicService
+
+    try:
+        db = get_supabase_client()
+        user_id = _get_owner_user_id()
+        if not user_id:
+            return
+        has_credentials = (
+            db.table("user_credentials").select("user_id").eq("user_id", user_id).limit(1).execute()
+        ).data
+        if not has_credentials:
+            return
+        result = await AcademicService(db).sync_datasets(user_id, CHANGE_SYNC_DATASETS)
+        if result["errors"]:
+            logger.warning(f"⚠️ Academic change sync partial failure: {result['errors']}")
+    except Exception as e:
+        logger.error(f"❌ Academic change sync failed: {e}")
+
+
+async def push_academic_changes() -> int:
+    """Send the owner's pending change events to Zalo in one message; drop other users' pending events.
+
+    Returns the number of events sent.
+    """
+    from app.background.scheduler import _get_owner_user_id  # scheduler import module này
+
+    try:
+        db = get_supabase_client()
+        user_id = _get_owner_user_id()
+        if not user_id:
+            return 0
+        expired = (
+            db.table("academic_change_events")
+            .delete()
+            .neq("user_id", user_id)
+            .is_("notified_at", "null")
+            .execute()
+        ).data or []
+        if expired:
+            logger.info(f"🧹 Dropped {len(expired)} undeliverable academic change(s) of non-owner users")
+        events = (
+            db.table("academic_change_events")
+            .select("id, event_type, payload")
+            .eq("user_id", user_id)
+            .is_("notified_at", "null")
+            .order("created_at", desc=False)
+            .limit(MAX_EVENTS_PER_PUSH)
+            .execute()
+        ).data or []
+        if not events:
+            return 0
+
+        text = "🔔 Cập nhật từ trường:\n" + "\n".join(
+            format_change_event({"event_type": e["event_type"], **(e.get("payload") or {})}) for e in events
+        )
+        if not await send_zalo_message(text):
+            return 0
+
+        db.table("academic_change_events").update(
+            {"notified_at": datetime.now(timezone.utc).isoformat()}
+        ).in_("id", [e["id"] for e in events]).execute()
+        logger.info(f"🔔 Pushed {len(events)} academic change(s) to Zalo")
+        return len(events)
+    except Exception as e:
+        logger.error(f"❌ Academic change push failed: {e}")
+        return 0
@@ -1,141 +1,177 @@
 import logging
-import tempfile
-import os
 from typing import List
 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
 from app.core.database import get_supabase_client
-from app.features.knowledge.embedding import embed_texts
+from app.features.knowledge.embedding_batcher import LANE_BULK, embed_texts_batched
+from app.features.knowledge.progress import IngestionProgress
+from app.features.knowledge.file_io import download_to_tempfile, remove_quietly
+from app.features.knowledge.extractors import iter_documents
+from app.features.knowledge.chunker import get_chunker
 
 logger = logging.getLogger(__name__)
 
-def extract_text_from_bytes(file_bytes: bytes, filename: str) -> List[Document]:
+def extract_text_from_path(file_path: str, filename: str) -> List[Document]:
     """
-    Extract text from PDF or DOCX bytes using Langchain loaders.
-    Use temp files since loaders require file paths.
+    Extract all page/section Documents from a file on disk (PDF, DOCX, PPTX, MD, TXT).
+    Eager wrapper around the streaming extractor registry, used by extract-text.
     """
-    ext = filename.rsplit(".", 1)[-1].lower()
-    docs = []
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{ext}") as temp_file:
-        temp_file.write(file_bytes)
-        temp_path = temp_file.name
+    return list(iter_documents(file_path, filename))
 
-    try:
-        if ext == "pdf":
-            loader = PyPDFLoader(temp_path)
-            docs = loader.load()
-        elif ext == "docx":
-            # For DOCX, we can use docx manually or a loader.
-            import docx
-            doc = docx.Document(temp_path)
-            full_text = []
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    full_text.append(para.text)
-            
-            # Since DOCX doesn't have inherent page numbers in python-docx easily,
-            # we just create a single Document or one per paragraph.
-            docs = [Document(page_content="\n".join(full_text), metadata={"page": 1})]
-        elif ext == "txt":
-            # Simple text read
-            with open(temp_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            docs = [Document(page_content=content, metadata={"page": 1})]
-        else:
-            raise ValueError(f"Unsupported file extension: {ext}")
-            
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-            
-    return docs
 
-def process_document_pipeline(material_id: str, user_id: str, file_bytes: bytes, filename: str, content_type: str):
-    """
-    Background task to process an uploaded document:
-    1. Extract text (with page numbers if PDF).
-    2. Chunk text (1000 size, 200 overlap).
-    3. Batch embed vectors.
-    4. Save to `material_chunks` table.
-    5. Update `study_materials` processing_status to 'success' or 'failed'.
+def _ingest_document(db, material_id: str, file_path: str, filename: str, progress: IngestionProgress) -> int:
+    """Extract → chunk → embed → insert chunks, streamed page by page. Raises on failure.
+
+    Extractors yield pages/sections lazily, so the first batches are embedded and
+    inserted while the rest of the file is still being parsed.
+    Stage counters are reported through `progress`.
+
+    Returns:
+        Number of chunks inserted.
     """
-    db = get_supabase_client()
-    logger.info(f"🚀 Starting background processing for material_id: {material_id} ({filename})")
-    
-    try:
-        # 1. Trích xuất văn bản
-        raw_docs = extract_text_from_bytes(file_bytes, filename)
-        if not raw_docs:
-            raise ValueError("No text could be extracted from the document.")
-            
-        # 2. Băm nhỏ văn bản (Chunking)
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        chunks = text_splitter.split_documents(raw_docs)
-        logger.info(f"✅ Extracted {len(raw_docs)} pages, generated {len(chunks)} chunks.")
-        
-        # 3. Batch Embedding (với Tenacity @retry đã bọc trong hàm embed_texts)
-        # Băm thành từng mẻ 50 chunks để tránh sập API
-        BATCH_SIZE = 50
-        all_vectors = []
-        all_texts = [chunk.page_content for chunk in chunks]
-        
-        for i in range(0, len(all_texts), BATCH_SIZE):
-            batch_texts = all_texts[i:i+BATCH_SIZE]
-            logger.info(f"🔄 Embedding batch {i//BATCH_SIZE + 1}/{(len(all_texts)//BATCH_SIZE) + 1}...")
-            batch_vectors = embed_texts(batch_texts)
-            all_vectors.extend(batch_vectors)
-            
-        if len(all_vectors) != len(chunks):
+    # Chunk theo ngân sách token (CHUNK_TARGET_TOKENS) tại ranh giới đoạn/dòng/câu
+    text_splitter = get_chunker()
+    # Băm thành từng mẻ 50 chunks để tránh sập API (embed) và DB (insert mảng bự)
+    BATCH_SIZE = 50
+    pending: List[Document] = []
+    counts = {"pages": 0, "chunks": 0, "embedded": 0, "inserted": 0}
+
+    def flush(batch: List[Document]):
+        # Batch Embedding qua EmbeddingBatcher (Tenacity @retry nằm trong embed_texts),
+        # lane bulk → không chặn embed query / note
+        vectors = embed_texts_batched([chunk.page_content for chunk in batch], lane=LANE_BULK)
+        if len(vectors) != len(batch):
             raise Exception("Mismatch between number of chunks and generated vectors.")
-            
-        # 4. Lưu vào Database (bảng material_chunks)
-        insert_data = []
-        for index, (chunk, vector) in enumerate(zip(chunks, all_vectors)):
-            page_num = chunk.metadata.get("page", 0)  # PyPDFLoader returns 0-indexed page numbers usually
-            
-            insert_data.append({
+        counts["embedded"] += len(vectors)
+        progress.update(chunks_embedded=counts["embedded"])
+
+        rows = []
+        for chunk, vector in zip(batch, vectors):
+            page_num = chunk.metadata.get("page", 0)  # Extractors use 0-indexed pages
+            rows.append({
                 "material_id": material_id,
                 "content": chunk.page_content,
-                "chunk_index": index,
+                "chunk_index": counts["inserted"] + len(rows),
                 "page_number": page_num + 1 if isinstance(page_num, int) else None, # Convert to 1-indexed
+                "section_title": chunk.metadata.get("heading"),
                 "embedding": vector
             })
-            
-        # Lại phải insert theo batch để DB không bị ngợp thao tác mảng bự
-        for i in range(0, len(insert_data), BATCH_SIZE):
-            batch_insert = insert_data[i:i+BATCH_SIZE]
-            db.table("material_chunks").insert(batch_insert).execute()
-            
-        logger.info(f"✅ Inserted {len(insert_data)} chunks into DB.")
-        
-        # 5. Cập nhật trạng thái thành công
+        db.table("material_chunks").insert(rows).execute()
+        counts["inserted"] += len(rows)
+        progress.update(rows_inserted=counts["inserted"])
+
+    # 1-2. Trích xuất từng trang / section và băm nhỏ ngay (Chunking)
+    for doc in iter_documents(file_path, filename):
+        counts["pages"] += 1
+        chunks = text_splitter.split_documents([doc])
+        pending.extend(chunks)
+        counts["chunks"] += len(chunks)
+        progress.update(
+            pages_extracted=counts["pages"],
+            pages_total=doc.metadata.get("total_pages"),
+            chunks_total=counts["chunks"],
+        )
+
+        # 3-4. Đủ 1 mẻ → embed + lưu vào material_chunks trong khi trang sau còn chưa parse
+        while len(pending) >= BATCH_SIZE:
+            flush(pending[:BATCH_SIZE])
+            pending = pending[BATCH_SIZE:]
+
+    if counts["chunks"] == 0:
+        raise ValueError("No text could be extracted from the document.")
+    logger.info(f"✅ Extracted {counts['pages']} pages, generated {counts['chunks']} chunks.")
+    progress.update(stage="embedding", extraction_done=True, pages_total=counts["pages"])
+
+    if pending:
+        flush(pending)
+
+    logger.info(f"✅ Inserted {counts['inserted']} chunks into DB.")
+    return counts["inserted"]
+
+
+def run_ingest_document_job(payload: dict, job: dict) -> dict:
+    """Job handler (ingest_document): download the stored file and run the RAG pipeline.
+
+    Retries are idempotent — chunks left by a previous partial attempt are removed
+    once the file has been downloaded (a failed download leaves existing chunks intact).
+    Only the last attempt marks the material as 'failed'; earlier failures stay
+    'processing' while the queue retries with backoff. Materials without a stored
+    file (imported from a snapshot) are skipped.
+
+    Args:
+        payload: { "material_id": str }
+        job: The claimed background_jobs row (attempts, max_attempts, ...).
+
+    Returns:
+        dict: { "chunks": int } or { "skipped": reason }
+    """
+    db = get_supabase_client()
+    material_id = payload["material_id"]
+
+    res = (
+        db.table("study_materials")
+        .select("file_url, file_name, chunk_count")
+        .eq("id", material_id)
+        .execute()
+    )
+    if not res.data:
+        logger.info(f"⏭️ Material {material_id} no longer exists, skipping ingestion.")
+        return {"skipped": "material deleted"}
+    material = res.data[0]
+    if not material.get("file_url"):
+        # Nhập từ snapshot: chunk chỉ có trong DB, không có file gốc để ingest lại
+        logger.warning(f"⏭️ Material {material_id} has no stored file, skipping ingestion.")
         db.table("study_materials").update({
-            "processing_status": "success"
+            "processing_status": "success" if material.get("chunk_count") else "failed"
         }).eq("id", material_id).execute()
-        
-        logger.info(f"🎉 Document pipeline finished successfully for {material_id}.")
+        return {"skipped": "no stored file"}
 
-    except Exception as e:
-        logger.error(f"❌ Document pipeline failed for {material_id}: {str(e)}")
-        # Cập nhật trạng thái lỗi để hiển thị lên Dashboard UI
+    logger.info(
+        f"🚀 Ingesting material {material_id} ({material['file_name']}), "
+        f"attempt {job.get('attempts', 1)}/{job.get('max_attempts', 1)}"
+    )
+    progress = IngestionProgress(db, material_id)
+    temp_path = None
+    try:
         db.table("study_materials").update({
-            "processing_status": "failed"
+            "processing_status": "processing"
         }).eq("id", material_id).execute()
 
+        # Stream file từ Storage ra đĩa — không giữ cả file trong RAM.
+        # Tải trước, xóa chunk cũ sau: tải lỗi thì tài liệu vẫn còn chunk để search
+        temp_path = download_to_tempfile(db, "knowledge-base", material["file_url"])
+        db.table("material_chunks").delete().eq("material_id", material_id).execute()
+        chunk_count = _ingest_document(db, material_id, temp_path, material["file_name"], progress)
+    except Exception as e:
+        logger.error(f"❌ Document pipeline failed for {material_id}: {str(e)}")
+        if job.get("attempts", 1) >= job.get("max_attempts", 1):
+            progress.finish("failed", str(e))
+            db.table("study_materials").update({
+                "processing_status": "failed"
+            }).eq("id", material_id).execute()
+        else:
+            progress.finish("retrying", str(e))
+        raise
+    finally:
+        remove_quietly(temp_path)
+
+    progress.finish("success")
+
+    db.table("study_materials").update({
+        "processing_status": "success",
+        "chunk_count": chunk_count,
+    }).eq("id", material_id).execute()
+    logger.info(f"🎉 Document pipeline finished successfully for {material_id}.")
+    return {"chunks": chunk_count}
+
 
 def delete_document_pipeline(material_id: str, file_url: str | None, user_id: str):
     """
     Background task to delete a document:
     1. Delete file from S3 (if file_url exists)
     2. Delete record from DB (which cascades to material_chunks)
+    Raises if the DB delete fails so the job queue can retry.
     """
     db = get_supabase_client()
     logger.info(f"🗑️ Starting background deletion for material_id: {material_id}")
@@ -156,4 +192,15 @@ def delete_document_pipeline(material_id: str, file_url: str | None, user_id: st
 
     except Exception as e:
         logger.error(f"❌ Failed to delete material {material_id}: {str(e)}")
+        raise
+
+
+def run_delete_document_job(payload: dict, job: dict) -> dict:
+    """Job handler (delete_document): remove the stored file and the material row.
+
+    Args:
+        payload: { "material_id": str, "file_url": str | None, "user_id": str }
+    """
+    delete_document_pipeline(payload["material_id"], payload.get("file_url"), payload["user_id"])
+    return {"deleted": payload["material_id"]}
 
@@ -1,41 +1,147 @@
 """
 Background tasks for processing embeddings.
 Moved here for better architecture and dashboard tracking.
+
+Notes được gom theo lô:
+  - enqueue_note_embedding() trả về ngay (không chặn agent turn / request).
+  - Các note đến trong cùng cửa sổ EMBEDDING_BATCH_WINDOW_MS được gom vào 1 job
+    `embed_notes` trong hàng đợi bền vững (job_queue) → restart không làm mất việc.
+  - Job gọi process_note_embeddings(): 1 UPDATE đánh dấu 'processing', vector lấy qua
+    EmbeddingBatcher (1 lời gọi embed_documents), 1 RPC ghi vector + status cho cả lô.
 """
 
 import logging
+import threading
+
 from app.core.database import get_supabase_client
-from app.features.knowledge.embedding import embed_text
+from app.features.knowledge.embedding_batcher import get_embedding_batcher
 
 logger = logging.getLogger(__name__)
 
 
-def process_note_embedding(note_id: str, content: str):
-    """Generate embedding vector for a note and update DB status.
-    Designed to run as a FastAPI BackgroundTask.
-    Tracks status: pending -> success / failed.
+def process_note_embeddings(notes: list[tuple[str, str]]) -> dict:
+    """Embed a batch of notes and write vectors + statuses in bulk.
+    Tracks status: pending -> processing -> success / failed.
+
+    Args:
+        notes: List of (note_id, content) pairs.
+
+    Returns:
+        dict: { "success": int, "failed": int }
+
+    Raises:
+        Exception: The bulk write failed — nothing was saved, so the caller (job
+            queue) must retry rather than count the batch as done.
     """
+    stats = {"success": 0, "failed": 0}
+    if not notes:
+        return stats
+
     db = get_supabase_client()
+    note_ids = [note_id for note_id, _ in notes]
+
     try:
-        # Mark as generating (in case it takes time)
         db.table("quick_notes").update({
             "embedding_status": "processing"
-        }).eq("id", note_id).execute()
+        }).in_("id", note_ids).execute()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not mark {len(note_ids)} notes as processing: {e}")
 
-        # Generate vector
-        vector = embed_text(content)
+    futures = get_embedding_batcher().submit_many([content for _, content in notes])
 
-        # Update vector and status
-        db.table("quick_notes").update({
-            "embedding": vector,
-            "embedding_status": "success"
-        }).eq("id", note_id).execute()
+    updates = []
+    for (note_id, _), future in zip(notes, futures):
+        try:
+            updates.append({
+                "id": note_id,
+                "embedding": future.result(),
+                "embedding_status": "success",
+            })
+            stats["success"] += 1
+        except Exception as e:
+            logger.error(f"❌ Background Task: Failed to embed note {note_id}: {e}")
+            # Mark as failed so dashboard can show it and allow retry
+            updates.append({"id": note_id, "embedding": None, "embedding_status": "failed"})
+            stats["failed"] += 1
+
+    try:
+        db.rpc("bulk_update_note_embeddings", {"updates": updates}).execute()
+        logger.info(
+            f"✅ Background Task: Embedded {stats['success']}/{len(notes)} notes in one batch"
+        )
+    except Exception as e:
+        logger.error(f"❌ Background Task: Failed to write embeddings for {len(notes)} notes: {e}")
+        raise
+
+    return stats
+
+
+def run_embed_notes_job(payload: dict, job: dict) -> dict:
+    """Job handler (embed_notes): embed the listed notes with their current content.
 
-        logger.info(f"✅ Background Task: Embedded note {note_id} ({len(vector)} dims)")
+    Args:
+        payload: { "note_ids": list[str] }
 
+    Returns:
+        dict: { "success": int, "failed": int }
+    """
+    note_ids = payload.get("note_ids") or []
+    if not note_ids:
+        return {"success": 0, "failed": 0}
+
+    db = get_supabase_client()
+    rows = (
+        db.table("quick_notes")
+        .select("id, content")
+        .in_("id", note_ids)
+        .execute()
+    ).data or []
+
+    stats = process_note_embeddings([(r["id"], r["content"]) for r in rows])
+    if rows and stats["success"] == 0:
+        # Cả lô lỗi (thường do quota/API) → để job queue retry với backoff
+        raise RuntimeError(f"Embedding failed for all {len(rows)} notes")
+    return stats
+
+
+# ── Coalescing queue (non-blocking) ─────────────────────
+
+_pending_notes: list[tuple[str, str]] = []
+_pending_lock = threading.Lock()
+_flush_timer: threading.Timer | None = None
+
+
+def _flush_pending_notes():
+    global _flush_timer
+    with _pending_lock:
+        batch = list(_pending_notes)
+        _pending_notes.clear()
+        _flush_timer = None
+    if not batch:
+        return
+    from app.background.job_queue import enqueue_job, JOB_EMBED_NOTES
+    try:
+        enqueue_job(JOB_EMBED_NOTES, {"note_ids": [note_id for note_id, _ in batch]})
     except Exception as e:
-        logger.error(f"❌ Background Task: Failed to embed note {note_id}: {e}")
-        # Mark as failed so dashboard can show it and allow retry
-        db.table("quick_notes").update({
-            "embedding_status": "failed"
-        }).eq("id", note_id).execute()
+        # Không ghi được job (DB/RPC lỗi) → embed trực tiếp, sweeper sẽ vét phần còn sót
+        logger.warning(f"⚠️ Could not enqueue embed_notes job, embedding inline: {e}")
+        try:
+            process_note_embeddings(batch)
+        except Exception as inner:
+            logger.error(f"❌ Note embedding batch failed: {inner}")
+
+
+def enqueue_note_embedding(note_id: str, content: str):
+    """Schedule a note for embedding and return immediately.
+
+    Notes enqueued within the batch window share one durable job, one embedding
+    call and one bulk status write. Safe to call from sync tools and async routes.
+    """
+    global _flush_timer
+    batcher = get_embedding_batcher()
+    with _pending_lock:
+        _pending_notes.append((note_id, content))
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(batcher.window, _flush_pending_notes)
+            _flush_timer.daemon = True
+            _flush_timer.start()
@@ -0,0 +1,444 @@
+"""
+Durable background job queue (table `background_jobs`, migration 011).
+
+Thay thế FastAPI BackgroundTasks / ThreadPoolExecutor cho các việc chạy nền dài:
+ingest tài liệu, xóa tài liệu, embed notes, xử lý tin nhắn Zalo.
+
+Luồng:
+  1. enqueue_job() ghi job vào DB (idempotency_key chống trùng) rồi đánh thức worker.
+  2. JobWorker (asyncio task trong lifespan) claim job bằng RPC claim_jobs
+     (FOR UPDATE SKIP LOCKED + lease), chạy tối đa JOB_WORKER_CONCURRENCY job cùng lúc.
+  3. Job chạy lâu → heartbeat gia hạn lease. Xong → succeeded.
+     Lỗi → queued lại với exponential backoff + jitter, hết lượt → dead.
+  4. sweep_stuck_jobs() (scheduler) đưa job mất lease về hàng đợi và dọn
+     study_materials / quick_notes bị kẹt ở trạng thái 'processing'.
+
+Handler nhận (payload, job) — sync handler chạy trong thread, async handler chạy trên event loop.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from app.config import get_settings
+from app.core.database import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# ── Job types ────────────────────────────────────────────
+JOB_INGEST_DOCUMENT = "ingest_document"
+JOB_DELETE_DOCUMENT = "delete_document"
+JOB_EMBED_NOTES = "embed_notes"
+JOB_ZALO_MESSAGE = "zalo_message"
+
+MAX_BACKOFF_SECONDS = 600
+
+
+def _get_handlers() -> dict:
+    """Map job_type → handler. Imported lazily to avoid circular imports."""
+    from app.background.document_tasks import run_ingest_document_job, run_delete_document_job
+    from app.background.embedding_tasks import run_embed_notes_job
+    from app.features.agent.router import run_zalo_message_job
+
+    return {
+        JOB_INGEST_DOCUMENT: run_ingest_document_job,
+        JOB_DELETE_DOCUMENT: run_delete_document_job,
+        JOB_EMBED_NOTES: run_embed_notes_job,
+        JOB_ZALO_MESSAGE: run_zalo_message_job,
+    }
+
+
+def compute_backoff(attempt: int, base_seconds: float, max_seconds: float = MAX_BACKOFF_SECONDS) -> float:
+    """Exponential backoff with full jitter: random(0.5, 1.0) * base * 2^(attempt-1)."""
+    delay = min(base_seconds * (2 ** max(attempt - 1, 0)), max_seconds)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def enqueue_job(
+    job_type: str,
+    payload: dict | None = None,
+    user_id: str | None = None,
+    idempotency_key: str | None = None,
+    max_attempts: int | None = None,
+    delay_seconds: int = 0,
+) -> str:
+    """Persist a job and wake the in-process worker.
+
+    Args:
+        job_type: One of the JOB_* constants.
+        payload: JSON-serialisable arguments for the handler.
+        user_id: Owner (for cascading deletes / dashboards).
+        idempotency_key: Jobs with the same key are created only once.
+        max_attempts: Retry budget (default JOB_MAX_ATTEMPTS).
+        delay_seconds: Do not run before now + delay.
+
+    Returns:
+        The job id (existing id if the idempotency key was already used).
+    """
+    settings = get_settings()
+    db = get_supabase_client()
+    res = db.rpc("enqueue_job", {
+        "p_job_type": job_type,
+        "p_payload": payload or {},
+        "p_user_id": user_id,
+        "p_idempotency_key": idempotency_key,
+        "p_max_attempts": max_attempts or settings.JOB_MAX_ATTEMPTS,
+        "p_delay_seconds": delay_seconds,
+    }).execute()
+    job_id = res.data
+    logger.info(f"📥 Enqueued job {job_type} ({job_id})")
+
+    if _worker is not None:
+        _worker.wake()
+    return job_id
+
+
+class JobStore:
+    """Thin wrapper around the background_jobs table / RPCs."""
+
+    def __init__(self, db=None):
+        self.db = db or get_supabase_client()
+
+    def claim(self, worker_id: str, limit: int, lease_seconds: int) -> list[dict]:
+        res = self.db.rpc("claim_jobs", {
+            "p_worker_id": worker_id,
+            "p_limit": limit,
+            "p_lease_seconds": lease_seconds,
+        }).execute()
+        return res.data or []
+
+    def extend_lease(self, job_id: str, worker_id: str, lease_seconds: int):
+        expires = datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)
+        self.db.table("background_jobs").update({
+            "lease_expires_at": expires.isoformat()
+        }).eq("id", job_id).eq("locked_by", worker_id).execute()
+
+    def complete(self, job_id: str, result: dict | None):
+        self.db.table("background_jobs").update({
+            "status": "succeeded",
+            "result": result,
+            "locked_by": None,
+            "lease_expires_at": None,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        }).eq("id", job_id).execute()
+
+    def retry(self, job_id: str, error: str, delay_seconds: float):
+        run_after = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+        self.db.table("background_jobs").update({
+            "status": "queued",
+            "last_error": error[:2000],
+            "locked_by": None,
+            "lease_expires_at": None,
+            "run_after": run_after.isoformat(),
+        }).eq("id", job_id).execute()
+
+    def bury(self, job_id: str, error: str):
+        self.db.table("background_jobs").update({
+            "status": "dead",
+            "last_error": error[:2000],
+            "locked_by": None,
+            "lease_expires_at": None,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        }).eq("id", job_id).execute()
+
+
+class JobWorker:
+    """Polls the job table and runs handlers with bounded concurrency."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        handlers: dict,
+        concurrency: int = 2,
+        poll_interval: float = 2.0,
+        lease_seconds: int = 300,
+        retry_base_seconds: float = 10,
+    ):
+        self.store = store
+        self.handlers = handlers
+        self.concurrency = max(concurrency, 1)
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._running: set[asyncio.Task] = set()
+        self._wake_event = asyncio.Event()
+        self._stopping = False
+        self._loop_task: asyncio.Task | None = None
+
+    def wake(self):
+        """Skip the remaining poll sleep (safe to call from any thread)."""
+        loop = self._loop_task.get_loop() if self._loop_task else None
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            self._wake_event.set()
+        else:
+            loop.call_soon_threadsafe(self._wake_event.set)
+
+    def start(self):
+        self._loop_task = asyncio.create_task(self._run_loop(), name="job_worker")
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop claiming and give in-flight jobs a grace period.
+        Jobs still running afterwards keep their lease and are recovered by the sweeper.
+        """
+        self._stopping = True
+        self._wake_event.set()
+        if self._loop_task:
+            await asyncio.wait({self._loop_task}, timeout=timeout)
+        if self._running:
+            await asyncio.wait(self._running, timeout=timeout)
+
+    async def _run_loop(self):
+        logger.info(f"👷 Job worker {self.worker_id} started (concurrency={self.concurrency})")
+        while not self._stopping:
+            claimed = 0
+            free_slots = self.concurrency - len(self._running)
+            if free_slots > 0:
+                try:
+                    jobs = await asyncio.to_thread(
+                        self.store.claim, self.worker_id, free_slots, self.lease_seconds
+                    )
+                except Exception as e:
+                    logger.error(f"Job claim failed: {e}")
+                    jobs = []
+                for job in jobs:
+                    task = asyncio.create_task(self.run_job(job))
+                    self._running.add(task)
+                    task.add_done_callback(self._on_job_done)
+                claimed = len(jobs)
+
+            # Vừa claim đủ slot → thử claim tiếp ngay; ngược lại chờ poll/wake
+            if claimed and claimed == free_slots:
+                continue
+            self._wake_event.clear()
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_job_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        # Có slot trống → claim job tiếp theo ngay
+        self._wake_event.set()
+
+    async def _heartbeat(self, job_id: str):
+        interval = max(self.lease_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(
+                    self.store.extend_lease, job_id, self.worker_id, self.lease_seconds
+                )
+            except Exception as e:
+                logger.warning(f"Lease heartbeat failed for job {job_id}: {e}")
+
+    async def run_job(self, job: dict):
+        """Run one claimed job and record its outcome."""
+        job_id, job_type = job["id"], job["job_type"]
+        handler = self.handlers.get(job_type)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job type '{job_type}'")
+            if inspect.iscoroutinefunction(handler):
+                result = await handler(job.get("payload") or {}, job)
+            else:
+                result = await asyncio.to_thread(handler, job.get("payload") or {}, job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            attempts = job.get("attempts", 1)
+            try:
+                if attempts >= job.get("max_attempts", 1):
+                    logger.error(f"💀 Job {job_type} ({job_id}) dead after {attempts} attempts: {error}")
+                    await asyncio.to_thread(self.store.bury, job_id, error)
+                else:
+                    delay = compute_backoff(attempts, self.retry_base_seconds)
+                    logger.warning(
+                        f"🔁 Job {job_type} ({job_id}) failed (attempt {attempts}), retry in {delay:.0f}s: {error}"
+                    )
+                    await asyncio.to_thread(self.store.retry, job_id, error, delay)
+            except Exception as store_error:
+                logger.error(f"Could not record failure of job {job_id}: {store_error}")
+            return
+        finally:
+            heartbeat.cancel()
+
+        try:
+            await asyncio.to_thread(
+                self.store.complete, job_id, result if isinstance(result, dict) else None
+            )
+            logger.info(f"✅ Job {job_type} ({job_id}) succeeded")
+        except Exception as e:
+            logger.error(f"Could not mark job {job_id} succeeded: {e}")
+
+
+# ── Worker lifecycle (called from FastAPI lifespan) ──────
+
+_worker: JobWorker | None = None
+
+
+def start_job_worker() -> JobWorker:
+    """Start the in-process job worker."""
+    global _worker
+    settings = get_settings()
+    _worker = JobWorker(
+        store=JobStore(),
+        handlers=_get_handlers(),
+        concurrency=settings.JOB_WORKER_CONCURRENCY,
+        poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        retry_base_seconds=settings.JOB_RETRY_BASE_SECONDS,
+    )
+    _worker.start()
+    return _worker
+
+
+async def stop_job_worker():
+    """Stop the worker, letting in-flight jobs finish for a short grace period."""
+    global _worker
+    if _worker is not None:
+        await _worker.stop()
+        _worker = None
+
+
+# ── Sweeper (scheduled) ──────────────────────────────────
+
+STUCK_PROCESSING_MINUTES = 30
+STUCK_MAX_REQUEUES = 3
+
+
+def _latest_ingest_jobs(db, material_ids: list[str]) -> dict[str, dict]:
+    """Newest ingest job per material, with `attempt_no` = how many ingest jobs it has had."""
+    if not material_ids:
+        return {}
+    rows = (
+        db.table("background_jobs")
+        .select("id, status, payload, created_at")
+        .eq("job_type", JOB_INGEST_DOCUMENT)
+        .in_("payload->>material_id", material_ids)
+        .order("created_at", desc=True)
+        .execute()
+    ).data or []
+    latest: dict[str, dict] = {}
+    for row in rows:
+        material_id = (row.get("payload") or {}).get("material_id")
+        job = latest.setdefault(material_id, {**row, "attempt_no": 0})
+        job["attempt_no"] += 1
+    return latest
+
+
+def _notes_with_live_jobs(db) -> set[str]:
+    """Note ids already covered by a queued / running embed_notes job."""
+    rows = (
+        db.table("background_jobs")
+        .select("payload")
+        .eq("job_type", JOB_EMBED_NOTES)
+        .in_("status", ["queued", "running"])
+        .execute()
+    ).data or []
+    return {note_id for row in rows for note_id in ((row.get("payload") or {}).get("note_ids") or [])}
+
+
+def sweep_stuck_jobs() -> dict:
+    """Recover jobs whose lease expired and repair rows stuck in 'processing'.
+
+    - Jobs 'running' with an expired lease → back to 'queued' (or 'dead').
+    - Dead ingest jobs → study_materials.processing_status = 'failed'.
+    - study_materials 'processing' for too long without a live job → re-enqueued under a
+      fresh idempotency key, or marked 'failed' when the last job is dead or the material
+      has already been re-ingested STUCK_MAX_REQUEUES times.
+    - quick_notes stuck in 'pending'/'processing' and not covered by a live
+      embed_notes job → re-enqueued for embedding.
+
+    Returns:
+        dict: { "recovered": int, "dead": int, "materials_requeued": int,
+                "materials_failed": int, "notes_requeued": int }
+    """
+    stats = {"recovered": 0, "dead": 0, "materials_requeued": 0, "materials_failed": 0, "notes_requeued": 0}
+    try:
+        db = get_supabase_client()
+
+        recovered = db.rpc("recover_expired_jobs").execute().data or []
+        for job in recovered:
+            if job["status"] == "dead":
+                stats["dead"] += 1
+                if job["job_type"] == JOB_INGEST_DOCUMENT:
+                    material_id = (job.get("payload") or {}).get("material_id")
+                    if material_id:
+                        db.table("study_materials").update({
+                            "processing_status": "failed"
+                        }).eq("id", material_id).execute()
+            else:
+                stats["recovered"] += 1
+
+        cutoff = (datetime.now(timezone.utc) - timedelta(minutes=STUCK_PROCESSING_MINUTES)).isoformat()
+
+        # Tài liệu kẹt 'processing' (vd: upload trước khi có job queue) → ingest lại
+        stuck_materials = (
+            db.table("study_materials")
+            .select("id, user_id, file_name, file_type")
+            .eq("processing_status", "processing")
+            .lt("updated_at", cutoff)
+            .execute()
+        ).data or []
+        latest_jobs = _latest_ingest_jobs(db, [m["id"] for m in stuck_materials])
+        for m in stuck_materials:
+            job = latest_jobs.get(m["id"])
+            if job and job["status"] in ("queued", "running"):
+                continue  # Job vẫn còn sống → để worker xử lý
+            if job and (job["status"] == "dead" or job["attempt_no"] > STUCK_MAX_REQUEUES):
+                # Hết lượt retry (hoặc re-ingest mãi vẫn kẹt) → báo lỗi thay vì treo 'processing'
+                db.table("study_materials").update({
+                    "processing_status": "failed"
+                }).eq("id", m["id"]).execute()
+                stats["materials_failed"] += 1
+                continue
+            # Chưa có job (upload trước khi có job queue) → key gốc; job cũ đã xong nhưng
+            # tài liệu vẫn kẹt → key mới, vì `ingest:{id}` đã dùng thì RPC không tạo job nữa
+            key = f"ingest:{m['id']}" if job is None else f"ingest:{m['id']}:sweep:{job['attempt_no']}"
+            enqueue_job(
+                JOB_INGEST_DOCUMENT,
+                {"material_id": m["id"], "filename": m["file_name"], "content_type": m.get("file_type")},
+                user_id=m["user_id"],
+                idempotency_key=key,
+            )
+            stats["materials_requeued"] += 1
+
+        stuck_notes = (
+            db.table("quick_notes")
+            .select("id")
+            .in_("embedding_status", ["pending", "processing"])
+            .lt("updated_at", cutoff)
+            .limit(500)
+            .execute()
+        ).data or []
+        # Note đang chờ retry (backoff có thể > cutoff) đã có job sống → không tạo job trùng
+        covered = _notes_with_live_jobs(db) if stuck_notes else set()
+        note_ids = [n["id"] for n in stuck_notes if n["id"] not in covered]
+        if note_ids:
+            enqueue_job(JOB_EMBED_NOTES, {"note_ids": note_ids})
+            stats["notes_requeued"] = len(note_ids)
+
+    except Exception as e:
+        logger.error(f"sweep_stuck_jobs failed: {e}")
+
+    if any(stats.values()):
+        logger.info(
+            f"🧹 Job sweeper — recovered={stats['recovered']}, dead={stats['dead']}, "
+            f"materials_requeued={stats['materials_requeued']}, "
+            f"materials_failed={stats['materials_failed']}, notes_requeued={stats['notes_requeued']}"
+        )
+    return stats
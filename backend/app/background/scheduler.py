@@ -6,7 +6,7 @@ Designed for a Personal Agent (single user).
 """
 
 import logging
-from datetime import timezone, timedelta
+from datetime import datetime, timezone, timedelta
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -14,7 +14,11 @@ from apscheduler.triggers.cron import CronTrigger
 from app.config import get_settings
 from app.core.database import get_supabase_client
 from app.core.zalo import send_agent_response_to_zalo, send_zalo_message
-from app.background.temp_cleanup import cleanup_temp_files
+from app.background.temp_cleanup import collect_expired_storage_objects
+from app.background.vector_index_sync import sync_local_vector_indexes
+from app.background.job_queue import sweep_stuck_jobs
+from app.background.academic_changes import push_academic_changes, sync_academic_changes
+from app.features.academic.school_clock import refresh_school_clock, refresh_timetable_types
 
 logger = logging.getLogger(__name__)
 
@@ -178,12 +182,10 @@ async def _execute_routine(routine_type: str):
         # Send via Zalo Bot (format markdown → plain text trước khi gửi)
         from app.core.zalo_formatter import ZaloFormatter
         from app.core.zalo import send_zalo_photo
-        import asyncio
         zalo_text = f"{title_prefix}\n\n{response_text}"
         image_urls, clean_zalo_text = ZaloFormatter.extract_images_and_clean(zalo_text)
         for img_url in image_urls:
             await send_zalo_photo(img_url)
-            await asyncio.sleep(0.5)
         await send_agent_response_to_zalo(clean_zalo_text)
 
         logger.info(f"✅ {routine_type} routine completed successfully.")
@@ -343,5 +345,52 @@ def sync_dynamic_jobs():
 # Chạy sync mỗi 5 phút một lần để update thay đổi ở DB
 scheduler.add_job(sync_dynamic_jobs, 'interval', minutes=5, id="sync_dynamic_jobs_task", replace_existing=True)
 
-# Dọn file tạm /temp/ trên S3 mỗi 6 giờ — xóa file > 24 giờ tuổi
-scheduler.add_job(cleanup_temp_files, 'interval', hours=6, id="cleanup_temp_files_task", replace_existing=True)
+# Dọn object hết hạn trên Storage (file tạm KB, ảnh chat, ảnh AI tạo) theo lifecycle policies
+scheduler.add_job(
+    collect_expired_storage_objects, 'interval',
+    hours=get_settings().STORAGE_GC_INTERVAL_HOURS,
+    id="cleanup_temp_files_task", replace_existing=True,
+)
+
+# Sweeper job queue: thu hồi job mất lease (worker chết/restart) + tài liệu/note kẹt 'processing'
+scheduler.add_job(
+    sweep_stuck_jobs, 'interval',
+    minutes=get_settings().JOB_SWEEP_INTERVAL_MINUTES,
+    next_run_time=datetime.now(VN_TZ),
+    id="sweep_stuck_jobs_task", replace_existing=True,
+)
+
+# Đồng bộ local vector index (nếu bật) — chạy ngay lúc khởi động (load snapshot + delta) rồi lặp định kỳ
+if get_settings().LOCAL_VECTOR_INDEX_ENABLED:
+    scheduler.add_job(
+        sync_local_vector_indexes, 'interval',
+        minutes=get_settings().LOCAL_VECTOR_INDEX_SYNC_MINUTES,
+        next_run_time=datetime.now(VN_TZ),
+        id="sync_local_vector_indexes_task", replace_existing=True,
+    )
+
+# Thay đổi dữ liệu trường (điểm mới, đổi phòng, báo nghỉ): sync định kỳ + đẩy outbox qua Zalo
+if get_settings().ACADEMIC_CHANGE_SYNC_HOURS > 0:
+    scheduler.add_job(
+        sync_academic_changes, 'interval',
+        hours=get_settings().ACADEMIC_CHANGE_SYNC_HOURS,
+        id="sync_academic_changes_task", replace_existing=True,
+    )
+scheduler.add_job(
+    push_academic_changes, 'interval',
+    minutes=get_settings().ACADEMIC_CHANGE_PUSH_MINUTES,
+    id="push_academic_changes_task", replace_existing=True,
+)
+
+# Giờ server trường (offset so với giờ máy) + danh sách loại TKB — tools đọc bản cache, không gọi mạng
+scheduler.add_job(
+    refresh_school_clock, 'interval',
+    minutes=get_settings().SCHOOL_CLOCK_REFRESH_MINUTES,
+    next_run_time=datetime.now(VN_TZ),
+    id="refresh_school_clock_task", replace_existing=True,
+)
+scheduler.add_job(
+    refresh_timetable_types, 'interval', days=1,
+    next_run_time=datetime.now(VN_TZ),
+    id="refresh_timetable_types_task", replace_existing=True,
+)
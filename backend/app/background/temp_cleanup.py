@@ -1,26 +1,34 @@
 """
-Background cleanup job: Xóa file tạm trong S3 bucket `knowledge-base` sau 24 giờ.
-
-Luồng tạo file tạm:
-  POST /api/knowledge/extract-text → lưu vào `{user_id}/temp/{unix_ts}_{safe_filename}`
-
-Luồng xóa:
-  cleanup_temp_files() chạy mỗi 6 giờ theo APScheduler.
-  List tất cả files trong thư mục /temp/ của mỗi user.
-  Parse unix_ts từ tên file (phần tử đầu tiên trước dấu `_`).
-  Nếu (now - ts) > MAX_AGE_SECONDS → xóa khỏi S3.
+Background cleanup job: Lifecycle collector cho các Storage bucket.
+
+Chính sách (tuổi tối đa cấu hình trong Settings, 0 = giữ vĩnh viễn):
+  - knowledge-base    `{user_id}/temp/`  file tạm từ POST /api/knowledge/extract-text  (KB_TEMP_MAX_AGE_HOURS)
+  - chat-uploads      `{user_id}/`       ảnh đính kèm trong chat                         (CHAT_UPLOAD_MAX_AGE_DAYS)
+  - generated-images  `/` (root)         ảnh do tool generate_image tạo                  (GENERATED_IMAGE_MAX_AGE_DAYS)
+
+Luồng (collect_expired_storage_objects, chạy mỗi STORAGE_GC_INTERVAL_HOURS):
+  1. List từng prefix theo trang (PAGE_SIZE), sắp xếp created_at tăng dần → các object
+     hết hạn luôn nằm ở đầu danh sách; gặp object còn trẻ là dừng prefix đó.
+  2. Gom path hết hạn của cả trang → xóa bằng MỘT lệnh remove(paths).
+     Object đã xóa biến khỏi listing nên trang sau chỉ cần bỏ qua các object
+     bị giữ lại (không parse được tuổi / xóa lỗi) — không sót file do lệch offset.
+  3. Mỗi lượt xóa tối đa STORAGE_GC_MAX_DELETES_PER_RUN object. Khi chạm giới hạn,
+     prefix đang dở được nhớ lại và lượt sau bắt đầu từ đó (các object đã xóa không
+     còn trong listing nên tiến độ tự được giữ giữa các lượt).
 """
 
-import time
 import logging
-from datetime import timezone, timedelta
+import time
+from datetime import datetime
 
+from app.config import get_settings
 from app.core.database import get_supabase_client
 
 logger = logging.getLogger(__name__)
 
-# 24 giờ (tính bằng giây)
-MAX_AGE_SECONDS = 24 * 60 * 60
+PAGE_SIZE = 1000
+# Prefix (bucket, prefix) mà lượt trước dừng giữa chừng vì hết ngân sách
+_resume_from: tuple[str, str] | None = None
 
 
 def _parse_timestamp_from_name(file_name: str) -> int | None:
@@ -39,78 +47,150 @@ def _parse_timestamp_from_name(file_name: str) -> int | None:
         return None
 
 
-def cleanup_temp_files() -> dict:
+def _object_timestamp(obj: dict) -> float | None:
+    """Upload time of a listed object: storage `created_at`, else the `{ts}_` name prefix."""
+    created_at = obj.get("created_at")
+    if created_at:
+        try:
+            return datetime.fromisoformat(created_at.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    ts = _parse_timestamp_from_name(obj.get("name", ""))
+    # Chỉ tin unix seconds hợp lệ — ảnh AI tạo có dạng `20250101_120000_x.png` (không phải ts)
+    if ts is not None and 1_000_000_000 <= ts < 10_000_000_000:
+        return ts
+    return None
+
+
+def get_lifecycle_policies() -> list[dict]:
+    """Enabled policies: { bucket, prefix ('{user_id}' is expanded per user), max_age_seconds }."""
+    settings = get_settings()
+    policies = [
+        {"bucket": "knowledge-base", "prefix": "{user_id}/temp", "max_age_seconds": settings.KB_TEMP_MAX_AGE_HOURS * 3600},
+        {"bucket": "chat-uploads", "prefix": "{user_id}", "max_age_seconds": settings.CHAT_UPLOAD_MAX_AGE_DAYS * 86400},
+        {"bucket": "generated-images", "prefix": "", "max_age_seconds": settings.GENERATED_IMAGE_MAX_AGE_DAYS * 86400},
+    ]
+    return [p for p in policies if p["max_age_seconds"] > 0]
+
+
+def collect_prefix(storage, bucket: str, prefix: str, max_age_seconds: int, budget: int, now: float | None = None) -> dict:
+    """Delete expired objects directly under one prefix, oldest first, in bulk.
+
+    Args:
+        storage: `db.storage` (anything with .from_(bucket).list/remove).
+        budget: Maximum number of objects to delete in this call.
+
+    Returns:
+        dict: { "deleted": int, "kept": int, "errors": int, "exhausted": bool }
+        `exhausted` is False when the budget ran out before the prefix was done.
     """
-    Xóa file tạm trong S3 bucket `knowledge-base/{user_id}/temp/` sau 24 giờ.
+    now = now if now is not None else time.time()
+    bucket_api = storage.from_(bucket)
+    stats = {"deleted": 0, "kept": 0, "errors": 0, "exhausted": True}
+    offset = 0  # = số object bị giữ lại ở đầu listing
+
+    while True:
+        page = bucket_api.list(prefix, {
+            "limit": PAGE_SIZE,
+            "offset": offset,
+            "sortBy": {"column": "created_at", "order": "asc"},
+        }) or []
+
+        expired: list[str] = []
+        reached_young = False
+        for obj in page:
+            name = obj.get("name")
+            if not name or obj.get("id") is None:
+                # Thư mục con (id = None) — không thuộc chính sách của prefix này
+                offset += 1
+                continue
+            ts = _object_timestamp(obj)
+            if ts is None:
+                # Không xác định được tuổi → bỏ qua, không xóa nhầm
+                stats["kept"] += 1
+                offset += 1
+                continue
+            if now - ts <= max_age_seconds:
+                reached_young = True
+                break
+            if len(expired) >= budget - stats["deleted"]:
+                stats["exhausted"] = False
+                break
+            expired.append(f"{prefix}/{name}" if prefix else name)
+
+        if expired:
+            try:
+                bucket_api.remove(expired)
+                stats["deleted"] += len(expired)
+                logger.info(f"🗑️  Deleted {len(expired)} expired objects from {bucket}/{prefix}")
+            except Exception as e:
+                logger.warning(f"Failed to delete {len(expired)} objects from {bucket}/{prefix}: {e}")
+                stats["errors"] += 1
+                offset += len(expired)
+
+        if reached_young or not stats["exhausted"] or len(page) < PAGE_SIZE:
+            return stats
+
 
-    Logic:
-      1. Lấy tất cả user_id từ bảng users.
-      2. Với mỗi user, list files trong prefix `{user_id}/temp/`.
-      3. Parse unix_ts từ tên file.
-      4. Xóa nếu tuổi file > MAX_AGE_SECONDS.
-      5. Bỏ qua file không đúng format tên (không parse được ts) — không xóa nhầm.
+def collect_expired_storage_objects() -> dict:
+    """
+    Chạy toàn bộ lifecycle policies với ngân sách STORAGE_GC_MAX_DELETES_PER_RUN.
 
     Returns:
-        dict: { "deleted": int, "skipped": int, "errors": int }
+        dict: { "deleted": int, "kept": int, "errors": int, "prefixes": int, "complete": bool }
     """
-    stats = {"deleted": 0, "skipped": 0, "errors": 0}
-    now = int(time.time())
+    global _resume_from
+    settings = get_settings()
+    budget = settings.STORAGE_GC_MAX_DELETES_PER_RUN
+    stats = {"deleted": 0, "kept": 0, "errors": 0, "prefixes": 0, "complete": True}
 
     try:
         db = get_supabase_client()
 
         # Lấy tất cả user_id — single-user system, nhưng giữ generic
-        users_res = db.table("users").select("id").execute()
-        users = users_res.data or []
-
-        for user in users:
-            user_id = user["id"]
-            prefix = f"{user_id}/temp"
-
+        user_ids = [u["id"] for u in (db.table("users").select("id").execute().data or [])]
+
+        targets: list[tuple[str, str, int]] = []
+        for policy in get_lifecycle_policies():
+            if "{user_id}" in policy["prefix"]:
+                for user_id in user_ids:
+                    targets.append((policy["bucket"], policy["prefix"].format(user_id=user_id), policy["max_age_seconds"]))
+            else:
+                targets.append((policy["bucket"], policy["prefix"], policy["max_age_seconds"]))
+
+        # Bắt đầu lại từ prefix mà lượt trước chưa dọn xong
+        if _resume_from is not None:
+            keys = [(bucket, prefix) for bucket, prefix, _ in targets]
+            if _resume_from in keys:
+                start = keys.index(_resume_from)
+                targets = targets[start:] + targets[:start]
+        _resume_from = None
+
+        for bucket, prefix, max_age in targets:
+            if stats["deleted"] >= budget:
+                _resume_from = (bucket, prefix)
+                stats["complete"] = False
+                break
             try:
-                files = db.storage.from_("knowledge-base").list(prefix)
+                result = collect_prefix(db.storage, bucket, prefix, max_age, budget - stats["deleted"])
             except Exception as e:
-                logger.warning(f"Could not list temp files for user {user_id}: {e}")
+                logger.warning(f"Could not collect {bucket}/{prefix}: {e}")
                 stats["errors"] += 1
                 continue
-
-            if not files:
-                continue
-
-            for file_obj in files:
-                file_name = file_obj.get("name", "")
-                if not file_name:
-                    continue
-
-                ts = _parse_timestamp_from_name(file_name)
-                if ts is None:
-                    # Không đúng format `{ts}_{name}` → bỏ qua, không xóa nhầm
-                    logger.debug(f"Skipping temp file with unrecognized format: {file_name}")
-                    stats["skipped"] += 1
-                    continue
-
-                age_seconds = now - ts
-                if age_seconds > MAX_AGE_SECONDS:
-                    storage_path = f"{prefix}/{file_name}"
-                    try:
-                        db.storage.from_("knowledge-base").remove([storage_path])
-                        logger.info(
-                            f"🗑️  Deleted expired temp file: {storage_path} "
-                            f"(age: {age_seconds // 3600}h)"
-                        )
-                        stats["deleted"] += 1
-                    except Exception as e:
-                        logger.warning(f"Failed to delete temp file {storage_path}: {e}")
-                        stats["errors"] += 1
-                else:
-                    stats["skipped"] += 1
+            stats["prefixes"] += 1
+            for key in ("deleted", "kept", "errors"):
+                stats[key] += result[key]
+            if not result["exhausted"]:
+                _resume_from = (bucket, prefix)
+                stats["complete"] = False
+                break
 
     except Exception as e:
-        logger.error(f"cleanup_temp_files failed: {e}")
+        logger.error(f"collect_expired_storage_objects failed: {e}")
         stats["errors"] += 1
 
     logger.info(
-        f"✅ Temp cleanup finished — "
-        f"deleted={stats['deleted']}, skipped={stats['skipped']}, errors={stats['errors']}"
+        f"✅ Storage cleanup finished — deleted={stats['deleted']}, kept={stats['kept']}, "
+        f"errors={stats['errors']}, prefixes={stats['prefixes']}, complete={stats['complete']}"
     )
     return stats
@@ -0,0 +1,55 @@
+"""
+Background job: Đồng bộ local vector index (quick_notes + material_chunks) từ Supabase.
+
+Chỉ chạy khi LOCAL_VECTOR_INDEX_ENABLED=true.
+
+Luồng:
+  - Lần chạy đầu (ngay khi khởi động): load snapshot float16 từ đĩa → kéo phần chênh lệch.
+  - Các lần sau: incremental sync theo watermark timestamp, ghi lại snapshot nếu có thay đổi.
+"""
+
+import logging
+
+from app.core.database import get_supabase_client
+from app.features.knowledge.local_index import get_local_index, CORPUS_NOTES, CORPUS_MATERIALS
+
+logger = logging.getLogger(__name__)
+
+
+def sync_local_vector_indexes() -> dict:
+    """Incrementally sync every user's local indexes and persist snapshots.
+
+    Returns:
+        dict: { "synced_rows": int, "indexes": int, "errors": int }
+    """
+    stats = {"synced_rows": 0, "indexes": 0, "errors": 0}
+
+    try:
+        db = get_supabase_client()
+        users = db.table("users").select("id").execute().data or []
+
+        for user in users:
+            for corpus in (CORPUS_NOTES, CORPUS_MATERIALS):
+                index = get_local_index(user["id"], corpus)
+                if index is None:
+                    return stats  # Feature disabled
+                try:
+                    changed = index.sync(db)
+                    if changed:
+                        index.save_snapshot()
+                    stats["synced_rows"] += changed
+                    stats["indexes"] += 1
+                except Exception as e:
+                    logger.warning(f"Local index sync failed ({corpus}, user {user['id']}): {e}")
+                    stats["errors"] += 1
+
+    except Exception as e:
+        logger.error(f"sync_local_vector_indexes failed: {e}")
+        stats["errors"] += 1
+
+    if stats["synced_rows"]:
+        logger.info(
+            f"🧭 Local vector index synced — rows={stats['synced_rows']}, "
+            f"indexes={stats['indexes']}, errors={stats['errors']}"
+        )
+    return stats
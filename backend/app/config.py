@@ -41,11 +41,54 @@ class Settings(BaseSettings):
     EMBEDDING_PROVIDER: str = "gemini"
     EMBEDDING_MODEL: str = "gemini-embedding-001"
     EMBEDDING_DIMENSIONS: int = 768
+    EMBEDDING_BATCH_WINDOW_MS: int = 50  # Coalesce concurrent embed requests within this window
+    EMBEDDING_BATCH_MAX_SIZE: int = 100  # Max texts per embed_documents call
+    CHUNK_TARGET_TOKENS: int = 450  # Token budget per knowledge-base chunk (estimated)
+    CHUNK_OVERLAP_TOKENS: int = 32  # Trailing whole sentences/lines carried into the next chunk
+
+    # ── Local Vector Index (optional, single-user) ───────
+    LOCAL_VECTOR_INDEX_ENABLED: bool = False  # True = vector branch of search answered in-process
+    LOCAL_VECTOR_INDEX_DIR: str = ".vector_index"  # Snapshot dir (float16 .npy + meta.json)
+    LOCAL_VECTOR_INDEX_SYNC_MINUTES: int = 2  # Incremental sync interval from Supabase
+
+    # ── Knowledge Base Uploads ───────────────────────────
+    KB_UPLOAD_MAX_MB: int = 50  # Persistent upload (RAG ingestion)
+    KB_TEMP_UPLOAD_MAX_MB: int = 10  # Chat attachment (extract-text only)
+    KB_SNAPSHOT_MAX_MB: int = 500  # Knowledge-base snapshot import (NPZ)
+
+    # ── Storage Lifecycle (temp-file GC) ─────────────────
+    STORAGE_GC_INTERVAL_HOURS: int = 6
+    STORAGE_GC_MAX_DELETES_PER_RUN: int = 5000  # Remaining objects are collected on the next run
+    KB_TEMP_MAX_AGE_HOURS: int = 24  # knowledge-base/{user_id}/temp (0 = keep forever)
+    CHAT_UPLOAD_MAX_AGE_DAYS: int = 90  # chat-uploads (0 = keep forever)
+    GENERATED_IMAGE_MAX_AGE_DAYS: int = 30  # generated-images (0 = keep forever)
+
+    # ── Background Job Queue ─────────────────────────────
+    JOB_WORKER_CONCURRENCY: int = 2  # Jobs run in parallel per process
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0  # Idle poll interval (enqueue wakes the worker early)
+    JOB_LEASE_SECONDS: int = 300  # Lease length; renewed by heartbeat while a job runs
+    JOB_MAX_ATTEMPTS: int = 5  # Default retry budget per job
+    JOB_RETRY_BASE_SECONDS: int = 10  # Backoff = base * 2^(attempt-1), jittered, capped at 10 min
+    JOB_SWEEP_INTERVAL_MINUTES: int = 5  # Recover expired leases / stuck 'processing' rows
 
     # ── School API ───────────────────────────────────────
     SCHOOL_API_BASE_URL: str = "https://ttsv.tvu.edu.vn/public/api"
     SCHOOL_CACHE_TTL_HOURS: int = 24  # Cache expiry
-    SCHOOL_API_TIMEOUT: int = 30  # HTTP timeout in seconds
+    SCHOOL_CACHE_MAX_STALE_HOURS: int = 168  # Serve stale data (refreshing in background) this long past TTL
+    ACADEMIC_MEMORY_CACHE_SIZE: int = 512  # In-process entries in front of academic_sync_cache
+    SCHOOL_API_TIMEOUT: int = 30  # Total budget per call (retries + backoff included), seconds
+    SCHOOL_API_ATTEMPT_TIMEOUT: int = 10  # Timeout of a single HTTP attempt
+    SCHOOL_API_MAX_RETRIES: int = 2  # Retries on network errors / 5xx / 429 (full jitter)
+    SCHOOL_API_RETRY_BASE_SECONDS: float = 0.5
+    SCHOOL_API_RATE_PER_SECOND: float = 5  # Token bucket shared by all portal requests (0 = unlimited)
+    SCHOOL_API_BURST: int = 10
+    SCHOOL_BREAKER_FAILURES: int = 3  # Consecutive failed calls before an endpoint's breaker opens
+    SCHOOL_BREAKER_RESET_SECONDS: int = 60  # Open → half-open probe after this long
+    SCHOOL_CLOCK_REFRESH_MINUTES: int = 30  # Re-measure school clock offset (timetable types: daily)
+    SCHOOL_SESSION_TTL_MINUTES: int = 45  # Reuse a login this long when the token carries no expiry
+    SCHOOL_SESSION_POOL_SIZE: int = 32  # Logged-in clients kept per process (LRU)
+    ACADEMIC_CHANGE_SYNC_HOURS: int = 3  # Re-sync grades + timetable to detect changes (0 = only on demand)
+    ACADEMIC_CHANGE_PUSH_MINUTES: int = 5  # Push pending change events to Zalo
 
     # ── Tavily (AI Search Engine) ────────────────────────
     TAVILY_API_KEY: str = ""  # Free tier: 1000 req/month
@@ -57,6 +100,10 @@ class Settings(BaseSettings):
     ZALO_BOT_TOKEN: str = ""  # Token from Zalo Bot Creator
     ZALO_CHAT_ID: str = ""    # Your personal Zalo chat ID
     ZALO_WEBHOOK_SECRET: str = ""  # Secret token for webhook verification
+    ZALO_SEND_INTERVAL_SECONDS: float = 0.3  # Min gap between two sends to the same chat (grows on 429)
+    ZALO_SEND_MAX_INTERVAL_SECONDS: float = 10
+    ZALO_SEND_MAX_RETRIES: int = 3  # Retries of a rate-limited (429) send
+    ZALO_OUTBOX_IDLE_SECONDS: float = 60  # Per-chat queue worker exits after this long idle
 
     # ── Agent ────────────────────────────────────────────
     AGENT_RECURSION_LIMIT: int = 25  # Max graph steps (agent+tool nodes per turn)
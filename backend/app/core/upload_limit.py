@@ -0,0 +1,81 @@
+"""
+ASGI middleware: reject oversized upload bodies before they are parsed.
+
+FastAPI parse toàn bộ multipart body trước khi gọi endpoint, nên check kích thước
+trong endpoint là quá muộn (file đã được đọc hết). Middleware này:
+  - Từ chối ngay (413) nếu Content-Length khai báo vượt giới hạn.
+  - Với body chunked / không khai báo, đếm byte khi stream vào và cắt ngang khi vượt.
+"""
+
+import json
+
+# Cho phép thêm phần overhead của multipart (boundary, headers, form fields)
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class UploadLimitMiddleware:
+    """Per-path request body limits for upload endpoints."""
+
+    def __init__(self, app, limits: dict[str, int]):
+        """
+        Args:
+            app: The ASGI app.
+            limits: { "/api/knowledge/upload": max_file_bytes, ... }
+        """
+        self.app = app
+        self.limits = {path: size + MULTIPART_OVERHEAD_BYTES for path, size in limits.items()}
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if limit is None or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope.get("headers") or []).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await _send_413(send, limit)
+            return
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            # App sẽ cố trả lỗi parse body (400/500) — thay bằng 413 phía dưới
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded:
+            await _send_413(send, limit)
+
+
+async def _send_413(send, limit: int):
+    body = json.dumps({
+        "detail": f"Request body too large. Limit is {(limit - MULTIPART_OVERHEAD_BYTES) // (1024 * 1024)}MB."
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
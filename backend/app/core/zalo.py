@@ -3,23 +3,27 @@ Zalo Bot notification service.
 
 Sends push notifications via Zalo Bot API (sendMessage).
 Docs: https://bot.zaloplatforms.com/docs/
+
+All calls share one keep-alive HTTP client; messages, photos and stickers go
+through the per-chat outbound queue (ordering + rate-limit-aware pacing), see
+app/core/zalo_outbox.py.
 """
 
 import logging
-import asyncio
-import httpx
 
 from app.config import get_settings
 from app.core.zalo_formatter import split_text_for_zalo
+from app.core.zalo_outbox import get_zalo_outbox
 
 logger = logging.getLogger(__name__)
 
-ZALO_API_BASE = "https://bot-api.zaloplatforms.com"
-
 
 async def send_zalo_message(text: str, chat_id: str | None = None) -> bool:
     """Send a text message via Zalo Bot.
 
+    Long text is split into chunks that are delivered back-to-back on the chat's
+    queue (no other message can land between two chunks).
+
     Args:
         text: Message content (max 2000 chars).
         chat_id: Recipient chat ID. Defaults to ZALO_CHAT_ID from config.
@@ -36,7 +40,6 @@ async def send_zalo_message(text: str, chat_id: str | None = None) -> bool:
         logger.warning("Zalo Bot not configured (missing ZALO_BOT_TOKEN or ZALO_CHAT_ID)")
         return False
 
-    url = f"{ZALO_API_BASE}/bot{token}/sendMessage"
     chunks = split_text_for_zalo(text)
 
     if not chunks:
@@ -44,29 +47,20 @@ async def send_zalo_message(text: str, chat_id: str | None = None) -> bool:
         return True
 
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            total_chunks = len(chunks)
-
-            for index, chunk in enumerate(chunks, start=1):
-                payload = {
-                    "chat_id": recipient,
-                    "text": chunk,
-                }
-
-                response = await client.post(url, json=payload)
-                data = response.json()
-
-                if data.get("ok"):
-                    message_id = data.get("result", {}).get("message_id", "N/A")
-                    logger.info(f"✅ Zalo message chunk {index}/{total_chunks} sent (msg_id: {message_id})")
-                else:
-                    logger.error(f"❌ Zalo API error on chunk {index}/{total_chunks}: {data}")
-                    return False
+        results = await get_zalo_outbox().send(
+            recipient, [("sendMessage", {"chat_id": recipient, "text": chunk}) for chunk in chunks]
+        )
+        total_chunks = len(chunks)
 
-                if index < total_chunks:
-                    await asyncio.sleep(0.5)
+        for index, data in enumerate(results, start=1):
+            if data.get("ok"):
+                message_id = data.get("result", {}).get("message_id", "N/A")
+                logger.info(f"✅ Zalo message chunk {index}/{total_chunks} sent (msg_id: {message_id})")
+            else:
+                logger.error(f"❌ Zalo API error on chunk {index}/{total_chunks}: {data}")
+                return False
 
-            return True
+        return True
     except Exception as e:
         logger.error(f"❌ Failed to send Zalo message: {e}")
         return False
@@ -86,22 +80,19 @@ async def send_zalo_sticker(sticker_id: str, chat_id: str | None = None) -> bool
     if not token or not recipient:
         return False
 
-    url = f"{ZALO_API_BASE}/bot{token}/sendSticker"
     payload = {
         "chat_id": recipient,
         "sticker": sticker_id
     }
 
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.post(url, json=payload)
-            data = response.json()
-            if data.get("ok"):
-                logger.info(f"✅ Zalo sticker sent")
-                return True
-            else:
-                logger.error(f"❌ Zalo sticker error: {data}")
-                return False
+        [data] = await get_zalo_outbox().send(recipient, [("sendSticker", payload)], timeout=10)
+        if data.get("ok"):
+            logger.info(f"✅ Zalo sticker sent")
+            return True
+        else:
+            logger.error(f"❌ Zalo sticker error: {data}")
+            return False
     except Exception as e:
         logger.error(f"❌ Failed to send Zalo sticker: {e}")
         return False
@@ -111,6 +102,8 @@ async def send_zalo_chat_action(action: str = "typing",
                                  chat_id: str | None = None) -> bool:
     """Show a chat action indicator (e.g. "typing...") in Zalo.
 
+    Not queued — an indicator has no ordering to preserve.
+
     Args:
         action: "typing" or "upload_photo".
         chat_id: Recipient chat ID. Defaults to ZALO_CHAT_ID.
@@ -122,19 +115,16 @@ async def send_zalo_chat_action(action: str = "typing",
     if not token or not recipient:
         return False
 
-    url = f"{ZALO_API_BASE}/bot{token}/sendChatAction"
     payload = {"chat_id": recipient, "action": action}
 
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.post(url, json=payload)
-            data = response.json()
-            if data.get("ok"):
-                logger.info(f"✅ Zalo chat action '{action}' sent")
-                return True
-            else:
-                logger.error(f"❌ Zalo sendChatAction error: {data}")
-                return False
+        data = await get_zalo_outbox().post("sendChatAction", payload, timeout=10)
+        if data.get("ok"):
+            logger.info(f"✅ Zalo chat action '{action}' sent")
+            return True
+        else:
+            logger.error(f"❌ Zalo sendChatAction error: {data}")
+            return False
     except Exception as e:
         logger.error(f"❌ Failed to send Zalo chat action: {e}")
         return False
@@ -156,21 +146,18 @@ async def send_zalo_photo(photo_url: str, caption: str = "",
     if not token or not recipient:
         return False
 
-    url = f"{ZALO_API_BASE}/bot{token}/sendPhoto"
     payload: dict = {"chat_id": recipient, "photo": photo_url}
     if caption:
         payload["caption"] = caption[:1000]
 
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.post(url, json=payload)
-            data = response.json()
-            if data.get("ok"):
-                logger.info(f"✅ Zalo photo sent: {photo_url[:60]}")
-                return True
-            else:
-                logger.error(f"❌ Zalo sendPhoto error: {data}")
-                return False
+        [data] = await get_zalo_outbox().send(recipient, [("sendPhoto", payload)], timeout=20)
+        if data.get("ok"):
+            logger.info(f"✅ Zalo photo sent: {photo_url[:60]}")
+            return True
+        else:
+            logger.error(f"❌ Zalo sendPhoto error: {data}")
+            return False
     except Exception as e:
         logger.error(f"❌ Failed to send Zalo photo: {e}")
         return False
@@ -183,7 +170,6 @@ async def send_agent_response_to_zalo(text: str, chat_id: str | None = None) ->
     from pydantic import BaseModel, Field
     from app.core.llm_provider import create_llm
     from app.core.zalo_formatter import EmotionType, get_sticker_id
-    import asyncio
 
     # Định nghĩa cấu trúc ép LLM trả về đúng Enum Emotion
     class EmotionResponse(BaseModel):
@@ -208,8 +194,8 @@ async def send_agent_response_to_zalo(text: str, chat_id: str | None = None) ->
         # Nếu có Sticker được map
         sticker_id = get_sticker_id(emotion_val)
         if sticker_id:
+            # Cùng queue của chat → text chỉ đi sau khi sticker đã được nhận
             await send_zalo_sticker(sticker_id, chat_id)
-            await asyncio.sleep(0.3)  # Chờ Zalo nhận Sticker trước khi nhận Text
             
         # Gửi Text
         return await send_zalo_message(text, chat_id)
@@ -0,0 +1,235 @@
+"""
+Zalo Bot outbound delivery: one keep-alive HTTP client + per-chat ordered queues.
+
+Trước đây mỗi send_zalo_* mở một httpx.AsyncClient mới (TLS handshake mỗi tin)
+và tin nhiều phần / ảnh được giãn cách bằng asyncio.sleep(0.5) / sleep(0.3) cố định.
+Giờ mọi lời gọi đi qua ZaloOutbox:
+
+  send_zalo_message / photo / sticker → outbox.send(chat_id, [(method, payload), ...])
+      → queue của chat đó (FIFO) → worker của chat gửi lần lượt trên client dùng chung
+
+  - Thứ tự: mỗi chat có một worker; một lô (các phần của một tin dài) được gửi liền
+    nhau, không bị tin khác chen giữa. Lô dừng ở phần đầu tiên gửi lỗi.
+  - Nhịp gửi: giữa hai lần gửi cùng chat cách nhau ít nhất `interval`. Bắt đầu
+    ZALO_SEND_INTERVAL_SECONDS; API trả 429 (HTTP hoặc error_code) → chờ Retry-After /
+    parameters.retry_after (nếu có), nhân đôi interval (tối đa
+    ZALO_SEND_MAX_INTERVAL_SECONDS) rồi gửi lại, tối đa ZALO_SEND_MAX_RETRIES lần.
+    Mỗi lần gửi thành công interval giảm một nửa về lại mức gốc.
+  - Worker tự thoát khi queue rỗng quá ZALO_OUTBOX_IDLE_SECONDS.
+
+sendChatAction ("đang gõ...") không cần thứ tự → post() thẳng, không qua queue.
+close() (lifespan shutdown) hủy worker, báo lỗi cho các lô còn chờ và đóng client.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+ZALO_API_BASE = "https://bot-api.zaloplatforms.com"
+
+
+@dataclass
+class _Chat:
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    worker: asyncio.Task | None = None
+    interval: float = 0.0
+    next_send_at: float = 0.0
+
+
+class ZaloOutbox:
+    """Shared keep-alive client + per-chat FIFO delivery with adaptive pacing."""
+
+    def __init__(
+        self,
+        base_interval: float,
+        max_interval: float,
+        max_retries: int,
+        idle_seconds: float = 60,
+        timeout: float = 15,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.max_retries = max_retries
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self.transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._chats: dict[str, _Chat] = {}
+        self.stats = {"sent": 0, "failed": 0, "rate_limited": 0, "retries": 0}
+
+    # ── Public API ───────────────────────────────────────
+
+    async def post(self, method: str, payload: dict, timeout: float | None = None) -> dict:
+        """Call one Bot API method right away (no queue). Returns the JSON body."""
+        data, _ = await self._post(method, payload, timeout)
+        return data
+
+    async def send(
+        self, chat_id: str, calls: list[tuple[str, dict]], timeout: float | None = None
+    ) -> list[dict]:
+        """Queue `calls` as one ordered batch for `chat_id` and wait for delivery.
+
+        Returns:
+            JSON bodies of the calls that were attempted; the batch stops at the
+            first one that is not {"ok": true}.
+
+        Raises:
+            httpx.HTTPError: Network failure (the rest of the batch is dropped).
+        """
+        self._get_client()
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _Chat(interval=self.base_interval)
+        future = asyncio.get_running_loop().create_future()
+        chat.queue.put_nowait((calls, timeout, future))
+        if chat.worker is None or chat.worker.done():
+            chat.worker = asyncio.create_task(self._run(chat_id, chat))
+        return await future
+
+    def snapshot(self) -> dict:
+        return {
+            "chats": len(self._chats),
+            "queued": sum(c.queue.qsize() for c in self._chats.values()),
+            "stats": dict(self.stats),
+        }
+
+    async def close(self):
+        """Cancel chat workers, fail pending batches and close the HTTP client."""
+        for chat in self._chats.values():
+            if chat.worker is not None:
+                chat.worker.cancel()
+            while not chat.queue.empty():
+                _, _, future = chat.queue.get_nowait()
+                if not future.done():
+                    future.set_exception(ConnectionError("Zalo outbox closed"))
+        self._chats.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ── Internals ────────────────────────────────────────
+
+    async def _post(self, method: str, payload: dict, timeout: float | None) -> tuple[dict, float | None]:
+        token = get_settings().ZALO_BOT_TOKEN
+        response = await self._get_client().post(
+            f"{ZALO_API_BASE}/bot{token}/{method}", json=payload, timeout=timeout or self.timeout
+        )
+        return self._parse(response)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            # Event loop mới (test / script) → client + worker cũ gắn với loop đã chết
+            self._chats.clear()
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+            )
+            self._loop = loop
+        return self._client
+
+    async def _run(self, chat_id: str, chat: _Chat):
+        while True:
+            try:
+                calls, timeout, future = await asyncio.wait_for(chat.queue.get(), self.idle_seconds)
+            except asyncio.TimeoutError:
+                if chat.queue.empty():
+                    if self._chats.get(chat_id) is chat:
+                        del self._chats[chat_id]
+                    return
+                continue
+            if future.done():  # Caller đã hủy
+                continue
+            try:
+                results = []
+                for method, payload in calls:
+                    data = await self._deliver(chat, method, payload, timeout)
+                    results.append(data)
+                    if not data.get("ok"):
+                        break
+                if not future.done():
+                    future.set_result(results)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.set_exception(ConnectionError("Zalo outbox closed"))
+                raise
+            except Exception as e:
+                self.stats["failed"] += 1
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _deliver(self, chat: _Chat, method: str, payload: dict, timeout: float | None) -> dict:
+        for attempt in range(self.max_retries + 1):
+            wait = chat.next_send_at - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            data, retry_after = await self._post(method, payload, timeout)
+            if data.get("error_code") != 429:
+                chat.interval = max(self.base_interval, chat.interval / 2)
+                chat.next_send_at = time.monotonic() + chat.interval
+                self.stats["sent" if data.get("ok") else "failed"] += 1
+                return data
+
+            self.stats["rate_limited"] += 1
+            chat.interval = min(self.max_interval, max(chat.interval * 2, self.base_interval or 0.5))
+            delay = retry_after if retry_after is not None else chat.interval
+            chat.next_send_at = time.monotonic() + delay
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                logger.warning(f"⏳ Zalo {method} rate limited — retrying in {delay:.1f}s")
+        self.stats["failed"] += 1
+        return data
+
+    @staticmethod
+    def _parse(response: httpx.Response) -> tuple[dict, float | None]:
+        """(JSON body, retry-after seconds). A rate limit always shows up as error_code 429."""
+        try:
+            data = response.json()
+        except ValueError:
+            data = {"ok": False, "error_code": response.status_code, "description": response.text[:200]}
+        if not isinstance(data, dict):
+            data = {"ok": False, "description": str(data)[:200]}
+        if response.status_code == 429:
+            data.setdefault("ok", False)
+            data["error_code"] = 429
+        retry_after = None
+        if data.get("error_code") == 429:
+            hint = (data.get("parameters") or {}).get("retry_after") or response.headers.get("Retry-After")
+            try:
+                retry_after = float(hint) if hint is not None else None
+            except ValueError:
+                pass
+        return data, retry_after
+
+
+_outbox: ZaloOutbox | None = None
+
+
+def get_zalo_outbox() -> ZaloOutbox:
+    """Process-wide outbox (created on first use)."""
+    global _outbox
+    if _outbox is None:
+        settings = get_settings()
+        _outbox = ZaloOutbox(
+            base_interval=settings.ZALO_SEND_INTERVAL_SECONDS,
+            max_interval=settings.ZALO_SEND_MAX_INTERVAL_SECONDS,
+            max_retries=settings.ZALO_SEND_MAX_RETRIES,
+            idle_seconds=settings.ZALO_OUTBOX_IDLE_SECONDS,
+        )
+    return _outbox
+
+
+async def close_zalo_outbox():
+    """Lifespan shutdown hook."""
+    if _outbox is not None:
+        await _outbox.close()
@@ -0,0 +1,225 @@
+"""
+Dev tooling: Load-test harness for the academic path against the local TVU portal stand-in.
+
+Dựng tvu_portal (uvicorn, cổng ngẫu nhiên trên 127.0.0.1), trỏ SCHOOL_API_BASE_URL
+vào đó, tạo N user giả (credentials mã hóa thật trong MemoryDB) rồi bắn song song
+các lời gọi AcademicService và các tool academic. Báo cáo:
+
+  - p50 / p99 / lỗi theo từng thao tác
+  - số lần login portal thật sự (pn-signin) so với thống kê session pool
+  - số request theo endpoint, lỗi đã tiêm, thống kê cache + breaker
+
+Ví dụ:
+  python -m app.dev.academic_loadtest --users 20 --requests 400 --concurrency 50
+  python -m app.dev.academic_loadtest --ttl-hours 0 --error-rate 0.05 --latency-ms 200 --no-limit
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import defaultdict
+
+import uvicorn
+
+from app.config import get_settings
+from app.core.security import encrypt_value
+from app.dev.memory_db import MemoryDB
+from app.dev.tvu_portal import PortalBehavior, create_portal_app
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile (p in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(p / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def seed_users(db: MemoryDB, count: int, ttl_hours: int | None) -> list[str]:
+    users = []
+    for i in range(count):
+        user_id = f"loadtest-{i:03d}"
+        db.table("users").insert({
+            "id": user_id,
+            "agent_config": {} if ttl_hours is None else {"cache_ttl_hours": ttl_hours},
+        }).execute()
+        db.table("user_credentials").insert({
+            "user_id": user_id,
+            "school_username_enc": encrypt_value(f"1101{i:05d}").decode("utf-8"),
+            "school_password_enc": encrypt_value("secret").decode("utf-8"),
+        }).execute()
+        users.append(user_id)
+    return users
+
+
+def build_operations(db: MemoryDB, mode: str) -> dict:
+    """name → coroutine factory(user_id). Tool errors come back as JSON strings, not exceptions."""
+    from app.features.academic import tools as academic_tools
+    from app.features.academic.service import AcademicService
+
+    academic_tools.get_db = lambda: db  # Tools tự lấy client Supabase → trỏ sang MemoryDB
+
+    async def tool_call(tool, user_id, **kwargs):
+        output = await tool.ainvoke({**kwargs, "user_id": user_id})
+        if isinstance(output, str) and output.startswith('{"status": "error"'):
+            raise RuntimeError(json.loads(output)["message"])
+        return output
+
+    service_ops = {
+        "service.get_timetable": lambda u: AcademicService(db).get_timetable(u),
+        "service.get_grades": lambda u: AcademicService(db).get_grades(u),
+        "service.get_student_info": lambda u: AcademicService(db).get_student_info(u),
+        "service.get_tuition_summary": lambda u: AcademicService(db).get_tuition_summary(u),
+        "service.get_semester_result": lambda u: AcademicService(db).get_semester_result(u, 20251),
+    }
+    tool_ops = {
+        "tool.get_timetable": lambda u: tool_call(academic_tools.get_timetable, u),
+        "tool.get_grades": lambda u: tool_call(academic_tools.get_grades, u),
+        "tool.get_gpa_summary": lambda u: tool_call(academic_tools.get_gpa_summary, u),
+        "tool.get_grade_for_subject": lambda u: tool_call(academic_tools.get_grade_for_subject, u, subject="giai tich"),
+        "tool.get_semester_grades": lambda u: tool_call(academic_tools.get_semester_grades, u, semester_id=20251),
+        "tool.get_tuition_info": lambda u: tool_call(academic_tools.get_tuition_info, u),
+    }
+    if mode == "service":
+        return service_ops
+    if mode == "tools":
+        return tool_ops
+    return {**service_ops, **tool_ops}
+
+
+async def drive(operations: dict, users: list[str], requests: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    plan = [(rng.choice(list(operations)), rng.choice(users)) for _ in range(requests)]
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, list[str]] = defaultdict(list)
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(name: str, user_id: str):
+        async with gate:
+            started = time.perf_counter()
+            try:
+                await operations[name](user_id)
+            except Exception as e:
+                errors[name].append(f"{type(e).__name__}: {e}")
+            latencies[name].append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(name, user_id) for name, user_id in plan))
+    return {"latencies": latencies, "errors": errors, "wall_ms": (time.perf_counter() - started) * 1000}
+
+
+def report(result: dict, portal_stats: dict, requests: int) -> dict:
+    from app.features.academic.cache import get_academic_cache
+    from app.features.academic.resilience import get_school_api_guard
+    from app.features.academic.session_pool import get_school_session_pool
+
+    all_latencies = [v for values in result["latencies"].values() for v in values]
+    ops = {
+        name: {
+            "n": len(values),
+            "errors": len(result["errors"].get(name, [])),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+        }
+        for name, values in sorted(result["latencies"].items())
+    }
+    return {
+        "requests": requests,
+        "wall_ms": round(result["wall_ms"], 1),
+        "throughput_rps": round(requests / (result["wall_ms"] / 1000), 1) if result["wall_ms"] else 0,
+        "p50_ms": round(percentile(all_latencies, 50), 1),
+        "p99_ms": round(percentile(all_latencies, 99), 1),
+        "operations": ops,
+        "portal_logins": portal_stats.get("logins", 0),
+        "portal_requests": {k: v for k, v in sorted(portal_stats.items()) if "/" in k},
+        "injected": {k: portal_stats.get(k, 0) for k in ("http_errors", "app_errors", "unauthorized")},
+        "session_pool": dict(get_school_session_pool().stats),
+        "cache": dict(get_academic_cache().stats),
+        "school_api": get_school_api_guard().snapshot(),
+        "sample_errors": {name: errs[:2] for name, errs in result["errors"].items()},
+    }
+
+
+def print_report(summary: dict):
+    print(f"\n{summary['requests']} requests in {summary['wall_ms']:.0f} ms "
+          f"({summary['throughput_rps']} req/s) — p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms")
+    print(f"\n{'operation':32} {'n':>5} {'err':>5} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, o in summary["operations"].items():
+        print(f"{name:32} {o['n']:>5} {o['errors']:>5} {o['p50_ms']:>9} {o['p99_ms']:>9}")
+    pool = summary["session_pool"]
+    print(f"\nportal logins: {summary['portal_logins']} "
+          f"(pool logins={pool.get('logins')}, reused={pool.get('reused')}, invalidated={pool.get('invalidated')})")
+    print(f"portal requests: {summary['portal_requests']}")
+    print(f"injected faults: {summary['injected']}")
+    print(f"cache: {summary['cache']}")
+    print(f"school api: {summary['school_api']['status']} {summary['school_api']['stats']}")
+    for name, errs in summary["sample_errors"].items():
+        print(f"  ! {name}: {errs[0].splitlines()[0]}")
+
+
+async def main(args: argparse.Namespace) -> dict:
+    behavior = PortalBehavior(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        app_error_rate=args.app_error_rate, unauthorized_rate=args.unauthorized_rate,
+        slow_rate=args.slow_rate, slow_ms=args.slow_ms, seed=args.seed,
+    )
+    portal = create_portal_app(behavior)
+    server = uvicorn.Server(uvicorn.Config(portal, host="127.0.0.1", port=args.port, log_level="warning", lifespan="off"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()  # Bind lỗi → raise
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    settings = get_settings()
+    settings.SCHOOL_API_BASE_URL = f"http://127.0.0.1:{port}/public/api"
+    if args.no_limit:
+        settings.SCHOOL_API_RATE_PER_SECOND = 0
+
+    from app.features.academic.session_pool import close_school_sessions
+
+    db = MemoryDB()
+    users = seed_users(db, args.users, args.ttl_hours)
+    try:
+        result = await drive(build_operations(db, args.mode), users, args.requests, args.concurrency, args.seed)
+        summary = report(result, dict(portal.state.stats), args.requests)
+    finally:
+        await close_school_sessions()
+        server.should_exit = True
+        await serving
+    return summary
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Academic load test against a local TVU portal stand-in")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mode", choices=("service", "tools", "both"), default="both")
+    parser.add_argument("--ttl-hours", type=int, default=None, help="Per-user cache TTL (0 = always hit the portal)")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 503 ratio")
+    parser.add_argument("--app-error-rate", type=float, default=0.0, help='200 + {"code": 500} ratio')
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0, help="401 (revoked token) ratio")
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=15000)
+    parser.add_argument("--no-limit", action="store_true", help="Disable the client-side token bucket")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    summary = asyncio.run(main(arguments))
+    if arguments.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print_report(summary)
@@ -0,0 +1,126 @@
+"""
+Dev tooling: In-memory stand-in for the Supabase client (PostgREST query builder subset).
+
+Đủ cho đường academic (user_credentials, users, academic_sync_cache,
+academic_change_events, tasks_reminders, calendar_events) khi chạy load test:
+  select / insert / upsert(on_conflict, NULL trong khóa = không conflict) / update / delete
+  eq / in_ / is_("null") / gte / lt / order / limit / single
+Không mô phỏng RLS, JSON path hay full-text — không dùng cho gì khác ngoài dev.
+"""
+
+import uuid
+from collections import defaultdict
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db: "MemoryDB", table: str):
+        self.db, self.table = db, table
+        self.op, self.values, self.on_conflict = "select", None, None
+        self.filters = []
+        self._order: tuple[str, bool] | None = None
+        self._limit: int | None = None
+        self._single = False
+
+    # ── Operations ───────────────────────────────────────
+    def select(self, *args, **kwargs):
+        return self
+
+    def insert(self, values):
+        self.op, self.values = "insert", values
+        return self
+
+    def upsert(self, values, on_conflict: str | None = None):
+        self.op, self.values, self.on_conflict = "upsert", values, on_conflict
+        return self
+
+    def update(self, values):
+        self.op, self.values = "update", values
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    # ── Filters / modifiers ──────────────────────────────
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(lambda r: r.get(column) is None)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and str(r[column]) >= str(value))
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and str(r[column]) < str(value))
+        return self
+
+    def order(self, column, desc: bool = False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def execute(self) -> _Result:
+        rows = self.db.tables[self.table]
+        if self.op in ("insert", "upsert"):
+            batch = self.values if isinstance(self.values, list) else [self.values]
+            keys = [k.strip() for k in (self.on_conflict or "").split(",") if k.strip()]
+            written = []
+            for values in batch:
+                row = {"id": str(uuid.uuid4()), **values}
+                # Như Postgres (NULLS DISTINCT): dòng có NULL trong khóa không bao giờ conflict
+                if keys and all(values.get(k) is not None for k in keys):
+                    existing = next((r for r in rows if all(r.get(k) == values.get(k) for k in keys)), None)
+                    if existing is not None:
+                        existing.update(values)
+                        written.append(dict(existing))
+                        continue
+                rows.append(row)
+                written.append(dict(row))
+            return _Result(written)
+
+        matched = [r for r in rows if all(f(r) for f in self.filters)]
+        if self.op == "update":
+            for r in matched:
+                r.update(self.values)
+        elif self.op == "delete":
+            self.db.tables[self.table] = [r for r in rows if r not in matched]
+        if self._order:
+            column, desc = self._order
+            matched.sort(key=lambda r: (r.get(column) is None, str(r.get(column))), reverse=desc)
+        if self._limit is not None:
+            matched = matched[: self._limit]
+        data = [dict(r) for r in matched]
+        if self._single:
+            return _Result(data[0] if data else None)
+        return _Result(data)
+
+
+class MemoryDB:
+    """`db.table(name)` → chainable query over lists of dict rows."""
+
+    def __init__(self):
+        self.tables: dict[str, list[dict]] = defaultdict(list)
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
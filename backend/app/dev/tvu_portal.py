@@ -0,0 +1,255 @@
+"""
+Dev tooling: Local ASGI stand-in for the TVU student portal (ttsv.tvu.edu.vn).
+
+Giả lập đủ phần portal mà SchoolAPIClient dùng, để benchmark / regression-test
+đường academic mà không đụng portal thật:
+
+  GET  /api/pn-signin?code=<base64>   → 302, Location: <root>/#/?CurrUser=<base64 json>&gopage=
+                                        (access_token, userName, FullName, expires_in)
+  GET  /                              → 200 (client follow redirect để lấy cookie)
+  POST /public/api/sch/...  srm/...  dkmh/...  rms/...   (Bearer token bắt buộc → 401 nếu sai)
+  GET  /public/api/hsba/w-gettimeserver, POST sch/w-locdsdoituongthoikhoabieu (không cần auth)
+
+Dữ liệu là bộ mẫu sinh ra quanh ngày hiện tại (TKB 18 tuần, 3 HK điểm...).
+Hành vi cấu hình được qua PortalBehavior (sửa được lúc đang chạy):
+  latency_ms ± jitter_ms       độ trễ mỗi request
+  error_rate                   tỉ lệ HTTP 503
+  app_error_rate               tỉ lệ HTTP 200 + {"code": 500, "result": false} (lỗi kiểu portal)
+  unauthorized_rate            tỉ lệ 401 (token bị thu hồi sớm)
+  slow_rate / slow_ms          tỉ lệ request treo lâu (thử timeout / breaker)
+
+Chạy riêng:  uvicorn app.dev.tvu_portal:app --port 8765
+rồi đặt SCHOOL_API_BASE_URL=http://127.0.0.1:8765/public/api
+"""
+
+import asyncio
+import base64
+import json
+import random
+from collections import Counter
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, RedirectResponse, Response
+
+SEMESTER = 20252
+SUBJECTS = [
+    ("CS101", "Lập trình Python", 4), ("MA101", "Giải tích 1", 3), ("EN201", "Tiếng Anh 2", 3),
+    ("PH101", "Vật lý đại cương", 2), ("CS205", "Cấu trúc dữ liệu", 3),
+]
+
+
+class PortalBehavior:
+    """Latency / error injection knobs (mutable while the server runs)."""
+
+    def __init__(
+        self,
+        latency_ms: float = 50,
+        jitter_ms: float = 20,
+        error_rate: float = 0.0,
+        app_error_rate: float = 0.0,
+        unauthorized_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_ms: float = 15000,
+        token_ttl_seconds: int = 3600,
+        seed: int | None = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.app_error_rate = app_error_rate
+        self.unauthorized_rate = unauthorized_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.token_ttl_seconds = token_ttl_seconds
+        self.random = random.Random(seed)
+
+    def delay(self) -> float:
+        if self.slow_rate and self.random.random() < self.slow_rate:
+            return self.slow_ms / 1000
+        return max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def roll(self, rate: float) -> bool:
+        return bool(rate) and self.random.random() < rate
+
+
+# ── Sample data ──────────────────────────────────────────
+
+def _monday(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def sample_timetable(today: date | None = None, weeks: int = 18) -> dict:
+    first = _monday(today or date.today()) - timedelta(weeks=6)
+    result = []
+    for i in range(weeks):
+        start = first + timedelta(weeks=i)
+        slots = []
+        for offset, (code, name, credits) in zip((0, 2, 4), SUBJECTS):
+            day = start + timedelta(days=offset)
+            slots.append({
+                "thu_kieu_so": day.isoweekday() + 1, "tiet_bat_dau": 1 if offset != 2 else 6, "so_tiet": 4,
+                "ma_mon": code, "ten_mon": name, "ten_mon_eg": name, "so_tin_chi": str(credits),
+                "ten_giang_vien": "Nguyễn Văn A", "ma_phong": f"B21.{101 + offset}", "ten_lop": "DA24TTA",
+                "ngay_hoc": f"{day.isoformat()}T00:00:00", "is_nghi_day": False,
+            })
+        result.append({
+            "tuan_hoc_ky": i + 1,
+            "ngay_bat_dau": start.strftime("%d/%m/%Y"),
+            "ngay_ket_thuc": (start + timedelta(days=6)).strftime("%d/%m/%Y"),
+            "ds_thoi_khoa_bieu": slots,
+        })
+    return {"ds_tuan_tkb": result}
+
+
+def sample_grades() -> dict:
+    semesters = []
+    for k, code in enumerate((20251, 20242, 20241)):
+        courses = []
+        for j, (subject, name, credits) in enumerate(SUBJECTS):
+            score = round(5.5 + ((j * 7 + k * 3) % 9) * 0.5, 1)
+            courses.append({
+                "ma_mon": f"{subject}-{k}", "ten_mon": name, "ten_mon_eg": name, "so_tin_chi": str(credits),
+                "diem_tk": str(score), "diem_tk_so": str(round(score / 2.5, 1)),
+                "diem_tk_chu": "A" if score >= 8.5 else "B" if score >= 7 else "C",
+                "ket_qua": 1, "ds_diem_thanh_phan": [{"ten": "Giữa kỳ", "diem": str(score)}],
+            })
+        semesters.append({
+            "hoc_ky": str(code), "ten_hoc_ky": f"Học kỳ {code % 10} Năm học {code // 10}-{code // 10 + 1}",
+            "dtb_hk_he10": "7.50", "dtb_hk_he4": "3.00", "dtb_tich_luy_he_10": "7.40",
+            "dtb_tich_luy_he_4": "2.95", "so_tin_chi_dat_hk": "15", "xep_loai_tkb_hk": "Khá",
+            "ds_diem_mon_hoc": courses,
+        })
+    return {"ds_diem_hocky": semesters}
+
+
+def sample_data(endpoint: str, body: dict, username: str) -> dict:
+    semester = (body or {}).get("hoc_ky") or SEMESTER
+    if endpoint == "sch/w-locdshockytkbuser":
+        return {"hoc_ky_theo_ngay_hien_tai": SEMESTER, "ds_hoc_ky": [
+            {"hoc_ky": code, "ten_hoc_ky": f"Học kỳ {code % 10} Năm học {code // 10}-{code // 10 + 1}"}
+            for code in (20252, 20251, 20242, 20241)
+        ]}
+    if endpoint == "sch/w-locdstkbtuanusertheohocky":
+        return sample_timetable()
+    if endpoint == "sch/w-locdstkbhockytheodoituong":
+        return {"ds_nhom_to": [
+            {"ma_mon": code, "ten_mon": name, "so_tc": credits, "nhom_to": "01", "gv": "Nguyễn Văn A",
+             "lop": "DA24TTA", "thu": 2 + i, "tbd": 1, "so_tiet": 4, "tu_gio": "07:00", "den_gio": "10:30",
+             "phong": f"B21.{101 + i}", "tkb": f"HK {semester}"}
+            for i, (code, name, credits) in enumerate(SUBJECTS)
+        ]}
+    if endpoint == "srm/w-locdsdiemsinhvien":
+        return sample_grades()
+    if endpoint == "dkmh/w-locsinhvieninfo":
+        return {"ma_sv": username, "ten_day_du": f"Sinh viên {username}", "lop": "DA24TTA",
+                "khoa": "Trường Kỹ thuật và Công nghệ", "nganh": "Công nghệ thông tin",
+                "bac_he_dao_tao": "đại học", "hien_dien_sv": "Đang học"}
+    if endpoint == "dkmh/w-inketquahoctap":
+        return {"ds_du_lieu": [
+            {"ma_doi_tuong": code, "ten_doi_tuong": name, "diem_trung_binh1": credits, "diem_trung_binh2": 7.5}
+            for code, name, credits in SUBJECTS
+        ]}
+    if endpoint == "rms/w-locdstonghophocphisv":
+        return {"ds_hoc_phi_hoc_ky": [
+            {"nhhk": code, "ten_hoc_ky": f"HK {code}", "hoc_phi": "9000000", "mien_giam": "0",
+             "phai_thu": "9000000", "da_thu": "9000000" if code != SEMESTER else "0",
+             "con_no": "0" if code != SEMESTER else "9000000", "don_gia": "600000"}
+            for code in (20252, 20251)
+        ]}
+    if endpoint == "sch/w-locdsdoituongthoikhoabieu":
+        return {"ds_doi_tuong_tkb": [
+            {"loai_doi_tuong": 1, "ten_doi_tuong": "Cá nhân"}, {"loai_doi_tuong": 2, "ten_doi_tuong": "Lớp sinh viên"},
+            {"loai_doi_tuong": 3, "ten_doi_tuong": "Lớp"}, {"loai_doi_tuong": 4, "ten_doi_tuong": "Môn học"},
+            {"loai_doi_tuong": 6, "ten_doi_tuong": "Khoa quản lý sinh viên"},
+        ]}
+    return {}
+
+
+# ── ASGI app ─────────────────────────────────────────────
+
+PUBLIC_ENDPOINTS = {"sch/w-locdsdoituongthoikhoabieu"}
+
+
+def create_portal_app(behavior: PortalBehavior | None = None) -> FastAPI:
+    """Build the stand-in. `app.state.behavior` / `app.state.stats` are read/write at runtime."""
+    portal = FastAPI(title="TVU portal stand-in")
+    portal.state.behavior = behavior or PortalBehavior()
+    portal.state.stats = Counter()
+    portal.state.tokens = {}  # access_token → username
+
+    async def _inject(request: Request) -> Response | None:
+        b: PortalBehavior = portal.state.behavior
+        await asyncio.sleep(b.delay())
+        if b.roll(b.error_rate):
+            portal.state.stats["http_errors"] += 1
+            return JSONResponse({"message": "Service Unavailable"}, status_code=503)
+        return None
+
+    @portal.get("/api/pn-signin")
+    async def signin(request: Request, code: str = ""):
+        portal.state.stats["logins"] += 1
+        injected = await _inject(request)
+        if injected is not None:
+            return injected
+        try:
+            username = json.loads(base64.b64decode(code))["username"]
+        except Exception:
+            return Response("Bad request", status_code=200)  # Portal thật trả trang lỗi, không 302
+
+        token = f"tok-{portal.state.stats['logins']}-{username}"
+        portal.state.tokens[token] = username
+        curr_user = base64.b64encode(json.dumps({
+            "access_token": token, "userName": username, "FullName": f"Sinh viên {username}",
+            "roles": "SINHVIEN", "expires_in": portal.state.behavior.token_ttl_seconds,
+        }).encode()).decode()
+        root = str(request.base_url).rstrip("/")
+        response = RedirectResponse(f"{root}/#/?CurrUser={quote(curr_user)}&gopage=", status_code=302)
+        response.set_cookie("ASP.NET_SessionId", token[-12:])
+        return response
+
+    @portal.get("/")
+    async def landing():
+        return Response("<html></html>", media_type="text/html")
+
+    @portal.get("/public/api/hsba/w-gettimeserver")
+    async def server_time(request: Request):
+        portal.state.stats["hsba/w-gettimeserver"] += 1
+        injected = await _inject(request)
+        if injected is not None:
+            return injected
+        return {"thoigianht": datetime.now().strftime("%d/%m/%Y %H:%M:%S")}
+
+    @portal.post("/public/api/{group}/{name}")
+    async def data_endpoint(group: str, name: str, request: Request):
+        endpoint = f"{group}/{name}"
+        portal.state.stats[endpoint] += 1
+        injected = await _inject(request)
+        if injected is not None:
+            return injected
+
+        b: PortalBehavior = portal.state.behavior
+        username = ""
+        if endpoint not in PUBLIC_ENDPOINTS:
+            token = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+            username = portal.state.tokens.get(token, "")
+            if not username or b.roll(b.unauthorized_rate):
+                portal.state.stats["unauthorized"] += 1
+                portal.state.tokens.pop(token, None)
+                return JSONResponse({"message": "Unauthorized"}, status_code=401)
+        if b.roll(b.app_error_rate):
+            portal.state.stats["app_errors"] += 1
+            return {"code": 500, "result": False, "message": "Lỗi hệ thống"}
+
+        try:
+            body = await request.json()
+        except Exception:
+            body = {}
+        filters = body.get("filter", body) if isinstance(body, dict) else {}
+        return {"result": True, "code": 200, "data": sample_data(endpoint, filters, username)}
+
+    return portal
+
+
+app = create_portal_app()
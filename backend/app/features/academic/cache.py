@@ -0,0 +1,116 @@
+"""
+Academic feature: In-process tier in front of academic_sync_cache.
+
+Mỗi lần _get_cached trước đây tốn 2 lần đọc PostgREST (users.agent_config để lấy
+TTL, rồi academic_sync_cache), và khi dữ liệu đã cũ thì user phải chờ login +
+fetch từ server trường. Module này giữ:
+
+  1. LRU (user_id, data_type, semester) → {raw_data, synced_at} — tier 1, trước bảng
+     academic_sync_cache (tier 2, nguồn sự thật dùng chung giữa các process).
+  2. TTL theo user (agent_config.cache_ttl_hours) đã memoize — xóa khi profile
+     được cập nhật, và tự hết hạn sau TTL_CONFIG_MAX_AGE giây (process khác có thể
+     đã đổi cấu hình).
+  3. Refresh nền single-flight theo key cho stale-while-revalidate: service trả dữ
+     liệu cũ ngay, task nền fetch lại và ghi cả hai tier.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+TTL_CONFIG_MAX_AGE = 600
+
+CacheKey = tuple[str, str, str | None]
+
+
+class AcademicCache:
+    """LRU of academic datasets + memoized per-user TTL + background refresh tasks."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, dict] = OrderedDict()
+        self._ttl_hours: dict[str, tuple[int, float]] = {}
+        self._refreshing: dict[CacheKey, asyncio.Task] = {}
+        self.stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stale_served": 0, "failovers": 0, "refreshes": 0}
+
+    # ── Datasets ─────────────────────────────────────────
+
+    def get(self, key: CacheKey) -> dict | None:
+        """{ "raw_data", "synced_at" (unix ts) } or None."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: CacheKey, raw_data: dict, synced_at: float | None = None):
+        self._entries[key] = {"raw_data": raw_data, "synced_at": synced_at if synced_at is not None else time.time()}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str, data_type: str | None = None):
+        """Drop a user's entries (all, or one data_type)."""
+        for key in [k for k in self._entries if k[0] == user_id and (data_type is None or k[1] == data_type)]:
+            del self._entries[key]
+
+    # ── Per-user TTL config ──────────────────────────────
+
+    def get_ttl(self, user_id: str) -> int | None:
+        memo = self._ttl_hours.get(user_id)
+        if memo is None or time.time() - memo[1] > TTL_CONFIG_MAX_AGE:
+            return None
+        return memo[0]
+
+    def set_ttl(self, user_id: str, ttl_hours: int):
+        self._ttl_hours[user_id] = (ttl_hours, time.time())
+
+    def invalidate_ttl(self, user_id: str):
+        """Call when the user's agent_config changes."""
+        self._ttl_hours.pop(user_id, None)
+
+    # ── Stale-while-revalidate ───────────────────────────
+
+    def schedule_refresh(self, key: CacheKey, refresh: Callable[[], Awaitable[object]]) -> bool:
+        """Run `refresh()` in the background unless one is already running for `key`."""
+        task = self._refreshing.get(key)
+        if task is not None and not task.done():
+            return False
+        self.stats["refreshes"] += 1
+        task = asyncio.create_task(self._run_refresh(key, refresh))
+        self._refreshing[key] = task
+        return True
+
+    async def _run_refresh(self, key: CacheKey, refresh):
+        try:
+            await refresh()
+        except Exception as e:
+            logger.warning(f"Background academic refresh {key[1]}/{key[2]} failed: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def wait_for_refreshes(self):
+        """Await in-flight background refreshes (tests / shutdown)."""
+        tasks = [t for t in self._refreshing.values() if not t.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def clear(self):
+        self._entries.clear()
+        self._ttl_hours.clear()
+
+
+_cache: AcademicCache | None = None
+
+
+def get_academic_cache() -> AcademicCache:
+    """Process-wide academic cache (created on first use)."""
+    global _cache
+    if _cache is None:
+        _cache = AcademicCache(max_entries=get_settings().ACADEMIC_MEMORY_CACHE_SIZE)
+    return _cache
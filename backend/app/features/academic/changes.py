@@ -0,0 +1,141 @@
+"""
+Academic feature: Content hashing + structural diffs of synced school data.
+
+Mỗi lần ghi cache, AcademicService so sánh hash nội dung với content_hash đã lưu:
+  - giống nhau  → chỉ cập nhật last_synced_at (không ghi lại raw_data)
+  - khác nhau   → upsert dữ liệu mới; với grades / timetable cá nhân thì diff với
+                  bản cũ để sinh sự kiện thay đổi (academic_change_events)
+
+Sự kiện:
+  grade_posted     môn vừa có điểm tổng kết
+  grade_changed    điểm tổng kết bị sửa
+  room_changed     buổi học đổi phòng
+  class_cancelled  buổi học bị báo nghỉ (is_nghi_day)
+
+Scheduler đọc các sự kiện chưa gửi và đẩy thẳng qua Zalo (format_change_event),
+không cần vòng LLM.
+"""
+
+import hashlib
+import json
+from datetime import date, datetime
+
+
+def content_hash(data) -> str:
+    """Stable SHA-256 of a JSON payload (key order independent)."""
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _parse_slot_date(value) -> date | None:
+    if not value:
+        return None
+    text = str(value)
+    for parse in (lambda v: datetime.fromisoformat(v[:10]).date(), lambda v: datetime.strptime(v[:10], "%d/%m/%Y").date()):
+        try:
+            return parse(text)
+        except ValueError:
+            continue
+    return None
+
+
+# ── Grades ───────────────────────────────────────────────
+
+def _grade_map(raw: dict | None) -> dict[tuple, dict]:
+    courses = {}
+    for sem in (raw or {}).get("ds_diem_hocky", []) or []:
+        for c in sem.get("ds_diem_mon_hoc", []) or []:
+            courses[(str(sem.get("hoc_ky", "")), c.get("ma_mon", ""))] = {**c, "_semester_name": sem.get("ten_hoc_ky", "")}
+    return courses
+
+
+def diff_grades(old: dict | None, new: dict) -> list[dict]:
+    events = []
+    previous = _grade_map(old)
+    for (semester, code), c in _grade_map(new).items():
+        grade = c.get("diem_tk")
+        if grade in (None, ""):
+            continue
+        before = previous.get((semester, code))
+        base = {
+            "subject_code": code,
+            "subject": c.get("ten_mon", ""),
+            "semester": semester,
+            "semester_name": c["_semester_name"],
+            "grade_10": grade,
+            "grade_letter": c.get("diem_tk_chu", ""),
+        }
+        if before is None or before.get("diem_tk") in (None, ""):
+            events.append({"event_type": "grade_posted", **base})
+        elif str(before.get("diem_tk")) != str(grade):
+            events.append({"event_type": "grade_changed", **base, "old_grade_10": before.get("diem_tk")})
+    return events
+
+
+# ── Timetable ────────────────────────────────────────────
+
+def _slot_map(raw: dict | None) -> dict[tuple, dict]:
+    slots = {}
+    for week in (raw or {}).get("ds_tuan_tkb", []) or []:
+        for s in week.get("ds_thoi_khoa_bieu", []) or []:
+            slots[(s.get("ngay_hoc"), s.get("tiet_bat_dau"), s.get("ma_mon"))] = s
+    return slots
+
+
+def diff_timetable(old: dict | None, new: dict, today: date | None = None) -> list[dict]:
+    """Room changes and cancellations of upcoming sessions (past sessions are ignored)."""
+    today = today or date.today()
+    events = []
+    previous = _slot_map(old)
+    for key, s in _slot_map(new).items():
+        before = previous.get(key)
+        if before is None:
+            continue
+        day = _parse_slot_date(s.get("ngay_hoc"))
+        if day is not None and day < today:
+            continue
+        base = {
+            "subject_code": s.get("ma_mon", ""),
+            "subject": s.get("ten_mon", ""),
+            "date": s.get("ngay_hoc"),
+            "start_period": s.get("tiet_bat_dau"),
+            "room": s.get("ma_phong", ""),
+        }
+        if s.get("is_nghi_day") and not before.get("is_nghi_day"):
+            events.append({"event_type": "class_cancelled", **base})
+        elif (s.get("ma_phong") or "") != (before.get("ma_phong") or ""):
+            events.append({"event_type": "room_changed", **base, "old_room": before.get("ma_phong", "")})
+    return events
+
+
+DIFFERS = {"grades": diff_grades, "timetable": diff_timetable}
+
+
+def is_diffable(data_type: str, semester: str | None) -> bool:
+    """Only the student's own views produce notifications (not class/department timetables)."""
+    if data_type not in DIFFERS:
+        return False
+    return data_type != "timetable" or "_type" not in (semester or "")
+
+
+def diff_dataset(data_type: str, old: dict | None, new: dict) -> list[dict]:
+    differ = DIFFERS.get(data_type)
+    return differ(old, new) if differ and old else []
+
+
+def format_change_event(event: dict) -> str:
+    """One-line Zalo text for a change event."""
+    kind = event.get("event_type")
+    subject = event.get("subject") or event.get("subject_code", "")
+    when = _parse_slot_date(event.get("date"))
+    when_text = when.strftime("%d/%m/%Y") if when else (event.get("date") or "")
+    if kind == "grade_posted":
+        letter = f" ({event['grade_letter']})" if event.get("grade_letter") else ""
+        return f"📝 Có điểm mới: {subject} — {event.get('grade_10')}{letter}"
+    if kind == "grade_changed":
+        return f"✏️ Điểm thay đổi: {subject} — {event.get('old_grade_10')} → {event.get('grade_10')}"
+    if kind == "class_cancelled":
+        return f"🚫 Báo nghỉ: {subject} ngày {when_text}, tiết {event.get('start_period')}"
+    if kind == "room_changed":
+        return f"🏫 Đổi phòng: {subject} ngày {when_text}: {event.get('old_room')} → {event.get('room')}"
+    return f"🔔 {kind}: {subject}"
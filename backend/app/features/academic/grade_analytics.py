@@ -0,0 +1,185 @@
+"""
+Academic feature: Precomputed grade analytics, built once per grades sync.
+
+Tool get_grades đổ toàn bộ bảng điểm (kèm điểm thành phần) vào context và để LLM tự
+cộng GPA bằng token. GradeAnalytics tính sẵn MỘT lần từ ds_diem_hocky:
+
+  - GPA từng HK và GPA tích lũy (hệ 10 + hệ 4): ưu tiên số portal trả về, thiếu
+    thì tự tính trung bình có trọng số tín chỉ
+  - tín chỉ theo trạng thái: passed (đạt) / failed (còn nợ) / pending (chưa có điểm)
+  - môn rớt (lần học tốt nhất vẫn rớt) và môn học lại (xuất hiện ở ≥ 2 HK)
+  - tra cứu môn theo mã hoặc theo tên không dấu ("lap trinh python")
+
+Một môn học nhiều lần → lần có điểm cao nhất được tính cho tích lũy.
+GradeAnalyticsCache dùng lại kết quả chừng nào tier nhớ còn trả về CÙNG object
+ds_diem_hocky (sync không đổi nội dung giữ nguyên object — xem _write_cache_batch).
+"""
+
+import re
+import unicodedata
+from collections import OrderedDict
+
+GRADE_ANALYTICS_CACHE_SIZE = 64
+PASS_GRADE_10 = 4.0
+LETTER_TO_4 = {"A": 4.0, "B+": 3.5, "B": 3.0, "C+": 2.5, "C": 2.0, "D+": 1.5, "D": 1.0, "F": 0.0}
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip Vietnamese diacritics (đ → d) and collapse punctuation/spaces."""
+    text = unicodedata.normalize("NFD", (text or "").replace("đ", "d").replace("Đ", "D"))
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+
+
+def _to_float(value) -> float | None:
+    try:
+        return float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def _weighted(courses: list[dict], field: str) -> float | None:
+    total = sum(c["credits"] for c in courses if c[field] is not None)
+    if not total:
+        return None
+    return round(sum(c[field] * c["credits"] for c in courses if c[field] is not None) / total, 2)
+
+
+def _course(raw: dict, semester_code: str, semester_name: str) -> dict:
+    grade_10 = _to_float(raw.get("diem_tk"))
+    letter = (raw.get("diem_tk_chu") or "").strip()
+    grade_4 = _to_float(raw.get("diem_tk_so"))
+    if grade_4 is None and letter in LETTER_TO_4:
+        grade_4 = LETTER_TO_4[letter]
+    if grade_10 is None:
+        status = "pending"
+    elif letter == "F" or grade_10 < PASS_GRADE_10:
+        status = "failed"
+    else:
+        status = "passed"
+    return {
+        "code": raw.get("ma_mon", ""),
+        "name": raw.get("ten_mon", ""),
+        "credits": _to_float(raw.get("so_tin_chi")) or 0.0,
+        "semester": semester_code,
+        "semester_name": semester_name,
+        "grade_10": grade_10,
+        "grade_4": grade_4,
+        "letter": letter,
+        "status": status,
+    }
+
+
+class GradeAnalytics:
+    """GPA, credit totals, failed/retake lists and a subject index over one grades payload."""
+
+    def __init__(self, raw_semesters: list):
+        self.semesters: list[dict] = []
+        attempts: dict[str, list[dict]] = {}
+        reported_cumulative = None
+
+        for sem in raw_semesters or []:  # Portal trả HK mới nhất trước
+            code, name = str(sem.get("hoc_ky", "")), sem.get("ten_hoc_ky", "")
+            courses = [_course(c, code, name) for c in sem.get("ds_diem_mon_hoc", []) or []]
+            for c in courses:
+                attempts.setdefault(c["code"] or normalize_name(c["name"]), []).append(c)
+
+            graded = [c for c in courses if c["grade_10"] is not None]
+            self.semesters.append({
+                "code": code,
+                "name": name,
+                "gpa_10": _to_float(sem.get("dtb_hk_he10")) or _weighted(graded, "grade_10"),
+                "gpa_4": _to_float(sem.get("dtb_hk_he4")) or _weighted(graded, "grade_4"),
+                "credits_earned": sum(c["credits"] for c in courses if c["status"] == "passed"),
+            })
+            if reported_cumulative is None and _to_float(sem.get("dtb_tich_luy_he_10")) is not None:
+                reported_cumulative = {
+                    "gpa_10": _to_float(sem.get("dtb_tich_luy_he_10")),
+                    "gpa_4": _to_float(sem.get("dtb_tich_luy_he_4")),
+                    "source": "portal",
+                }
+
+        # Lần học tốt nhất của mỗi môn (chưa có điểm xếp sau mọi lần đã có điểm)
+        self._attempts = attempts
+        best = {
+            key: max(items, key=lambda c: (c["grade_10"] is not None, c["grade_10"] or 0))
+            for key, items in attempts.items()
+        }
+        passed = [c for c in best.values() if c["status"] == "passed"]
+        self.cumulative = reported_cumulative or {
+            "gpa_10": _weighted(passed, "grade_10"),
+            "gpa_4": _weighted(passed, "grade_4"),
+            "source": "computed",
+        }
+        self.credits = {
+            status: sum(c["credits"] for c in best.values() if c["status"] == status)
+            for status in ("passed", "failed", "pending")
+        }
+        self.failed = [c for c in best.values() if c["status"] == "failed"]
+        self.retakes = [
+            {"code": items[0]["code"], "name": items[0]["name"], "attempts": len(items),
+             "best_grade_10": best[key]["grade_10"]}
+            for key, items in attempts.items() if len(items) > 1
+        ]
+        self._by_name = {key: normalize_name(items[0]["name"]) for key, items in attempts.items()}
+
+    def find(self, query: str, limit: int = 5) -> list[list[dict]]:
+        """Attempts of subjects matching `query` (exact code, else diacritic-insensitive name)."""
+        code = (query or "").strip().upper()
+        for key, items in self._attempts.items():
+            if items[0]["code"].upper() == code:
+                return [items]
+
+        needle = normalize_name(query)
+        if not needle:
+            return []
+        exact = [k for k, name in self._by_name.items() if name == needle]
+        tokens = needle.split()
+        partial = [
+            k for k, name in self._by_name.items() if k not in exact and all(t in name for t in tokens)
+        ]
+        return [self._attempts[k] for k in (exact + partial)[:limit]]
+
+    def summary(self) -> dict:
+        latest = next((s for s in self.semesters if s["gpa_10"] is not None), None)
+        return {
+            "cumulative": self.cumulative,
+            "latest_semester": latest,
+            "credits": self.credits,
+            "failed": [{"code": c["code"], "name": c["name"], "grade_10": c["grade_10"]} for c in self.failed],
+            "retakes": self.retakes,
+        }
+
+
+class GradeAnalyticsCache:
+    """Per-user GradeAnalytics, rebuilt whenever the raw ds_diem_hocky object changes."""
+
+    def __init__(self, max_entries: int = GRADE_ANALYTICS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[list, GradeAnalytics]] = OrderedDict()
+        self.stats = {"hits": 0, "builds": 0}
+
+    def get(self, user_id: str, raw_semesters: list) -> GradeAnalytics:
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] is raw_semesters:
+            self._entries.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return entry[1]
+
+        analytics = GradeAnalytics(raw_semesters)
+        self.stats["builds"] += 1
+        self._entries[user_id] = (raw_semesters, analytics)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return analytics
+
+    def clear(self):
+        self._entries.clear()
+
+
+_analytics_cache = GradeAnalyticsCache()
+
+
+def get_grade_analytics_cache() -> GradeAnalyticsCache:
+    return _analytics_cache
@@ -0,0 +1,107 @@
+"""
+Academic feature: Projection-on-write for academic_sync_cache payloads.
+
+Portal trả về JSON rất "béo" (mã nội bộ, cờ hiển thị, tên tiếng Anh của mọi
+thứ...) trong khi parser / tool / diff chỉ đọc vài trường. Trước khi ghi cache,
+AcademicService chiếu payload về đúng các trường đó và ghi kèm schema_version:
+
+  portal JSON → project_dataset() → raw_data (bản gọn) + schema_version → DB + RAM
+
+Cache hit (RAM hoặc PostgREST) vì vậy chỉ chuyển bản gọn. Dòng cũ (schema_version
+NULL hoặc nhỏ hơn) vẫn đọc được: được chiếu lại khi đọc và ghi đè ở lần sync sau.
+
+Thêm trường mới vào parser → thêm vào PROJECTIONS và tăng SCHEMA_VERSION, nếu
+không trường đó sẽ luôn rỗng với dữ liệu đã cache.
+"""
+
+SCHEMA_VERSION = 1
+
+# Spec: {key: None} = giữ nguyên giá trị; {key: {...}} = chiếu đệ quy (dict, hoặc
+# từng phần tử nếu là list). Trường không có trong spec bị bỏ.
+_TIMETABLE_SLOT = {
+    # _parse_timetable
+    "thu_kieu_so": None, "tiet_bat_dau": None, "so_tiet": None, "ma_mon": None,
+    "ten_mon": None, "ten_mon_eg": None, "so_tin_chi": None, "ten_giang_vien": None,
+    "ma_phong": None, "ten_lop": None, "ngay_hoc": None, "is_nghi_day": None,
+}
+
+_GRADE_COURSE = {
+    # _parse_grades + grade_analytics + diff_grades
+    "ma_mon": None, "ten_mon": None, "ten_mon_eg": None, "so_tin_chi": None,
+    "diem_tk": None, "diem_tk_so": None, "diem_tk_chu": None, "ket_qua": None,
+    "ds_diem_thanh_phan": None,
+}
+
+PROJECTIONS: dict[str, dict] = {
+    "timetable": {
+        "ds_tuan_tkb": {
+            "tuan_hoc_ky": None, "ngay_bat_dau": None, "ngay_ket_thuc": None,
+            "ds_thoi_khoa_bieu": _TIMETABLE_SLOT,
+        },
+    },
+    "grades": {
+        "ds_diem_hocky": {
+            "hoc_ky": None, "ten_hoc_ky": None, "dtb_hk_he10": None, "dtb_hk_he4": None,
+            "dtb_tich_luy_he_10": None, "dtb_tich_luy_he_4": None,
+            "so_tin_chi_dat_hk": None, "xep_loai_tkb_hk": None,
+            "ds_diem_mon_hoc": _GRADE_COURSE,
+        },
+    },
+    "semesters": {
+        "hoc_ky_theo_ngay_hien_tai": None,
+        "ds_hoc_ky": {"hoc_ky": None, "ten_hoc_ky": None},
+    },
+    "student_info": {
+        key: None for key in (
+            "ma_sv", "ten_day_du", "ngay_sinh", "gioi_tinh", "lop", "khoa", "nganh",
+            "bac_he_dao_tao", "email", "dien_thoai", "ho_ten_cvht", "email_cvht",
+            "dien_thoai_cvht", "hien_dien_sv", "str_nhhk_vao", "str_nhhk_ra",
+        )
+    },
+    "tuition": {
+        "ds_hoc_phi_hoc_ky": {
+            "nhhk": None, "ten_hoc_ky": None, "hoc_phi": None, "mien_giam": None,
+            "phai_thu": None, "da_thu": None, "con_no": None, "don_gia": None,
+        },
+    },
+    "semester_result": {
+        "ds_du_lieu": {
+            "ma_doi_tuong": None, "ten_doi_tuong": None,
+            "diem_trung_binh1": None, "diem_trung_binh2": None,
+        },
+    },
+    "semester_tkb_overview": {
+        "ds_nhom_to": {
+            # get_semester_timetable_overview tool
+            "ma_mon": None, "ten_mon": None, "so_tc": None, "nhom_to": None, "gv": None,
+            "lop": None, "thu": None, "tbd": None, "so_tiet": None, "tu_gio": None,
+            "den_gio": None, "phong": None, "tkb": None,
+        },
+    },
+}
+
+
+def _project(value, spec: dict | None):
+    if spec is None:
+        return value
+    if isinstance(value, list):
+        return [_project(item, spec) for item in value]
+    if isinstance(value, dict):
+        return {key: _project(value[key], sub) for key, sub in spec.items() if key in value}
+    return value
+
+
+def project_dataset(data_type: str, data: dict) -> dict:
+    """Compact copy of `data` holding only the fields readers use (idempotent).
+
+    Data types without a projection are returned unchanged.
+    """
+    spec = PROJECTIONS.get(data_type)
+    if spec is None or not isinstance(data, dict):
+        return data
+    return _project(data, spec)
+
+
+def needs_projection(data_type: str, schema_version: int | None) -> bool:
+    """True when a stored row predates the current projection of its data type."""
+    return data_type in PROJECTIONS and schema_version != SCHEMA_VERSION
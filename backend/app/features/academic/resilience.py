@@ -0,0 +1,248 @@
+"""
+Academic feature: Resilience layer in front of the TVU portal (ttsv.tvu.edu.vn).
+
+Portal chậm và hay sập; trước đây mỗi lần gọi tool trong lúc portal chết đều treo
+đủ SCHOOL_API_TIMEOUT (30s), có khi nhiều lần trong một vòng ReAct. Mọi request
+của SchoolAPIClient giờ đi qua SchoolAPIGuard.call():
+
+  1. Circuit breaker theo endpoint (pn-signin, sch/w-locdstkb..., ...):
+       closed ──(SCHOOL_BREAKER_FAILURES lần lỗi liên tiếp)──▶ open
+       open   ──(sau SCHOOL_BREAKER_RESET_SECONDS)──▶ half_open (cho 1 request thăm dò)
+       half_open ──ok──▶ closed / ──lỗi──▶ open
+     Breaker open → raise SchoolAPIUnavailable ngay, không chờ timeout.
+  2. Token bucket toàn process (SCHOOL_API_RATE_PER_SECOND, burst SCHOOL_API_BURST)
+     để không dội portal khi sync song song nhiều dataset / nhiều user.
+  3. Retry có giới hạn (SCHOOL_API_MAX_RETRIES) với full jitter, cho lỗi mạng /
+     timeout / HTTP 5xx / 429. Tổng thời gian mỗi call (kể cả chờ limiter và
+     backoff) không vượt SCHOOL_API_TIMEOUT; mỗi lần thử tối đa SCHOOL_API_ATTEMPT_TIMEOUT.
+
+HTTP 4xx khác (401, 400...) nghĩa là portal vẫn sống → tính là thành công với
+breaker và trả response cho caller tự xử lý (raise_for_status / 401 re-login).
+
+SchoolAPIUnavailable kế thừa ConnectionError → router trả 503; AcademicService
+bắt lỗi này để trả dữ liệu cache cũ kèm mốc "stale since".
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable
+
+import httpx
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class SchoolAPIUnavailable(ConnectionError):
+    """The school portal is down, breaker-open or over the retry budget."""
+
+    def __init__(self, endpoint: str, reason: str, retry_after: float | None = None):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(f"Hệ thống trường không phản hồi ({endpoint}: {reason}). Vui lòng thử lại sau.")
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one endpoint."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.last_error: str | None = None
+        self._probing = False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """True if a request may go out (half-open lets exactly one probe through)."""
+        if self.state == self.OPEN and self.retry_after() == 0:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        self._probing = False
+
+    def record_success(self):
+        self.state, self.failures, self.opened_at, self._probing = self.CLOSED, 0, None, False
+
+    def record_failure(self, error: str):
+        self.failures += 1
+        self.last_error = error
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"⚡ School API breaker OPEN after {self.failures} failure(s): {error}")
+            self.state, self.opened_at = self.OPEN, time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_after_s": round(self.retry_after(), 1) if self.state == self.OPEN else 0,
+            "last_error": self.last_error,
+        }
+
+
+class TokenBucket:
+    """Token bucket: `rate` tokens/second, at most `capacity` banked."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, max_wait: float) -> bool:
+        """Take one token, waiting up to `max_wait` seconds. False if that is not enough."""
+        if self.rate <= 0:
+            return True
+        async with self._lock:
+            self._refill()
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if wait > max_wait:
+                return False
+            if wait:
+                await asyncio.sleep(wait)
+                self._refill()
+            self._tokens -= 1
+            return True
+
+
+class SchoolAPIGuard:
+    """Breakers per endpoint + shared limiter + bounded, jittered retries."""
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int,
+        reset_seconds: float,
+        rate_per_second: float,
+        burst: int,
+        max_retries: int,
+        retry_base_seconds: float,
+        attempt_timeout: float,
+        total_timeout: float,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.limiter = TokenBucket(rate_per_second, burst)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.attempt_timeout = attempt_timeout
+        self.total_timeout = total_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self.stats = {"calls": 0, "retries": 0, "rejected": 0, "rate_limited": 0}
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+        return self._breakers[endpoint]
+
+    async def call(
+        self, endpoint: str, send: Callable[[float], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """Run `send(timeout)` under the endpoint's breaker, the limiter and the retry budget.
+
+        Raises:
+            SchoolAPIUnavailable: Breaker open, limiter/budget exhausted, or every attempt failed.
+        """
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            self.stats["rejected"] += 1
+            raise SchoolAPIUnavailable(endpoint, "circuit open", breaker.retry_after())
+
+        self.stats["calls"] += 1
+        try:
+            response, error = await self._attempts(endpoint, send)
+        except BaseException:
+            breaker.release_probe()  # Bị hủy / lỗi ngoài HTTP → không giữ slot thăm dò
+            raise
+        if response is not None:
+            breaker.record_success()
+            return response
+        breaker.record_failure(error)
+        raise SchoolAPIUnavailable(endpoint, error)
+
+    async def _attempts(self, endpoint: str, send) -> tuple[httpx.Response | None, str]:
+        """Retry loop. Returns (response, "") on a non-retryable response, else (None, last error)."""
+        deadline = time.monotonic() + self.total_timeout
+        error = "timeout budget exhausted"
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not await self.limiter.acquire(max_wait=remaining):
+                # Hết ngân sách vì hàng đợi nội bộ, không phải lỗi portal → không tính vào breaker
+                self.stats["rate_limited"] += 1
+                raise SchoolAPIUnavailable(endpoint, "rate limited")
+            remaining = deadline - time.monotonic()
+            try:
+                response = await send(min(self.attempt_timeout, max(remaining, 0.1)))
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                error = type(e).__name__
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    return response, ""
+                error = f"HTTP {response.status_code}"
+
+            if attempt < self.max_retries:
+                # Full jitter: ngủ ngẫu nhiên trong [0, base * 2^attempt], không vượt deadline
+                delay = random.uniform(0, self.retry_base_seconds * (2 ** attempt))
+                if time.monotonic() + delay >= deadline:
+                    break
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+        return None, error
+
+    def snapshot(self) -> dict:
+        """Breaker states for /health."""
+        breakers = {name: b.snapshot() for name, b in sorted(self._breakers.items())}
+        return {
+            "status": "degraded" if any(b["state"] != CircuitBreaker.CLOSED for b in breakers.values()) else "ok",
+            "breakers": breakers,
+            "stats": dict(self.stats),
+        }
+
+
+_guard: SchoolAPIGuard | None = None
+
+
+def get_school_api_guard() -> SchoolAPIGuard:
+    global _guard
+    if _guard is None:
+        settings = get_settings()
+        _guard = SchoolAPIGuard(
+            failure_threshold=settings.SCHOOL_BREAKER_FAILURES,
+            reset_seconds=settings.SCHOOL_BREAKER_RESET_SECONDS,
+            rate_per_second=settings.SCHOOL_API_RATE_PER_SECOND,
+            burst=settings.SCHOOL_API_BURST,
+            max_retries=settings.SCHOOL_API_MAX_RETRIES,
+            retry_base_seconds=settings.SCHOOL_API_RETRY_BASE_SECONDS,
+            attempt_timeout=settings.SCHOOL_API_ATTEMPT_TIMEOUT,
+            total_timeout=settings.SCHOOL_API_TIMEOUT,
+        )
+    return _guard
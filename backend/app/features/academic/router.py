@@ -60,6 +60,8 @@ async def get_timetable(
         return {"data": [w.model_dump() for w in result]}
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
 
 
 @router.get("/grades")
@@ -74,58 +76,43 @@ async def get_grades(
         return {"data": [s.model_dump() for s in result]}
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
 
 
 @router.post("/sync")
 async def trigger_sync(
     data_type: str = "all",
+    semester: int | None = None,
     user_id: str = Depends(get_current_user_id),
     db: Client = Depends(get_db),
 ):
-    """Trigger manual sync từ school API.
+    """Trigger manual sync từ school API (1 lần login, các dataset chạy song song).
     
     Args:
-        data_type: 'timetable', 'grades', or 'all' (default).
+        data_type: 'all' (default) hoặc danh sách phân tách bằng dấu phẩy trong
+            timetable, grades, student_info, tuition, semester_result, semester_tkb_overview.
+        semester: Mã học kỳ cho timetable / semester_result / semester_tkb_overview (mặc định: HK hiện tại).
     """
     service = AcademicService(db)
-    
-    valid_types = ["timetable", "grades", "all"]
-    if data_type not in valid_types:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"data_type phải là một trong: {', '.join(valid_types)}",
-        )
-
-    # Invalidate cache
-    if data_type == "all":
-        db.table("academic_sync_cache").delete().eq("user_id", user_id).execute()
-    else:
-        db.table("academic_sync_cache").delete().eq(
-            "user_id", user_id
-        ).eq("data_type", data_type).execute()
-
-    # Re-sync by fetching fresh data (this populates cache)
-    synced = []
-    errors = []
-
-    try:
-        if data_type in ("timetable", "all"):
-            await service.get_timetable(user_id)
-            synced.append("timetable")
-    except Exception as e:
-        errors.append({"type": "timetable", "error": str(e)})
+    datasets = None if data_type == "all" else [d.strip() for d in data_type.split(",") if d.strip()]
 
     try:
-        if data_type in ("grades", "all"):
-            await service.get_grades(user_id)
-            synced.append("grades")
+        result = await service.sync_datasets(user_id, datasets, semester)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        errors.append({"type": "grades", "error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Không thể đồng bộ từ hệ thống trường: {str(e)}",
+        )
 
     return {
-        "message": f"Sync hoàn tất",
-        "synced": synced,
-        "errors": errors if errors else None,
+        "message": "Sync hoàn tất",
+        "synced": result["synced"],
+        "errors": result["errors"] or None,
+        "timings_ms": result["timings_ms"],
+        "total_ms": result["total_ms"],
     }
 
 
@@ -138,8 +125,7 @@ async def clear_cache(
     
     Dùng khi user muốn chủ động xóa sạch dữ liệu học tập đã lưu tạm.
     """
-    result = db.table("academic_sync_cache").delete().eq("user_id", user_id).execute()
-    count = len(result.data) if result.data else 0
+    count = AcademicService(db).invalidate_cache(user_id)
     return {
         "message": f"Đã xóa {count} bản ghi cache.",
         "deleted_count": count,
@@ -20,12 +20,15 @@ DATA ENDPOINTS:
 """
 
 import json
+import time
 import base64
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from urllib.parse import urlparse, unquote
 import httpx
 
 from app.config import get_settings
+from app.features.academic.resilience import get_school_api_guard
 
 
 class SchoolAPIClient:
@@ -37,10 +40,13 @@ class SchoolAPIClient:
     def __init__(self):
         settings = get_settings()
         self.base_url = settings.SCHOOL_API_BASE_URL.rstrip("/")
-        self.root_url = "https://ttsv.tvu.edu.vn"
+        # pn-signin nằm ngoài /public/api → lấy scheme + host từ base URL (portal thật hoặc stand-in local)
+        parsed_base = urlparse(self.base_url)
+        self.root_url = f"{parsed_base.scheme}://{parsed_base.netloc}"
         self._access_token: str | None = None
         self._user_info: dict = {}
-        self._timeout = settings.SCHOOL_API_TIMEOUT
+        self.token_expires_at: float | None = None  # Unix ts, nếu CurrUser có thông tin hạn token
+        self._timeout = settings.SCHOOL_API_ATTEMPT_TIMEOUT  # Per attempt; tổng mỗi call do SchoolAPIGuard giới hạn
 
         # Client for data APIs (with Bearer auth, follows redirects)
         self._client = httpx.AsyncClient(
@@ -88,9 +94,11 @@ class SchoolAPIClient:
             follow_redirects=False,
             headers={"User-Agent": "Mozilla/5.0"},
         ) as login_client:
-            response = await login_client.get(
-                f"{self.root_url}/api/pn-signin",
-                params={"code": code},
+            response = await get_school_api_guard().call(
+                "pn-signin",
+                lambda timeout: login_client.get(
+                    f"{self.root_url}/api/pn-signin", params={"code": code}, timeout=timeout,
+                ),
             )
 
         if response.status_code != 302:
@@ -158,12 +166,25 @@ class SchoolAPIClient:
                 "username": user_data.get("userName", ""),
                 "roles": user_data.get("roles", ""),
             }
+            self.token_expires_at = self._parse_token_expiry(user_data)
 
             return user_data.get("access_token")
 
         except Exception:
             return None
 
+    @staticmethod
+    def _parse_token_expiry(user_data: dict) -> float | None:
+        """Token expiry from CurrUser (OAuth `expires_in` seconds or `.expires` HTTP date)."""
+        try:
+            if user_data.get("expires_in"):
+                return time.time() + float(user_data["expires_in"])
+            if user_data.get(".expires"):
+                return parsedate_to_datetime(user_data[".expires"]).timestamp()
+        except (TypeError, ValueError):
+            pass
+        return None
+
     @property
     def is_authenticated(self) -> bool:
         """Check if client has a valid access token."""
@@ -181,13 +202,7 @@ class SchoolAPIClient:
         
         POST /public/api/sch/w-locdshockytkbuser
         """
-        self._ensure_authenticated()
-        response = await self._client.post(
-            f"{self.base_url}/sch/w-locdshockytkbuser",
-            json={},
-        )
-        response.raise_for_status()
-        return self._extract_data(response)
+        return await self._post("sch/w-locdshockytkbuser", {})
 
     async def get_weekly_timetable(
         self,
@@ -207,8 +222,6 @@ class SchoolAPIClient:
                 4 = Môn học
                 6 = Khoa quản lý sinh viên
         """
-        self._ensure_authenticated()
-        
         # The school API requires the parameters to be wrapped in a "filter" object
         # Otherwise it throws NullReferenceException in W_LocDSTKBDangTuanTheoSinhVienHoacGiangVien
         filter_data: dict = {}
@@ -222,33 +235,23 @@ class SchoolAPIClient:
         # Wrap in {"filter": ...}
         body = {"filter": filter_data}
 
-        response = await self._client.post(
-            f"{self.base_url}/sch/w-locdstkbtuanusertheohocky",
-            json=body,
-        )
-        response.raise_for_status()
-        return self._extract_data(response)
+        return await self._post("sch/w-locdstkbtuanusertheohocky", body)
 
     async def get_grades(self, by_tkb: bool = False) -> dict:
         """Get all grades across semesters.
         
         POST /public/api/srm/w-locdsdiemsinhvien
         """
-        self._ensure_authenticated()
-        response = await self._client.post(
-            f"{self.base_url}/srm/w-locdsdiemsinhvien",
-            json={"hien_thi_mon_theo_hkdk": by_tkb},
-        )
-        response.raise_for_status()
-        return self._extract_data(response)
+        return await self._post("srm/w-locdsdiemsinhvien", {"hien_thi_mon_theo_hkdk": by_tkb})
 
     async def get_auth_config(self) -> dict:
         """Get auth config (this one is actually GET).
 
         GET /public/api/auth/authconfig
         """
-        response = await self._client.get(
-            f"{self.base_url}/auth/authconfig",
+        response = await get_school_api_guard().call(
+            "auth/authconfig",
+            lambda timeout: self._client.get(f"{self.base_url}/auth/authconfig", timeout=timeout),
         )
         response.raise_for_status()
         return self._extract_data(response)
@@ -261,13 +264,7 @@ class SchoolAPIClient:
         POST /public/api/dkmh/w-locsinhvieninfo
         Returns: name, DOB, class, department, major, email, phone, advisor, etc.
         """
-        self._ensure_authenticated()
-        response = await self._client.post(
-            f"{self.base_url}/dkmh/w-locsinhvieninfo",
-            json={},
-        )
-        response.raise_for_status()
-        return self._extract_data(response)
+        return await self._post("dkmh/w-locsinhvieninfo", {})
 
     async def get_tuition_summary(self) -> dict:
         """Get tuition fee summary across all semesters.
@@ -275,13 +272,7 @@ class SchoolAPIClient:
         POST /public/api/rms/w-locdstonghophocphisv
         Returns: tuition per semester (amount, paid, remaining debt).
         """
-        self._ensure_authenticated()
-        response = await self._client.post(
-            f"{self.base_url}/rms/w-locdstonghophocphisv",
-            json={},
-        )
-        response.raise_for_status()
-        return self._extract_data(response)
+        return await self._post("rms/w-locdstonghophocphisv", {})
 
     async def get_semester_result(self, semester_id: int) -> dict:
         """Get grades for a specific semester.
@@ -292,13 +283,7 @@ class SchoolAPIClient:
             semester_id: Semester code, e.g. 20251.
         Returns: list of courses with credits and scores for that semester.
         """
-        self._ensure_authenticated()
-        response = await self._client.post(
-            f"{self.base_url}/dkmh/w-inketquahoctap",
-            json={"hoc_ky": semester_id},
-        )
-        response.raise_for_status()
-        return self._extract_data(response)
+        return await self._post("dkmh/w-inketquahoctap", {"hoc_ky": semester_id})
 
     async def get_semester_timetable_overview(self, semester_id: int) -> dict:
         """Get semester-wide timetable overview (all classes, grouped by subject).
@@ -309,16 +294,13 @@ class SchoolAPIClient:
             semester_id: Semester code, e.g. 20251.
         Returns: flat list of all class sessions in the semester.
         """
-        self._ensure_authenticated()
-        response = await self._client.post(
-            f"{self.base_url}/sch/w-locdstkbhockytheodoituong",
-            json={"hoc_ky": semester_id},
-        )
-        response.raise_for_status()
-        return self._extract_data(response)
+        return await self._post("sch/w-locdstkbhockytheodoituong", {"hoc_ky": semester_id})
 
     # ── Public endpoints (no auth required) ─────────────
 
+    # Gọi định kỳ bởi SchoolClock (school_clock.py) — tools dùng offset đã cache,
+    # không gọi trực tiếp các hàm này.
+
     @classmethod
     async def get_server_time(cls) -> datetime:
         """Get current Vietnam server time from school portal.
@@ -327,20 +309,20 @@ class SchoolAPIClient:
 
         Returns:
             datetime in Vietnam time (no tzinfo; school does not include offset).
-            Falls back to datetime.now() if request fails.
+
+        Raises:
+            SchoolAPIUnavailable / ValueError: Request failed or unexpected payload.
 
         Response: {"thoigianht": "23/02/2026 00:26:37"}
         """
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(
-                    "https://ttsv.tvu.edu.vn/public/api/hsba/w-gettimeserver"
-                )
-                response.raise_for_status()
-                raw = response.json().get("thoigianht", "")
-                return datetime.strptime(raw, "%d/%m/%Y %H:%M:%S")
-        except Exception:
-            return datetime.now()
+        base_url = get_settings().SCHOOL_API_BASE_URL.rstrip("/")
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await get_school_api_guard().call(
+                "hsba/w-gettimeserver",
+                lambda timeout: client.get(f"{base_url}/hsba/w-gettimeserver", timeout=timeout),
+            )
+        response.raise_for_status()
+        return datetime.strptime(response.json().get("thoigianht", ""), "%d/%m/%Y %H:%M:%S")
 
     @classmethod
     async def get_timetable_types(cls) -> list[dict]:
@@ -349,21 +331,33 @@ class SchoolAPIClient:
         POST /public/api/sch/w-locdsdoituongthoikhoabieu  — no auth required.
 
         Returns list of {loai_doi_tuong: int, ten_doi_tuong: str}.
+
+        Raises:
+            SchoolAPIUnavailable / httpx.HTTPStatusError: Request failed.
         """
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.post(
-                    "https://ttsv.tvu.edu.vn/public/api/sch/w-locdsdoituongthoikhoabieu",
-                    json={},
-                )
-                response.raise_for_status()
-                data = response.json().get("data", {})
-                return data.get("ds_doi_tuong_tkb", [])
-        except Exception:
-            return []
+        base_url = get_settings().SCHOOL_API_BASE_URL.rstrip("/")
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await get_school_api_guard().call(
+                "sch/w-locdsdoituongthoikhoabieu",
+                lambda timeout: client.post(
+                    f"{base_url}/sch/w-locdsdoituongthoikhoabieu", json={}, timeout=timeout,
+                ),
+            )
+        response.raise_for_status()
+        return (response.json().get("data") or {}).get("ds_doi_tuong_tkb", [])
 
     # ── Helpers ──────────────────────────────────────────
 
+    async def _post(self, path: str, body: dict) -> dict:
+        """Authenticated POST through the resilience guard (breaker per `path`)."""
+        self._ensure_authenticated()
+        response = await get_school_api_guard().call(
+            path,
+            lambda timeout: self._client.post(f"{self.base_url}/{path}", json=body, timeout=timeout),
+        )
+        response.raise_for_status()
+        return self._extract_data(response)
+
     def _ensure_authenticated(self):
         """Raise if not logged in."""
         if not self.is_authenticated:
@@ -0,0 +1,100 @@
+"""
+Academic feature: Cached school clock offset + timetable type list.
+
+Trước đây get_server_time / get_timetable_types mở một httpx.AsyncClient mới và
+gọi portal mỗi lần dùng (timeout 5s, fallback giờ máy). SchoolClock giữ:
+
+  - offset = giờ server trường − giờ máy (giây), đo với hiệu chỉnh nửa RTT:
+        offset = server_time − (t_gửi + t_nhận) / 2
+    làm mới nền mỗi SCHOOL_CLOCK_REFRESH_MINUTES (scheduler). Lần đo lỗi → giữ
+    offset cũ; chưa đo được lần nào → offset 0 (giờ máy, UTC+7).
+  - danh sách loại đối tượng TKB (loai_doi_tuong), làm mới mỗi ngày.
+
+Tools / agenda gọi school_now() — không có network call nào trên đường xử lý chat.
+"""
+
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from app.features.academic.school_client import SchoolAPIClient
+
+logger = logging.getLogger(__name__)
+
+VN_TZ = timezone(timedelta(hours=7))
+MAX_OFFSET_SECONDS = 6 * 3600  # Lệch hơn mức này coi như dữ liệu server lỗi, bỏ qua
+
+
+class SchoolClock:
+    """Offset between the school portal clock and the local clock, plus cached reference data."""
+
+    def __init__(self):
+        self.offset_seconds = 0.0
+        self.offset_synced_at: float | None = None
+        self.timetable_types: list[dict] = []
+        self.types_synced_at: float | None = None
+
+    def now(self) -> datetime:
+        """Current school time (Vietnam tz), no network call."""
+        return datetime.now(VN_TZ) + timedelta(seconds=self.offset_seconds)
+
+    def today(self) -> date:
+        return self.now().date()
+
+    async def refresh_offset(self) -> bool:
+        """Measure the offset once. Keeps the previous value on failure."""
+        sent = time.time()
+        try:
+            server_time = await SchoolAPIClient.get_server_time()
+        except Exception as e:
+            logger.info(f"School clock refresh skipped: {e}")
+            return False
+        received = time.time()
+
+        local_mid = datetime.fromtimestamp((sent + received) / 2, VN_TZ).replace(tzinfo=None)
+        offset = (server_time - local_mid).total_seconds()
+        if abs(offset) > MAX_OFFSET_SECONDS:
+            logger.warning(f"⚠️ Ignoring implausible school clock offset {offset:.0f}s")
+            return False
+        self.offset_seconds = offset
+        self.offset_synced_at = received
+        return True
+
+    async def refresh_timetable_types(self) -> bool:
+        try:
+            types = await SchoolAPIClient.get_timetable_types()
+        except Exception as e:
+            logger.info(f"Timetable types refresh skipped: {e}")
+            return False
+        if types:
+            self.timetable_types = types
+            self.types_synced_at = time.time()
+        return bool(types)
+
+    def snapshot(self) -> dict:
+        return {
+            "offset_s": round(self.offset_seconds, 1),
+            "offset_age_s": round(time.time() - self.offset_synced_at) if self.offset_synced_at else None,
+            "timetable_types": len(self.timetable_types),
+        }
+
+
+_clock = SchoolClock()
+
+
+def get_school_clock() -> SchoolClock:
+    return _clock
+
+
+def school_now() -> datetime:
+    return _clock.now()
+
+
+async def refresh_school_clock():
+    """Scheduler job: re-measure the clock offset."""
+    await _clock.refresh_offset()
+
+
+async def refresh_timetable_types():
+    """Scheduler job (daily): reload the timetable object types."""
+    await _clock.refresh_timetable_types()
@@ -2,12 +2,25 @@
 Academic feature: Service layer for syncing and caching school data.
 """
 
-from datetime import datetime, timezone, timedelta
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
 from supabase import Client
 
 from app.config import get_settings
 from app.core.security import encrypt_value, decrypt_value
+from app.features.academic.cache import get_academic_cache
+from app.features.academic.changes import content_hash, diff_dataset, is_diffable
+from app.features.academic.grade_analytics import GradeAnalytics, get_grade_analytics_cache
+from app.features.academic.projection import SCHEMA_VERSION, needs_projection, project_dataset
+from app.features.academic.resilience import SchoolAPIUnavailable
 from app.features.academic.school_client import SchoolAPIClient
+from app.features.academic.session_pool import get_school_session_pool
+from app.features.academic.timetable_index import ParsedTimetable, get_timetable_index_cache
 from app.features.academic.schemas import (
     TimetableSlot,
     WeekTimetable,
@@ -18,17 +31,34 @@ from app.features.academic.schemas import (
     SemesterCourseResult,
 )
 
+logger = logging.getLogger(__name__)
+
+VN_TZ = timezone(timedelta(hours=7))
+
+T = TypeVar("T")
+
+# Datasets POST /sync có thể làm mới; 2 loại cuối gắn với một học kỳ cụ thể
+SYNC_DATASETS = (
+    "timetable", "grades", "student_info", "tuition", "semester_result", "semester_tkb_overview",
+)
+
 
 class AcademicService:
     """
     Manages school data syncing with cache-first strategy.
     
-    Flow: Tool call → Check DB cache → If stale, sync from school API → Return data
+    Flow: Tool call → In-process cache → DB cache (academic_sync_cache) → Return data.
+    Both tiers hold the compact projection of the portal payload (see projection.py).
+    Stale data is returned immediately while a background task re-syncs from the
+    school API; only a full miss (or data older than TTL + SCHOOL_CACHE_MAX_STALE_HOURS)
+    makes the caller wait for the school server.
     """
 
     def __init__(self, db: Client):
         self.db = db
         self.settings = get_settings()
+        # data_type → thời điểm sync của bản cache đã trả thay cho API lỗi (fast failover)
+        self.stale_since: dict[str, datetime] = {}
 
     # ── Credential Management ────────────────────────────
 
@@ -66,7 +96,9 @@ class AcademicService:
         ).execute()
 
         # IMPORTANT: Invalidate the cache for this user so we fetch fresh data for the new account
-        self.db.table("academic_sync_cache").delete().eq("user_id", user_id).execute()
+        self.invalidate_cache(user_id)
+        # ...and drop the pooled session of the old account
+        await get_school_session_pool().invalidate(user_id)
 
     async def reconnect_credentials(self, user_id: str, mssv: str, password: str):
         """Re-connect: delete old credentials and save new ones.
@@ -84,7 +116,8 @@ class AcademicService:
         Login flow: GET /api/pn-signin → 302 redirect → extract JWT access_token
         from CurrUser param → set as Bearer token for all subsequent POST API calls.
         
-        Each sync operation creates a fresh client, logs in, fetches data, then closes.
+        Only called by the session pool on a miss (no session / expired / 401) —
+        data access goes through `_with_client`, which reuses the pooled login.
         
         Returns:
             Authenticated SchoolAPIClient with Bearer token set.
@@ -120,16 +153,34 @@ class AcademicService:
 
         return client
 
+    async def _with_client(self, user_id: str, operation: Callable[[SchoolAPIClient], Awaitable[T]]) -> T:
+        """Run `operation(client)` on the user's pooled session.
+
+        A 401 means the school revoked/expired the token early: the session is
+        dropped and the operation retried once after a fresh login.
+        """
+        pool = get_school_session_pool()
+        for attempt in range(2):
+            async with pool.session(user_id, lambda: self._get_authenticated_client(user_id)) as client:
+                try:
+                    return await operation(client)
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code != 401 or attempt:
+                        raise
+                    await pool.invalidate(user_id, client)
+
     # ── Cache Layer ──────────────────────────────────────
 
-    async def _get_cached(self, user_id: str, data_type: str, semester: str | None = None) -> dict | None:
-        """Get cached data if fresh (within TTL).
-        
-        TTL is resolved per-user from agent_config.cache_ttl_hours,
-        falling back to global SCHOOL_CACHE_TTL_HOURS.
+    def _get_ttl_hours(self, user_id: str) -> int:
+        """Per-user TTL from agent_config.cache_ttl_hours (memoized), else SCHOOL_CACHE_TTL_HOURS.
+
         TTL of 0 means caching is disabled (always fetch fresh).
         """
-        # Resolve per-user TTL
+        cache = get_academic_cache()
+        memo = cache.get_ttl(user_id)
+        if memo is not None:
+            return memo
+
         ttl_hours = self.settings.SCHOOL_CACHE_TTL_HOURS  # Global default
         try:
             user_row = (
@@ -145,51 +196,237 @@ class AcademicService:
                 if user_ttl is not None:
                     ttl_hours = int(user_ttl)
         except Exception:
-            pass  # Fallback to global default
-        
-        # TTL = 0 means no caching
-        if ttl_hours == 0:
-            return None
+            return ttl_hours  # Fallback to global default (not memoized — retry next time)
+
+        cache.set_ttl(user_id, ttl_hours)
+        return ttl_hours
 
+    def _lookup_cache(self, user_id: str, data_type: str, semester: str | None, ttl_hours: int) -> dict | None:
+        """Newest cached entry { raw_data, synced_at } from memory, falling back to the DB row.
+
+        Rows written before the current projection are projected on read.
+        """
+        cache = get_academic_cache()
+        key = (user_id, data_type, semester)
+        entry = cache.get(key)
+        if entry is not None and time.time() - entry["synced_at"] < ttl_hours * 3600:
+            cache.stats["memory_hits"] += 1
+            return entry
+
+        # Memory miss or stale — another process may have refreshed the table meanwhile
         query = (
             self.db.table("academic_sync_cache")
-            .select("*")
+            .select("raw_data, last_synced_at, schema_version")
             .eq("user_id", user_id)
             .eq("data_type", data_type)
         )
-        if semester:
-            query = query.eq("semester", semester)
+        # Dòng trùng (semester NULL trước migration 013) có thể còn → luôn lấy dòng mới nhất
+        query = query.eq("semester", semester) if semester else query.is_("semester", "null")
+        result = query.order("last_synced_at", desc=True).limit(1).execute()
+
+        if result.data:
+            record = result.data[0]
+            synced_at = datetime.fromisoformat(record["last_synced_at"]).timestamp()
+            if entry is None or synced_at > entry["synced_at"]:
+                data = record["raw_data"]
+                if needs_projection(data_type, record.get("schema_version")):
+                    data = project_dataset(data_type, data)
+                cache.put(key, data, synced_at)
+                entry = cache.get(key)
+            cache.stats["db_hits"] += 1
+        return entry
 
-        result = query.execute()
-
-        if not result.data:
+    async def _get_cached(self, user_id: str, data_type: str, semester: str | None = None) -> dict | None:
+        """Get cached data if fresh (within TTL), from memory or academic_sync_cache."""
+        ttl_hours = self._get_ttl_hours(user_id)
+        if ttl_hours == 0:
             return None
+        entry = self._lookup_cache(user_id, data_type, semester, ttl_hours)
+        if entry and time.time() - entry["synced_at"] < ttl_hours * 3600:
+            return entry["raw_data"]
+        return None  # Cache stale
+
+    async def _cache_first(
+        self,
+        user_id: str,
+        data_type: str,
+        fetch: Callable[[], Awaitable[dict]],
+        semester: str | None = None,
+    ) -> dict:
+        """Return cached data, serving stale data while a background refresh runs.
 
-        record = result.data[0]
-        last_synced = datetime.fromisoformat(record["last_synced_at"])
-        ttl = timedelta(hours=ttl_hours)
+        Args:
+            fetch: Coroutine factory that loads the dataset from the school API.
 
-        if datetime.now(timezone.utc) - last_synced < ttl:
-            return record["raw_data"]
+        Raises:
+            ValueError: On a miss, if the school API returns an error response.
+            SchoolAPIUnavailable: Portal unreachable and nothing cached at all.
+        """
+        ttl_hours = self._get_ttl_hours(user_id)
+        cache = get_academic_cache()
+        entry = None
+        if ttl_hours > 0:
+            entry = self._lookup_cache(user_id, data_type, semester, ttl_hours)
+            if entry and self._is_valid_response(entry["raw_data"]):
+                age = time.time() - entry["synced_at"]
+                if age < ttl_hours * 3600:
+                    return entry["raw_data"]
+                if age < (ttl_hours + self.settings.SCHOOL_CACHE_MAX_STALE_HOURS) * 3600:
+                    cache.stats["stale_served"] += 1
+                    cache.schedule_refresh(
+                        (user_id, data_type, semester),
+                        lambda: self._fetch_and_store(user_id, data_type, fetch, semester),
+                    )
+                    return entry["raw_data"]
+
+        cache.stats["misses"] += 1
+        try:
+            return await self._fetch_and_store(user_id, data_type, fetch, semester)
+        except SchoolAPIUnavailable:
+            # Fast failover: portal sập / breaker mở → bản cache bất kỳ (kể cả quá hạn stale
+            # tối đa, hoặc TTL = 0) vẫn tốt hơn lỗi; đánh dấu "stale since" cho caller
+            if entry is None:
+                entry = self._lookup_cache(user_id, data_type, semester, 0)
+            if not entry or not self._is_valid_response(entry["raw_data"]):
+                raise
+            cache.stats["failovers"] += 1
+            self.stale_since[data_type] = datetime.fromtimestamp(entry["synced_at"], timezone.utc)
+            return entry["raw_data"]
+
+    def stale_note(self) -> str:
+        """Notice to append to tool output when some data was served from cache during an outage."""
+        if not self.stale_since:
+            return ""
+        oldest = min(self.stale_since.values()).astimezone(VN_TZ)
+        return (
+            f"\n\n⚠️ Hệ thống trường đang không phản hồi — dữ liệu lấy từ bộ nhớ đệm, "
+            f"cập nhật lần cuối {oldest.strftime('%H:%M %d/%m/%Y')}."
+        )
 
-        return None  # Cache stale
+    async def _fetch_and_store(
+        self, user_id: str, data_type: str, fetch: Callable[[], Awaitable[dict]], semester: str | None = None
+    ) -> dict:
+        """Fetch from the school API and write both cache tiers. Error responses are never cached.
+
+        Returns the cached (projected) copy, so callers see the same shape as on a hit.
+        """
+        data = await fetch()
+        if not self._is_valid_response(data):
+            message = data.get("message", "Unknown") if isinstance(data, dict) else "Unknown"
+            raise ValueError(f"API trường trả lỗi: {message}")
+        return await self._update_cache(user_id, data_type, data, semester)
 
     async def _update_cache(
         self, user_id: str, data_type: str, data: dict, semester: str | None = None
-    ):
-        """Upsert cached data."""
-        self.db.table("academic_sync_cache").upsert(
-            {
+    ) -> dict:
+        """Upsert cached data (DB row + in-process copy). Returns the stored copy."""
+        return self._write_cache_batch(user_id, [(data_type, semester, data)])[(data_type, semester)]
+
+    def _write_cache_batch(
+        self, user_id: str, entries: list[tuple[str, str | None, dict]]
+    ) -> dict[tuple[str, str | None], dict]:
+        """Write several (data_type, semester, data) rows and refresh the memory tier.
+
+        Payloads are projected to the fields readers use before hashing / storing.
+        Rows whose content hash matches the stored content_hash only get their
+        last_synced_at bumped (one UPDATE for all of them); changed rows are
+        upserted in ONE request. Changed grades / personal timetables are diffed
+        against the previous copy and the deltas queued in academic_change_events.
+
+        Returns:
+            (data_type, semester) → the copy now held by the memory tier.
+        """
+        if not entries:
+            return {}
+        now = datetime.now(timezone.utc)
+        cache = get_academic_cache()
+        existing: dict[tuple[str, str | None], dict] = {}
+        rows = (
+            self.db.table("academic_sync_cache")
+            .select("id, data_type, semester, content_hash, last_synced_at")
+            .eq("user_id", user_id)
+            .in_("data_type", sorted({data_type for data_type, _, _ in entries}))
+            .order("last_synced_at", desc=True)
+            .execute()
+        ).data or []
+        for r in rows:
+            # Mới nhất trước → giữ dòng đầu; diff với bản cũ hơn sẽ gửi lại sự kiện đã gửi
+            existing.setdefault((r["data_type"], r["semester"]), r)
+
+        changed, unchanged_ids, events, stored = [], [], [], {}
+        for data_type, semester, data in entries:
+            key = (user_id, data_type, semester)
+            # Hash bản đã chiếu → trường portal không ai đọc đổi cũng không gây ghi lại
+            data = project_dataset(data_type, data)
+            digest = content_hash(data)
+            current = existing.get((data_type, semester))
+            if current is not None and current.get("content_hash") == digest:
+                unchanged_ids.append(current["id"])
+                entry = cache.get(key)
+                # Giữ nguyên object cũ → ParsedTimetable đã build vẫn dùng lại được
+                stored[(data_type, semester)] = entry["raw_data"] if entry else data
+                cache.put(key, stored[(data_type, semester)], now.timestamp())
+                continue
+
+            if current is not None and is_diffable(data_type, semester):
+                try:
+                    previous = self._previous_raw(current["id"])
+                    events.extend(
+                        {"user_id": user_id, "data_type": data_type, "event_type": e["event_type"], "payload": e}
+                        for e in diff_dataset(data_type, previous, data)
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Diff {data_type} failed for {user_id}: {e}")
+
+            changed.append({
                 "user_id": user_id,
                 "data_type": data_type,
                 "semester": semester,
                 "raw_data": data,
-                "last_synced_at": datetime.now(timezone.utc).isoformat(),
+                "content_hash": digest,
+                "schema_version": SCHEMA_VERSION,
+                "last_synced_at": now.isoformat(),
                 "sync_status": "success",
                 "sync_error": None,
-            },
-            on_conflict="user_id,data_type,semester",
-        ).execute()
+            })
+            stored[(data_type, semester)] = data
+            cache.put(key, data, now.timestamp())
+
+        if changed:
+            self.db.table("academic_sync_cache").upsert(
+                changed, on_conflict="user_id,data_type,semester"
+            ).execute()
+        if unchanged_ids:
+            self.db.table("academic_sync_cache").update(
+                {"last_synced_at": now.isoformat(), "sync_status": "success", "sync_error": None}
+            ).in_("id", unchanged_ids).execute()
+        if events:
+            try:
+                self.db.table("academic_change_events").insert(events).execute()
+                logger.info(f"🔔 {len(events)} academic change(s) queued for {user_id}")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not queue academic changes for {user_id}: {e}")
+        return stored
+
+    def _previous_raw(self, row_id: str) -> dict | None:
+        """raw_data currently stored in a cache row (only read when the content changed).
+
+        Đọc từ DB chứ không từ tier nhớ: bản trong RAM có thể cũ hơn nếu process
+        khác đã ghi → diff sẽ báo lại sự kiện đã gửi.
+        """
+        result = (
+            self.db.table("academic_sync_cache").select("raw_data").eq("id", row_id).limit(1).execute()
+        )
+        return result.data[0]["raw_data"] if result.data else None
+
+    def invalidate_cache(self, user_id: str, data_type: str | None = None) -> int:
+        """Delete cached rows (all, or one data_type) in both tiers. Returns deleted DB rows."""
+        query = self.db.table("academic_sync_cache").delete().eq("user_id", user_id)
+        if data_type:
+            query = query.eq("data_type", data_type)
+        result = query.execute()
+        get_academic_cache().invalidate_user(user_id, data_type)
+        return len(result.data) if result.data else 0
 
     # ── Data Access (Cache-first) ────────────────────────
 
@@ -213,7 +450,16 @@ class AcademicService:
         semester: str | None = None,
         timetable_type: int = 1,
     ) -> list[WeekTimetable]:
-        """Get weekly timetable. Cache-first, sync from school API if stale.
+        """Get weekly timetable. Cache-first, sync from school API if stale."""
+        return (await self.get_parsed_timetable(user_id, semester, timetable_type)).weeks
+
+    async def get_parsed_timetable(
+        self,
+        user_id: str,
+        semester: str | None = None,
+        timetable_type: int = 1,
+    ) -> ParsedTimetable:
+        """Get the weekly timetable as a parsed, date-indexed object (reused while the cache is warm).
 
         Args:
             user_id: The authenticated user.
@@ -225,143 +471,190 @@ class AcademicService:
         if timetable_type != 1:
             cache_key = f"{cache_key}_type{timetable_type}"
 
-        # 1. Check cache — but skip if cached data is an error response
-        cached = await self._get_cached(user_id, "timetable", cache_key)
-        if cached and self._is_valid_response(cached):
-            raw_weeks = cached.get("ds_tuan_tkb", [])
-        else:
-            # 2. Sync from school (login + fetch + close)
-            client = await self._get_authenticated_client(user_id)
-            try:
-                # Resolve current semester if not specified
-                actual_semester = semester
-                if not actual_semester or actual_semester == "current":
-                    semesters_data = await client.get_semesters()
-                    if self._is_valid_response(semesters_data):
-                        # Use the exact current semester according to the school server
-                        actual_semester = semesters_data.get("hoc_ky_theo_ngay_hien_tai")
-                
-                # School API requires explicit hoc_ky to be passed in filter
-                semester_id = int(actual_semester) if actual_semester and str(actual_semester).isdigit() else None
-                
-                data = await client.get_weekly_timetable(
-                    semester_id,
-                    timetable_type=timetable_type,
-                )
-                # Only cache successful responses
-                if self._is_valid_response(data):
-                    await self._update_cache(user_id, "timetable", data, cache_key)
-                    raw_weeks = data.get("ds_tuan_tkb", [])
-                else:
-                    # API returned error — don't cache, return empty
-                    error_msg = data.get("message", "Unknown error")
-                    raise ValueError(f"API trường trả lỗi: {error_msg}")
-            finally:
-                await client.close()
+        async def fetch() -> dict:
+            # Resolve current semester if not specified (exact value from the school server)
+            actual_semester = semester
+            if not actual_semester or actual_semester == "current":
+                actual_semester = await self.get_current_semester(user_id)
 
-        # 3. Transform to clean models
-        return self._parse_timetable(raw_weeks)
+            # School API requires explicit hoc_ky to be passed in filter
+            semester_id = int(actual_semester) if actual_semester and str(actual_semester).isdigit() else None
+            return await self._with_client(
+                user_id, lambda c: c.get_weekly_timetable(semester_id, timetable_type=timetable_type)
+            )
+
+        data = await self._cache_first(user_id, "timetable", fetch, cache_key)
+        return get_timetable_index_cache().get(
+            (user_id, cache_key), data.get("ds_tuan_tkb", []), self._parse_timetable
+        )
 
     async def get_grades(self, user_id: str) -> list[SemesterGrades]:
         """Get all grades. Cache-first, sync from school API if stale."""
-        cached = await self._get_cached(user_id, "grades")
-        if cached and self._is_valid_response(cached):
-            raw_semesters = cached.get("ds_diem_hocky", [])
-        else:
-            client = await self._get_authenticated_client(user_id)
-            try:
-                data = await client.get_grades()
-                if self._is_valid_response(data):
-                    await self._update_cache(user_id, "grades", data)
-                    raw_semesters = data.get("ds_diem_hocky", [])
-                else:
-                    error_msg = data.get("message", "Unknown error")
-                    raise ValueError(f"API trường trả lỗi: {error_msg}")
-            finally:
-                await client.close()
+        data = await self._cache_first(
+            user_id, "grades", lambda: self._with_client(user_id, lambda c: c.get_grades())
+        )
+        return self._parse_grades(data.get("ds_diem_hocky", []))
 
-        return self._parse_grades(raw_semesters)
+    async def get_grade_analytics(self, user_id: str) -> GradeAnalytics:
+        """GPA / credit / subject analytics over the cached grades (built once per sync)."""
+        data = await self._cache_first(
+            user_id, "grades", lambda: self._with_client(user_id, lambda c: c.get_grades())
+        )
+        return get_grade_analytics_cache().get(user_id, data.get("ds_diem_hocky", []))
+
+    async def get_semesters(self, user_id: str) -> dict:
+        """Get the raw semester list (ds_hoc_ky + hoc_ky_theo_ngay_hien_tai). Cache-first."""
+        return await self._cache_first(
+            user_id, "semesters", lambda: self._with_client(user_id, lambda c: c.get_semesters())
+        )
+
+    async def get_current_semester(self, user_id: str) -> str | None:
+        """Current semester code according to the school server, e.g. "20252"."""
+        try:
+            data = await self.get_semesters(user_id)
+        except ValueError:
+            return None
+        current = data.get("hoc_ky_theo_ngay_hien_tai")
+        return str(current) if current else None
 
     # ── Phase 2: New Data Access Methods ─────────────────
 
     async def get_student_info(self, user_id: str) -> StudentInfo:
         """Get student personal info. Cache-first, sync from school API if stale."""
-        cached = await self._get_cached(user_id, "student_info")
-        if cached and self._is_valid_response(cached):
-            raw = cached
-        else:
-            client = await self._get_authenticated_client(user_id)
-            try:
-                raw = await client.get_student_info()
-                if self._is_valid_response(raw):
-                    await self._update_cache(user_id, "student_info", raw)
-                else:
-                    raise ValueError(f"API trường trả lỗi: {raw.get('message', 'Unknown')}")
-            finally:
-                await client.close()
-
+        raw = await self._cache_first(
+            user_id, "student_info", lambda: self._with_client(user_id, lambda c: c.get_student_info())
+        )
         return self._parse_student_info(raw)
 
     async def get_tuition_summary(self, user_id: str) -> list[TuitionSemester]:
         """Get tuition fee summary. Cache-first."""
-        cached = await self._get_cached(user_id, "tuition")
-        if cached and self._is_valid_response(cached):
-            raw_semesters = cached.get("ds_hoc_phi_hoc_ky", [])
-        else:
-            client = await self._get_authenticated_client(user_id)
-            try:
-                data = await client.get_tuition_summary()
-                if self._is_valid_response(data):
-                    await self._update_cache(user_id, "tuition", data)
-                    raw_semesters = data.get("ds_hoc_phi_hoc_ky", [])
-                else:
-                    raise ValueError(f"API trường trả lỗi: {data.get('message', 'Unknown')}")
-            finally:
-                await client.close()
-
-        return self._parse_tuition(raw_semesters)
+        data = await self._cache_first(
+            user_id, "tuition", lambda: self._with_client(user_id, lambda c: c.get_tuition_summary())
+        )
+        return self._parse_tuition(data.get("ds_hoc_phi_hoc_ky", []))
 
     async def get_semester_result(
         self, user_id: str, semester_id: int
     ) -> list[SemesterCourseResult]:
         """Get grades for a specific semester. Cache-first."""
-        cache_key = f"sem_result_{semester_id}"
-        cached = await self._get_cached(user_id, "semester_result", cache_key)
-        if cached and self._is_valid_response(cached):
-            raw_courses = cached.get("ds_du_lieu", [])
-        else:
-            client = await self._get_authenticated_client(user_id)
-            try:
-                data = await client.get_semester_result(semester_id)
-                if self._is_valid_response(data):
-                    await self._update_cache(user_id, "semester_result", data, cache_key)
-                    raw_courses = data.get("ds_du_lieu", [])
-                else:
-                    raise ValueError(f"API trường trả lỗi: {data.get('message', 'Unknown')}")
-            finally:
-                await client.close()
-
-        return self._parse_semester_result(raw_courses)
+        data = await self._cache_first(
+            user_id,
+            "semester_result",
+            lambda: self._with_client(user_id, lambda c: c.get_semester_result(semester_id)),
+            f"sem_result_{semester_id}",
+        )
+        return self._parse_semester_result(data.get("ds_du_lieu", []))
 
     async def get_semester_timetable_overview(
         self, user_id: str, semester_id: int
     ) -> dict:
         """Get semester-wide timetable overview. Returns raw data for tool formatting."""
-        cache_key = f"sem_tkb_{semester_id}"
-        cached = await self._get_cached(user_id, "semester_tkb_overview", cache_key)
-        if cached and self._is_valid_response(cached):
-            return cached
-        else:
-            client = await self._get_authenticated_client(user_id)
+        return await self._cache_first(
+            user_id,
+            "semester_tkb_overview",
+            lambda: self._with_client(user_id, lambda c: c.get_semester_timetable_overview(semester_id)),
+            f"sem_tkb_{semester_id}",
+        )
+
+    # ── Bulk Sync ────────────────────────────────────────
+
+    async def sync_datasets(
+        self, user_id: str, datasets: list[str] | None = None, semester_id: int | None = None
+    ) -> dict:
+        """Refresh several datasets from the school API over ONE login.
+
+        The semester list is fetched first (current semester resolution), then all
+        requested datasets are fetched concurrently on the shared pooled session and
+        written with a single upsert. A failing dataset does not abort the others.
+
+        Args:
+            datasets: Subset of SYNC_DATASETS (default: all).
+            semester_id: Semester for timetable / semester_result / semester_tkb_overview.
+                None = current semester (timetable is then cached under "current").
+
+        Returns:
+            dict: { "synced": [...], "errors": [{type, error}], "timings_ms": {dataset: ms}, "total_ms": int }
+        """
+        datasets = list(dict.fromkeys(datasets or SYNC_DATASETS))
+        unknown = [d for d in datasets if d not in SYNC_DATASETS]
+        if unknown:
+            raise ValueError(f"data_type phải là một trong: {', '.join(SYNC_DATASETS)}")
+
+        started = time.perf_counter()
+        timings: dict[str, int] = {}
+
+        async def timed(name: str, call):
+            t0 = time.perf_counter()
             try:
-                data = await client.get_semester_timetable_overview(semester_id)
-                if self._is_valid_response(data):
-                    await self._update_cache(user_id, "semester_tkb_overview", data, cache_key)
-                    return data
-                else:
-                    raise ValueError(f"API trường trả lỗi: {data.get('message', 'Unknown')}")
+                return await call
             finally:
-                await client.close()
+                timings[name] = round((time.perf_counter() - t0) * 1000)
+
+        async def run(client: SchoolAPIClient) -> list[tuple[str, str | None, object]]:
+            # Học kỳ hiện tại — cần cho các dataset theo kỳ và được cache luôn
+            results: list[tuple[str, str | None, object]] = []
+            try:
+                semesters = await timed("semesters", client.get_semesters())
+            except Exception as e:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 401:
+                    raise
+                semesters = e
+            results.append(("semesters", None, semesters))
+            current = semesters.get("hoc_ky_theo_ngay_hien_tai") if self._is_valid_response(semesters) else None
+            target = semester_id or (int(current) if current and str(current).isdigit() else None)
+
+            calls = {
+                "timetable": (str(semester_id) if semester_id else "current",
+                              lambda: client.get_weekly_timetable(target)),
+                "grades": (None, client.get_grades),
+                "student_info": (None, client.get_student_info),
+                "tuition": (None, client.get_tuition_summary),
+                "semester_result": (f"sem_result_{target}",
+                                    lambda: client.get_semester_result(target)),
+                "semester_tkb_overview": (f"sem_tkb_{target}",
+                                          lambda: client.get_semester_timetable_overview(target)),
+            }
+            pending = []
+            for name in datasets:
+                cache_key, call = calls[name]
+                if target is None and name in ("semester_result", "semester_tkb_overview"):
+                    results.append((name, cache_key, ValueError("Không xác định được học kỳ hiện tại")))
+                    continue
+                pending.append((name, cache_key, call))
+
+            fetched = await asyncio.gather(
+                *[timed(name, call()) for name, _, call in pending], return_exceptions=True
+            )
+            for (name, cache_key, _), data in zip(pending, fetched):
+                # Token bị thu hồi giữa chừng → để _with_client login lại và chạy lại cả lô
+                if isinstance(data, httpx.HTTPStatusError) and data.response.status_code == 401:
+                    raise data
+                results.append((name, cache_key, data))
+            return results
+
+        results = await self._with_client(user_id, run)
+
+        entries: list[tuple[str, str | None, dict]] = []
+        synced: list[str] = []
+        errors: list[dict] = []
+        for name, cache_key, data in results:
+            if isinstance(data, Exception):
+                errors.append({"type": name, "error": str(data)})
+            elif not self._is_valid_response(data):
+                message = data.get("message", "Unknown") if isinstance(data, dict) else "Unknown"
+                errors.append({"type": name, "error": f"API trường trả lỗi: {message}"})
+            else:
+                entries.append((name, cache_key, data))
+                if name in datasets:
+                    synced.append(name)
+
+        self._write_cache_batch(user_id, entries)
+        return {
+            "synced": synced,
+            "errors": errors,
+            "timings_ms": timings,
+            "total_ms": round((time.perf_counter() - started) * 1000),
+        }
 
     # ── Data Transformers ────────────────────────────────
 
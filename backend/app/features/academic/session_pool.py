@@ -0,0 +1,145 @@
+"""
+Academic feature: Per-user pool of authenticated SchoolAPIClient sessions.
+
+Trước đây mỗi lần cache miss đều: giải mã credentials → GET pn-signin (302) →
+follow redirect → update last_login_at, rồi đóng client. Pool này giữ lại client
+đã đăng nhập của từng user và dùng lại JWE token cho tới khi:
+  - token hết hạn (expires_in trong CurrUser, hoặc SCHOOL_SESSION_TTL_MINUTES), hoặc
+  - API trả 401 → service gọi invalidate() và đăng nhập lại một lần.
+
+Single-flight: các coroutine cùng cần session cho một user trong lúc chưa có
+session hợp lệ sẽ chờ CHUNG một lần login (kể cả khi login lỗi — cùng nhận lỗi đó).
+
+Client bị loại (hết hạn / 401 / bị đẩy ra khỏi LRU) chỉ được đóng khi không còn
+request nào đang dùng nó. close_all() được gọi khi app shutdown.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from app.config import get_settings
+from app.features.academic.school_client import SchoolAPIClient
+
+logger = logging.getLogger(__name__)
+
+# Đăng nhập lại sớm hơn hạn token một chút để request đang bay không dính 401
+SESSION_EXPIRY_MARGIN = 60
+
+
+class SchoolSessionPool:
+    """LRU of logged-in SchoolAPIClient per user with single-flight login."""
+
+    def __init__(self, max_sessions: int, default_ttl_seconds: float, expiry_margin: float = SESSION_EXPIRY_MARGIN):
+        self.max_sessions = max_sessions
+        self.default_ttl_seconds = default_ttl_seconds
+        self.expiry_margin = expiry_margin
+        self._sessions: OrderedDict[str, dict] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.stats = {"logins": 0, "reused": 0, "invalidated": 0}
+
+    @asynccontextmanager
+    async def session(self, user_id: str, login: Callable[[], Awaitable[SchoolAPIClient]]):
+        """Yield an authenticated client for `user_id`, logging in via `login()` only when needed.
+
+        The client is shared — callers must NOT close it.
+        """
+        entry = await self._acquire(user_id, login)
+        entry["active"] += 1
+        try:
+            yield entry["client"]
+        finally:
+            entry["active"] -= 1
+            await self._close_if_idle(entry)
+
+    async def invalidate(self, user_id: str, client: SchoolAPIClient | None = None):
+        """Drop the user's session (only if it is still `client`, when given)."""
+        entry = self._sessions.get(user_id)
+        if entry is None or (client is not None and entry["client"] is not client):
+            return
+        self.stats["invalidated"] += 1
+        await self._retire(user_id)
+
+    async def close_all(self):
+        """Close every pooled client (app shutdown)."""
+        for user_id in list(self._sessions):
+            entry = self._sessions.pop(user_id)
+            entry["retired"] = True
+            await entry["client"].close()
+        if self.stats["logins"]:
+            logger.info(
+                f"🔌 Closed school sessions — logins={self.stats['logins']}, reused={self.stats['reused']}"
+            )
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    # ── Internals ────────────────────────────────────────
+
+    async def _acquire(self, user_id: str, login) -> dict:
+        entry = self._sessions.get(user_id)
+        if entry is not None:
+            if entry["expires_at"] - self.expiry_margin > time.time():
+                self._sessions.move_to_end(user_id)
+                self.stats["reused"] += 1
+                return entry
+            await self._retire(user_id)
+
+        future = self._inflight.get(user_id)
+        if future is None:
+            future = asyncio.ensure_future(self._login(user_id, login))
+            self._inflight[user_id] = future
+            future.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        # shield: một caller bị cancel không được hủy lần login mà người khác đang chờ
+        return await asyncio.shield(future)
+
+    async def _login(self, user_id: str, login) -> dict:
+        client = await login()
+        self.stats["logins"] += 1
+        expires_at = client.token_expires_at or (time.time() + self.default_ttl_seconds)
+        entry = {"client": client, "expires_at": expires_at, "active": 0, "retired": False}
+        if user_id in self._sessions:
+            await self._retire(user_id)
+        self._sessions[user_id] = entry
+        while len(self._sessions) > self.max_sessions:
+            oldest = next(iter(self._sessions))
+            await self._retire(oldest)
+        return entry
+
+    async def _retire(self, user_id: str):
+        entry = self._sessions.pop(user_id, None)
+        if entry is not None:
+            entry["retired"] = True
+            await self._close_if_idle(entry)
+
+    @staticmethod
+    async def _close_if_idle(entry: dict):
+        if entry["retired"] and entry["active"] == 0:
+            try:
+                await entry["client"].close()
+            except Exception as e:
+                logger.warning(f"Could not close school client: {e}")
+
+
+_pool: SchoolSessionPool | None = None
+
+
+def get_school_session_pool() -> SchoolSessionPool:
+    """Process-wide session pool (created on first use)."""
+    global _pool
+    if _pool is None:
+        settings = get_settings()
+        _pool = SchoolSessionPool(
+            max_sessions=settings.SCHOOL_SESSION_POOL_SIZE,
+            default_ttl_seconds=settings.SCHOOL_SESSION_TTL_MINUTES * 60,
+        )
+    return _pool
+
+
+async def close_school_sessions():
+    """Lifespan shutdown hook."""
+    if _pool is not None:
+        await _pool.close_all()
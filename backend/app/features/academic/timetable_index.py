@@ -0,0 +1,230 @@
+"""
+Academic feature: Parsed + indexed timetable, cached per (user, semester, type).
+
+Trước đây mỗi lần tool get_timetable chạy đều: parse lại JSON ds_tuan_tkb thành
+model pydantic, strptime 2 lần / tuần trong vòng lặp tuyến tính để tìm tuần hiện
+tại, rồi nối chuỗi để render. ParsedTimetable làm các việc đó MỘT lần:
+
+  - ngày bắt đầu/kết thúc của mỗi tuần được parse sẵn, sắp xếp theo ngày bắt đầu
+    → tìm tuần chứa một ngày bằng bisect (O(log n))
+  - bảng "tuần có lịch tiếp theo / tuần có lịch trước đó" cho các fallback
+  - khối text của từng tuần được render sẵn (nhãn [TUẦN NÀY]... gắn khi ghép)
+
+TimetableIndexCache giữ ParsedTimetable theo key và dùng lại chừng nào tier nhớ
+của AcademicCache còn trả về CÙNG object ds_tuan_tkb (dữ liệu được sync lại →
+object mới → tự build lại, không cần invalidate riêng).
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Callable
+
+from app.features.academic.schemas import TimetableSlot, WeekTimetable
+
+DAY_LABELS = {2: "Thứ 2", 3: "Thứ 3", 4: "Thứ 4", 5: "Thứ 5", 6: "Thứ 6", 7: "Thứ 7", 8: "CN"}
+TIMETABLE_INDEX_CACHE_SIZE = 64
+
+
+def period_minutes(start_period: int, num_periods: int) -> tuple[int, int]:
+    """Start/end of a TVU class as minutes since midnight (rules in `period_to_time`)."""
+    PERIOD_MIN = 45
+    BREAK_MIN  = 30
+
+    def _offset(pos_in_session: int) -> int:
+        """Minutes from session start to the START of period `pos_in_session` (1-based)."""
+        if pos_in_session <= 2:
+            return (pos_in_session - 1) * PERIOD_MIN
+        # Break inserted after position 2
+        return 2 * PERIOD_MIN + BREAK_MIN + (pos_in_session - 3) * PERIOD_MIN
+
+    if start_period <= 5:
+        session_start = 7 * 60   # 07:00
+        pos = start_period
+    else:
+        session_start = 13 * 60  # 13:00
+        pos = start_period - 5
+
+    start_min = session_start + _offset(pos)
+    end_min   = session_start + _offset(pos + num_periods - 1) + PERIOD_MIN
+    return start_min, end_min
+
+
+def format_minutes(m: int) -> str:
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+
+def period_to_time(start_period: int, num_periods: int) -> str:
+    """Convert TVU period number + count to a human-readable time range.
+
+    TVU schedule rules:
+      - Morning session : period  1–5,  starts 07:00
+      - Afternoon session: period  6–10, starts 13:00
+      - Each period = 45 min
+      - Break of 30 min after the 2nd period within each session
+          Morning  : after period 2  (08:30 – 09:00)
+          Afternoon: after period 7  (14:30 – 15:00)
+
+    Examples:
+      (1, 4) → "07:00–10:30"   (tiết 1-4 sáng, 2 tiết + nghỉ + 2 tiết)
+      (1, 5) → "07:00–11:15"   (tiết 1-5 sáng)
+      (6, 4) → "13:00–16:30"   (tiết 6-9 chiều)
+      (6, 5) → "13:00–17:15"   (tiết 6-10 chiều)
+    """
+    start_min, end_min = period_minutes(start_period, num_periods)
+    return f"{format_minutes(start_min)}–{format_minutes(end_min)}"
+
+
+def _parse_date(value: str) -> date | None:
+    """Date format in WeekTimetable is DD/MM/YYYY."""
+    try:
+        return datetime.strptime(value, "%d/%m/%Y").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _render_slots(w: WeekTimetable) -> str:
+    lines = []
+    for s in w.slots:
+        end_period = s.start_period + s.num_periods - 1
+        cancelled = " [NGHỈ]" if s.is_cancelled else ""
+        day_label = DAY_LABELS.get(s.day_of_week, f"Thứ {s.day_of_week}")
+        class_info = f" | Lớp: {s.class_name}" if s.class_name else ""
+        time_range = period_to_time(s.start_period, s.num_periods)
+        lines.append(
+            f"  {day_label} | {time_range} (Tiết {s.start_period}-{end_period}) | "
+            f"{s.subject_name} | Phòng {s.room} | "
+            f"GV: {s.lecturer}{class_info}{cancelled}\n"
+        )
+    return "".join(lines)
+
+
+class ParsedTimetable:
+    """Weeks of one semester with a date index and pre-rendered week blocks."""
+
+    def __init__(self, weeks: list[WeekTimetable]):
+        self.weeks = weeks
+
+        # Index theo ngày bắt đầu (bỏ qua tuần có ngày không hợp lệ)
+        dated = []
+        for i, w in enumerate(weeks):
+            start, end = _parse_date(w.start_date), _parse_date(w.end_date)
+            if start and end:
+                dated.append((start, end, i))
+        dated.sort()
+        self._starts = [d[0] for d in dated]
+        self._ends = [d[1] for d in dated]
+        self._positions = [d[2] for d in dated]
+
+        # _next_with_slots[k] = vị trí tuần có lịch đầu tiên trong dated[k:]
+        self._next_with_slots: list[int | None] = [None] * (len(dated) + 1)
+        for k in range(len(dated) - 1, -1, -1):
+            pos = self._positions[k]
+            self._next_with_slots[k] = pos if weeks[pos].slots else self._next_with_slots[k + 1]
+
+        # _prev_with_slots[i] = tuần có lịch gần nhất TRƯỚC tuần i (theo thứ tự danh sách), -1 nếu không có
+        self._prev_with_slots: list[int] = []
+        last = -1
+        for i, w in enumerate(weeks):
+            self._prev_with_slots.append(last)
+            if w.slots:
+                last = i
+
+        self._bodies = [_render_slots(w) for w in weeks]
+
+    def week_index(self, target: date) -> int:
+        """Return the index of the week containing `target` date.
+
+        Falls back to the first week with slots starting on/after `target` when the
+        date is before the semester (or in a gap), else the first week.
+        """
+        index = self.week_containing(target)
+        if index is not None:
+            return index
+
+        # Target is outside semester range — find closest future week with slots
+        upcoming = self._next_with_slots[bisect_left(self._starts, target)]
+        return upcoming if upcoming is not None else 0  # Fallback: first week
+
+    def week_containing(self, target: date) -> int | None:
+        """Index of the week whose date range contains `target`, without fallbacks."""
+        k = bisect_right(self._starts, target) - 1
+        if k >= 0 and target <= self._ends[k]:
+            return self._positions[k]
+        return None
+
+    def slots_on(self, target: date) -> list[TimetableSlot]:
+        """Slots scheduled on `target` (thu_kieu_so: 2 = Thứ 2 ... 8 = CN)."""
+        index = self.week_containing(target)
+        if index is None:
+            return []
+        weekday = target.isoweekday() + 1
+        return [s for s in self.weeks[index].slots if s.day_of_week == weekday]
+
+    def render_week(self, index: int, label: str = "") -> str:
+        w = self.weeks[index]
+        header_label = f" [{label}]" if label else ""
+        if not w.slots:
+            return f"Tuần {w.week_number}{header_label} ({w.start_date} - {w.end_date}): Không có lịch học\n\n"
+        return f"Tuần {w.week_number}{header_label} ({w.start_date} - {w.end_date}):\n{self._bodies[index]}\n"
+
+    def format_window(self, start_index: int, max_weeks: int = 4) -> str:
+        """Format a window of weeks into a compact string for the LLM / vector search.
+
+        Window layout: 1 tuần trước + tuần hiện tại + 2 tuần tiếp theo (4 tuần tổng).
+        - Tuần trước: context pattern (tuần nặng/nhẹ, so sánh)
+        - Tuần hiện tại: hành động ngay hôm nay
+        - 2 tuần tiếp: lập kế hoạch, cảnh báo deadline
+
+        Empty weeks (nghỉ lễ/Tết) vẫn hiển thị trong phần forward (tương lai)
+        nhưng KHÔNG tính vào slot khi tìm tuần trước — tìm lùi đến tuần có slot.
+        """
+        if not self.weeks:
+            return ""
+        parts = []
+        prev_index = self._prev_with_slots[start_index]
+        if prev_index >= 0:
+            parts.append(self.render_week(prev_index, "TUẦN TRƯỚC"))
+
+        # -1 vì đã dùng 1 slot cho tuần trước
+        end = min(len(self.weeks), start_index + max_weeks - 1)
+        for i in range(start_index, end):
+            parts.append(self.render_week(i, "TUẦN NÀY" if i == start_index else ""))
+
+        return "".join(parts).strip()
+
+
+class TimetableIndexCache:
+    """LRU of ParsedTimetable, rebuilt whenever the raw ds_tuan_tkb object changes."""
+
+    def __init__(self, max_entries: int = TIMETABLE_INDEX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[list, ParsedTimetable]] = OrderedDict()
+        self.stats = {"hits": 0, "builds": 0}
+
+    def get(
+        self, key: tuple, raw_weeks: list, parse: Callable[[list], list[WeekTimetable]]
+    ) -> ParsedTimetable:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is raw_weeks:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+        parsed = ParsedTimetable(parse(raw_weeks))
+        self.stats["builds"] += 1
+        self._entries[key] = (raw_weeks, parsed)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return parsed
+
+    def clear(self):
+        self._entries.clear()
+
+
+_index_cache = TimetableIndexCache()
+
+
+def get_timetable_index_cache() -> TimetableIndexCache:
+    return _index_cache
@@ -2,145 +2,20 @@
 Academic tools for the agent — uses AcademicService for per-user credentials.
 These are LangChain @tool functions that the LangGraph agent can call.
 
-Flow: Tool call → AcademicService → Check cache → If stale, decrypt user
-credentials → Login to school API → Fetch → Cache → Return formatted data.
+Flow: Tool call → AcademicService → Check cache → If stale, reuse the user's
+pooled school session (decrypt credentials + login only when none is valid)
+→ Fetch → Cache → Return formatted data. If the portal is down (breaker open /
+retries exhausted) the last cached copy is returned with a "stale since" notice.
 """
 
 import json
-from datetime import datetime, date, timezone, timedelta
+from datetime import datetime
 from typing import Annotated
 from langchain_core.tools import tool, InjectedToolArg
 
 from app.core.dependencies import get_db
+from app.features.academic.school_clock import get_school_clock, school_now
 from app.features.academic.service import AcademicService
-from app.features.academic.schemas import WeekTimetable
-
-# Vietnam timezone (UTC+7) — instant, no HTTP call needed
-VN_TZ = timezone(timedelta(hours=7))
-
-
-def _period_to_time(start_period: int, num_periods: int) -> str:
-    """Convert TVU period number + count to a human-readable time range.
-
-    TVU schedule rules:
-      - Morning session : period  1–5,  starts 07:00
-      - Afternoon session: period  6–10, starts 13:00
-      - Each period = 45 min
-      - Break of 30 min after the 2nd period within each session
-          Morning  : after period 2  (08:30 – 09:00)
-          Afternoon: after period 7  (14:30 – 15:00)
-
-    Examples:
-      (1, 4) → "07:00–10:30"   (tiết 1-4 sáng, 2 tiết + nghỉ + 2 tiết)
-      (1, 5) → "07:00–11:15"   (tiết 1-5 sáng)
-      (6, 4) → "13:00–16:30"   (tiết 6-9 chiều)
-      (6, 5) → "13:00–17:15"   (tiết 6-10 chiều)
-    """
-    PERIOD_MIN = 45
-    BREAK_MIN  = 30
-
-    def _offset(pos_in_session: int) -> int:
-        """Minutes from session start to the START of period `pos_in_session` (1-based)."""
-        if pos_in_session <= 2:
-            return (pos_in_session - 1) * PERIOD_MIN
-        # Break inserted after position 2
-        return 2 * PERIOD_MIN + BREAK_MIN + (pos_in_session - 3) * PERIOD_MIN
-
-    if start_period <= 5:
-        session_start = 7 * 60   # 07:00
-        pos = start_period
-    else:
-        session_start = 13 * 60  # 13:00
-        pos = start_period - 5
-
-    start_min = session_start + _offset(pos)
-    end_min   = session_start + _offset(pos + num_periods - 1) + PERIOD_MIN
-
-    def _fmt(m: int) -> str:
-        return f"{m // 60:02d}:{m % 60:02d}"
-
-    return f"{_fmt(start_min)}–{_fmt(end_min)}"
-
-
-def _find_current_week_index(weeks: list[WeekTimetable], target: date) -> int:
-    """Return the index of the week containing `target` date.
-    
-    Falls back to the first week with upcoming slots if target is before
-    the semester, or the last week if target is after the semester.
-    
-    Date format in WeekTimetable is DD/MM/YYYY.
-    """
-    for i, w in enumerate(weeks):
-        try:
-            start = datetime.strptime(w.start_date, "%d/%m/%Y").date()
-            end = datetime.strptime(w.end_date, "%d/%m/%Y").date()
-            if start <= target <= end:
-                return i
-        except ValueError:
-            continue
-
-    # Target is outside semester range — find closest future week with slots
-    for i, w in enumerate(weeks):
-        try:
-            start = datetime.strptime(w.start_date, "%d/%m/%Y").date()
-            if start >= target and w.slots:
-                return i
-        except ValueError:
-            continue
-
-    return 0  # Fallback: first week
-
-
-def _format_weeks(weeks: list[WeekTimetable], start_index: int, max_weeks: int = 4) -> str:
-    """Format a window of weeks into a compact string for the LLM / vector search.
-
-    Window layout: 1 tuần trước + tuần hiện tại + 2 tuần tiếp theo (4 tuần tổng).
-    - Tuần trước: context pattern (tuần nặng/nhẹ, so sánh)
-    - Tuần hiện tại: hành động ngay hôm nay
-    - 2 tuần tiếp: lập kế hoạch, cảnh báo deadline
-
-    Empty weeks (nghỉ lễ/Tết) vẫn hiển thị trong phần forward (tương lai)
-    nhưng KHÔNG tính vào slot khi tìm tuần trước — tìm lùi đến tuần có slot.
-    """
-    day_map = {2: "Thứ 2", 3: "Thứ 3", 4: "Thứ 4", 5: "Thứ 5", 6: "Thứ 6", 7: "Thứ 7", 8: "CN"}
-    result = ""
-
-    def _render_week(w: WeekTimetable, label: str = "") -> str:
-        header_label = f" [{label}]" if label else ""
-        if not w.slots:
-            return f"Tuần {w.week_number}{header_label} ({w.start_date} - {w.end_date}): Không có lịch học\n\n"
-        out = f"Tuần {w.week_number}{header_label} ({w.start_date} - {w.end_date}):\n"
-        for s in w.slots:
-            end_period = s.start_period + s.num_periods - 1
-            cancelled = " [NGHỈ]" if s.is_cancelled else ""
-            day_label = day_map.get(s.day_of_week, f"Thứ {s.day_of_week}")
-            class_info = f" | Lớp: {s.class_name}" if s.class_name else ""
-            time_range = _period_to_time(s.start_period, s.num_periods)
-            out += (
-                f"  {day_label} | {time_range} (Tiết {s.start_period}-{end_period}) | "
-                f"{s.subject_name} | Phòng {s.room} | "
-                f"GV: {s.lecturer}{class_info}{cancelled}\n"
-            )
-        out += "\n"
-        return out
-
-    # ── Tuần trước: tìm lùi đến tuần gần nhất có slot (bỏ qua tuần trống) ──
-    prev_index = start_index - 1
-    while prev_index >= 0 and not weeks[prev_index].slots:
-        prev_index -= 1
-    if prev_index >= 0:
-        result += _render_week(weeks[prev_index], "TUẦN TRƯỚC")
-
-    # ── Tuần hiện tại + các tuần tới (forward window) ────────────────────────
-    shown = 0
-    i = start_index
-    while i < len(weeks) and shown < (max_weeks - 1):  # -1 vì đã dùng 1 slot cho tuần trước
-        label = "TUẦN NÀY" if shown == 0 else ""
-        result += _render_week(weeks[i], label)
-        shown += 1
-        i += 1
-
-    return result.strip()
 
 
 @tool
@@ -155,12 +30,7 @@ async def get_semesters(
     """
     try:
         service = AcademicService(get_db())
-        client = await service._get_authenticated_client(user_id)
-
-        try:
-            data = await client.get_semesters()
-        finally:
-            await client.close()
+        data = await service.get_semesters(user_id)
 
         # Format for LLM consumption
         current = data.get("hoc_ky_theo_ngay_hien_tai", "?")
@@ -171,7 +41,7 @@ async def get_semesters(
         for s in semesters[:6]:  # Limit to recent 6
             result += f"- {s.get('ten_hoc_ky', '?')} (ma: {s.get('hoc_ky', '?')})\n"
 
-        return result
+        return result + service.stale_note()
 
     except ValueError as e:
         return json.dumps({
@@ -210,29 +80,37 @@ async def get_timetable(
     Returns:
         Thời khóa biểu 4 tuần (1 trước + hiện tại + 2 tiếp): thứ, tiết, môn, phòng, lớp, giảng viên.
     """
+    known_types = {t.get("loai_doi_tuong") for t in get_school_clock().timetable_types}
+    if known_types and timetable_type not in known_types:
+        return json.dumps({
+            "status": "error",
+            "message": f"timetable_type không hợp lệ: {timetable_type}",
+            "available": get_school_clock().timetable_types,
+        }, ensure_ascii=False)
+
     try:
         service = AcademicService(get_db())
         semester_str = str(semester_id) if semester_id else None
-        weeks = await service.get_timetable(user_id, semester_str, timetable_type)
+        timetable = await service.get_parsed_timetable(user_id, semester_str, timetable_type)
 
-        if not weeks:
+        if not timetable.weeks:
             return "Không có thời khóa biểu cho học kỳ này (có thể HK chưa bắt đầu)."
 
-        # Resolve target date — prefer school server time to avoid UTC vs GMT+7 mismatch
+        # Resolve target date — giờ server trường (offset đã cache), tránh lệch UTC vs GMT+7
         if target_date:
             try:
                 pivot = datetime.strptime(target_date, "%Y-%m-%d").date()
             except ValueError:
-                pivot = datetime.now(VN_TZ).date()
+                pivot = school_now().date()
         else:
-            pivot = datetime.now(VN_TZ).date()
+            pivot = school_now().date()
 
-        start_index = _find_current_week_index(weeks, pivot)
-        header = f"Ngày tra cứu: {pivot.strftime('%d/%m/%Y')} | Tổng số tuần trong HK: {len(weeks)}\n"
+        start_index = timetable.week_index(pivot)
+        header = f"Ngày tra cứu: {pivot.strftime('%d/%m/%Y')} | Tổng số tuần trong HK: {len(timetable.weeks)}\n"
         header += "Cửa sổ: 1 tuần trước + tuần hiện tại + 2 tuần tiếp theo\n\n"
-        body = _format_weeks(weeks, start_index, max_weeks=4)
+        body = timetable.format_window(start_index, max_weeks=4)
 
-        return header + (body if body else "Không có lịch học trong khoảng thời gian này.")
+        return header + (body if body else "Không có lịch học trong khoảng thời gian này.") + service.stale_note()
 
     except ValueError as e:
         return json.dumps({
@@ -280,7 +158,7 @@ async def get_grades(
                 )
             result += "\n"
 
-        return result
+        return result + service.stale_note()
 
     except ValueError as e:
         return json.dumps({
@@ -329,7 +207,7 @@ async def get_student_info(
         result += f"Trạng thái: {info.status}\n"
         result += f"Khóa: {info.semester_start} → {info.semester_end}\n"
 
-        return result
+        return result + service.stale_note()
 
     except ValueError as e:
         return json.dumps({
@@ -383,7 +261,7 @@ async def get_tuition_info(
         result += f"Tổng đã thu: {total_paid:,}đ\n"
         result += f"Tổng còn nợ: {total_remaining:,}đ\n"
 
-        return result
+        return result + service.stale_note()
 
     except ValueError as e:
         return json.dumps({
@@ -430,7 +308,7 @@ async def get_semester_grades(
         for c in courses:
             result += f"  {c.subject_name} ({c.credits:.0f} TC): {c.score}/10\n"
 
-        return result
+        return result + service.stale_note()
 
     except ValueError as e:
         return json.dumps({
@@ -464,14 +342,7 @@ async def get_semester_timetable_overview(
         service = AcademicService(get_db())
 
         # Resolve semester if not provided
-        actual_semester = semester_id
-        if not actual_semester:
-            client = await service._get_authenticated_client(user_id)
-            try:
-                sdata = await client.get_semesters()
-                actual_semester = sdata.get("hoc_ky_theo_ngay_hien_tai")
-            finally:
-                await client.close()
+        actual_semester = semester_id or await service.get_current_semester(user_id)
 
         if not actual_semester:
             return "Không xác định được học kỳ hiện tại. Hãy truyền semester_id."
@@ -523,7 +394,7 @@ async def get_semester_timetable_overview(
             if len(info["sessions"]) > 3:
                 result += f"  ... và {len(info['sessions']) - 3} buổi khác\n"
 
-        return result
+        return result + service.stale_note()
 
     except ValueError as e:
         return json.dumps({
@@ -538,9 +409,115 @@ async def get_semester_timetable_overview(
         }, ensure_ascii=False)
 
 
+# ── Grade analytics (precomputed, tiny payloads) ─────
+
+def _fmt_score(value) -> str:
+    return "—" if value is None else f"{value:g}"
+
+
+@tool
+async def get_grade_for_subject(
+    subject: str,
+    user_id: Annotated[str, InjectedToolArg] = "",
+) -> str:
+    """Tra điểm MỘT môn theo mã môn hoặc tên môn (không cần gõ dấu).
+    Dùng khi sinh viên hỏi: "Môn Lập trình Python mình được mấy điểm?", "Điểm môn CS101?"
+    Nhẹ hơn nhiều so với get_grades — ưu tiên dùng tool này cho câu hỏi về một môn.
+
+    Args:
+        subject: Mã môn (vd: "CS101") hoặc tên / một phần tên môn (vd: "lap trinh python").
+
+    Returns:
+        Mỗi lần học của môn: học kỳ, số TC, điểm hệ 10 / hệ 4 / chữ, trạng thái.
+    """
+    try:
+        service = AcademicService(get_db())
+        analytics = await service.get_grade_analytics(user_id)
+        matches = analytics.find(subject)
+        if not matches:
+            return f"Không tìm thấy môn khớp với \"{subject}\" trong bảng điểm."
+
+        status_vi = {"passed": "Đạt", "failed": "Chưa đạt", "pending": "Chưa có điểm"}
+        lines = []
+        for attempts in matches:
+            first = attempts[0]
+            lines.append(f"{first['name']} ({first['code']}, {first['credits']:g} TC):")
+            for a in attempts:
+                letter = f" ({a['letter']})" if a["letter"] else ""
+                lines.append(
+                    f"  {a['semester_name'] or a['semester']}: {_fmt_score(a['grade_10'])}/10, "
+                    f"{_fmt_score(a['grade_4'])}/4{letter} — {status_vi[a['status']]}"
+                )
+        return "\n".join(lines) + service.stale_note()
+
+    except ValueError as e:
+        return json.dumps({
+            "status": "error",
+            "message": str(e),
+            "hint": "Chủ nhân cần kết nối tài khoản trường trước.",
+        }, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({
+            "status": "error",
+            "message": f"Lỗi khi tra điểm môn ({type(e).__name__}): {str(e)}",
+        }, ensure_ascii=False)
+
+
+@tool
+async def get_gpa_summary(
+    user_id: Annotated[str, InjectedToolArg] = "",
+) -> str:
+    """Tóm tắt GPA: tích lũy + HK gần nhất (hệ 10 và hệ 4), tín chỉ đạt / nợ / chưa có điểm,
+    danh sách môn rớt và môn học lại. Đã tính sẵn — KHÔNG cần tự cộng điểm từ get_grades.
+    Dùng khi sinh viên hỏi: "GPA của mình bao nhiêu?", "Mình nợ bao nhiêu tín chỉ?", "Rớt môn nào?"
+    """
+    try:
+        service = AcademicService(get_db())
+        summary = (await service.get_grade_analytics(user_id)).summary()
+
+        cumulative = summary["cumulative"]
+        credits = summary["credits"]
+        lines = [
+            f"GPA tích lũy: {_fmt_score(cumulative['gpa_10'])} (hệ 10) / {_fmt_score(cumulative['gpa_4'])} (hệ 4)"
+            + (" [tự tính]" if cumulative["source"] == "computed" else ""),
+        ]
+        latest = summary["latest_semester"]
+        if latest:
+            lines.append(
+                f"{latest['name'] or latest['code']}: {_fmt_score(latest['gpa_10'])} (hệ 10) / "
+                f"{_fmt_score(latest['gpa_4'])} (hệ 4)"
+            )
+        lines.append(
+            f"Tín chỉ: đạt {credits['passed']:g}, nợ {credits['failed']:g}, chưa có điểm {credits['pending']:g}"
+        )
+        if summary["failed"]:
+            lines.append("Môn chưa đạt: " + ", ".join(
+                f"{c['name']} ({_fmt_score(c['grade_10'])})" for c in summary["failed"]
+            ))
+        if summary["retakes"]:
+            lines.append("Môn học lại: " + ", ".join(
+                f"{r['name']} ({r['attempts']} lần, cao nhất {_fmt_score(r['best_grade_10'])})"
+                for r in summary["retakes"]
+            ))
+        return "\n".join(lines) + service.stale_note()
+
+    except ValueError as e:
+        return json.dumps({
+            "status": "error",
+            "message": str(e),
+            "hint": "Chủ nhân cần kết nối tài khoản trường trước.",
+        }, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({
+            "status": "error",
+            "message": f"Lỗi khi tính GPA ({type(e).__name__}): {str(e)}",
+        }, ensure_ascii=False)
+
+
 # Export all tools for the agent graph
 academic_tools = [
     get_semesters, get_timetable, get_grades,
     get_student_info, get_tuition_info,
     get_semester_grades, get_semester_timetable_overview,
+    get_grade_for_subject, get_gpa_summary,
 ]
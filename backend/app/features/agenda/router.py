@@ -0,0 +1,31 @@
+"""
+Agenda feature: API route for the merged day/week view.
+"""
+
+from datetime import date as date_type
+
+from fastapi import APIRouter, Depends
+from supabase import Client
+
+from app.core.dependencies import get_db, get_current_user_id
+from app.features.agenda.service import AgendaService
+
+router = APIRouter()
+
+
+@router.get("/")
+async def get_agenda(
+    date: date_type | None = None,
+    days: int = 1,
+    user_id: str = Depends(get_current_user_id),
+    db: Client = Depends(get_db),
+):
+    """Lịch tổng hợp (TKB + task + sự kiện) theo ngày, kèm trùng lịch và giờ trống."""
+    service = AgendaService(db)
+    agenda = await service.get_agenda(user_id, date, days)
+    return {
+        "data": [day.to_dict() for day in agenda["days"]],
+        "overdue": agenda["overdue"],
+        "overdue_count": agenda["overdue_count"],
+        "note": agenda["note"],
+    }
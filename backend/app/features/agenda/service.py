@@ -0,0 +1,281 @@
+"""
+Agenda feature: Unified day/week view over timetable, tasks and calendar events.
+
+Câu hỏi kiểu "hôm nay mình có gì" trước đây khiến agent gọi get_timetable,
+list_tasks, get_events rồi tự ghép 3 kết quả lớn trong LLM. AgendaService gộp
+ngay trên server:
+
+  1. Buổi học trong TKB đã cache (ParsedTimetable.slots_on + period_minutes)
+  2. Task pending có due_date trong khoảng (tasks_reminders) + số task quá hạn
+  3. Sự kiện giao với khoảng (calendar_events) — kể cả sự kiện bắt đầu trước đó
+     nhưng còn kéo dài vào khoảng; sự kiện nhiều ngày được chia theo từng ngày
+
+Mỗi ngày là một DayAgenda: các mục sắp theo giờ bắt đầu, khoảng bận đã gộp
+(sắp xếp → tra cứu bisect), danh sách trùng lịch và khoảng trống trong ngày.
+Giờ được tính theo giờ Việt Nam (UTC+7).
+"""
+
+import logging
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+
+from supabase import Client
+
+from app.features.academic.school_clock import school_now
+from app.features.academic.service import AcademicService
+from app.features.academic.timetable_index import DAY_LABELS, format_minutes, period_minutes
+
+logger = logging.getLogger(__name__)
+
+VN_TZ = timezone(timedelta(hours=7))
+DAY_START_MIN = 6 * 60  # Khung tính giờ trống: 06:00 – 22:00
+DAY_END_MIN = 22 * 60
+MIN_FREE_MINUTES = 30
+DEFAULT_EVENT_MINUTES = 60  # Sự kiện không có end_time
+MAX_AGENDA_DAYS = 14
+OVERDUE_PREVIEW = 5  # Số task quá hạn liệt kê tên (tổng số lấy bằng count="exact")
+
+
+class DayAgenda:
+    """Items of one day, sorted by start, with merged busy intervals."""
+
+    def __init__(self, day: date, items: list[dict]):
+        self.day = day
+        # Mục cả ngày / deadline không giờ (start=None) đứng đầu
+        self.items = sorted(items, key=lambda i: (i["start"] is not None, i["start"] or 0, i["end"] or 0))
+        self._timed = [i for i in self.items if i["start"] is not None and not i.get("cancelled")]
+
+        merged: list[list[int]] = []
+        for item in self._timed:
+            if merged and item["start"] < merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], item["end"])
+            else:
+                merged.append([item["start"], item["end"]])
+        self.busy = [(s, e) for s, e in merged]
+        self._busy_starts = [s for s, _ in self.busy]
+
+    def is_busy(self, minute: int) -> bool:
+        """True if `minute` (since midnight) falls inside a busy interval."""
+        k = bisect_right(self._busy_starts, minute) - 1
+        return k >= 0 and minute < self.busy[k][1]
+
+    def conflicts(self) -> list[tuple[dict, dict]]:
+        """Overlapping item pairs (sweep over items sorted by start)."""
+        pairs = []
+        active: list[dict] = []
+        for item in self._timed:
+            active = [a for a in active if a["end"] > item["start"]]
+            pairs.extend((a, item) for a in active)
+            active.append(item)
+        return pairs
+
+    def free_slots(self, min_minutes: int = MIN_FREE_MINUTES) -> list[tuple[int, int]]:
+        """Gaps of at least `min_minutes` between DAY_START_MIN and DAY_END_MIN."""
+        slots = []
+        cursor = DAY_START_MIN
+        for start, end in self.busy:
+            if start - cursor >= min_minutes:
+                slots.append((cursor, min(start, DAY_END_MIN)))
+            cursor = max(cursor, end)
+            if cursor >= DAY_END_MIN:
+                break
+        if DAY_END_MIN - cursor >= min_minutes:
+            slots.append((cursor, DAY_END_MIN))
+        return slots
+
+    def to_dict(self) -> dict:
+        return {
+            "date": self.day.isoformat(),
+            "items": self.items,
+            "conflicts": [[a["title"], b["title"]] for a, b in self.conflicts()],
+            "free": [f"{format_minutes(s)}–{format_minutes(e)}" for s, e in self.free_slots()],
+        }
+
+
+def _to_local(value: str | None) -> datetime | None:
+    """Parse an ISO timestamp from PostgREST and convert it to Vietnam time."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=VN_TZ)
+    return dt.astimezone(VN_TZ)
+
+
+def _minutes(dt: datetime) -> int:
+    return dt.hour * 60 + dt.minute
+
+
+def build_day_agendas(
+    start: date, days: int, timetable, tasks: list[dict], events: list[dict]
+) -> list[DayAgenda]:
+    """Merge raw sources into one DayAgenda per day (pure — no I/O).
+
+    Args:
+        timetable: ParsedTimetable or None (no school account / API down).
+        tasks: tasks_reminders rows with due_date inside the range.
+        events: calendar_events rows overlapping the range.
+    """
+    by_day: dict[date, list[dict]] = {start + timedelta(days=i): [] for i in range(days)}
+
+    if timetable is not None:
+        for day, items in by_day.items():
+            for s in timetable.slots_on(day):
+                begin, end = period_minutes(s.start_period, s.num_periods)
+                items.append({
+                    "kind": "class", "title": s.subject_name, "start": begin, "end": end,
+                    "location": s.room, "cancelled": s.is_cancelled,
+                })
+
+    for e in events:
+        begin_dt = _to_local(e.get("start_time"))
+        if begin_dt is None:
+            continue
+        end_dt = _to_local(e.get("end_time"))
+        if end_dt is None or end_dt <= begin_dt:
+            end_dt = begin_dt + timedelta(minutes=DEFAULT_EVENT_MINUTES)
+        # end_time là mốc loại trừ: kết thúc đúng 00:00 không tính sang ngày đó
+        last_day = (end_dt - timedelta(microseconds=1)).date()
+        day = max(begin_dt.date(), start)
+        while day <= last_day and day in by_day:
+            item = {"kind": "event", "title": e.get("title", ""), "id": e.get("id"), "location": e.get("location")}
+            if e.get("is_all_day"):
+                item.update(start=None, end=None)
+            else:
+                # Sự kiện nhiều ngày → mỗi ngày chiếm phần của ngày đó (cắt ở nửa đêm)
+                begin_min = _minutes(begin_dt) if day == begin_dt.date() else 0
+                end_min = _minutes(end_dt) if day == end_dt.date() else 24 * 60
+                item.update(start=begin_min, end=max(end_min, begin_min + 1))
+            by_day[day].append(item)
+            day += timedelta(days=1)
+
+    for t in tasks:
+        due = _to_local(t.get("due_date"))
+        if due is None or due.date() not in by_day:
+            continue
+        # Task chỉ có ngày ("YYYY-MM-DD" → 00:00 UTC = 07:00 giờ VN) → deadline cả ngày,
+        # không chiếm khoảng thời gian
+        has_time = (due.hour, due.minute) not in ((0, 0), (7, 0))
+        by_day[due.date()].append({
+            "kind": "task", "title": t.get("title", ""), "id": t.get("id"),
+            "priority": t.get("priority", "medium"),
+            "start": None, "end": None, "due": format_minutes(_minutes(due)) if has_time else None,
+        })
+
+    return [DayAgenda(day, items) for day, items in by_day.items()]
+
+
+def format_agenda(
+    agendas: list[DayAgenda],
+    overdue: list[dict] | None = None,
+    note: str | None = None,
+    overdue_count: int | None = None,
+) -> str:
+    """Compact text for the LLM (one line per item).
+
+    `overdue` only needs the first OVERDUE_PREVIEW tasks; `overdue_count` is the total
+    (defaults to len(overdue)).
+    """
+    icons = {"class": "🎓", "event": "📌", "task": "⏰"}
+    lines = []
+    if note:
+        lines.append(f"({note})")
+    overdue = overdue or []
+    total = len(overdue) if overdue_count is None else max(overdue_count, len(overdue))
+    if total:
+        shown = overdue[:OVERDUE_PREVIEW]
+        titles = ", ".join(t.get("title", "") for t in shown)
+        more = f" (+{total - len(shown)})" if total > len(shown) else ""
+        lines.append(f"⚠️ {total} task quá hạn: {titles}{more}")
+
+    for agenda in agendas:
+        day_label = DAY_LABELS.get(agenda.day.isoweekday() + 1, "")
+        lines.append(f"📅 {day_label} {agenda.day.strftime('%d/%m/%Y')}")
+        if not agenda.items:
+            lines.append("  Không có lịch")
+        for item in agenda.items:
+            if item["kind"] == "task":
+                due = f" lúc {item['due']}" if item.get("due") else ""
+                lines.append(f"  {icons['task']} Hạn{due}: {item['title']} [{item.get('priority')}]")
+                continue
+            when = "Cả ngày" if item["start"] is None else f"{format_minutes(item['start'])}–{format_minutes(item['end'])}"
+            where = f" @ {item['location']}" if item.get("location") else ""
+            cancelled = " [NGHỈ]" if item.get("cancelled") else ""
+            lines.append(f"  {when} {icons[item['kind']]} {item['title']}{where}{cancelled}")
+        for a, b in agenda.conflicts():
+            lines.append(f"  ⚠️ Trùng lịch: {a['title']} ↔ {b['title']}")
+        free = agenda.free_slots()
+        if agenda.items and free:
+            lines.append("  🟢 Trống: " + ", ".join(f"{format_minutes(s)}–{format_minutes(e)}" for s, e in free))
+    return "\n".join(lines)
+
+
+class AgendaService:
+    """Loads timetable, tasks and events for a date range and merges them."""
+
+    def __init__(self, db: Client):
+        self.db = db
+
+    async def get_agenda(self, user_id: str, start: date | None = None, days: int = 1) -> dict:
+        """Build the agenda for `days` days starting at `start` (default: today, school clock).
+
+        Returns:
+            dict: { "days": [DayAgenda], "overdue": [first OVERDUE_PREVIEW task rows],
+                    "overdue_count": int, "note": str | None }
+        """
+        start = start or school_now().date()
+        days = max(1, min(days, MAX_AGENDA_DAYS))
+        range_start = datetime.combine(start, time.min, tzinfo=VN_TZ)
+        range_end = range_start + timedelta(days=days)
+
+        note = None
+        timetable = None
+        try:
+            timetable = await AcademicService(self.db).get_parsed_timetable(user_id)
+        except Exception as e:
+            # Chưa kết nối tài khoản trường / API trường lỗi → vẫn trả task + sự kiện
+            logger.info(f"Agenda without timetable for {user_id}: {e}")
+            note = "Không lấy được thời khóa biểu"
+
+        tasks = (
+            self.db.table("tasks_reminders")
+            .select("id, title, due_date, priority")
+            .eq("user_id", user_id)
+            .eq("status", "pending")
+            .gte("due_date", range_start.isoformat())
+            .lt("due_date", range_end.isoformat())
+            .execute()
+        ).data or []
+        overdue_res = (
+            self.db.table("tasks_reminders")
+            .select("id, title, due_date", count="exact")
+            .eq("user_id", user_id)
+            .eq("status", "pending")
+            .lt("due_date", school_now().replace(hour=0, minute=0, second=0, microsecond=0).isoformat())
+            .order("due_date", desc=False)
+            .limit(OVERDUE_PREVIEW)
+            .execute()
+        )
+        overdue = overdue_res.data or []
+        # Sự kiện giao với khoảng: bắt đầu trước range_end và kết thúc từ range_start trở đi
+        # (không có end_time → phải bắt đầu trong khoảng)
+        since = range_start.isoformat()
+        events = (
+            self.db.table("calendar_events")
+            .select("id, title, start_time, end_time, is_all_day, location")
+            .eq("user_id", user_id)
+            .lt("start_time", range_end.isoformat())
+            .or_(f'end_time.gte."{since}",and(end_time.is.null,start_time.gte."{since}")')
+            .order("start_time", desc=False)
+            .execute()
+        ).data or []
+
+        return {
+            "days": build_day_agendas(start, days, timetable, tasks, events),
+            "overdue": overdue,
+            "overdue_count": overdue_res.count if overdue_res.count is not None else len(overdue),
+            "note": note,
+        }
@@ -0,0 +1,53 @@
+"""
+Agenda feature: Agent tool for a merged day/week view.
+These are LangChain @tool functions that the LangGraph agent can call.
+"""
+
+import json
+from datetime import datetime
+from typing import Annotated
+from langchain_core.tools import tool, InjectedToolArg
+
+from app.core.dependencies import get_db
+from app.features.agenda.service import AgendaService, format_agenda
+
+
+@tool
+async def get_agenda(
+    date: str | None = None,
+    days: int = 1,
+    user_id: Annotated[str, InjectedToolArg] = "",
+) -> str:
+    """Xem lịch tổng hợp: buổi học (TKB) + deadline task + sự kiện, đã sắp theo giờ.
+    Kèm cảnh báo trùng lịch, khoảng thời gian trống và task quá hạn.
+    Dùng cho câu hỏi kiểu "Hôm nay mình có gì?", "Tuần này bận không?", "Chiều mai rảnh lúc nào?"
+    — MỘT lần gọi thay cho get_timetable + list_tasks + get_events.
+
+    Args:
+        date: Ngày bắt đầu (YYYY-MM-DD). Mặc định = hôm nay (giờ Việt Nam).
+        days: Số ngày cần xem (1 = một ngày, 7 = cả tuần, tối đa 14).
+
+    Returns:
+        Lịch từng ngày: giờ, loại (🎓 học / 📌 sự kiện / ⏰ hạn task), trùng lịch, giờ trống.
+    """
+    try:
+        start = datetime.strptime(date, "%Y-%m-%d").date() if date else None
+    except ValueError:
+        return json.dumps({
+            "status": "error",
+            "message": f"Ngày không hợp lệ: {date}. Dùng định dạng YYYY-MM-DD.",
+        }, ensure_ascii=False)
+
+    try:
+        agenda = await AgendaService(get_db()).get_agenda(user_id, start, days)
+        return format_agenda(
+            agenda["days"], agenda["overdue"], agenda["note"], overdue_count=agenda["overdue_count"]
+        )
+    except Exception as e:
+        return json.dumps({
+            "status": "error",
+            "message": f"Lỗi khi lấy lịch tổng hợp ({type(e).__name__}): {str(e)}",
+        }, ensure_ascii=False)
+
+
+agenda_tools = [get_agenda]
@@ -29,6 +29,7 @@ from app.features.academic.tools import academic_tools
 from app.features.tasks.tools import create_task, list_tasks, update_task, complete_task, delete_task
 from app.features.notes.tools import save_quick_note, search_notes, list_notes, update_note, delete_note
 from app.features.calendar.tools import create_event, get_events, update_event, delete_event
+from app.features.agenda.tools import agenda_tools
 from app.features.agent.tools.web_search import web_tools
 from app.features.agent.tools.image_gen import image_tools
 from app.features.agent.tools.weather import weather_tools
@@ -59,6 +60,8 @@ ALL_TOOLS = [
     save_quick_note, search_notes, list_notes, update_note, delete_note,
     # Calendar Events
     create_event, get_events, update_event, delete_event,
+    # Agenda (TKB + tasks + events merged)
+    *agenda_tools,
     # Web Search & Image Gen (Phase 1)
     *web_tools,
     *image_tools,
@@ -2,10 +2,7 @@
 Agent feature: System prompts and persona definition.
 """
 
-from datetime import datetime, timezone, timedelta
-
-# Vietnam timezone (UTC+7) — no pytz dependency needed
-VN_TZ = timezone(timedelta(hours=7))
+from app.features.academic.school_clock import school_now
 
 
 def build_system_prompt(
@@ -16,7 +13,7 @@ def build_system_prompt(
     platform: str = "web",
 ) -> str:
     """Build system prompt with current datetime injected."""
-    now = datetime.now(VN_TZ)
+    now = school_now()  # Giờ VN theo đồng hồ server trường (offset cache, không gọi mạng)
     current_time = now.strftime("%H:%M ngày %d/%m/%Y (%A)")
     # Vietnamese weekday
     weekday_vi = {
@@ -93,7 +90,9 @@ Khi tin nhắn của người dùng chứa thẻ `[SYS_FILE: tên_file - Path: .
 ### Học tập
 - `get_semesters()`: Danh sách học kỳ
 - `get_timetable()`: TKB theo tuần (window 4 tuần quanh ngày hiện tại)
-- `get_grades()`: Bảng điểm tất cả HK (dùng khi hỏi tổng quan)
+- `get_grades()`: Bảng điểm tất cả HK (chỉ khi cần xem chi tiết nhiều môn)
+- `get_gpa_summary()`: GPA tích lũy + HK gần nhất (hệ 10/4), tín chỉ đạt/nợ, môn rớt, môn học lại — đã tính sẵn, KHÔNG tự cộng điểm
+- `get_grade_for_subject(subject)`: Điểm 1 môn theo mã hoặc tên (không cần dấu)
 - `get_student_info()`: Thông tin cá nhân SV (khoa, lớp, email, CVHT)
 - `get_tuition_info()`: Tình hình học phí / công nợ các kỳ
 - `get_semester_grades(semester_id)`: Điểm 1 kỳ cụ thể (nhẹ hơn get_grades). Cần gọi get_semesters() trước nếu chưa biết mã HK.
@@ -115,6 +114,8 @@ Khi tin nhắn của người dùng chứa thẻ `[SYS_FILE: tên_file - Path: .
 - `get_events()`: Xem sự kiện sắp tới (trả về event_id)
 - `update_event(event_id)`: Sửa sự kiện
 - `delete_event(event_id)`: Xóa sự kiện
+### Lịch tổng hợp
+- `get_agenda(date, days)`: TKB + deadline task + sự kiện đã gộp, kèm trùng lịch và giờ trống. ƯU TIÊN dùng cho "hôm nay/tuần này mình có gì?", "khi nào rảnh?" thay vì gọi riêng get_timetable + list_tasks + get_events.
 ### Tiện ích
 - `search_web(query)`: Tìm kiếm internet (tin tức, giá cả...)
 - `scrape_website(url)`: Đọc nội dung 1 trang web
@@ -131,7 +132,10 @@ Khi tin nhắn của người dùng chứa thẻ `[SYS_FILE: tên_file - Path: .
   1. Phải gọi `find_study_materials` trước để lấy chính xác `material_id`.
   2. Nếu tìm thấy > 1 file → Liệt kê các file và hỏi user muốn xóa file nào, KHÔNG TỰ CHỌN XÓA.
   3. Luôn xác nhận lại tên file với user trước khi gọi tool xóa (Ví dụ: "Bạn chắc chắn muốn xóa file 'x.pdf' chứ?").
-  4. KHÔNG BAO GIỜ xóa nhiều file cùng lúc mà không xác nhận từng cái.
+  4. KHÔNG BAO GIỜ xóa nhiều file cùng lúc khi user chưa xác nhận đủ danh sách tên file.
+- `delete_study_materials(material_ids)`: Xóa nhiều tài liệu trong 1 lần. Chỉ gọi sau khi đã liệt kê ĐẦY ĐỦ tên các file sẽ xóa và user xác nhận cả danh sách. Báo lại kết quả từng file.
+- `save_temp_documents_to_knowledge_base(storage_paths, domain)`: Lưu nhiều file đính kèm tạm thời vào kho trong 1 lần (dùng đúng các giá trị Path trong thẻ `[SYS_FILE]`).
+- `reindex_study_materials(material_ids)`: Xử lý lại tài liệu bị lỗi hoặc khi user muốn AI học lại file.
 """
 
 # Alias used by graph.py
@@ -588,10 +588,9 @@ async def _process_zalo_message(user_text: str, chat_id: str,
         # Format for Zalo: tách ảnh + strip markdown
         image_urls, clean_text = ZaloFormatter.extract_images_and_clean(response_text)
 
-        # Gửi ảnh tuần tự TRƯỚC text (fix race condition)
+        # Gửi ảnh tuần tự TRƯỚC text (fix race condition) — queue của chat tự giãn nhịp
         for img_url in image_urls:
             await send_zalo_photo(img_url, chat_id=chat_id)
-            await asyncio.sleep(0.5)
 
         # Gửi text trực tiếp (skip sticker LLM chain để giảm latency)
         if clean_text:
@@ -603,12 +602,23 @@ async def _process_zalo_message(user_text: str, chat_id: str,
         await send_zalo_message(f"⚠️ JARVIS gặp lỗi: {str(e)[:200]}", chat_id)
 
 
+async def run_zalo_message_job(payload: dict, job: dict):
+    """Job handler (zalo_message): process one inbound Zalo text message."""
+    settings = get_settings()
+    await _process_zalo_message(
+        user_text=payload["user_text"],
+        chat_id=payload["chat_id"],
+        db_url=settings.SUPABASE_URL,
+        db_key=settings.SUPABASE_SERVICE_KEY or settings.SUPABASE_KEY,
+    )
+
+
 @router.post("/webhook/zalo")
 async def zalo_webhook(request: Request, background_tasks: BackgroundTasks):
     """Zalo Bot Inbound Webhook.
 
     Trả 200 OK ngay lập tức để tránh Zalo timeout/retry.
-    Xử lý LangGraph ở background task.
+    Xử lý LangGraph trong job queue bền vững (restart không làm mất tin nhắn).
     """
     settings = get_settings()
 
@@ -673,14 +683,25 @@ async def zalo_webhook(request: Request, background_tasks: BackgroundTasks):
     if message_id:
         _processed_message_ids[message_id] = time_now()
 
-    # 5. Trả 200 OK ngay → xử lý ở background (tránh Zalo timeout 3-5s)
-    background_tasks.add_task(
-        _process_zalo_message,
-        user_text=user_text,
-        chat_id=chat_id,
-        db_url=settings.SUPABASE_URL,
-        db_key=settings.SUPABASE_SERVICE_KEY or settings.SUPABASE_KEY,
-    )
+    # 5. Trả 200 OK ngay → xử lý qua job queue (tránh Zalo timeout 3-5s)
+    #    idempotency_key theo message_id → Zalo retry sau restart cũng không tạo job trùng
+    from app.background.job_queue import enqueue_job, JOB_ZALO_MESSAGE
+    try:
+        enqueue_job(
+            JOB_ZALO_MESSAGE,
+            {"user_text": user_text, "chat_id": chat_id},
+            idempotency_key=f"zalo:{message_id}" if message_id else None,
+            max_attempts=2,  # Không retry nhiều — tránh trả lời lặp
+        )
+    except Exception as e:
+        _webhook_logger.warning(f"Zalo webhook: enqueue failed, processing in-process: {e}")
+        background_tasks.add_task(
+            _process_zalo_message,
+            user_text=user_text,
+            chat_id=chat_id,
+            db_url=settings.SUPABASE_URL,
+            db_key=settings.SUPABASE_SERVICE_KEY or settings.SUPABASE_KEY,
+        )
 
     return {"ok": True}
 
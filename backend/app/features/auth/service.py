@@ -7,6 +7,7 @@ from supabase import Client
 
 from app.core.security import hash_password, verify_password, create_access_token
 from app.features.auth.schemas import RegisterRequest, LoginRequest, UserResponse
+from app.features.academic.cache import get_academic_cache
 
 
 class AuthService:
@@ -110,4 +111,7 @@ class AuthService:
             .eq("id", user_id)
             .execute()
         )
+        if "agent_config" in update_data:
+            # cache_ttl_hours có thể đã đổi → bỏ TTL đã memoize
+            get_academic_cache().invalidate_ttl(user_id)
         return UserResponse(**result.data[0])
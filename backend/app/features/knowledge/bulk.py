@@ -0,0 +1,224 @@
+"""
+Knowledge feature: Bulk material operations (multi-delete, multi-promote, re-index).
+
+Dọn tài liệu cả học kỳ từng phải xoá từng file (mỗi file 1 lần đọc quyền sở hữu,
+1 lệnh Storage remove, 1 lệnh DB delete). Các hàm ở đây nhận danh sách và gom:
+  - delete:  1 SELECT ... IN (ids) → 1 Storage remove(paths) → 1 DELETE ... IN (ids)
+  - promote: move từng file (Storage không có move hàng loạt) → 1 INSERT nhiều dòng
+             → enqueue job ingest cho từng tài liệu
+  - reindex: 1 SELECT → 1 UPDATE processing_status → enqueue job ingest
+Mỗi hàm trả kết quả theo từng item để router / agent báo cáo chính xác.
+"""
+
+import logging
+import time
+
+from app.features.knowledge.file_io import content_type_for
+from app.features.knowledge.signed_urls import get_signed_url_cache
+
+logger = logging.getLogger(__name__)
+
+BUCKET = "knowledge-base"
+MAX_BULK_ITEMS = 100
+VALID_DOMAINS = {"study", "work", "personal", "other"}
+
+
+def _check_size(items: list):
+    if not items:
+        raise ValueError("No items given.")
+    if len(items) > MAX_BULK_ITEMS:
+        raise ValueError(f"At most {MAX_BULK_ITEMS} items per bulk request.")
+
+
+def _owned_materials(db, user_id: str, material_ids: list[str], columns: str) -> dict[str, dict]:
+    res = (
+        db.table("study_materials")
+        .select(f"id, {columns}")
+        .eq("user_id", user_id)
+        .in_("id", material_ids)
+        .execute()
+    )
+    return {row["id"]: row for row in (res.data or [])}
+
+
+def bulk_delete_materials(db, user_id: str, material_ids: list[str]) -> list[dict]:
+    """Delete many materials with one Storage remove batch and one DB delete.
+
+    Files are removed first; rows whose file could not be removed are kept so
+    nothing is left pointing at a half-deleted material (same rule as the
+    single delete tool). Chunks go with the rows via ON DELETE CASCADE.
+
+    Returns:
+        One result per distinct id: { material_id, status: deleted|not_found|error, file_name?, message? }
+
+    Raises:
+        ValueError: Empty or oversized id list.
+    """
+    material_ids = list(dict.fromkeys(material_ids))
+    _check_size(material_ids)
+
+    owned = _owned_materials(db, user_id, material_ids, "file_name, file_url")
+    results: dict[str, dict] = {
+        mid: {"material_id": mid, "status": "not_found"} for mid in material_ids if mid not in owned
+    }
+
+    storage_paths = {
+        mid: row["file_url"] for mid, row in owned.items()
+        if row.get("file_url") and not row["file_url"].startswith("http")
+    }
+    deletable = list(owned)
+    if storage_paths:
+        try:
+            db.storage.from_(BUCKET).remove(list(storage_paths.values()))
+            for path in storage_paths.values():
+                get_signed_url_cache().invalidate(BUCKET, path)
+        except Exception as e:
+            logger.warning(f"⚠️ Bulk storage remove failed for {len(storage_paths)} files: {e}")
+            deletable = [mid for mid in owned if mid not in storage_paths]
+            for mid in storage_paths:
+                results[mid] = {
+                    "material_id": mid,
+                    "file_name": owned[mid]["file_name"],
+                    "status": "error",
+                    "message": f"Storage remove failed: {e}",
+                }
+
+    if deletable:
+        db.table("study_materials").delete().eq("user_id", user_id).in_("id", deletable).execute()
+        for mid in deletable:
+            results[mid] = {"material_id": mid, "file_name": owned[mid]["file_name"], "status": "deleted"}
+        logger.info(f"🗑️ Bulk deleted {len(deletable)} materials for user {user_id}")
+
+    return [results[mid] for mid in material_ids]
+
+
+def _enqueue_ingest(material_id: str, user_id: str, idempotency_key: str) -> str:
+    from app.background.job_queue import enqueue_job, JOB_INGEST_DOCUMENT
+    return enqueue_job(
+        JOB_INGEST_DOCUMENT,
+        {"material_id": material_id},
+        user_id=user_id,
+        idempotency_key=idempotency_key,
+    )
+
+
+def bulk_promote_temp_files(db, user_id: str, items: list[dict]) -> list[dict]:
+    """Move many temp uploads into the knowledge base and queue their ingestion.
+
+    Args:
+        items: [{ "storage_path": "<user_id>/temp/...", "domain": str, "subject": str | None }]
+
+    Returns:
+        One result per item, in order: { storage_path, status: queued|error, material_id?, message? }
+
+    Raises:
+        ValueError: Empty or oversized item list.
+    """
+    _check_size(items)
+    results: list[dict] = []
+    rows: list[dict] = []
+    row_result_index: list[int] = []
+
+    for item in items:
+        storage_path = item.get("storage_path") or ""
+        domain = item.get("domain")
+        result = {"storage_path": storage_path}
+        results.append(result)
+
+        if domain not in VALID_DOMAINS:
+            result.update(status="error", message=f"Invalid domain. Must be one of: {sorted(VALID_DOMAINS)}")
+            continue
+        if not storage_path.startswith(f"{user_id}/temp/"):
+            result.update(status="error", message="Invalid temporary storage path.")
+            continue
+
+        filename = storage_path.split("/")[-1]
+        new_path = f"{user_id}/{domain}/{filename}"
+        try:
+            db.storage.from_(BUCKET).move(storage_path, new_path)
+        except Exception as e:
+            result.update(status="error", message=f"Move failed: {e}")
+            continue
+
+        rows.append({
+            "user_id": user_id,
+            "file_name": filename,
+            "file_type": content_type_for(filename),
+            "file_url": new_path,
+            "domain": domain,
+            "subject": item.get("subject"),
+            "processing_status": "processing",
+        })
+        row_result_index.append(len(results) - 1)
+
+    if rows:
+        inserted = db.table("study_materials").insert(rows).execute().data or []
+        for index, row in zip(row_result_index, inserted):
+            results[index].update(status="queued", material_id=row["id"], file_name=row["file_name"])
+            try:
+                _enqueue_ingest(row["id"], user_id, f"ingest:{row['id']}")
+            except Exception as e:
+                # Bản ghi đã có — sweep_stuck_jobs sẽ enqueue lại tài liệu 'processing' bị bỏ sót
+                logger.warning(f"⚠️ Could not enqueue ingestion for {row['id']}: {e}")
+
+    return results
+
+
+def bulk_reindex_materials(db, user_id: str, material_ids: list[str]) -> list[dict]:
+    """Re-run chunking + embedding for many materials through the ingestion queue.
+
+    Materials already being processed, or without a stored file (imported from a
+    snapshot — their chunks exist only in the DB), are skipped. The idempotency key
+    carries a per-request suffix because `ingest:{id}` was consumed by the original upload.
+
+    Returns:
+        One result per distinct id: { material_id, status: queued|skipped|not_found|error, file_name?, message? }
+
+    Raises:
+        ValueError: Empty or oversized id list.
+    """
+    material_ids = list(dict.fromkeys(material_ids))
+    _check_size(material_ids)
+
+    owned = _owned_materials(db, user_id, material_ids, "file_name, file_url, processing_status")
+    results: dict[str, dict] = {}
+    to_queue: list[str] = []
+    for mid in material_ids:
+        row = owned.get(mid)
+        if row is None:
+            results[mid] = {"material_id": mid, "status": "not_found"}
+        elif row.get("processing_status") == "processing":
+            results[mid] = {
+                "material_id": mid, "file_name": row["file_name"],
+                "status": "skipped", "message": "Already processing.",
+            }
+        elif not row.get("file_url"):
+            results[mid] = {
+                "material_id": mid, "file_name": row["file_name"],
+                "status": "skipped", "message": "No stored file to re-index from.",
+            }
+        else:
+            to_queue.append(mid)
+
+    if to_queue:
+        db.table("study_materials").update({
+            "processing_status": "processing",
+            "progress": None,
+        }).eq("user_id", user_id).in_("id", to_queue).execute()
+
+        suffix = int(time.time())
+        for mid in to_queue:
+            try:
+                _enqueue_ingest(mid, user_id, f"ingest:{mid}:reindex:{suffix}")
+                results[mid] = {"material_id": mid, "file_name": owned[mid]["file_name"], "status": "queued"}
+            except Exception as e:
+                logger.warning(f"⚠️ Could not enqueue re-index for {mid}: {e}")
+                db.table("study_materials").update({
+                    "processing_status": owned[mid].get("processing_status")
+                }).eq("id", mid).execute()
+                results[mid] = {
+                    "material_id": mid, "file_name": owned[mid]["file_name"],
+                    "status": "error", "message": str(e),
+                }
+
+    return [results[mid] for mid in material_ids]
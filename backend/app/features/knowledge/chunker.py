@@ -0,0 +1,162 @@
+"""
+Knowledge feature: Token-aware chunker.
+
+RecursiveCharacterTextSplitter(1000, 200) đo theo ký tự: với tiếng Việt có dấu,
+1000 ký tự có thể là ~250 hoặc ~450 token, và 20% mỗi chunk là overlap bị embed lại.
+Chunker này:
+  1. Ước lượng số token bằng bảng độ dài cache theo từng từ (lru_cache) — không gọi API.
+  2. Tách theo ranh giới cấu trúc: đoạn (\\n\\n) → dòng → câu → từ, chỉ xuống cấp
+     khi một đơn vị vượt ngân sách token.
+  3. Gom các đơn vị liên tiếp tới CHUNK_TARGET_TOKENS, overlap nhỏ (CHUNK_OVERLAP_TOKENS)
+     chỉ gồm các đơn vị nguyên vẹn ở cuối chunk trước.
+
+Interface giống text splitter của LangChain: split_documents(docs) / split_text(text).
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, List
+
+from langchain_core.documents import Document
+
+_WORD_OR_SYMBOL = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_END = re.compile(r"(?<=[.!?…;:])\s+")
+
+# Cấp tách theo thứ tự ưu tiên: (tên, hàm tách, chuỗi nối lại)
+_PARAGRAPH, _LINE, _SENTENCE, _WORD = range(4)
+_JOINERS = ["\n\n", "\n", " ", " "]
+
+
+@lru_cache(maxsize=65536)
+def _word_tokens(word: str) -> int:
+    """Estimated token count for one word / symbol (cached length table).
+
+    BPE/SentencePiece tokenizers cover common ASCII words at ~4 chars/token,
+    while syllables with Vietnamese diacritics fragment more (~2.5 chars/token).
+    """
+    if len(word) == 1:
+        return 1
+    if word.isascii():
+        if word.isdigit():
+            return math.ceil(len(word) / 3)
+        return max(1, math.ceil(len(word) / 4))
+    return max(1, math.ceil(len(word) / 2.5))
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast token estimate for a text, using the cached per-word table."""
+    return sum(_word_tokens(w) for w in _WORD_OR_SYMBOL.findall(text))
+
+
+def _split_level(text: str, level: int) -> List[str]:
+    if level == _PARAGRAPH:
+        parts = re.split(r"\n\s*\n", text)
+    elif level == _LINE:
+        parts = text.split("\n")
+    elif level == _SENTENCE:
+        parts = _SENTENCE_END.split(text)
+    else:
+        parts = text.split()
+    return [p.strip() for p in parts if p.strip()]
+
+
+class TokenAwareChunker:
+    """Pack structural units into chunks of ~target_tokens with a small overlap."""
+
+    def __init__(
+        self,
+        target_tokens: int = 450,
+        overlap_tokens: int = 32,
+        length_function: Callable[[str], int] = estimate_tokens,
+    ):
+        if overlap_tokens >= target_tokens:
+            raise ValueError("overlap_tokens must be smaller than target_tokens")
+        self.target_tokens = target_tokens
+        self.overlap_tokens = overlap_tokens
+        self.length_function = length_function
+
+    def _units(self, text: str, level: int = _PARAGRAPH) -> List[tuple[str, int, str]]:
+        """Break text into (unit, tokens, joiner) pieces that each fit the budget."""
+        units = []
+        for part in _split_level(text, level):
+            tokens = self.length_function(part)
+            if tokens <= self.target_tokens or level == _WORD:
+                units.append((part, tokens, _JOINERS[level]))
+            else:
+                units.extend(self._units(part, level + 1))
+        return units
+
+    def _overlap(self, units: List[tuple[str, int, str]]) -> List[tuple[str, int, str]]:
+        """Trailing whole units of a finished chunk that fit the overlap budget.
+
+        When the last unit alone is too large (e.g. a long PDF line), its trailing
+        sentences — or, failing that, words — are carried instead.
+        """
+        carried: List[tuple[str, int, str]] = []
+        budget = self.overlap_tokens
+        for unit, tokens, joiner in reversed(units):
+            if tokens <= budget:
+                carried.insert(0, (unit, tokens, joiner))
+                budget -= tokens
+                continue
+            for level in (_SENTENCE, _WORD):
+                tail: List[str] = []
+                tail_tokens = 0
+                for piece in reversed(_split_level(unit, level)):
+                    piece_tokens = self.length_function(piece)
+                    if tail_tokens + piece_tokens > budget:
+                        break
+                    tail.insert(0, piece)
+                    tail_tokens += piece_tokens
+                if tail:
+                    carried.insert(0, (" ".join(tail), tail_tokens, joiner))
+                    break
+            break
+        return carried
+
+    def split_text(self, text: str) -> List[str]:
+        units = self._units(text)
+        chunks: List[str] = []
+        current: List[tuple[str, int, str]] = []
+        current_tokens = 0
+
+        def render(parts):
+            out = parts[0][0]
+            for unit, _, joiner in parts[1:]:
+                out += joiner + unit
+            return out
+
+        for unit in units:
+            if current and current_tokens + unit[1] > self.target_tokens:
+                chunks.append(render(current))
+                carried = self._overlap(current)
+                carried_tokens = sum(tokens for _, tokens, _ in carried)
+                # Overlap không được đẩy đơn vị mới vượt ngân sách chunk
+                if carried_tokens + unit[1] > self.target_tokens:
+                    carried, carried_tokens = [], 0
+                current, current_tokens = carried, carried_tokens
+            current.append(unit)
+            current_tokens += unit[1]
+
+        if current:
+            chunks.append(render(current))
+        return chunks
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """Split Documents, copying metadata to every chunk (LangChain splitter interface)."""
+        result = []
+        for doc in documents:
+            for chunk in self.split_text(doc.page_content):
+                result.append(Document(page_content=chunk, metadata=dict(doc.metadata)))
+        return result
+
+
+def get_chunker() -> TokenAwareChunker:
+    """Chunker configured from settings (CHUNK_TARGET_TOKENS / CHUNK_OVERLAP_TOKENS)."""
+    from app.config import get_settings
+    settings = get_settings()
+    return TokenAwareChunker(
+        target_tokens=settings.CHUNK_TARGET_TOKENS,
+        overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+    )
@@ -3,6 +3,7 @@ Knowledge feature: Embedding utility functions.
 Wraps the LLM provider's embedding model for use across the app.
 """
 
+import json
 import logging
 from tenacity import retry, wait_exponential, stop_after_attempt
 from app.core.llm_provider import create_embeddings
@@ -62,3 +63,12 @@ def embed_texts(texts: list[str]) -> list[list[float]]:
     vectors = model.embed_documents(texts)
     dim = settings.EMBEDDING_DIMENSIONS
     return [v[:dim] for v in vectors]
+
+
+def parse_pgvector(raw) -> list[float] | None:
+    """Parse a pgvector value returned by PostgREST (JSON-ish string '[0.1,...]')."""
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        return json.loads(raw)
+    return list(raw)
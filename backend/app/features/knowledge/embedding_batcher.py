@@ -0,0 +1,162 @@
+"""
+Knowledge feature: Micro-batching embedding service.
+
+Mỗi lời gọi embed đơn lẻ (lưu note, embed câu query khi search, batch chunk khi ingest)
+trước đây là 1 HTTP request riêng tới embedding API. Service này gom các request
+đến gần nhau trong một cửa sổ ngắn (EMBEDDING_BATCH_WINDOW_MS) thành 1 lời gọi
+embed_texts (embed_documents) duy nhất.
+
+Luồng:
+  1. Caller gọi submit(text, lane) → nhận Future ngay lập tức.
+  2. Mỗi lane có queue + worker thread (daemon) riêng: worker lấy request đầu tiên,
+     chờ thêm tối đa window ms hoặc tới khi đủ EMBEDDING_BATCH_MAX_SIZE.
+  3. Gọi embed_texts(batch) (đã có Tenacity retry) → set_result cho từng Future.
+     Lỗi của batch được set_exception cho mọi Future trong batch.
+
+Lane:
+  - LANE_INTERACTIVE (mặc định): query khi search, embed note — ngắn, người dùng chờ.
+  - LANE_BULK: chunk khi ingest tài liệu — batch lớn, có thể retry/backoff hàng chục giây.
+  Hai lane không chặn nhau: ingest đang retry không làm search / lưu note phải chờ.
+
+Caller dùng embed_text_batched() / embed_texts_batched() (block trên Future).
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.features.knowledge.embedding import embed_texts
+
+logger = logging.getLogger(__name__)
+
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+LANES = (LANE_INTERACTIVE, LANE_BULK)
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent single-text embedding requests into batch calls."""
+
+    def __init__(self, window_ms: int = 50, max_batch_size: int = 100, embed_fn=embed_texts):
+        self.window = max(window_ms, 0) / 1000
+        self.max_batch_size = max(max_batch_size, 1)
+        self._embed_fn = embed_fn
+        self._queues: dict[str, queue.Queue[tuple[str, Future]]] = {lane: queue.Queue() for lane in LANES}
+        self._workers: dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        # Thống kê đơn giản cho log / debug
+        self.requests = 0
+        self.batches = 0
+
+    def submit(self, text: str, lane: str = LANE_INTERACTIVE) -> Future:
+        """Queue a text for embedding on `lane` and return a Future resolving to its vector."""
+        future: Future = Future()
+        self._ensure_worker(lane)
+        self._queues[lane].put((text, future))
+        return future
+
+    def submit_many(self, texts: list[str], lane: str = LANE_INTERACTIVE) -> list[Future]:
+        """Queue several texts at once (they usually land in the same batch)."""
+        self._ensure_worker(lane)
+        futures = []
+        for text in texts:
+            future: Future = Future()
+            self._queues[lane].put((text, future))
+            futures.append(future)
+        return futures
+
+    def _ensure_worker(self, lane: str):
+        worker = self._workers.get(lane)
+        if worker is not None and worker.is_alive():
+            return
+        with self._lock:
+            worker = self._workers.get(lane)
+            if worker is None or not worker.is_alive():
+                worker = threading.Thread(
+                    target=self._run,
+                    args=(self._queues[lane],),
+                    name=f"embedding_batcher_{lane}",
+                    daemon=True,
+                )
+                self._workers[lane] = worker
+                worker.start()
+
+    def _collect_batch(self, q: queue.Queue) -> list[tuple[str, Future]]:
+        """Block for the first request, then gather more until the window closes."""
+        batch = [q.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout <= 0:
+                    # Cửa sổ đã đóng — vẫn vét những request đang chờ sẵn trong queue
+                    batch.append(q.get_nowait())
+                else:
+                    batch.append(q.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, q: queue.Queue):
+        while True:
+            batch = self._collect_batch(q)
+            self._flush(batch)
+
+    def _flush(self, batch: list[tuple[str, Future]]):
+        # Bỏ qua các Future đã bị caller huỷ
+        batch = [(text, f) for text, f in batch if f.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        # Gộp các text trùng nhau trong cùng batch → embed 1 lần
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = self._embed_fn(unique_texts)
+        except Exception as e:
+            logger.error(f"❌ Embedding batch of {len(unique_texts)} failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            future.set_result(by_text[text])
+
+        with self._lock:
+            self.requests += len(batch)
+            self.batches += 1
+        if len(batch) > 1:
+            logger.debug(f"🧮 Embedded {len(batch)} requests in 1 call ({len(unique_texts)} unique)")
+
+
+# Singleton batcher (lazy init)
+_batcher: EmbeddingBatcher | None = None
+_batcher_lock = threading.Lock()
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Get or create the shared embedding batcher."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                from app.config import get_settings
+                settings = get_settings()
+                _batcher = EmbeddingBatcher(
+                    window_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+                    max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                )
+    return _batcher
+
+
+def embed_text_batched(text: str) -> list[float]:
+    """Embed a single text through the shared batcher (blocking)."""
+    return get_embedding_batcher().submit(text).result()
+
+
+def embed_texts_batched(texts: list[str], lane: str = LANE_INTERACTIVE) -> list[list[float]]:
+    """Embed several texts through the shared batcher (blocking)."""
+    futures = get_embedding_batcher().submit_many(texts, lane)
+    return [f.result() for f in futures]
@@ -0,0 +1,209 @@
+"""
+Knowledge feature: Pluggable streaming text extractors.
+
+Mỗi định dạng đăng ký một extractor qua @register_extractor("ext", ...).
+Extractor nhận đường dẫn file và *yield* từng Document cỡ trang / slide / section
+(lazy) → pipeline ingest có thể chunk + embed trang đầu trong khi phần sau
+của file còn đang được parse.
+
+Metadata chuẩn hoá cho mọi định dạng:
+  - page:         index 0-based (PDF page, PPTX slide) — pipeline lưu page_number = page + 1
+  - total_pages:  tổng số trang/slide nếu biết trước (để tính tiến độ)
+  - slide_number: số slide 1-based (PPTX)
+  - heading:      tiêu đề section / slide (DOCX, MD, PPTX) → material_chunks.section_title
+
+Thêm định dạng mới = viết 1 hàm generator + decorator, không phải sửa pipeline.
+"""
+
+import re
+from typing import Callable, Iterator
+
+from langchain_core.documents import Document
+
+Extractor = Callable[[str], Iterator[Document]]
+
+_EXTRACTORS: dict[str, Extractor] = {}
+
+# TXT không có cấu trúc → gom theo đoạn tới khoảng kích thước này rồi yield
+TEXT_SECTION_CHARS = 20_000
+
+_MD_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+
+
+def register_extractor(*extensions: str):
+    """Register a generator function as the extractor for the given extensions."""
+    def decorator(func: Extractor) -> Extractor:
+        for ext in extensions:
+            _EXTRACTORS[ext.lower()] = func
+        return func
+    return decorator
+
+
+def supported_extensions() -> set[str]:
+    """Extensions with a registered extractor (used for upload validation)."""
+    return set(_EXTRACTORS)
+
+
+def iter_documents(file_path: str, filename: str) -> Iterator[Document]:
+    """Lazily extract page/section Documents from a file on disk.
+
+    Raises:
+        ValueError: No extractor registered for the file extension.
+    """
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    extractor = _EXTRACTORS.get(ext)
+    if extractor is None:
+        raise ValueError(f"Unsupported file extension: {ext}")
+    for doc in extractor(file_path):
+        if doc.page_content.strip():
+            yield doc
+
+
+# ── PDF ──────────────────────────────────────────────────
+
+@register_extractor("pdf")
+def extract_pdf(file_path: str) -> Iterator[Document]:
+    """One Document per PDF page; pages are parsed only when consumed."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    total = len(reader.pages)
+    for index, page in enumerate(reader.pages):
+        yield Document(
+            page_content=page.extract_text() or "",
+            metadata={"page": index, "total_pages": total},
+        )
+
+
+# ── DOCX ─────────────────────────────────────────────────
+
+def _is_docx_heading(paragraph) -> bool:
+    style = (paragraph.style.name if paragraph.style is not None else "") or ""
+    return style.startswith("Heading") or style == "Title"
+
+
+@register_extractor("docx")
+def extract_docx(file_path: str) -> Iterator[Document]:
+    """One Document per heading-delimited section of a Word document."""
+    import docx
+
+    document = docx.Document(file_path)
+    heading = None
+    section_index = 0
+    lines: list[str] = []
+
+    def flush():
+        return Document(
+            page_content="\n".join(lines),
+            metadata={"heading": heading, "section": section_index},
+        )
+
+    for para in document.paragraphs:
+        text = para.text.strip()
+        if not text:
+            continue
+        if _is_docx_heading(para):
+            if lines:
+                yield flush()
+                section_index += 1
+            heading = text
+            lines = [text]
+        else:
+            lines.append(text)
+
+    if lines:
+        yield flush()
+
+
+# ── PPTX ─────────────────────────────────────────────────
+
+@register_extractor("pptx")
+def extract_pptx(file_path: str) -> Iterator[Document]:
+    """One Document per slide (title, body text, tables and speaker notes)."""
+    from pptx import Presentation
+
+    presentation = Presentation(file_path)
+    total = len(presentation.slides)
+    for index, slide in enumerate(presentation.slides):
+        title_shape = slide.shapes.title
+        title = title_shape.text_frame.text.strip() if title_shape is not None and title_shape.has_text_frame else None
+
+        parts: list[str] = []
+        for shape in slide.shapes:
+            if shape.has_text_frame:
+                text = shape.text_frame.text.strip()
+                if text:
+                    parts.append(text)
+            elif getattr(shape, "has_table", False) and shape.has_table:
+                for row in shape.table.rows:
+                    cells = [cell.text.strip() for cell in row.cells]
+                    if any(cells):
+                        parts.append(" | ".join(cells))
+
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame.text.strip()
+            if notes:
+                parts.append(f"Ghi chú: {notes}")
+
+        yield Document(
+            page_content="\n".join(parts),
+            metadata={"page": index, "slide_number": index + 1, "total_pages": total, "heading": title},
+        )
+
+
+# ── Markdown ─────────────────────────────────────────────
+
+@register_extractor("md", "markdown")
+def extract_markdown(file_path: str) -> Iterator[Document]:
+    """One Document per ATX heading section, streamed line by line."""
+    heading = None
+    section_index = 0
+    lines: list[str] = []
+    in_code_block = False
+
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            stripped = line.rstrip("\n")
+            if stripped.lstrip().startswith("```"):
+                in_code_block = not in_code_block
+            match = None if in_code_block else _MD_HEADING.match(stripped)
+            if match:
+                if any(l.strip() for l in lines):
+                    yield Document(
+                        page_content="\n".join(lines).strip(),
+                        metadata={"heading": heading, "section": section_index},
+                    )
+                    section_index += 1
+                heading = match.group(2)
+                lines = [stripped]
+            else:
+                lines.append(stripped)
+
+    if any(l.strip() for l in lines):
+        yield Document(
+            page_content="\n".join(lines).strip(),
+            metadata={"heading": heading, "section": section_index},
+        )
+
+
+# ── Plain text ───────────────────────────────────────────
+
+@register_extractor("txt")
+def extract_text(file_path: str) -> Iterator[Document]:
+    """Paragraph-aligned blocks of ~TEXT_SECTION_CHARS, streamed line by line."""
+    section_index = 0
+    buffer: list[str] = []
+    size = 0
+
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            buffer.append(line)
+            size += len(line)
+            # Chỉ cắt tại dòng trống để không xé đôi đoạn văn
+            if size >= TEXT_SECTION_CHARS and not line.strip():
+                yield Document(page_content="".join(buffer).strip(), metadata={"section": section_index})
+                section_index += 1
+                buffer, size = [], 0
+
+    if buffer:
+        yield Document(page_content="".join(buffer).strip(), metadata={"section": section_index})
@@ -0,0 +1,110 @@
+"""
+Knowledge feature: Bounded-memory file I/O for uploads and ingestion.
+
+Thay vì `await file.read()` (giữ nguyên file 50MB trong RAM, rồi truyền bytes cho
+background task), file được:
+  1. Ghi từng khối 1MB ra temp file trên đĩa, dừng và trả 413 ngay khi vượt giới hạn.
+  2. Upload lên Storage bằng đường dẫn file (httpx stream multipart theo khối).
+  3. Extractor đọc lại theo đường dẫn, từng trang / từng dòng (extractors.py).
+Worker ingest tải file từ Storage bằng signed URL + httpx stream ra temp file.
+
+→ RSS mỗi upload đồng thời gần như không đổi theo kích thước file.
+"""
+
+import os
+import tempfile
+
+import httpx
+from fastapi import HTTPException, UploadFile
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1MB
+SIGNED_DOWNLOAD_TTL = 120  # Đủ để bắt đầu tải; httpx giữ kết nối tới khi xong
+
+
+# Ghi vào study_materials.file_type khi file không đi qua upload (promote từ temp)
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "md": "text/markdown",
+    "markdown": "text/markdown",
+}
+
+
+def content_type_for(filename: str) -> str:
+    """MIME type recorded for a knowledge-base file, from its extension."""
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return CONTENT_TYPES.get(ext, "text/plain")
+
+
+def _suffix_for(filename: str) -> str:
+    return f".{filename.rsplit('.', 1)[-1].lower()}" if "." in filename else ""
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int, limit_label: str) -> tuple[str, int]:
+    """Copy an UploadFile to a named temp file in fixed-size chunks.
+
+    Rejects as soon as the size limit is crossed, without reading the rest.
+
+    Args:
+        upload: The incoming file.
+        max_bytes: Maximum allowed size.
+        limit_label: Human-readable limit for the 413 message, e.g. "50MB".
+
+    Returns:
+        (temp_path, size_bytes). Caller must delete the file (see remove_quietly).
+
+    Raises:
+        HTTPException 413: File exceeds max_bytes.
+    """
+    too_large = HTTPException(
+        status_code=413, detail=f"File too large. Maximum size for this upload is {limit_label}."
+    )
+    # Starlette đã biết kích thước → từ chối trước khi copy byte nào
+    if upload.size is not None and upload.size > max_bytes:
+        raise too_large
+
+    fd, temp_path = tempfile.mkstemp(suffix=_suffix_for(upload.filename or ""))
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await upload.read(STREAM_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise too_large
+                out.write(chunk)
+    except BaseException:
+        remove_quietly(temp_path)
+        raise
+    return temp_path, size
+
+
+def download_to_tempfile(db, bucket: str, storage_path: str) -> str:
+    """Stream a Storage object to a named temp file (never fully in memory).
+
+    Returns:
+        Path of the temp file. Caller must delete it.
+    """
+    signed = db.storage.from_(bucket).create_signed_url(storage_path, SIGNED_DOWNLOAD_TTL)
+    url = signed.get("signedURL") or signed.get("signedUrl")
+
+    fd, temp_path = tempfile.mkstemp(suffix=_suffix_for(storage_path))
+    try:
+        with os.fdopen(fd, "wb") as out, httpx.stream("GET", url, timeout=60) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes(STREAM_CHUNK_SIZE):
+                out.write(chunk)
+    except BaseException:
+        remove_quietly(temp_path)
+        raise
+    return temp_path
+
+
+def remove_quietly(path: str | None):
+    """Delete a temp file, ignoring errors (already removed, etc.)."""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
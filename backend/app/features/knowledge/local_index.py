@@ -0,0 +1,396 @@
+"""
+Knowledge feature: Embedded local vector index for single-user deployments.
+
+Supabase vẫn là source of truth — index này chỉ là bản sao read-only trong process
+để trả lời `search_*_by_vector` và nhánh vector của hybrid search mà không cần
+round trip tới pgvector (KnowledgeService chỉ còn gọi RPC lexical_search_* rồi tự
+hợp nhất RRF).
+
+Layout trên đĩa (mỗi user + corpus):
+  {LOCAL_VECTOR_INDEX_DIR}/{user_id}/{corpus}.npy        ← ma trận float16 (đã chuẩn hoá L2), mở bằng mmap
+  {LOCAL_VECTOR_INDEX_DIR}/{user_id}/{corpus}.meta.json  ← ids, metadata từng dòng, watermark đồng bộ
+
+Đồng bộ incremental theo timestamp (keyset pagination trên (ts, id)):
+  - notes     : quick_notes.updated_at (archive / sửa nội dung đều bump updated_at)
+  - materials : material_chunks.created_at (chunk là immutable, re-index = xóa + insert mới).
+                Chunk bị xóa không để lại dấu vết → material nào có chunk mới trong lần
+                sync thì đối chiếu lại toàn bộ id chunk hiện có của material đó.
+
+Search: snapshot float16 được upcast sang float32 một lần khi load/sync
+(NumPy không có kernel SIMD cho float16 matmul), sau đó mỗi query chỉ là
+1 phép nhân ma trận-vector + argpartition.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from supabase import Client
+
+from app.config import get_settings
+from app.features.knowledge.embedding import parse_pgvector
+
+logger = logging.getLogger(__name__)
+
+CORPUS_NOTES = "notes"
+CORPUS_MATERIALS = "materials"
+
+# Số dòng mỗi lần kéo từ PostgREST khi đồng bộ
+SYNC_PAGE_SIZE = 500
+
+_NOTE_FIELDS = ("id", "content", "note_type", "tags", "is_pinned", "created_at")
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row so that dot product == cosine similarity."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVectorIndex:
+    """In-process cosine top-k index for one (user, corpus) pair."""
+
+    def __init__(self, user_id: str, corpus: str, base_dir: str | Path, dim: int):
+        if corpus not in (CORPUS_NOTES, CORPUS_MATERIALS):
+            raise ValueError(f"Unknown corpus: {corpus}")
+        self.user_id = user_id
+        self.corpus = corpus
+        self.dim = dim
+        self._dir = Path(base_dir) / user_id
+        self._lock = threading.Lock()
+
+        self._ids: list[str] = []
+        self._rows: list[dict] = []
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        # Facet columns used for filtering (built alongside the matrix)
+        self._domains = np.array([], dtype=object)
+        self._tag_sets: list[frozenset] = []
+
+        self._watermark: str | None = None  # last seen timestamp
+        self._watermark_id: str = ""         # tie-breaker id at that timestamp
+        self.is_ready = False
+
+    # ── Paths ────────────────────────────────────────────
+
+    @property
+    def _matrix_path(self) -> Path:
+        return self._dir / f"{self.corpus}.npy"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self._dir / f"{self.corpus}.meta.json"
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ── Mutation ─────────────────────────────────────────
+
+    def _rebuild(self, ids: list[str], rows: list[dict], vectors: np.ndarray):
+        """Swap in a new generation of arrays (readers keep their old references)."""
+        matrix = _normalize_rows(vectors.astype(np.float32, copy=False)) if len(ids) else (
+            np.zeros((0, self.dim), dtype=np.float32)
+        )
+        domains = np.array([r.get("domain") for r in rows], dtype=object)
+        tag_sets = [frozenset(r.get("tags") or []) for r in rows]
+        with self._lock:
+            self._ids, self._rows, self._matrix = ids, rows, matrix
+            self._domains, self._tag_sets = domains, tag_sets
+
+    def apply_changes(
+        self,
+        upserts: list[tuple[str, dict, list[float]]],
+        deletes: set[str] | None = None,
+    ) -> bool:
+        """Merge upserted rows and deletions into the index.
+
+        Args:
+            upserts: (id, metadata row, embedding) triples.
+            deletes: ids to drop.
+
+        Returns:
+            True if anything changed.
+        """
+        deletes = deletes or set()
+        if not upserts and not (deletes & set(self._ids)):
+            return False
+
+        with self._lock:
+            ids, rows, matrix = self._ids, self._rows, self._matrix
+
+        position = {rid: i for i, rid in enumerate(ids)}
+        replaced: dict[int, tuple[dict, list[float]]] = {}
+        appended: dict[str, tuple[dict, list[float]]] = {}
+        for rid, row, vec in upserts:
+            if rid in position:
+                replaced[position[rid]] = (row, vec)
+            else:
+                appended[rid] = (row, vec)
+
+        keep = [i for i, rid in enumerate(ids) if rid not in deletes]
+        new_ids = [ids[i] for i in keep]
+        new_rows = [replaced[i][0] if i in replaced else rows[i] for i in keep]
+        new_matrix = matrix[keep] if keep else np.zeros((0, self.dim), dtype=np.float32)
+        for offset, i in enumerate(keep):
+            if i in replaced:
+                new_matrix[offset] = replaced[i][1]
+
+        append_ids = [rid for rid in appended if rid not in deletes]
+        if append_ids:
+            new_ids += append_ids
+            new_rows += [appended[rid][0] for rid in append_ids]
+            extra = np.asarray([appended[rid][1] for rid in append_ids], dtype=np.float32)
+            new_matrix = np.vstack([new_matrix, extra])
+
+        self._rebuild(new_ids, new_rows, new_matrix)
+        return True
+
+    def lookup(self, ids: list[str], query_vector: list[float]) -> dict[str, tuple[float, list[float]]]:
+        """Cosine similarity to the query + stored (normalized) vector for each known id."""
+        with self._lock:
+            all_ids, matrix = self._ids, self._matrix
+        position = {rid: i for i, rid in enumerate(all_ids)}
+        found = [(rid, position[rid]) for rid in ids if rid in position]
+        if not found:
+            return {}
+        q = np.asarray(query_vector, dtype=np.float32)[: self.dim]
+        q = q / (np.linalg.norm(q) or 1.0)
+        vectors = matrix[[i for _, i in found]]
+        scores = vectors @ q
+        return {rid: (float(score), vec.tolist()) for (rid, _), score, vec in zip(found, scores, vectors)}
+
+    # ── Search ───────────────────────────────────────────
+
+    def search(
+        self,
+        query_vector: list[float],
+        top_k: int = 5,
+        tags: list[str] | None = None,
+        domain: str | None = None,
+    ) -> list[dict]:
+        """Vectorized cosine top-k. Row dicts mirror the pgvector RPC output."""
+        with self._lock:
+            rows, matrix = self._rows, self._matrix
+            domains, tag_sets = self._domains, self._tag_sets
+
+        if not rows or top_k <= 0:
+            return []
+
+        q = np.asarray(query_vector, dtype=np.float32)[: self.dim]
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return []
+        scores = matrix @ (q / norm)
+
+        if domain is not None:
+            scores = np.where(domains == domain, scores, -np.inf)
+        if tags:
+            wanted = set(tags)
+            mask = np.fromiter((not wanted.isdisjoint(t) for t in tag_sets), dtype=bool, count=len(tag_sets))
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(top_k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**rows[i], "similarity": float(scores[i])}
+            for i in top
+            if np.isfinite(scores[i])
+        ]
+
+    # ── Snapshot ─────────────────────────────────────────
+
+    def save_snapshot(self):
+        """Write float16 matrix + meta atomically (tmp file → os.replace)."""
+        with self._lock:
+            ids, rows, matrix = self._ids, self._rows, self._matrix
+            watermark, watermark_id = self._watermark, self._watermark_id
+
+        self._dir.mkdir(parents=True, exist_ok=True)
+        tmp_matrix = self._matrix_path.with_suffix(".npy.tmp")
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, matrix.astype(np.float16))
+        os.replace(tmp_matrix, self._matrix_path)
+
+        tmp_meta = self._meta_path.with_suffix(".json.tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": self.dim,
+                "watermark": watermark,
+                "watermark_id": watermark_id,
+                "ids": ids,
+                "rows": rows,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_meta, self._meta_path)
+
+    def load_snapshot(self) -> bool:
+        """Load the on-disk snapshot (mmap). Returns False if none / incompatible."""
+        if not (self._matrix_path.exists() and self._meta_path.exists()):
+            return False
+        try:
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("dim") != self.dim:
+                logger.warning(f"Local index {self.corpus}/{self.user_id}: dim changed, ignoring snapshot")
+                return False
+            mapped = np.load(self._matrix_path, mmap_mode="r")
+            if mapped.shape[0] != len(meta["ids"]):
+                logger.warning(f"Local index {self.corpus}/{self.user_id}: corrupt snapshot, ignoring")
+                return False
+            self._rebuild(meta["ids"], meta["rows"], np.asarray(mapped, dtype=np.float32))
+            self._watermark = meta.get("watermark")
+            self._watermark_id = meta.get("watermark_id") or ""
+            self.is_ready = True
+            return True
+        except Exception as e:
+            logger.warning(f"Could not load local index snapshot {self._matrix_path}: {e}")
+            return False
+
+    # ── Sync from Supabase ───────────────────────────────
+
+    def _keyset_filter(self, ts_column: str) -> str:
+        wm = self._watermark
+        return f'{ts_column}.gt."{wm}",and({ts_column}.eq."{wm}",id.gt.{self._watermark_id})'
+
+    def _fetch_page(self, db: Client, ts_column: str) -> list[dict]:
+        if self.corpus == CORPUS_NOTES:
+            query = (
+                db.table("quick_notes")
+                .select("id, content, note_type, tags, is_pinned, is_archived, created_at, updated_at, embedding")
+                .eq("user_id", self.user_id)
+            )
+        else:
+            query = (
+                db.table("material_chunks")
+                .select(
+                    "id, content, chunk_index, page_number, section_title, material_id, created_at, embedding, "
+                    "study_materials!inner(user_id, file_name, domain)"
+                )
+                .eq("study_materials.user_id", self.user_id)
+            )
+        if self._watermark:
+            query = query.or_(self._keyset_filter(ts_column))
+        res = query.order(ts_column).order("id").limit(SYNC_PAGE_SIZE).execute()
+        return res.data or []
+
+    def sync(self, db: Client) -> int:
+        """Pull rows changed since the watermark. Returns number of rows applied."""
+        ts_column = "updated_at" if self.corpus == CORPUS_NOTES else "created_at"
+        applied = 0
+        touched: set[str] = set()  # materials có chunk mới trong lần sync này
+
+        while True:
+            page = self._fetch_page(db, ts_column)
+            if not page:
+                break
+
+            upserts: list[tuple[str, dict, list[float]]] = []
+            deletes: set[str] = set()
+
+            for r in page:
+                vec = parse_pgvector(r.get("embedding"))
+                if self.corpus == CORPUS_NOTES:
+                    if r.get("is_archived") or vec is None:
+                        deletes.add(r["id"])
+                        continue
+                    row = {k: r.get(k) for k in _NOTE_FIELDS}
+                else:
+                    if r.get("material_id"):
+                        touched.add(r["material_id"])
+                    if vec is None:
+                        continue
+                    sm = r.get("study_materials") or {}
+                    row = {
+                        "chunk_id": r["id"],
+                        "content": r.get("content"),
+                        "chunk_index": r.get("chunk_index"),
+                        "page_number": r.get("page_number"),
+                        "section_title": r.get("section_title"),
+                        "material_id": r.get("material_id"),
+                        "file_name": sm.get("file_name"),
+                        "domain": sm.get("domain"),
+                        "created_at": r.get("created_at"),
+                    }
+                upserts.append((r["id"], row, vec[: self.dim]))
+
+            self.apply_changes(upserts, deletes)
+            applied += len(page)
+            self._watermark = page[-1][ts_column]
+            self._watermark_id = page[-1]["id"]
+
+            if len(page) < SYNC_PAGE_SIZE:
+                break
+
+        if self.corpus == CORPUS_MATERIALS and self._ids:
+            # Re-index = xóa chunk cũ + insert theo từng mẻ → chỉ DB biết chunk nào còn sống
+            applied += self._reconcile_materials(db, touched)
+            applied += self._drop_deleted_materials(db)
+
+        self.is_ready = True
+        return applied
+
+    def _reconcile_materials(self, db: Client, material_ids: set[str]) -> int:
+        """Drop local chunks of `material_ids` that no longer exist in material_chunks."""
+        if not material_ids:
+            return 0
+        alive: set[str] = set()
+        for material_id in material_ids:
+            offset = 0
+            while True:
+                rows = (
+                    db.table("material_chunks")
+                    .select("id")
+                    .eq("material_id", material_id)
+                    .order("id")
+                    .range(offset, offset + SYNC_PAGE_SIZE - 1)
+                    .execute()
+                ).data or []
+                alive.update(r["id"] for r in rows)
+                if len(rows) < SYNC_PAGE_SIZE:
+                    break
+                offset += SYNC_PAGE_SIZE
+        gone = {
+            rid for rid, row in zip(self._ids, self._rows)
+            if row.get("material_id") in material_ids and rid not in alive
+        }
+        if gone:
+            self.apply_changes([], gone)
+        return len(gone)
+
+    def _drop_deleted_materials(self, db: Client) -> int:
+        """Chunks have no tombstone: drop rows whose material no longer exists."""
+        res = db.table("study_materials").select("id").eq("user_id", self.user_id).execute()
+        alive = {r["id"] for r in (res.data or [])}
+        gone = {rid for rid, row in zip(self._ids, self._rows) if row.get("material_id") not in alive}
+        if gone:
+            self.apply_changes([], gone)
+        return len(gone)
+
+
+# ── Registry ─────────────────────────────────────────────
+
+_indexes: dict[tuple[str, str], LocalVectorIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def get_local_index(user_id: str, corpus: str) -> LocalVectorIndex | None:
+    """Get (and lazily load from snapshot) the local index, or None if disabled."""
+    settings = get_settings()
+    if not settings.LOCAL_VECTOR_INDEX_ENABLED:
+        return None
+
+    key = (user_id, corpus)
+    with _registry_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = LocalVectorIndex(
+                user_id, corpus,
+                base_dir=settings.LOCAL_VECTOR_INDEX_DIR,
+                dim=settings.EMBEDDING_DIMENSIONS,
+            )
+            index.load_snapshot()
+            _indexes[key] = index
+    return index
@@ -0,0 +1,183 @@
+"""
+Knowledge feature: Ingestion progress tracking.
+
+Pipeline ghi bộ đếm theo từng giai đoạn vào IngestionProgress:
+  extracting  → pages_extracted (các mẻ đầu đã được embed/insert song song)
+  embedding   → chunks_embedded, rows_inserted / chunks_total (extraction_done = True)
+  success | failed | retrying (job queue sẽ chạy lại)
+
+Embed và insert đi liền nhau theo từng mẻ nên không có giai đoạn "inserting" riêng;
+rows_inserted vẫn được tính vào % qua PHASE_WEIGHTS["insert"].
+
+processing_status của study_materials là nguồn sự thật cuối cùng: worker chết giữa
+chừng → sweeper / dead-job đặt 'failed' nhưng progress lưu trong DB vẫn kẹt ở
+"extracting"/"embedding". get_progress() vì vậy lấy processing_status đè lên stage.
+
+Snapshot được giữ trong bộ nhớ (đọc tức thì cho SSE cùng process) và ghi xuống
+cột study_materials.progress (migration 012) có throttle, để process khác / client
+reconnect vẫn đọc được.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Trọng số mỗi phần việc khi quy đổi ra % tổng (embedding là phần chậm nhất)
+PHASE_WEIGHTS = {"extract": 0.15, "embed": 0.7, "insert": 0.15}
+TERMINAL_STAGES = {"success", "failed"}
+
+# material_id → snapshot đang chạy trong process này
+_active: dict[str, dict] = {}
+_active_lock = threading.Lock()
+
+
+def overall_fraction(progress: dict) -> float:
+    """Fraction of the whole pipeline completed (0.0 – 1.0).
+
+    Extraction is streamed, so chunks_total grows until `extraction_done`;
+    embed/insert fractions are scaled by how much of the file has been extracted.
+    """
+    stage = progress.get("stage")
+    if stage == "success":
+        return 1.0
+    chunks_total = progress.get("chunks_total") or 0
+    pages_total = progress.get("pages_total") or 0
+
+    if progress.get("extraction_done"):
+        extract = 1.0
+    elif pages_total:
+        extract = min(progress.get("pages_extracted", 0) / pages_total, 1.0)
+    else:
+        extract = 0.0
+    embed = progress.get("chunks_embedded", 0) / chunks_total * extract if chunks_total else 0.0
+    insert = progress.get("rows_inserted", 0) / chunks_total * extract if chunks_total else 0.0
+
+    return (
+        PHASE_WEIGHTS["extract"] * extract
+        + PHASE_WEIGHTS["embed"] * min(embed, 1.0)
+        + PHASE_WEIGHTS["insert"] * min(insert, 1.0)
+    )
+
+
+def with_eta(progress: dict, now: float | None = None) -> dict:
+    """Return a copy of the snapshot with `percent` and `eta_seconds`.
+
+    ETA is extrapolated from the elapsed time and the weighted fraction done,
+    so it becomes accurate once embedding (the dominant stage) has started.
+    """
+    result = dict(progress)
+    fraction = overall_fraction(progress)
+    result["percent"] = round(fraction * 100, 1)
+
+    started = progress.get("started_ts")
+    now = now if now is not None else time.time()
+    if progress.get("stage") in TERMINAL_STAGES:
+        result["eta_seconds"] = 0
+    elif started and fraction >= 0.01:
+        elapsed = max(now - started, 0.0)
+        result["eta_seconds"] = round(elapsed * (1 - fraction) / fraction, 1)
+    else:
+        result["eta_seconds"] = None
+    return result
+
+
+class IngestionProgress:
+    """Stage counters for one material, persisted to study_materials.progress."""
+
+    def __init__(self, db, material_id: str, persist_interval: float = 1.0):
+        self.db = db
+        self.material_id = material_id
+        self.persist_interval = persist_interval
+        self._last_persist = 0.0
+        self.data = {
+            "stage": "extracting",
+            "pages_total": None,
+            "pages_extracted": 0,
+            "chunks_total": None,
+            "chunks_embedded": 0,
+            "rows_inserted": 0,
+            "started_ts": time.time(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with _active_lock:
+            _active[material_id] = self.data
+        self._persist(force=True)
+
+    def update(self, stage: str | None = None, **counters):
+        """Update counters; persists when the stage changes or the interval elapsed."""
+        stage_changed = stage is not None and stage != self.data["stage"]
+        with _active_lock:
+            if stage is not None:
+                self.data["stage"] = stage
+            self.data.update(counters)
+        self._persist(force=stage_changed)
+
+    def finish(self, status: str, error: str | None = None):
+        """Mark the run as 'success', 'failed' or 'retrying' and persist immediately."""
+        with _active_lock:
+            self.data["stage"] = status
+            self.data["finished_at"] = datetime.now(timezone.utc).isoformat()
+            if error:
+                self.data["error"] = error[:500]
+            _active.pop(self.material_id, None)
+        self._persist(force=True)
+
+    def _persist(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_persist < self.persist_interval:
+            return
+        self._last_persist = now
+        try:
+            self.db.table("study_materials").update({
+                "progress": self.data
+            }).eq("id", self.material_id).execute()
+        except Exception as e:
+            # Progress là thông tin phụ — không làm hỏng pipeline
+            logger.warning(f"Could not persist progress for {self.material_id}: {e}")
+
+
+def get_live_progress(material_id: str) -> dict | None:
+    """In-process snapshot with percent/ETA (None if this process is not ingesting it)."""
+    with _active_lock:
+        live = dict(_active[material_id]) if material_id in _active else None
+    return with_eta(live) if live else None
+
+
+def get_progress(db, material_id: str, user_id: str) -> dict | None:
+    """Current progress snapshot with percent/ETA, or None if the material is not found.
+
+    Reads the in-process snapshot when this process is running the pipeline,
+    otherwise the last persisted one. A terminal processing_status ('success' /
+    'failed') overrides a persisted stage left behind by a worker that died.
+    """
+    res = (
+        db.table("study_materials")
+        .select("processing_status, progress, chunk_count")
+        .eq("id", material_id)
+        .eq("user_id", user_id)
+        .execute()
+    )
+    if not res.data:
+        return None
+    row = res.data[0]
+
+    with _active_lock:
+        live = dict(_active[material_id]) if material_id in _active else None
+    progress = live or dict(row.get("progress") or {})
+
+    status = row.get("processing_status")
+    # Tài liệu cũ (trước migration 012) hoặc chưa có job chạy
+    if not progress:
+        progress = {"stage": status if status in TERMINAL_STAGES else "queued"}
+        if status == "success":
+            progress["rows_inserted"] = progress["chunks_total"] = row.get("chunk_count") or 0
+    elif live is None and status in TERMINAL_STAGES and progress.get("stage") != status:
+        progress["stage"] = status
+        if status == "success":
+            progress["extraction_done"] = True
+
+    progress["processing_status"] = row.get("processing_status")
+    return with_eta(progress)
@@ -1,35 +1,47 @@
+import asyncio
+import json
 import logging
+import time
 import urllib.parse
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
 from app.core.dependencies import get_current_user_id, get_db
 from app.core.database import get_supabase_client
+from app.config import get_settings
+from app.features.knowledge.file_io import spool_upload, remove_quietly, content_type_for
+from app.features.knowledge.extractors import supported_extensions
+from app.features.knowledge.signed_urls import get_signed_urls, get_signed_url_cache
+from app.features.knowledge.bulk import bulk_delete_materials, bulk_promote_temp_files, bulk_reindex_materials
+from app.features.knowledge.schemas import BulkMaterialIdsRequest, BulkPromoteRequest
+from app.features.knowledge.snapshot import export_snapshot, import_snapshot
 from supabase import Client
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Knowledge Base"])
 
-ALLOWED_EXTENSIONS = {"pdf", "docx", "txt", "md"}
+# Định dạng được hỗ trợ = các extractor đã đăng ký (pdf, docx, pptx, md, txt)
+ALLOWED_EXTENSIONS = supported_extensions()
 
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 @router.post("/upload")
 async def upload_document(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     domain: str = Form(..., description="Must be one of: study, work, personal, other"),
     subject: str = Form(None),
     user_id: str = Depends(get_current_user_id),
 ):
     """
-    Tải lên tài liệu (PDF, DOCX, TXT) để dạy cho AI.
+    Tải lên tài liệu (PDF, DOCX, PPTX, MD, TXT) để dạy cho AI.
     - Lưu file vào Supabase Storage (knowledge-base).
     - Tạo bản ghi trạng thái `processing`.
-    - Gọi background task bóc tách, băm nhỏ và nhúng Vector.
+    - Đưa job bóc tách, băm nhỏ và nhúng Vector vào hàng đợi.
     """
     if not allowed_file(file.filename):
-        raise HTTPException(status_code=400, detail="Only PDF, DOCX, TXT, and MD files are allowed.")
+        raise HTTPException(status_code=400, detail="Only PDF, DOCX, PPTX, TXT, and MD files are allowed.")
     
     valid_domains = {"study", "work", "personal", "other"}
     if domain not in valid_domains:
@@ -42,18 +54,16 @@ async def upload_document(
     safe_filename = secure_filename(file.filename)
     storage_path = f"{user_id}/{domain}/{safe_filename}"
     
+    settings = get_settings()
+    max_size = settings.KB_UPLOAD_MAX_MB * 1024 * 1024
+    temp_path = None
     try:
-        # Đọc file ra memory
-        file_bytes = await file.read()
+        # 1.1 Stream file ra temp file trên đĩa, dừng ngay khi vượt giới hạn (50MB cho Luồng 2 RAG)
+        temp_path, file_size = await spool_upload(file, max_size, f"{settings.KB_UPLOAD_MAX_MB}MB")
         
-        # 1.1 Chặn dung lượng File (50MB Limit cho Luồng 2 RAG)
-        MAX_SIZE_PERSISTENT = 50 * 1024 * 1024 # 50MB
-        if len(file_bytes) > MAX_SIZE_PERSISTENT:
-             raise HTTPException(status_code=413, detail="File too large. Maximum size for Knowledge Base upload is 50MB.")
-        
-        # 2. Upload lên Supabase Storage
+        # 2. Upload lên Supabase Storage (truyền đường dẫn → httpx stream theo khối)
         res_storage = db.storage.from_("knowledge-base").upload(
-            file=file_bytes,
+            file=temp_path,
             path=storage_path,
             file_options={"content-type": file.content_type, "upsert": "true"}
         )
@@ -67,6 +77,7 @@ async def upload_document(
             "file_name": safe_filename,
             "file_type": file.content_type,
             "file_url": storage_path,  # Lưu storage path thay vì Signed URL hết hạn
+            "file_size_bytes": file_size,
             "domain": domain,
             "subject": subject,
             "processing_status": "processing"
@@ -75,15 +86,14 @@ async def upload_document(
         material = res_db.data[0]
         material_id = material["id"]
 
-        # 4. Gọi Background Task Rút trích Text và Embedding
-        from app.background.document_tasks import process_document_pipeline
-        background_tasks.add_task(
-            process_document_pipeline, 
-            material_id=material_id, 
-            user_id=user_id, 
-            file_bytes=file_bytes, 
-            filename=safe_filename,
-            content_type=file.content_type
+        # 4. Đưa job Rút trích Text và Embedding vào hàng đợi bền vững
+        #    (worker tải lại file từ Storage → restart không làm kẹt 'processing')
+        from app.background.job_queue import enqueue_job, JOB_INGEST_DOCUMENT
+        enqueue_job(
+            JOB_INGEST_DOCUMENT,
+            {"material_id": material_id},
+            user_id=user_id,
+            idempotency_key=f"ingest:{material_id}",
         )
 
         return {
@@ -92,9 +102,13 @@ async def upload_document(
             "data": material
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading document: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    finally:
+        remove_quietly(temp_path)
 
 
 import unicodedata
@@ -119,7 +133,7 @@ async def extract_text_only(
     Prefix unix_ts cho phép cleanup job tính tuổi file và tự xóa sau 24 giờ.
     """
     if not allowed_file(file.filename):
-        raise HTTPException(status_code=400, detail="Only PDF, DOCX, TXT, and MD files are allowed.")
+        raise HTTPException(status_code=400, detail="Only PDF, DOCX, PPTX, TXT, and MD files are allowed.")
 
     import time as _time
     db = get_supabase_client()
@@ -128,17 +142,16 @@ async def extract_text_only(
     unix_ts = int(_time.time())
     storage_path = f"{user_id}/temp/{unix_ts}_{safe_filename}"
     
+    settings = get_settings()
+    max_size = settings.KB_TEMP_UPLOAD_MAX_MB * 1024 * 1024
+    temp_path = None
     try:
-        file_bytes = await file.read()
-        
-        # 1. Chặn dung lượng File (10MB Limit) để tránh crash RAM và tràn Context LLM
-        MAX_SIZE = 10 * 1024 * 1024 # 10MB
-        if len(file_bytes) > MAX_SIZE:
-             raise HTTPException(status_code=413, detail="File too large. Maximum size for temporary upload is 10MB.")
+        # 1. Stream ra temp file, chặn dung lượng (10MB) ngay khi vượt để tránh crash RAM và tràn Context LLM
+        temp_path, _ = await spool_upload(file, max_size, f"{settings.KB_TEMP_UPLOAD_MAX_MB}MB")
 
         # 2. Lưu tạm file gốc lên S3 (vào thư mục /temp)
         db.storage.from_("knowledge-base").upload(
-            file=file_bytes,
+            file=temp_path,
             path=storage_path,
             file_options={"content-type": file.content_type, "upsert": "true"}
         )
@@ -146,9 +159,9 @@ async def extract_text_only(
         # 3. Bỏ qua get_public_url vì bucket Private sẽ lỗi 403.
         # Frontend chỉ cần storage_path để hiển thị UI và gọi API lưu vĩnh viễn sau này.
         
-        # 4. Bóc chữ trực tiếp, không chunk, không RAG
-        from app.background.document_tasks import extract_text_from_bytes
-        raw_docs = extract_text_from_bytes(file_bytes, safe_filename)
+        # 4. Bóc chữ trực tiếp từ file trên đĩa, không chunk, không RAG
+        from app.background.document_tasks import extract_text_from_path
+        raw_docs = extract_text_from_path(temp_path, safe_filename)
         
         if not raw_docs:
             full_text = ""
@@ -170,10 +183,11 @@ async def extract_text_only(
     except Exception as e:
         logger.error(f"Error extracting text: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Text extraction failed: {str(e)}")
+    finally:
+        remove_quietly(temp_path)
 
 @router.post("/promote")
 async def promote_temp_to_knowledge_base(
-    background_tasks: BackgroundTasks,
     storage_path: str = Form(..., description="The temporary storage path returned by extract-text API"),
     domain: str = Form(..., description="Target domain: study, work, personal, other"),
     subject: str = Form(None),
@@ -181,7 +195,7 @@ async def promote_temp_to_knowledge_base(
 ):
     """
     (Luồng Chat Kế thừa) - Move File từ Temp sang Lưu Trữ và chạy RAG
-    Nhận `storage_path` cũ từ UI Chat -> Move file sang thư mục mới -> Gọi Background Task.
+    Nhận `storage_path` cũ từ UI Chat -> Move file sang thư mục mới -> Enqueue job RAG.
     """
     valid_domains = {"study", "work", "personal", "other"}
     if domain not in valid_domains:
@@ -199,8 +213,7 @@ async def promote_temp_to_knowledge_base(
         # https://supabase.com/docs/reference/python/storage-from-move
         db.storage.from_("knowledge-base").move(storage_path, new_storage_path)
         
-        # Determine content type manually (weak heuristic but enough for DB recording)
-        content_type = "application/pdf" if filename.endswith(".pdf") else "application/vnd.openxmlformats-officedocument.wordprocessingml.document" if filename.endswith(".docx") else "text/plain"
+        content_type = content_type_for(filename)
 
         # 2. Add into study_materials DB
         insert_data = {
@@ -215,24 +228,18 @@ async def promote_temp_to_knowledge_base(
         res_db = db.table("study_materials").insert(insert_data).execute()
         material_id = res_db.data[0]["id"]
         
-        # 3. Download the bytes strictly for the Background task extraction
-        # Because process_document_pipeline expects bytes as input currently
-        file_res = db.storage.from_("knowledge-base").download(new_storage_path)
-        
-        # 4. Trigger the exact same RAG pipeline
-        from app.background.document_tasks import process_document_pipeline
-        background_tasks.add_task(
-            process_document_pipeline, 
-            material_id=material_id, 
-            user_id=user_id, 
-            file_bytes=file_res, 
-            filename=filename,
-            content_type=content_type
+        # 3. Trigger the exact same RAG pipeline (worker downloads the file itself)
+        from app.background.job_queue import enqueue_job, JOB_INGEST_DOCUMENT
+        enqueue_job(
+            JOB_INGEST_DOCUMENT,
+            {"material_id": material_id},
+            user_id=user_id,
+            idempotency_key=f"ingest:{material_id}",
         )
         
         return {
             "status": "success",
-            "message": "File promoted successfully. RAG Background task started.",
+            "message": "File promoted successfully. RAG ingestion job queued.",
             "data": res_db.data[0]
         }
         
@@ -303,16 +310,16 @@ async def get_study_materials(
         total = res.count or 0
         total_pages = max(1, -(-total // page_size))  # ceiling division
 
-        # Sinh signed URL cho từng file (do stored path trong 'file_url' column)
+        # Signed URL cho cả trang: lấy từ cache, path còn thiếu ký bằng 1 lệnh create_signed_urls
+        storage_paths = [
+            m["file_url"] for m in materials
+            if m.get("file_url") and not m["file_url"].startswith("http")
+        ]
+        signed_urls = get_signed_urls(db, "knowledge-base", storage_paths) if storage_paths else {}
         for m in materials:
             storage_path = m.get("file_url")
             if storage_path and not storage_path.startswith("http"):
-                try:
-                    signed_url = db.storage.from_("knowledge-base").create_signed_url(storage_path, 3600)
-                    m["download_url"] = signed_url.get("signedURL")
-                except Exception as ex:
-                    logger.warning(f"Could not generate signed URL for {storage_path}: {ex}")
-                    m["download_url"] = None
+                m["download_url"] = signed_urls.get(storage_path)
             else:
                 m["download_url"] = storage_path
 
@@ -333,9 +340,79 @@ async def get_study_materials(
         raise HTTPException(status_code=500, detail=f"Failed to fetch materials: {str(e)}")
 
 
+PROGRESS_LIVE_POLL_SECONDS = 0.5  # Pipeline chạy trong process này → đọc snapshot bộ nhớ
+PROGRESS_DB_POLL_SECONDS = 2.0  # Ngược lại → đọc study_materials.progress
+PROGRESS_KEEPALIVE_SECONDS = 15.0
+
+
+@router.get("/{material_id}/progress")
+async def stream_ingestion_progress(
+    material_id: str,
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Stream tiến độ ingest của một tài liệu (Server-Sent Events).
+
+    Mỗi event: `data: {"type": "progress", "stage", "pages_extracted", "chunks_total",
+    "chunks_embedded", "rows_inserted", "percent", "eta_seconds", ...}`.
+    Event cuối: `{"type": "done", ...}` khi stage là success / failed, sau đó đóng stream.
+    Client không cần poll GET /api/knowledge/ nữa.
+    """
+    from app.features.knowledge.progress import get_progress, get_live_progress, TERMINAL_STAGES
+
+    db = get_supabase_client()
+    initial = await asyncio.to_thread(get_progress, db, material_id, user_id)
+    if initial is None:
+        raise HTTPException(status_code=404, detail="Material not found")
+
+    async def generate_progress_stream():
+        snapshot = initial
+        last_sent = None
+        last_db_read = time.monotonic()
+        last_event = 0.0
+
+        while True:
+            # Bỏ các field biến thiên theo thời gian khi so sánh để chỉ gửi lúc có thay đổi thật
+            comparable = {k: v for k, v in snapshot.items() if k != "eta_seconds"}
+            if comparable != last_sent:
+                last_sent = comparable
+                last_event = time.monotonic()
+                event_type = "done" if snapshot.get("stage") in TERMINAL_STAGES else "progress"
+                yield f"data: {json.dumps({'type': event_type, 'material_id': material_id, **snapshot})}\n\n"
+                if event_type == "done":
+                    return
+            elif time.monotonic() - last_event >= PROGRESS_KEEPALIVE_SECONDS:
+                last_event = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            if await request.is_disconnected():
+                return
+
+            live = get_live_progress(material_id)
+            if live is not None:
+                snapshot = live
+                await asyncio.sleep(PROGRESS_LIVE_POLL_SECONDS)
+                continue
+
+            await asyncio.sleep(PROGRESS_LIVE_POLL_SECONDS)
+            if time.monotonic() - last_db_read >= PROGRESS_DB_POLL_SECONDS:
+                last_db_read = time.monotonic()
+                refreshed = await asyncio.to_thread(get_progress, db, material_id, user_id)
+                if refreshed is None:
+                    yield f"data: {json.dumps({'type': 'done', 'material_id': material_id, 'stage': 'deleted'})}\n\n"
+                    return
+                snapshot = refreshed
+
+    return StreamingResponse(
+        generate_progress_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.delete("/{material_id}")
 async def delete_study_material_endpoint(
-    background_tasks: BackgroundTasks,
     material_id: str,
     user_id: str = Depends(get_current_user_id)
 ):
@@ -343,7 +420,7 @@ async def delete_study_material_endpoint(
     Xóa tài liệu khỏi Knowledge Base.
     - Xóa dọn file gốc trên Supabase S3 (Storage) để tránh rác.
     - Xóa metadata trong DB (Cascasde xóa luôn Vector Embeddings).
-    Thực hiện dưới dạng Background Task để tránh block API.
+    Thực hiện qua job queue bền vững để tránh block API.
     """
     db = get_supabase_client()
     try:
@@ -353,20 +430,152 @@ async def delete_study_material_endpoint(
             raise HTTPException(status_code=404, detail="Material not found")
             
         storage_path = res.data[0].get("file_url")
+        if storage_path:
+            get_signed_url_cache().invalidate("knowledge-base", storage_path)
         
-        # Add to background tasks
-        from app.background.document_tasks import delete_document_pipeline
-        background_tasks.add_task(
-            delete_document_pipeline,
-            material_id=material_id,
-            file_url=storage_path,
-            user_id=user_id
+        # Đưa vào job queue (retry nếu DB/Storage lỗi tạm thời)
+        from app.background.job_queue import enqueue_job, JOB_DELETE_DOCUMENT
+        enqueue_job(
+            JOB_DELETE_DOCUMENT,
+            {"material_id": material_id, "file_url": storage_path, "user_id": user_id},
+            user_id=user_id,
+            idempotency_key=f"delete:{material_id}",
         )
              
-        return {"status": "success", "message": "Material deletion started in background."}
+        return {"status": "success", "message": "Material deletion queued."}
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error initiating material deletion: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to initiate material deletion: {str(e)}")
 
+
+
+def _bulk_response(results: list[dict]) -> dict:
+    summary: dict[str, int] = {}
+    for r in results:
+        summary[r["status"]] = summary.get(r["status"], 0) + 1
+    return {"status": "success", "summary": summary, "data": results}
+
+
+@router.post("/bulk-delete")
+async def bulk_delete_study_materials(
+    body: BulkMaterialIdsRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Xóa nhiều tài liệu cùng lúc: 1 lệnh Storage remove + 1 lệnh DB delete.
+    Trả kết quả theo từng material_id (deleted / not_found / error).
+    """
+    try:
+        return _bulk_response(bulk_delete_materials(get_supabase_client(), user_id, body.material_ids))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error bulk deleting materials: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bulk delete failed: {str(e)}")
+
+
+@router.post("/bulk-promote")
+async def bulk_promote_temp_files_endpoint(
+    body: BulkPromoteRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Chuyển nhiều file tạm (temp) vào Knowledge Base, tạo bản ghi bằng 1 lệnh insert
+    và đưa job RAG của từng file vào hàng đợi. Trả kết quả theo từng storage_path.
+    """
+    try:
+        items = [item.model_dump() for item in body.items]
+        return _bulk_response(bulk_promote_temp_files(get_supabase_client(), user_id, items))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error bulk promoting files: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bulk promotion failed: {str(e)}")
+
+
+@router.post("/bulk-reindex")
+async def bulk_reindex_study_materials(
+    body: BulkMaterialIdsRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Chạy lại chunking + embedding cho nhiều tài liệu qua hàng đợi ingest.
+    Tài liệu đang xử lý được bỏ qua. Trả kết quả theo từng material_id.
+    """
+    try:
+        return _bulk_response(bulk_reindex_materials(get_supabase_client(), user_id, body.material_ids))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error bulk re-indexing materials: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bulk re-index failed: {str(e)}")
+
+
+def _export_to_tempfile(user_id: str) -> str:
+    import tempfile
+    fd, path = tempfile.mkstemp(suffix=".npz")
+    try:
+        with open(fd, "wb") as f:
+            export_snapshot(get_supabase_client(), user_id, f, get_settings().EMBEDDING_DIMENSIONS)
+    except BaseException:
+        remove_quietly(path)
+        raise
+    return path
+
+
+@router.get("/export")
+async def export_knowledge_snapshot(user_id: str = Depends(get_current_user_id)):
+    """
+    Xuất toàn bộ kho kiến thức (tài liệu, chunks, ghi chú + embeddings) ra file NPZ gọn
+    (vector float16, text nén zstd) để chuyển / khôi phục mà không phải embed lại.
+    """
+    try:
+        path = await asyncio.to_thread(_export_to_tempfile, user_id)
+    except Exception as e:
+        logger.error(f"Error exporting knowledge snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+    filename = f"knowledge-snapshot-{time.strftime('%Y%m%d')}.npz"
+    return FileResponse(
+        path,
+        media_type="application/octet-stream",
+        filename=filename,
+        background=BackgroundTask(remove_quietly, path),
+    )
+
+
+@router.post("/import")
+async def import_knowledge_snapshot(
+    file: UploadFile = File(...),
+    keep_ids: bool = Form(False, description="Reuse exported UUIDs (restore into an empty environment)"),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Nhập file snapshot từ /export: ghi tài liệu, chunks và ghi chú (kèm embeddings)
+    bằng insert theo lô — không gọi embedding API.
+    """
+    settings = get_settings()
+    temp_path = None
+    try:
+        max_bytes = settings.KB_SNAPSHOT_MAX_MB * 1024 * 1024
+        temp_path, _ = await spool_upload(file, max_bytes, f"{settings.KB_SNAPSHOT_MAX_MB}MB")
+
+        def run_import():
+            with open(temp_path, "rb") as f:
+                return import_snapshot(
+                    get_supabase_client(), user_id, f, settings.EMBEDDING_DIMENSIONS,
+                    keep_ids=keep_ids, max_text_bytes=max_bytes,
+                )
+
+        counts = await asyncio.to_thread(run_import)
+        return {"status": "success", "message": "Knowledge snapshot imported.", "data": counts}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error importing knowledge snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+    finally:
+        remove_quietly(temp_path)
@@ -12,3 +12,17 @@ class StudyMaterialResponse(BaseModel):
     created_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class BulkMaterialIdsRequest(BaseModel):
+    material_ids: list[str]
+
+
+class BulkPromoteItem(BaseModel):
+    storage_path: str
+    domain: str
+    subject: Optional[str] = None
+
+
+class BulkPromoteRequest(BaseModel):
+    items: list[BulkPromoteItem]
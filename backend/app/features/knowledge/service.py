@@ -4,12 +4,151 @@ Handles semantic search across notes (memories) and study materials.
 """
 
 import logging
+import numpy as np
 from supabase import Client
 
-from app.features.knowledge.embedding import embed_text
+from app.features.knowledge.embedding import parse_pgvector
+from app.features.knowledge.embedding_batcher import embed_text_batched
+from app.features.knowledge.local_index import (
+    CORPUS_MATERIALS,
+    CORPUS_NOTES,
+    LocalVectorIndex,
+    get_local_index,
+)
 
 logger = logging.getLogger(__name__)
 
+# Hybrid search (RRF): số ứng viên mỗi nhánh (lexical / vector) trước khi hợp nhất
+HYBRID_CANDIDATE_COUNT = 30
+# Hằng số k trong công thức Reciprocal Rank Fusion: 1 / (k + rank)
+RRF_K = 60
+
+# MMR: over-fetch ứng viên rồi chọn tập đa dạng (chunk_overlap=200 → chunk lân cận rất giống nhau)
+MMR_CANDIDATE_COUNT = 30
+MMR_LAMBDA = 0.7  # 1.0 = chỉ relevance, 0.0 = chỉ diversity
+# Ghép 2 chunk liền kề: overlap hợp lệ phải dài ít nhất MIN và không quá MAX ký tự
+MIN_MERGE_OVERLAP = 20
+MAX_MERGE_OVERLAP = 400
+
+
+def _mmr_select(relevance: np.ndarray, doc_vectors: np.ndarray, k: int, lambda_mult: float = MMR_LAMBDA) -> list[int]:
+    """Maximal Marginal Relevance, vectorized with NumPy.
+
+    score(d) = λ·sim(q, d) − (1 − λ)·max_{s ∈ selected} sim(d, s)
+
+    Args:
+        relevance: Query relevance of each candidate in [0, 1], shape (n,).
+        doc_vectors: Candidate embeddings, shape (n, dim).
+        k: Number of candidates to select.
+
+    Returns:
+        Indices of selected candidates, in selection order.
+    """
+    n = doc_vectors.shape[0]
+    if n == 0 or k <= 0:
+        return []
+
+    norms = np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    docs = doc_vectors / norms
+    pairwise = docs @ docs.T
+
+    first = int(np.argmax(relevance))
+    selected = [first]
+    max_sim = pairwise[first].copy()
+    available = np.ones(n, dtype=bool)
+    available[first] = False
+
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_sim
+        scores[~available] = -np.inf
+        nxt = int(np.argmax(scores))
+        selected.append(nxt)
+        available[nxt] = False
+        np.maximum(max_sim, pairwise[nxt], out=max_sim)
+
+    return selected
+
+
+def _rrf_relevance(rows: list[dict]) -> np.ndarray:
+    """Hybrid RRF scores scaled by the best one, so MMR weighs them on a 0–1 scale like cosine."""
+    scores = np.asarray([r.get("rrf_score") or 0 for r in rows], dtype=np.float32)
+    top = scores.max(initial=0)
+    return scores / top if top > 0 else scores
+
+
+def _rrf_fuse(lexical: list[dict], semantic: list[dict], key: str, rrf_k: int = RRF_K) -> list[dict]:
+    """Reciprocal Rank Fusion of two ranked candidate lists, same output shape as the hybrid RPCs.
+
+    Args:
+        lexical: Full-text candidates carrying `lexical_rank` (1 = best).
+        semantic: Vector candidates, best first.
+        key: Row id column ("id" for notes, "chunk_id" for material chunks).
+    """
+    fused: dict[str, dict] = {}
+    for r in lexical:
+        fused[r[key]] = {**r, "similarity": None, "vector_rank": None,
+                         "rrf_score": 1.0 / (rrf_k + r["lexical_rank"])}
+    for rank, r in enumerate(semantic, start=1):
+        row = fused.get(r[key])
+        if row is None:
+            row = fused[r[key]] = {**r, "lexical_rank": None, "rrf_score": 0.0}
+        row["similarity"] = r.get("similarity")
+        row["vector_rank"] = rank
+        row["rrf_score"] += 1.0 / (rrf_k + rank)
+    return sorted(fused.values(), key=lambda r: r["rrf_score"], reverse=True)
+
+
+def _join_overlapping(prev: str, nxt: str) -> str:
+    """Concatenate two consecutive chunks, dropping the text they share."""
+    limit = min(len(prev), len(nxt), MAX_MERGE_OVERLAP)
+    for size in range(limit, MIN_MERGE_OVERLAP - 1, -1):
+        if prev.endswith(nxt[:size]):
+            return prev + nxt[size:]
+    return f"{prev}\n{nxt}"
+
+
+def _merge_adjacent_chunks(rows: list[dict]) -> list[dict]:
+    """Merge chunks of the same material with consecutive chunk_index into passages.
+
+    Returns passages sorted by their best fused score (`rrf_score`, ties broken
+    by similarity), each with the chunk/page range it covers.
+    """
+    by_material: dict[str, list[dict]] = {}
+    for r in rows:
+        by_material.setdefault(r.get("material_id"), []).append(r)
+
+    passages = []
+    for material_rows in by_material.values():
+        material_rows.sort(key=lambda r: r.get("chunk_index") or 0)
+        current = None
+        for r in material_rows:
+            idx = r.get("chunk_index") or 0
+            if current is not None and idx <= current["chunk_end"] + 1:
+                if idx > current["chunk_end"]:
+                    current["content"] = _join_overlapping(current["content"], r.get("content") or "")
+                    current["chunk_end"] = idx
+                    current["page_end"] = r.get("page_number") or current["page_end"]
+                current["similarity"] = max(current["similarity"], r.get("similarity") or 0)
+                current["rrf_score"] = max(current["rrf_score"], r.get("rrf_score") or 0)
+                continue
+            current = {
+                "material_id": r.get("material_id"),
+                "file_name": r.get("file_name"),
+                "domain": r.get("domain"),
+                "page_number": r.get("page_number"),
+                "page_end": r.get("page_number"),
+                "chunk_start": idx,
+                "chunk_end": idx,
+                "content": r.get("content") or "",
+                "similarity": r.get("similarity") or 0,
+                "rrf_score": r.get("rrf_score") or 0,
+            }
+            passages.append(current)
+
+    passages.sort(key=lambda p: (p["rrf_score"], p["similarity"]), reverse=True)
+    return passages
+
 
 class KnowledgeService:
     """Vector search operations using pgvector."""
@@ -36,7 +175,12 @@ class KnowledgeService:
             List of matching notes sorted by relevance.
         """
         # Generate query vector
-        query_vector = embed_text(query)
+        query_vector = embed_text_batched(query)
+
+        # Local in-process index (if enabled & synced) → skip the pgvector round trip
+        local = get_local_index(user_id, CORPUS_NOTES)
+        if local is not None and local.is_ready:
+            return local.search(query_vector, top_k, tags=tags)
 
         # Use Supabase RPC for pgvector cosine similarity search
         # We need a DB function for this — use raw SQL via rpc
@@ -70,7 +214,11 @@ class KnowledgeService:
         Returns:
             List of matching chunks with material metadata.
         """
-        query_vector = embed_text(query)
+        query_vector = embed_text_batched(query)
+
+        local = get_local_index(user_id, CORPUS_MATERIALS)
+        if local is not None and local.is_ready:
+            return local.search(query_vector, top_k, domain=domain)
 
         result = self.db.rpc(
             "search_materials_by_embedding",
@@ -83,3 +231,163 @@ class KnowledgeService:
         ).execute()
 
         return result.data if result.data else []
+
+    def hybrid_search_notes(
+        self,
+        user_id: str,
+        query: str,
+        top_k: int = 5,
+        tags: list[str] | None = None,
+    ) -> list[dict]:
+        """Hybrid search across quick_notes: full-text + vector, fused with RRF.
+
+        Both candidate lists and the fusion are computed server-side by the
+        `hybrid_search_notes` SQL function, so this is a single round trip.
+        With the local vector index ready, only the full-text branch goes to
+        Postgres and the fusion happens in-process.
+
+        Args:
+            user_id: Owner of the notes.
+            query: Natural language search query (also used as the FTS query).
+            top_k: Number of results to return.
+            tags: Optional tag filter.
+
+        Returns:
+            List of matching notes sorted by fused score (`rrf_score`).
+        """
+        query_vector = embed_text_batched(query)
+
+        local = get_local_index(user_id, CORPUS_NOTES)
+        if local is not None and local.is_ready:
+            return self._hybrid_with_local_index(
+                local, "lexical_search_notes", "id", query, query_vector, user_id, top_k,
+                filter_tags=tags,
+            )
+
+        result = self.db.rpc(
+            "hybrid_search_notes",
+            {
+                "query_text": query,
+                "query_embedding": query_vector,
+                "match_user_id": user_id,
+                "match_count": top_k,
+                "filter_tags": tags,
+                "candidate_count": HYBRID_CANDIDATE_COUNT,
+                "rrf_k": RRF_K,
+            },
+        ).execute()
+
+        return result.data if result.data else []
+
+    def hybrid_search_materials(
+        self,
+        user_id: str,
+        query: str,
+        top_k: int = 5,
+        domain: str | None = None,
+        include_embedding: bool = False,
+    ) -> list[dict]:
+        """Hybrid search across study material chunks: full-text + vector, fused with RRF.
+
+        Args:
+            user_id: Owner of the materials.
+            query: Natural language search query (also used as the FTS query).
+            top_k: Number of results to return.
+            domain: Optional domain filter (study, work, personal, other).
+            include_embedding: Also return each chunk's embedding (for re-ranking).
+
+        Returns:
+            List of matching chunks with material metadata, sorted by `rrf_score`.
+        """
+        query_vector = embed_text_batched(query)
+
+        local = get_local_index(user_id, CORPUS_MATERIALS)
+        if local is not None and local.is_ready:
+            return self._hybrid_with_local_index(
+                local, "lexical_search_materials", "chunk_id", query, query_vector, user_id, top_k,
+                include_embedding=include_embedding, filter_domain=domain,
+            )
+
+        result = self.db.rpc(
+            "hybrid_search_materials",
+            {
+                "query_text": query,
+                "query_embedding": query_vector,
+                "match_user_id": user_id,
+                "match_count": top_k,
+                "filter_domain": domain,
+                "candidate_count": HYBRID_CANDIDATE_COUNT,
+                "rrf_k": RRF_K,
+                "include_embedding": include_embedding,
+            },
+        ).execute()
+
+        return result.data if result.data else []
+
+    def _hybrid_with_local_index(
+        self,
+        local: LocalVectorIndex,
+        lexical_rpc: str,
+        key: str,
+        query: str,
+        query_vector: list[float],
+        user_id: str,
+        top_k: int,
+        include_embedding: bool = False,
+        filter_tags: list[str] | None = None,
+        filter_domain: str | None = None,
+    ) -> list[dict]:
+        """Hybrid search whose vector branch is answered by the local index.
+
+        Postgres only runs the full-text branch (`lexical_rpc`, migration 015);
+        RRF fusion, similarity and (optionally) embeddings come from the index.
+        """
+        params = {"query_text": query, "match_user_id": user_id, "candidate_count": HYBRID_CANDIDATE_COUNT}
+        if key == "id":
+            params["filter_tags"] = filter_tags
+        else:
+            params["filter_domain"] = filter_domain
+        lexical = self.db.rpc(lexical_rpc, params).execute().data or []
+        semantic = local.search(query_vector, HYBRID_CANDIDATE_COUNT, tags=filter_tags, domain=filter_domain)
+
+        fused = _rrf_fuse(lexical, semantic, key)[:top_k]
+        known = local.lookup([r[key] for r in fused], query_vector)
+        for r in fused:
+            # Chunk / note mới chưa kịp sync vào index → similarity / embedding = None
+            similarity, vector = known.get(r[key], (None, None))
+            r["similarity"] = similarity
+            if include_embedding:
+                r["embedding"] = vector
+        return fused
+
+    def search_materials_diverse(
+        self,
+        user_id: str,
+        query: str,
+        top_k: int = 5,
+        domain: str | None = None,
+    ) -> list[dict]:
+        """Hybrid search → MMR de-duplication → merge adjacent chunks.
+
+        Over-fetches MMR_CANDIDATE_COUNT chunks, keeps the `top_k` most relevant
+        yet mutually diverse ones, then stitches chunks with consecutive
+        chunk_index into a single passage (removing the shared overlap).
+
+        Returns:
+            Passages (<= top_k) with material metadata and chunk/page ranges.
+        """
+        candidates = [
+            r for r in self.hybrid_search_materials(
+                user_id, query, top_k=MMR_CANDIDATE_COUNT, domain=domain, include_embedding=True,
+            )
+            if r.get("embedding") is not None
+        ]
+        if not candidates:
+            return []
+
+        vectors = np.asarray([parse_pgvector(r.pop("embedding")) for r in candidates], dtype=np.float32)
+        # Relevance = điểm RRF (lexical + vector), không chỉ cosine → giữ kết quả khớp từ khóa
+        relevance = _rrf_relevance(candidates)
+        picked = _mmr_select(relevance, vectors, top_k)
+
+        return _merge_adjacent_chunks([candidates[i] for i in picked])
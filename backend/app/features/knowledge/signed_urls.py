@@ -0,0 +1,112 @@
+"""
+Knowledge feature: Batched, cached signed download URLs.
+
+Danh sách tài liệu từng gọi create_signed_url tuần tự cho mỗi file (50 file = 50
+round-trip tới Storage mỗi lần refresh dashboard), dù URL có hạn 1 giờ.
+Module này:
+  1. Giữ cache storage_path → (signed_url, expires_at) trong process, trả lại URL
+     cho tới khi còn SIGNED_URL_REFRESH_MARGIN giây trước khi hết hạn.
+  2. Ký tất cả path chưa có trong cache bằng MỘT lệnh create_signed_urls.
+→ Độ trễ listing không còn phụ thuộc số file trong trang.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SIGNED_URL_TTL = 3600  # Thời hạn URL cấp cho client
+SIGNED_URL_REFRESH_MARGIN = 300  # Ký lại khi URL còn ít hơn 5 phút
+SIGNED_URL_CACHE_SIZE = 10_000
+
+
+class SignedUrlCache:
+    """Thread-safe LRU of signed URLs keyed by (bucket, storage_path)."""
+
+    def __init__(self, max_entries: int = SIGNED_URL_CACHE_SIZE, refresh_margin: int = SIGNED_URL_REFRESH_MARGIN):
+        self.max_entries = max_entries
+        self.refresh_margin = refresh_margin
+        self._entries: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bucket: str, path: str, now: float | None = None) -> str | None:
+        now = now if now is not None else time.time()
+        key = (bucket, path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            url, expires_at = entry
+            if expires_at - self.refresh_margin <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return url
+
+    def put(self, bucket: str, path: str, url: str, expires_at: float):
+        with self._lock:
+            self._entries[(bucket, path)] = (url, expires_at)
+            self._entries.move_to_end((bucket, path))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bucket: str, path: str):
+        with self._lock:
+            self._entries.pop((bucket, path), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = SignedUrlCache()
+
+
+def get_signed_url_cache() -> SignedUrlCache:
+    return _cache
+
+
+def get_signed_urls(db, bucket: str, paths: list[str], expires_in: int = SIGNED_URL_TTL) -> dict[str, str | None]:
+    """Signed download URLs for many storage paths with at most one Storage call.
+
+    Args:
+        db: Supabase client.
+        bucket: Storage bucket name.
+        paths: Storage paths (duplicates allowed).
+        expires_in: Lifetime of newly signed URLs, in seconds.
+
+    Returns:
+        { path: signed_url or None if signing failed }
+    """
+    now = time.time()
+    result: dict[str, str | None] = {}
+    missing: list[str] = []
+    for path in dict.fromkeys(paths):
+        cached = _cache.get(bucket, path, now)
+        if cached:
+            result[path] = cached
+        else:
+            missing.append(path)
+
+    if not missing:
+        return result
+
+    try:
+        signed = db.storage.from_(bucket).create_signed_urls(missing, expires_in)
+    except Exception as e:
+        logger.warning(f"Could not generate signed URLs for {len(missing)} files: {e}")
+        signed = []
+
+    expires_at = now + expires_in
+    by_path = {item.get("path"): item for item in signed}
+    for path in missing:
+        item = by_path.get(path) or {}
+        url = None if item.get("error") else (item.get("signedURL") or item.get("signedUrl"))
+        if url:
+            _cache.put(bucket, path, url, expires_at)
+        elif item:
+            logger.warning(f"Could not generate signed URL for {path}: {item.get('error')}")
+        result[path] = url
+    return result
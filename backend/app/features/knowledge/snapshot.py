@@ -0,0 +1,297 @@
+"""
+Knowledge feature: Compact knowledge-base snapshot export / import.
+
+Chuyển hoặc khôi phục kho kiến thức của một user mà KHÔNG phải extract + embed lại:
+export ghi study_materials, material_chunks và quick_notes (kèm embedding) vào một
+file NPZ dạng cột:
+
+  manifest             ← JSON (uint8): format, version, dim, số dòng mỗi bảng
+  {table}_columns      ← zstd(JSON {cột: [giá trị...]}) — text + metadata, không có vector
+  {table}_embedding    ← float16 (n, dim), dòng không có vector = 0
+  {table}_has_embedding← bool (n,)
+
+với {table} ∈ materials, chunks, notes. Float16 + zstd → ~1.6KB / chunk thay vì
+~15KB JSON của pgvector.
+
+Import đọc bundle, cấp UUID mới (hoặc giữ nguyên id khi khôi phục vào môi trường
+trống) và ghi bằng insert theo lô IMPORT_BATCH_SIZE dòng.
+File gốc trên Storage KHÔNG nằm trong snapshot — chỉ dữ liệu RAG đã xử lý — nên
+tài liệu import có file_url = NULL (không trỏ vào object Storage của ai cả).
+Bundle là input không tin cậy: manifest / mảng được kiểm tra (lỗi → ValueError → 400),
+phần text giải nén bị giới hạn tổng max_text_bytes (chống zstd bomb), mỗi dòng chỉ
+giữ các cột trong *_COLUMNS, và chunk chỉ được gắn vào tài liệu nằm trong chính bundle
+đó. Insert lỗi giữa chừng → xóa các tài liệu / ghi chú đã ghi (chunk đi theo CASCADE).
+"""
+
+import io
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import zstandard
+
+from app.features.knowledge.embedding import parse_pgvector
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "kb-snapshot"
+SNAPSHOT_VERSION = 1
+EXPORT_PAGE_SIZE = 500
+IMPORT_BATCH_SIZE = 200  # ~3MB JSON / lô với vector 768 chiều
+ZSTD_LEVEL = 10
+
+MATERIAL_COLUMNS = (
+    "id", "file_name", "file_type", "file_url", "file_size_bytes", "domain", "subject",
+    "semester", "tags", "description", "processing_status", "chunk_count", "created_at",
+)
+CHUNK_COLUMNS = ("id", "material_id", "content", "chunk_index", "page_number", "section_title", "created_at")
+NOTE_COLUMNS = (
+    "id", "content", "note_type", "tags", "url", "related_subject",
+    "is_pinned", "is_archived", "embedding_status", "created_at",
+)
+
+
+# ── Encoding ─────────────────────────────────────────────
+
+def _pack_columns(rows: list[dict], columns: tuple[str, ...]) -> np.ndarray:
+    table = {col: [row.get(col) for row in rows] for col in columns}
+    raw = json.dumps(table, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return np.frombuffer(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw), dtype=np.uint8)
+
+
+def _unpack_columns(blob: np.ndarray, budget: list[int] | None = None) -> list[dict]:
+    """Decompress one column table. `budget` = [bytes left], shared across tables."""
+    # Đọc dạng stream với trần cứng — không tin content size khai báo trong frame
+    limit = budget[0] if budget is not None else None
+    with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(blob.tobytes())) as reader:
+        raw = reader.read() if limit is None else reader.read(limit + 1)
+    if limit is not None:
+        if len(raw) > limit:
+            raise ValueError("Snapshot text exceeds the allowed decompressed size")
+        budget[0] -= len(raw)
+
+    table = json.loads(raw)
+    if not isinstance(table, dict) or not all(isinstance(v, list) for v in table.values()):
+        raise ValueError("Malformed snapshot column table")
+    columns = list(table)
+    count = len(table[columns[0]]) if columns else 0
+    if any(len(table[col]) != count for col in columns):
+        raise ValueError("Snapshot columns have different lengths")
+    return [{col: table[col][i] for col in columns} for i in range(count)]
+
+
+def _pack_embeddings(rows: list[dict], dim: int) -> tuple[np.ndarray, np.ndarray]:
+    matrix = np.zeros((len(rows), dim), dtype=np.float16)
+    mask = np.zeros(len(rows), dtype=bool)
+    for i, row in enumerate(rows):
+        vector = parse_pgvector(row.get("embedding"))
+        if vector is not None and len(vector) == dim:
+            matrix[i] = vector
+            mask[i] = True
+    return matrix, mask
+
+
+def write_snapshot(fileobj, user_id: str, dim: int, materials: list[dict], chunks: list[dict], notes: list[dict]) -> dict:
+    """Serialize rows (as returned by PostgREST) into an NPZ bundle. Returns the manifest."""
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "dim": dim,
+        "source_user_id": user_id,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "counts": {"materials": len(materials), "chunks": len(chunks), "notes": len(notes)},
+    }
+    arrays = {"manifest": np.frombuffer(json.dumps(manifest).encode("utf-8"), dtype=np.uint8)}
+    arrays["materials_columns"] = _pack_columns(materials, MATERIAL_COLUMNS)
+    for name, rows, columns in (("chunks", chunks, CHUNK_COLUMNS), ("notes", notes, NOTE_COLUMNS)):
+        arrays[f"{name}_columns"] = _pack_columns(rows, columns)
+        arrays[f"{name}_embedding"], arrays[f"{name}_has_embedding"] = _pack_embeddings(rows, dim)
+    # Vector float16 và text zstd đã nén sẵn → savez thường (không deflate lần nữa)
+    np.savez(fileobj, **arrays)
+    return manifest
+
+
+def read_snapshot(fileobj, max_text_bytes: int | None = None) -> dict:
+    """Load an NPZ bundle into { manifest, materials, chunks, notes } with float32 embeddings.
+
+    Args:
+        max_text_bytes: Cap on the total decompressed size of the column tables.
+
+    Raises:
+        ValueError: Not a snapshot file, unsupported version or malformed content.
+    """
+    try:
+        bundle = np.load(fileobj, allow_pickle=False)
+        manifest = json.loads(bundle["manifest"].tobytes())
+    except Exception as e:
+        raise ValueError(f"Not a knowledge-base snapshot: {e}")
+    if not isinstance(manifest, dict):
+        raise ValueError("Not a knowledge-base snapshot: manifest is not an object")
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot format/version: {manifest.get('format')} v{manifest.get('version')}")
+    dim = manifest.get("dim")
+    if not isinstance(dim, int) or isinstance(dim, bool) or dim <= 0:
+        raise ValueError(f"Snapshot manifest has no valid embedding dimension: {dim!r}")
+
+    budget = [max_text_bytes] if max_text_bytes is not None else None
+    try:
+        data = {"manifest": manifest, "materials": _unpack_columns(bundle["materials_columns"], budget)}
+        for name in ("chunks", "notes"):
+            rows = _unpack_columns(bundle[f"{name}_columns"], budget)
+            matrix = bundle[f"{name}_embedding"]
+            mask = bundle[f"{name}_has_embedding"]
+            if matrix.shape != (len(rows), dim) or mask.shape != (len(rows),):
+                raise ValueError(f"Snapshot {name} embeddings do not match its rows")
+            matrix = matrix.astype(np.float32)
+            for i, row in enumerate(rows):
+                row["embedding"] = matrix[i].tolist() if mask[i] else None
+            data[name] = rows
+    except ValueError:
+        raise
+    except Exception as e:
+        # Thiếu mảng (KeyError), frame zstd / JSON hỏng...
+        raise ValueError(f"Corrupt knowledge-base snapshot: {e}")
+    for name in ("materials", "chunks", "notes"):
+        if not all(isinstance(row.get("id"), str) for row in data[name]):
+            raise ValueError(f"Snapshot {name} rows need a string id")
+    return data
+
+
+# ── Supabase I/O ─────────────────────────────────────────
+
+def _fetch_all(query_factory) -> list[dict]:
+    """Keyset-paginate on id (order by id, id > last)."""
+    rows: list[dict] = []
+    last_id = None
+    while True:
+        query = query_factory()
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.order("id").limit(EXPORT_PAGE_SIZE).execute().data or []
+        rows.extend(page)
+        if len(page) < EXPORT_PAGE_SIZE:
+            return rows
+        last_id = page[-1]["id"]
+
+
+def export_snapshot(db, user_id: str, fileobj, dim: int) -> dict:
+    """Export a user's materials, chunks and notes (with embeddings) to `fileobj`.
+
+    Returns:
+        The manifest (includes row counts).
+    """
+    materials = _fetch_all(lambda: (
+        db.table("study_materials").select(", ".join(MATERIAL_COLUMNS)).eq("user_id", user_id)
+    ))
+    chunks = _fetch_all(lambda: (
+        db.table("material_chunks")
+        .select(", ".join(CHUNK_COLUMNS) + ", embedding, study_materials!inner(user_id)")
+        .eq("study_materials.user_id", user_id)
+    ))
+    notes = _fetch_all(lambda: (
+        db.table("quick_notes").select(", ".join(NOTE_COLUMNS) + ", embedding").eq("user_id", user_id)
+    ))
+    manifest = write_snapshot(fileobj, user_id, dim, materials, chunks, notes)
+    logger.info(f"📦 Exported knowledge snapshot for {user_id}: {manifest['counts']}")
+    return manifest
+
+
+def _whitelist(row: dict, columns: tuple[str, ...]) -> dict:
+    return {col: row[col] for col in columns if col in row}
+
+
+def _insert_batches(db, table: str, rows: list[dict]) -> int:
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        db.table(table).insert(rows[start:start + IMPORT_BATCH_SIZE]).execute()
+    return len(rows)
+
+
+def _delete_batches(db, table: str, user_id: str, ids: list[str]):
+    for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+        db.table(table).delete().eq("user_id", user_id).in_("id", ids[start:start + IMPORT_BATCH_SIZE]).execute()
+
+
+def import_snapshot(
+    db, user_id: str, fileobj, dim: int, keep_ids: bool = False, max_text_bytes: int | None = None,
+) -> dict:
+    """Insert a snapshot's rows for `user_id` with batched inserts (no embedding calls).
+
+    Args:
+        keep_ids: Reuse the exported UUIDs (restore into an empty environment).
+            By default new UUIDs are issued so a snapshot can be imported next to existing data.
+        max_text_bytes: Cap on the decompressed text of the bundle (see read_snapshot).
+
+    Returns:
+        dict: { "materials": int, "chunks": int, "notes": int }
+
+    Raises:
+        ValueError: Invalid snapshot or embedding dimension mismatch.
+        Exception: An insert failed; rows written so far have been removed.
+    """
+    data = read_snapshot(fileobj, max_text_bytes)
+    if data["manifest"]["dim"] != dim:
+        raise ValueError(f"Snapshot embedding dimension {data['manifest']['dim']} != configured {dim}")
+
+    id_map: dict[str, str] = {}
+
+    def new_id(old: str) -> str:
+        if keep_ids:
+            return old
+        return id_map.setdefault(old, str(uuid.uuid4()))
+
+    # Chunk trỏ tới material_id ngoài bundle (vd. tài liệu của user khác) bị bỏ
+    bundle_material_ids = {row["id"] for row in data["materials"]}
+    bundle_chunks = [row for row in data["chunks"] if row.get("material_id") in bundle_material_ids]
+    chunk_counts: dict[str, int] = {}
+    for chunk in bundle_chunks:
+        chunk_counts[chunk["material_id"]] = chunk_counts.get(chunk["material_id"], 0) + 1
+
+    materials = []
+    for row in data["materials"]:
+        has_chunks = chunk_counts.get(row["id"], 0) > 0
+        materials.append({
+            **_whitelist(row, MATERIAL_COLUMNS),
+            "id": new_id(row["id"]),
+            "user_id": user_id,
+            "file_url": None,  # Không có file gốc trong snapshot
+            # Tài liệu chưa xử lý xong không có chunk → 'failed'
+            "processing_status": "success" if has_chunks else "failed",
+            "chunk_count": chunk_counts.get(row["id"], 0),
+        })
+    chunks = [
+        {
+            **_whitelist(row, CHUNK_COLUMNS + ("embedding",)),
+            "id": new_id(row["id"]),
+            "material_id": new_id(row["material_id"]),
+        }
+        for row in bundle_chunks
+    ]
+    notes = [
+        {
+            **_whitelist(row, NOTE_COLUMNS + ("embedding",)),
+            "id": new_id(row["id"]),
+            "user_id": user_id,
+            "embedding_status": "success" if row.get("embedding") else "pending",
+        }
+        for row in data["notes"]
+    ]
+
+    try:
+        counts = {
+            "materials": _insert_batches(db, "study_materials", materials),
+            "chunks": _insert_batches(db, "material_chunks", chunks),
+            "notes": _insert_batches(db, "quick_notes", notes),
+        }
+    except Exception as e:
+        # Không để lại snapshot nhập dở: xóa tài liệu (chunk theo CASCADE) và ghi chú đã ghi
+        logger.error(f"❌ Snapshot import failed for {user_id}, rolling back: {e}")
+        try:
+            _delete_batches(db, "quick_notes", user_id, [n["id"] for n in notes])
+            _delete_batches(db, "study_materials", user_id, [m["id"] for m in materials])
+        except Exception as cleanup_error:
+            logger.error(f"❌ Could not roll back snapshot import for {user_id}: {cleanup_error}")
+        raise
+    logger.info(f"📥 Imported knowledge snapshot for {user_id}: {counts}")
+    return counts
@@ -17,7 +17,7 @@ def search_memories(
     tags: list[str] | None = None,
     user_id: Annotated[str, InjectedToolArg] = "",
 ) -> str:
-    """Tìm kiếm trong ký ức/ghi chú của chủ nhân bằng ngữ nghĩa (semantic search).
+    """Tìm kiếm trong ký ức/ghi chú của chủ nhân (kết hợp từ khóa + ngữ nghĩa).
     Dùng khi chủ nhân hỏi về thông tin đã từng lưu trữ, ví dụ:
     - "Hôm trước tao bảo lưu cái gì ấy nhỉ?"
     - "Mật khẩu wifi gì ấy?"
@@ -33,7 +33,8 @@ def search_memories(
     db = get_db()
     service = KnowledgeService(db)
 
-    results = service.search_notes_by_vector(
+    # Hybrid (full-text + vector, RRF) — khớp cả từ khóa chính xác lẫn ngữ nghĩa
+    results = service.hybrid_search_notes(
         user_id=user_id,
         query=query,
         top_k=5,
@@ -55,7 +56,7 @@ def search_memories(
             "note_type": r.get("note_type"),
             "tags": r.get("tags", []),
             "created_at": r.get("created_at"),
-            "similarity": round(r.get("similarity", 0), 4),
+            "similarity": round(r.get("similarity") or 0, 4),
         })
 
     return json.dumps({
@@ -100,9 +101,9 @@ def save_memory(
         tags=tags or [],
     )
 
-    # Trigger embedding calculation (synchronous inside tool since agent runs in background)
-    from app.background.embedding_tasks import process_note_embedding
-    process_note_embedding(note["id"], content)
+    # Embedding chạy nền theo lô — không chặn lượt trả lời của agent
+    from app.background.embedding_tasks import enqueue_note_embedding
+    enqueue_note_embedding(note["id"], content)
 
     return json.dumps({
         "status": "success",
@@ -136,13 +137,15 @@ def search_study_materials(
             - 'other': Tạp hóa các loại tài liệu không phân loại được.
             
     Returns:
-        Danh sách 5 đoạn văn bản (chunks) liên quan nhất trích từ các tài liệu, kèm theo tên file.
+        Tối đa 5 đoạn văn bản liên quan nhất, đa dạng và không trùng lặp (các chunk liền kề
+        đã được gộp), kèm theo tên file và số trang.
         Agent cần đọc các đoạn trích này để tổng hợp câu trả lời cho người dùng.
     """
     db = get_db()
     service = KnowledgeService(db)
 
-    results = service.search_materials_by_vector(
+    # Hybrid search + MMR: loại các chunk lân cận trùng lặp, gộp chunk liền kề thành 1 đoạn
+    results = service.search_materials_diverse(
         user_id=user_id,
         query=query,
         top_k=5,
@@ -158,27 +161,27 @@ def search_study_materials(
 
     chunks = []
     for r in results:
+        pages = r.get("page_number")
+        if r.get("page_end") and r.get("page_end") != pages:
+            pages = f"{pages}-{r['page_end']}"
         chunks.append({
             "file_name": r.get("file_name"),
             "domain": r.get("domain"),
-            "page_number": r.get("page_number"),
+            "page_number": pages,
             "content": r.get("content"),
-            "similarity": round(r.get("similarity", 0), 4),
+            "similarity": round(r.get("similarity") or 0, 4),
         })
 
     return json.dumps({
         "status": "success",
-        "message": f"Tìm thấy {len(chunks)} đoạn tài liệu mã hóa bằng vector liên quan nhất.",
+        "message": f"Tìm thấy {len(chunks)} đoạn tài liệu liên quan nhất (đã loại trùng lặp).",
         "chunks": chunks,
     }, ensure_ascii=False)
 
 
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 from app.core.database import get_supabase_client
+from app.features.knowledge.file_io import content_type_for
 
-# Thread pool for background document processing (RAG pipeline)
-_doc_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rag_pipeline")
 
 @tool
 async def save_temp_document_to_knowledge_base(
@@ -208,8 +211,7 @@ async def save_temp_document_to_knowledge_base(
         # 1. Luân chuyển file từ nhánh /temp sang /domain cố định
         db.storage.from_("knowledge-base").move(old_path, new_path)
         
-        # Determine content type manually
-        content_type = "application/pdf" if file_name.endswith(".pdf") else "application/vnd.openxmlformats-officedocument.wordprocessingml.document" if file_name.endswith(".docx") else "text/plain"
+        content_type = content_type_for(file_name)
 
         # 2. Tạo bản ghi quản lý vào bảng study_materials
         insert_data = {
@@ -223,18 +225,13 @@ async def save_temp_document_to_knowledge_base(
         res_db = db.table("study_materials").insert(insert_data).execute()
         material_id = res_db.data[0]["id"]
         
-        # 3. Tải nội dung bytes về để chạy RAG
-        file_res = db.storage.from_("knowledge-base").download(new_path)
-        
-        # 4. Kích hoạt Background Task chạy RAG (Chunking + Embedding)
-        # Dùng ThreadPoolExecutor thay vì bare threading.Thread cho lifecycle management tốt hơn
-        from app.background.document_tasks import process_document_pipeline
-        
-        loop = asyncio.get_event_loop()
-        loop.run_in_executor(
-            _doc_executor,
-            process_document_pipeline,
-            material_id, user_id, file_res, file_name, content_type,
+        # 3. Đưa job RAG (Chunking + Embedding) vào hàng đợi bền vững
+        from app.background.job_queue import enqueue_job, JOB_INGEST_DOCUMENT
+        enqueue_job(
+            JOB_INGEST_DOCUMENT,
+            {"material_id": material_id},
+            user_id=user_id,
+            idempotency_key=f"ingest:{material_id}",
         )
         
         return json.dumps({
@@ -344,5 +341,88 @@ def delete_study_material(
     }, ensure_ascii=False)
 
 
+from app.features.knowledge.bulk import bulk_delete_materials, bulk_promote_temp_files, bulk_reindex_materials
+
+
+def _bulk_tool_result(results: list[dict], done_status: str, done_label: str) -> str:
+    done = [r for r in results if r["status"] == done_status]
+    return json.dumps({
+        "status": "success" if done else "error",
+        "message": f"{done_label} {len(done)}/{len(results)} mục.",
+        "results": results,
+    }, ensure_ascii=False)
+
+
+@tool
+def delete_study_materials(
+    material_ids: list[str],
+    user_id: Annotated[str, InjectedToolArg] = "",
+) -> str:
+    """Xóa vĩnh viễn NHIỀU tài liệu khỏi Knowledge Base trong một lần (vd: dọn tài liệu cả học kỳ).
+    QUAN TRỌNG: Gọi find_study_materials trước để lấy material_id, liệt kê đủ tên các file
+    sẽ bị xóa và chờ user xác nhận danh sách rồi mới gọi tool này.
+
+    Args:
+        material_ids: Danh sách UUID tài liệu (tối đa 100), lấy từ find_study_materials.
+
+    Returns:
+        Kết quả từng tài liệu: deleted / not_found / error.
+    """
+    try:
+        results = bulk_delete_materials(get_supabase_client(), user_id, material_ids)
+    except ValueError as e:
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+    return _bulk_tool_result(results, "deleted", "Đã xóa")
+
+
+@tool
+def save_temp_documents_to_knowledge_base(
+    storage_paths: list[str],
+    domain: Literal['study', 'work', 'personal', 'other'],
+    user_id: Annotated[str, InjectedToolArg] = "",
+) -> str:
+    """Lưu vĩnh viễn NHIỀU file đính kèm tạm thời vào kho kiến thức trong một lần.
+    Dùng khi user gửi nhiều file [SYS_FILE: ...] và muốn lưu tất cả vào cùng một thư mục.
+
+    Args:
+        storage_paths: Danh sách giá trị "Path:" lấy nguyên văn từ các thẻ [SYS_FILE: ... - Path: ...].
+        domain: Thư mục đích: 'study', 'work', 'personal', 'other'.
+
+    Returns:
+        Kết quả từng file: queued (đang nhúng vector chạy ngầm) / error.
+    """
+    items = [{"storage_path": path, "domain": domain} for path in storage_paths]
+    try:
+        results = bulk_promote_temp_files(get_supabase_client(), user_id, items)
+    except ValueError as e:
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+    return _bulk_tool_result(results, "queued", "Đã đưa vào hàng đợi lưu")
+
+
+@tool
+def reindex_study_materials(
+    material_ids: list[str],
+    user_id: Annotated[str, InjectedToolArg] = "",
+) -> str:
+    """Xử lý lại (băm + nhúng vector lại) các tài liệu trong kho, vd khi tài liệu bị lỗi
+    xử lý ('failed') hoặc user muốn AI "học lại" file.
+
+    Args:
+        material_ids: Danh sách UUID tài liệu (tối đa 100), lấy từ find_study_materials.
+
+    Returns:
+        Kết quả từng tài liệu: queued / skipped (đang xử lý) / not_found / error.
+    """
+    try:
+        results = bulk_reindex_materials(get_supabase_client(), user_id, material_ids)
+    except ValueError as e:
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+    return _bulk_tool_result(results, "queued", "Đã đưa vào hàng đợi xử lý lại")
+
+
 # Export all knowledge tools for the agent graph
-knowledge_tools = [search_memories, save_memory, search_study_materials, save_temp_document_to_knowledge_base, find_study_materials, delete_study_material]
+knowledge_tools = [
+    search_memories, save_memory, search_study_materials, save_temp_document_to_knowledge_base,
+    find_study_materials, delete_study_material,
+    delete_study_materials, save_temp_documents_to_knowledge_base, reindex_study_materials,
+]
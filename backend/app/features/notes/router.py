@@ -2,6 +2,8 @@
 Notes feature: API routes for quick note management.
 """
 
+import asyncio
+
 from fastapi import APIRouter, Depends, BackgroundTasks
 from supabase import Client
 
@@ -43,8 +45,8 @@ async def create_note(
         related_subject=data.related_subject,
     )
     # Background: generate embedding vector (non-blocking) and track status
-    from app.background.embedding_tasks import process_note_embedding
-    background_tasks.add_task(process_note_embedding, note["id"], data.content)
+    from app.background.embedding_tasks import enqueue_note_embedding
+    background_tasks.add_task(enqueue_note_embedding, note["id"], data.content)
     return {"data": note}
 
 
@@ -55,9 +57,10 @@ async def search_notes(
     user_id: str = Depends(get_current_user_id),
     db: Client = Depends(get_db),
 ):
-    """Search notes by keyword and/or tags."""
+    """Search notes by keyword + meaning (hybrid RRF) and/or tags."""
     service = NotesService(db)
-    notes = service.search_notes(user_id, query, tags)
+    # Embed câu query là lời gọi chặn → chạy ngoài event loop
+    notes = await asyncio.to_thread(service.search_notes, user_id, query, tags)
     return {"data": notes}
 
 
@@ -74,7 +77,8 @@ async def update_note(
     note = service.update_note(user_id, note_id, data.model_dump())
     # Re-embed if content was updated
     if data.content is not None and note:
-        background_tasks.add_task(service.embed_note, note["id"], data.content)
+        from app.background.embedding_tasks import enqueue_note_embedding
+        background_tasks.add_task(enqueue_note_embedding, note["id"], data.content)
     return {"data": note}
 
 
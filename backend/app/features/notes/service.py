@@ -4,9 +4,11 @@ Notes feature: Service layer for quick notes management.
 
 from supabase import Client
 
+from app.features.knowledge.service import KnowledgeService
+
 
 class NotesService:
-    """CRUD operations for quick notes with keyword search."""
+    """CRUD operations for quick notes with hybrid (keyword + semantic) search."""
 
     def __init__(self, db: Client):
         self.db = db
@@ -57,25 +59,26 @@ class NotesService:
         return result.data
 
     def search_notes(self, user_id: str, query: str, tags: list[str] | None = None) -> list[dict]:
-        """Search notes by keyword (ILIKE) and/or tags.
-        
-        Phase 2: Simple keyword search.
-        Phase 2.5: Will add cosine similarity on embedding column.
+        """Search notes with the hybrid full-text + vector RPC (RRF), best match first.
+
+        Ranking comes from `hybrid_search_notes` (GIN full-text index + pgvector);
+        the full rows are then read back by primary key so callers keep getting
+        every column (url, related_subject, ...). `tags` matches notes sharing any tag.
         """
-        db_query = (
+        ranked = KnowledgeService(self.db).hybrid_search_notes(user_id, query, top_k=10, tags=tags)
+        if not ranked:
+            return []
+
+        ids = [r["id"] for r in ranked]
+        result = (
             self.db.table("quick_notes")
             .select("*")
             .eq("user_id", user_id)
-            .eq("is_archived", False)
-            .ilike("content", f"%{query}%")
+            .in_("id", ids)
+            .execute()
         )
-
-        if tags:
-            # PostgreSQL array contains operator
-            db_query = db_query.contains("tags", tags)
-
-        result = db_query.order("created_at", desc=True).limit(10).execute()
-        return result.data
+        by_id = {row["id"]: row for row in (result.data or [])}
+        return [by_id[note_id] for note_id in ids if note_id in by_id]
 
     def update_note(self, user_id: str, note_id: str, update_data: dict) -> dict | None:
         """Update an existing note."""
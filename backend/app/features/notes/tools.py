@@ -66,7 +66,7 @@ def search_notes(
     Dùng khi chủ nhân hỏi về thông tin đã note/lưu lại trước đây.
 
     Args:
-        query: Từ khóa tìm kiếm
+        query: Câu hỏi hoặc từ khóa tìm kiếm (khớp cả từ khóa lẫn ngữ nghĩa)
 
     Returns:
         Danh sách ghi chú phù hợp.
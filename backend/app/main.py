@@ -13,7 +13,13 @@ from fastapi.responses import JSONResponse
 
 from app.config import get_settings
 from app.core.exceptions import AppBaseError
+from app.core.upload_limit import UploadLimitMiddleware
+from app.core.zalo_outbox import close_zalo_outbox, get_zalo_outbox
 from app.background.scheduler import init_scheduler, shutdown_scheduler
+from app.background.job_queue import start_job_worker, stop_job_worker
+from app.features.academic.session_pool import close_school_sessions
+from app.features.academic.resilience import get_school_api_guard
+from app.features.academic.school_clock import get_school_clock
 
 # ── Feature Routers ──────────────────────────────────────
 from app.features.auth.router import router as auth_router
@@ -22,6 +28,7 @@ from app.features.agent.router import router as agent_router
 from app.features.tasks.router import router as tasks_router
 from app.features.notes.router import router as notes_router
 from app.features.calendar.router import router as calendar_router
+from app.features.agenda.router import router as agenda_router
 from app.features.knowledge.router import router as knowledge_router
 from app.features.iot.router import router as iot_router
 
@@ -41,10 +48,20 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ Scheduler init failed (non-critical): {e}")
 
+    # Start durable job worker (ingestion, note embedding, Zalo messages)
+    try:
+        start_job_worker()
+        print(f"👷 Job worker started (concurrency={settings.JOB_WORKER_CONCURRENCY}).")
+    except Exception as e:
+        print(f"⚠️ Job worker start failed: {e}")
+
     yield
 
     # Graceful shutdown
+    await stop_job_worker()
     shutdown_scheduler()
+    await close_school_sessions()
+    await close_zalo_outbox()
     print("👋 Shutting down...")
 
 
@@ -69,6 +86,16 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # ── Upload body limits (reject before multipart parsing) ──
+    app.add_middleware(
+        UploadLimitMiddleware,
+        limits={
+            "/api/knowledge/upload": settings.KB_UPLOAD_MAX_MB * 1024 * 1024,
+            "/api/knowledge/extract-text": settings.KB_TEMP_UPLOAD_MAX_MB * 1024 * 1024,
+            "/api/knowledge/import": settings.KB_SNAPSHOT_MAX_MB * 1024 * 1024,
+        },
+    )
+
     # ── Global Exception Handler ─────────────────────────
     @app.exception_handler(AppBaseError)
     async def app_error_handler(request: Request, exc: AppBaseError):
@@ -88,6 +115,7 @@ def create_app() -> FastAPI:
     app.include_router(tasks_router, prefix="/api/tasks", tags=["Tasks"])
     app.include_router(notes_router, prefix="/api/notes", tags=["Notes"])
     app.include_router(calendar_router, prefix="/api/calendar", tags=["Calendar"])
+    app.include_router(agenda_router, prefix="/api/agenda", tags=["Agenda"])
     app.include_router(knowledge_router, prefix="/api/knowledge", tags=["Knowledge"])
     app.include_router(iot_router, prefix="/api", tags=["IoT Devices"])
 
@@ -99,6 +127,9 @@ def create_app() -> FastAPI:
             "status": "healthy",
             "app": settings.APP_NAME,
             "version": settings.APP_VERSION,
+            "school_api": get_school_api_guard().snapshot(),
+            "school_clock": get_school_clock().snapshot(),
+            "zalo_outbox": get_zalo_outbox().snapshot(),
         }
 
     return app
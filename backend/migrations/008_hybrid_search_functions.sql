@@ -0,0 +1,192 @@
+-- =====================================================
+-- Migration 008: Hybrid lexical + vector search (RRF)
+-- Run in Supabase SQL Editor
+-- =====================================================
+-- Mỗi corpus (quick_notes, material_chunks) có một hàm duy nhất:
+--   1. Lấy top-N ứng viên theo full-text (to_tsvector('simple', content))
+--   2. Lấy top-N ứng viên theo cosine distance (pgvector)
+--   3. Hợp nhất bằng Reciprocal Rank Fusion: score = Σ 1 / (rrf_k + rank)
+-- → Agent nhận top-k tốt nhất chỉ với 1 round trip.
+
+-- 1. Full-text index cho material_chunks (quick_notes đã có idx_notes_search)
+CREATE INDEX IF NOT EXISTS idx_chunks_search
+    ON material_chunks USING gin(to_tsvector('simple', content));
+
+
+-- 2. Hybrid search cho quick_notes
+CREATE OR REPLACE FUNCTION hybrid_search_notes(
+    query_text TEXT,
+    query_embedding vector(768),
+    match_user_id UUID,
+    match_count INT DEFAULT 5,
+    filter_tags TEXT[] DEFAULT NULL,
+    candidate_count INT DEFAULT 30,
+    rrf_k INT DEFAULT 60
+)
+RETURNS TABLE (
+    id UUID,
+    content TEXT,
+    note_type TEXT,
+    tags TEXT[],
+    is_pinned BOOLEAN,
+    created_at TIMESTAMPTZ,
+    similarity FLOAT,
+    lexical_rank INT,
+    vector_rank INT,
+    rrf_score FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH lexical AS (
+        SELECT
+            qn.id AS note_id,
+            ROW_NUMBER() OVER (
+                ORDER BY ts_rank_cd(
+                    to_tsvector('simple', qn.content),
+                    websearch_to_tsquery('simple', query_text)
+                ) DESC
+            ) AS rnk
+        FROM quick_notes qn
+        WHERE qn.user_id = match_user_id
+          AND qn.is_archived = FALSE
+          AND (filter_tags IS NULL OR qn.tags && filter_tags)
+          AND to_tsvector('simple', qn.content) @@ websearch_to_tsquery('simple', query_text)
+        ORDER BY rnk
+        LIMIT candidate_count
+    ),
+    semantic AS (
+        SELECT
+            qn.id AS note_id,
+            ROW_NUMBER() OVER (ORDER BY qn.embedding <=> query_embedding) AS rnk
+        FROM quick_notes qn
+        WHERE qn.user_id = match_user_id
+          AND qn.is_archived = FALSE
+          AND qn.embedding IS NOT NULL
+          AND (filter_tags IS NULL OR qn.tags && filter_tags)
+        ORDER BY qn.embedding <=> query_embedding
+        LIMIT candidate_count
+    ),
+    fused AS (
+        SELECT
+            COALESCE(l.note_id, s.note_id) AS note_id,
+            l.rnk AS l_rank,
+            s.rnk AS s_rank,
+            COALESCE(1.0 / (rrf_k + l.rnk), 0.0)
+                + COALESCE(1.0 / (rrf_k + s.rnk), 0.0) AS score
+        FROM lexical l
+        FULL OUTER JOIN semantic s ON l.note_id = s.note_id
+    )
+    SELECT
+        qn.id,
+        qn.content,
+        qn.note_type,
+        qn.tags,
+        qn.is_pinned,
+        qn.created_at,
+        CASE
+            WHEN qn.embedding IS NULL THEN NULL
+            ELSE 1 - (qn.embedding <=> query_embedding)
+        END::FLOAT AS similarity,
+        f.l_rank::INT AS lexical_rank,
+        f.s_rank::INT AS vector_rank,
+        f.score::FLOAT AS rrf_score
+    FROM fused f
+    JOIN quick_notes qn ON qn.id = f.note_id
+    ORDER BY f.score DESC
+    LIMIT match_count;
+END;
+$$;
+
+
+-- 3. Hybrid search cho material_chunks
+CREATE OR REPLACE FUNCTION hybrid_search_materials(
+    query_text TEXT,
+    query_embedding vector(768),
+    match_user_id UUID,
+    match_count INT DEFAULT 5,
+    filter_domain TEXT DEFAULT NULL,
+    candidate_count INT DEFAULT 30,
+    rrf_k INT DEFAULT 60
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    content TEXT,
+    chunk_index INT,
+    page_number INT,
+    section_title TEXT,
+    material_id UUID,
+    file_name TEXT,
+    domain TEXT,
+    similarity FLOAT,
+    lexical_rank INT,
+    vector_rank INT,
+    rrf_score FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH lexical AS (
+        SELECT
+            mc.id AS c_id,
+            ROW_NUMBER() OVER (
+                ORDER BY ts_rank_cd(
+                    to_tsvector('simple', mc.content),
+                    websearch_to_tsquery('simple', query_text)
+                ) DESC
+            ) AS rnk
+        FROM material_chunks mc
+        JOIN study_materials sm ON mc.material_id = sm.id
+        WHERE sm.user_id = match_user_id
+          AND (filter_domain IS NULL OR sm.domain = filter_domain)
+          AND to_tsvector('simple', mc.content) @@ websearch_to_tsquery('simple', query_text)
+        ORDER BY rnk
+        LIMIT candidate_count
+    ),
+    semantic AS (
+        SELECT
+            mc.id AS c_id,
+            ROW_NUMBER() OVER (ORDER BY mc.embedding <=> query_embedding) AS rnk
+        FROM material_chunks mc
+        JOIN study_materials sm ON mc.material_id = sm.id
+        WHERE sm.user_id = match_user_id
+          AND mc.embedding IS NOT NULL
+          AND (filter_domain IS NULL OR sm.domain = filter_domain)
+        ORDER BY mc.embedding <=> query_embedding
+        LIMIT candidate_count
+    ),
+    fused AS (
+        SELECT
+            COALESCE(l.c_id, s.c_id) AS c_id,
+            l.rnk AS l_rank,
+            s.rnk AS s_rank,
+            COALESCE(1.0 / (rrf_k + l.rnk), 0.0)
+                + COALESCE(1.0 / (rrf_k + s.rnk), 0.0) AS score
+        FROM lexical l
+        FULL OUTER JOIN semantic s ON l.c_id = s.c_id
+    )
+    SELECT
+        mc.id AS chunk_id,
+        mc.content,
+        mc.chunk_index,
+        mc.page_number,
+        mc.section_title,
+        sm.id AS material_id,
+        sm.file_name,
+        sm.domain,
+        CASE
+            WHEN mc.embedding IS NULL THEN NULL
+            ELSE 1 - (mc.embedding <=> query_embedding)
+        END::FLOAT AS similarity,
+        f.l_rank::INT AS lexical_rank,
+        f.s_rank::INT AS vector_rank,
+        f.score::FLOAT AS rrf_score
+    FROM fused f
+    JOIN material_chunks mc ON mc.id = f.c_id
+    JOIN study_materials sm ON mc.material_id = sm.id
+    ORDER BY f.score DESC
+    LIMIT match_count;
+END;
+$$;
@@ -0,0 +1,103 @@
+-- =====================================================
+-- Migration 009: hybrid_search_materials trả thêm embedding (tùy chọn)
+-- Run in Supabase SQL Editor
+-- =====================================================
+-- KnowledgeService over-fetch ~30 ứng viên rồi chạy MMR (NumPy) phía app
+-- để loại các chunk lân cận trùng lặp (chunk_overlap=200). MMR cần vector
+-- của từng ứng viên → thêm cờ include_embedding (mặc định FALSE để payload nhỏ).
+
+-- Return type thay đổi → phải drop signature cũ trước
+DROP FUNCTION IF EXISTS hybrid_search_materials(TEXT, vector(768), UUID, INT, TEXT, INT, INT);
+
+CREATE OR REPLACE FUNCTION hybrid_search_materials(
+    query_text TEXT,
+    query_embedding vector(768),
+    match_user_id UUID,
+    match_count INT DEFAULT 5,
+    filter_domain TEXT DEFAULT NULL,
+    candidate_count INT DEFAULT 30,
+    rrf_k INT DEFAULT 60,
+    include_embedding BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    content TEXT,
+    chunk_index INT,
+    page_number INT,
+    section_title TEXT,
+    material_id UUID,
+    file_name TEXT,
+    domain TEXT,
+    similarity FLOAT,
+    lexical_rank INT,
+    vector_rank INT,
+    rrf_score FLOAT,
+    embedding vector(768)
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH lexical AS (
+        SELECT
+            mc.id AS c_id,
+            ROW_NUMBER() OVER (
+                ORDER BY ts_rank_cd(
+                    to_tsvector('simple', mc.content),
+                    websearch_to_tsquery('simple', query_text)
+                ) DESC
+            ) AS rnk
+        FROM material_chunks mc
+        JOIN study_materials sm ON mc.material_id = sm.id
+        WHERE sm.user_id = match_user_id
+          AND (filter_domain IS NULL OR sm.domain = filter_domain)
+          AND to_tsvector('simple', mc.content) @@ websearch_to_tsquery('simple', query_text)
+        ORDER BY rnk
+        LIMIT candidate_count
+    ),
+    semantic AS (
+        SELECT
+            mc.id AS c_id,
+            ROW_NUMBER() OVER (ORDER BY mc.embedding <=> query_embedding) AS rnk
+        FROM material_chunks mc
+        JOIN study_materials sm ON mc.material_id = sm.id
+        WHERE sm.user_id = match_user_id
+          AND mc.embedding IS NOT NULL
+          AND (filter_domain IS NULL OR sm.domain = filter_domain)
+        ORDER BY mc.embedding <=> query_embedding
+        LIMIT candidate_count
+    ),
+    fused AS (
+        SELECT
+            COALESCE(l.c_id, s.c_id) AS c_id,
+            l.rnk AS l_rank,
+            s.rnk AS s_rank,
+            COALESCE(1.0 / (rrf_k + l.rnk), 0.0)
+                + COALESCE(1.0 / (rrf_k + s.rnk), 0.0) AS score
+        FROM lexical l
+        FULL OUTER JOIN semantic s ON l.c_id = s.c_id
+    )
+    SELECT
+        mc.id AS chunk_id,
+        mc.content,
+        mc.chunk_index,
+        mc.page_number,
+        mc.section_title,
+        sm.id AS material_id,
+        sm.file_name,
+        sm.domain,
+        CASE
+            WHEN mc.embedding IS NULL THEN NULL
+            ELSE 1 - (mc.embedding <=> query_embedding)
+        END::FLOAT AS similarity,
+        f.l_rank::INT AS lexical_rank,
+        f.s_rank::INT AS vector_rank,
+        f.score::FLOAT AS rrf_score,
+        CASE WHEN include_embedding THEN mc.embedding ELSE NULL END AS embedding
+    FROM fused f
+    JOIN material_chunks mc ON mc.id = f.c_id
+    JOIN study_materials sm ON mc.material_id = sm.id
+    ORDER BY f.score DESC
+    LIMIT match_count;
+END;
+$$;
@@ -0,0 +1,28 @@
+-- =====================================================
+-- Migration 010: Bulk write note embeddings + status
+-- Run in Supabase SQL Editor
+-- =====================================================
+-- Embedding service gom nhiều note vào 1 batch → ghi vector + embedding_status
+-- của cả batch bằng 1 câu UPDATE thay vì 1 request/note.
+--
+-- updates: JSON array [{ "id": uuid, "embedding": [..] | null, "embedding_status": text }]
+-- embedding = null (batch lỗi) → giữ nguyên vector cũ, chỉ đổi status.
+
+CREATE OR REPLACE FUNCTION bulk_update_note_embeddings(updates JSONB)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    affected INT;
+BEGIN
+    UPDATE quick_notes qn
+    SET
+        embedding = COALESCE((u->>'embedding')::vector(768), qn.embedding),
+        embedding_status = u->>'embedding_status'
+    FROM jsonb_array_elements(updates) AS u
+    WHERE qn.id = (u->>'id')::UUID;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$;
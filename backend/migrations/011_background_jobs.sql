@@ -0,0 +1,122 @@
+-- =====================================================
+-- Migration 011: Durable background job queue
+-- Run in Supabase SQL Editor
+-- =====================================================
+-- Thay thế FastAPI BackgroundTasks / ThreadPoolExecutor bằng hàng đợi lưu trong DB:
+--   - Worker "thuê" (lease) job bằng claim_jobs() với FOR UPDATE SKIP LOCKED
+--     → nhiều worker/process không bao giờ lấy trùng job.
+--   - Worker gia hạn lease định kỳ khi job chạy lâu (heartbeat).
+--   - Restart giữa chừng → lease hết hạn → recover_expired_jobs() đưa job về 'queued'.
+--   - idempotency_key UNIQUE → enqueue lặp lại (Zalo retry, double click) chỉ tạo 1 job.
+--
+-- Vòng đời: queued → running → succeeded
+--                          ↘ queued (retry, run_after = backoff) → ... → dead
+
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    job_type TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued | running | succeeded | dead
+    idempotency_key TEXT UNIQUE,
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_by TEXT,
+    lease_expires_at TIMESTAMPTZ,
+    last_error TEXT,
+    result JSONB,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_ready
+    ON background_jobs(run_after)
+    WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS idx_jobs_lease
+    ON background_jobs(lease_expires_at)
+    WHERE status = 'running';
+
+CREATE TRIGGER trg_background_jobs_updated
+    BEFORE UPDATE ON background_jobs FOR EACH ROW EXECUTE FUNCTION update_updated_at();
+
+
+-- 1. Enqueue (idempotent): trả về id job mới hoặc id job đã tồn tại với cùng key
+CREATE OR REPLACE FUNCTION enqueue_job(
+    p_job_type TEXT,
+    p_payload JSONB DEFAULT '{}'::jsonb,
+    p_user_id UUID DEFAULT NULL,
+    p_idempotency_key TEXT DEFAULT NULL,
+    p_max_attempts INT DEFAULT 5,
+    p_delay_seconds INT DEFAULT 0
+)
+RETURNS UUID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_id UUID;
+BEGIN
+    INSERT INTO background_jobs (job_type, payload, user_id, idempotency_key, max_attempts, run_after)
+    VALUES (
+        p_job_type, p_payload, p_user_id, p_idempotency_key, p_max_attempts,
+        NOW() + make_interval(secs => p_delay_seconds)
+    )
+    ON CONFLICT (idempotency_key) DO NOTHING
+    RETURNING id INTO new_id;
+
+    IF new_id IS NULL THEN
+        SELECT id INTO new_id FROM background_jobs WHERE idempotency_key = p_idempotency_key;
+    END IF;
+    RETURN new_id;
+END;
+$$;
+
+
+-- 2. Claim: lấy tối đa p_limit job sẵn sàng, đánh dấu running + lease
+CREATE OR REPLACE FUNCTION claim_jobs(
+    p_worker_id TEXT,
+    p_limit INT DEFAULT 1,
+    p_lease_seconds INT DEFAULT 300
+)
+RETURNS SETOF background_jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE background_jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_by = p_worker_id,
+        lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    WHERE j.id IN (
+        SELECT id FROM background_jobs
+        WHERE status = 'queued' AND run_after <= NOW()
+        ORDER BY run_after
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+END;
+$$;
+
+
+-- 3. Sweeper: job 'running' quá hạn lease (worker chết) → queued lại hoặc dead
+CREATE OR REPLACE FUNCTION recover_expired_jobs()
+RETURNS TABLE (id UUID, job_type TEXT, status TEXT, payload JSONB)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE background_jobs j
+    SET status = CASE WHEN j.attempts >= j.max_attempts THEN 'dead' ELSE 'queued' END,
+        locked_by = NULL,
+        lease_expires_at = NULL,
+        run_after = NOW(),
+        last_error = COALESCE(j.last_error, 'lease expired (worker restarted?)'),
+        finished_at = CASE WHEN j.attempts >= j.max_attempts THEN NOW() ELSE NULL END
+    WHERE j.status = 'running' AND j.lease_expires_at < NOW()
+    RETURNING j.id, j.job_type, j.status, j.payload;
+END;
+$$;
@@ -0,0 +1,12 @@
+-- =====================================================
+-- Migration 012: Ingestion progress counters
+-- Run in Supabase SQL Editor
+-- =====================================================
+-- Pipeline ghi tiến độ theo giai đoạn (có throttle ~1s) để
+-- GET /api/knowledge/{material_id}/progress (SSE) stream cho client:
+--   { "stage": "embedding", "pages_total": 300, "pages_extracted": 300,
+--     "chunks_total": 812, "chunks_embedded": 400, "rows_inserted": 0,
+--     "started_at": "...", "finished_at": "...", "error": "..." }
+
+ALTER TABLE study_materials
+    ADD COLUMN IF NOT EXISTS progress JSONB DEFAULT '{}'::jsonb;
@@ -0,0 +1,50 @@
+-- =====================================================
+-- Migration 013: Academic content hashes + change events
+-- Run in Supabase SQL Editor
+-- =====================================================
+-- Mỗi dòng academic_sync_cache lưu thêm content_hash (SHA-256 của raw_data):
+--   sync lại mà hash không đổi → chỉ cập nhật last_synced_at, không ghi lại JSONB.
+-- Khi grades / TKB cá nhân thay đổi, diff có cấu trúc được ghi vào
+-- academic_change_events (outbox); scheduler đẩy các dòng chưa gửi qua Zalo
+-- rồi đặt notified_at.
+--
+-- event_type: grade_posted | grade_changed | room_changed | class_cancelled
+
+ALTER TABLE academic_sync_cache
+    ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- UNIQUE(user_id, data_type, semester) mặc định coi NULL là khác nhau → upsert của
+-- grades / tuition / student_info / semesters (semester NULL) không bao giờ conflict
+-- và chèn thêm dòng mỗi lần thay đổi. Xóa dòng trùng (giữ bản mới nhất) rồi đổi
+-- sang NULLS NOT DISTINCT (Postgres 15+).
+DELETE FROM academic_sync_cache
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY user_id, data_type, semester
+            ORDER BY last_synced_at DESC NULLS LAST, id DESC
+        ) AS rn
+        FROM academic_sync_cache
+    ) ranked
+    WHERE rn > 1
+);
+
+ALTER TABLE academic_sync_cache
+    DROP CONSTRAINT IF EXISTS academic_sync_cache_user_id_data_type_semester_key;
+ALTER TABLE academic_sync_cache
+    ADD CONSTRAINT academic_sync_cache_user_id_data_type_semester_key
+    UNIQUE NULLS NOT DISTINCT (user_id, data_type, semester);
+
+CREATE TABLE IF NOT EXISTS academic_change_events (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    data_type TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    notified_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_academic_changes_pending
+    ON academic_change_events(created_at)
+    WHERE notified_at IS NULL;
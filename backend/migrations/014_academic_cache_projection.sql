@@ -0,0 +1,12 @@
+-- =====================================================
+-- Migration 014: Projected academic_sync_cache payloads
+-- Run in Supabase SQL Editor
+-- =====================================================
+-- raw_data giờ lưu bản chiếu gọn của payload portal (chỉ các trường parser /
+-- tool / diff đọc — xem app/features/academic/projection.py), content_hash tính
+-- trên bản chiếu. schema_version ghi phiên bản projection đã dùng:
+--   NULL (dòng cũ, JSON nguyên bản) hoặc < phiên bản hiện tại → backend chiếu
+--   lại khi đọc và ghi đè ở lần sync kế tiếp.
+
+ALTER TABLE academic_sync_cache
+    ADD COLUMN IF NOT EXISTS schema_version SMALLINT;
@@ -0,0 +1,98 @@
+-- =====================================================
+-- Migration 015: Lexical-only search (nhánh full-text của hybrid search)
+-- Run in Supabase SQL Editor
+-- =====================================================
+-- Khi LOCAL_VECTOR_INDEX_ENABLED=true, nhánh vector của hybrid search chạy trong
+-- process (local_index.py). KnowledgeService chỉ cần DB trả nhánh full-text:
+--   lexical_search_* → top-N theo ts_rank_cd, kèm lexical_rank
+-- rồi tự hợp nhất RRF ở phía app — không gửi query embedding, không quét pgvector.
+-- Điều kiện lọc giống hệt CTE `lexical` trong hybrid_search_notes / hybrid_search_materials.
+
+CREATE OR REPLACE FUNCTION lexical_search_notes(
+    query_text TEXT,
+    match_user_id UUID,
+    filter_tags TEXT[] DEFAULT NULL,
+    candidate_count INT DEFAULT 30
+)
+RETURNS TABLE (
+    id UUID,
+    content TEXT,
+    note_type TEXT,
+    tags TEXT[],
+    is_pinned BOOLEAN,
+    created_at TIMESTAMPTZ,
+    lexical_rank INT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        qn.id,
+        qn.content,
+        qn.note_type,
+        qn.tags,
+        qn.is_pinned,
+        qn.created_at,
+        (ROW_NUMBER() OVER (
+            ORDER BY ts_rank_cd(
+                to_tsvector('simple', qn.content),
+                websearch_to_tsquery('simple', query_text)
+            ) DESC
+        ))::INT AS lexical_rank
+    FROM quick_notes qn
+    WHERE qn.user_id = match_user_id
+      AND qn.is_archived = FALSE
+      AND (filter_tags IS NULL OR qn.tags && filter_tags)
+      AND to_tsvector('simple', qn.content) @@ websearch_to_tsquery('simple', query_text)
+    ORDER BY lexical_rank
+    LIMIT candidate_count;
+END;
+$$;
+
+
+CREATE OR REPLACE FUNCTION lexical_search_materials(
+    query_text TEXT,
+    match_user_id UUID,
+    filter_domain TEXT DEFAULT NULL,
+    candidate_count INT DEFAULT 30
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    content TEXT,
+    chunk_index INT,
+    page_number INT,
+    section_title TEXT,
+    material_id UUID,
+    file_name TEXT,
+    domain TEXT,
+    lexical_rank INT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        mc.id AS chunk_id,
+        mc.content,
+        mc.chunk_index,
+        mc.page_number,
+        mc.section_title,
+        sm.id AS material_id,
+        sm.file_name,
+        sm.domain,
+        (ROW_NUMBER() OVER (
+            ORDER BY ts_rank_cd(
+                to_tsvector('simple', mc.content),
+                websearch_to_tsquery('simple', query_text)
+            ) DESC
+        ))::INT AS lexical_rank
+    FROM material_chunks mc
+    JOIN study_materials sm ON mc.material_id = sm.id
+    WHERE sm.user_id = match_user_id
+      AND (filter_domain IS NULL OR sm.domain = filter_domain)
+      AND to_tsvector('simple', mc.content) @@ websearch_to_tsquery('simple', query_text)
+    ORDER BY lexical_rank
+    LIMIT candidate_count;
+END;
+$$;
@@ -0,0 +1,196 @@
+"""
+Unit tests for the two-tier academic cache (memory LRU + academic_sync_cache) with stale-while-revalidate.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.features.academic import service as academic_service
+from app.features.academic.cache import AcademicCache
+from app.features.academic.service import AcademicService
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db, self.table, self.filters, self.op, self.values = db, table, [], "select", None
+        self._order, self._limit = None, None
+
+    def select(self, *args):
+        return self
+
+    def upsert(self, values, on_conflict=None):
+        self.op, self.values = "upsert", values
+        return self
+
+    def update(self, values):
+        self.op, self.values = "update", values
+        return self
+
+    def insert(self, values):
+        self.op, self.values = "insert", values
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda r: r.get(column) != value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(lambda r: r.get(column) is None)
+        return self
+
+    def single(self):
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def execute(self):
+        self.db.calls.append((self.table, self.op))
+        if self.table == "users":
+            return type("Res", (), {"data": {"agent_config": self.db.agent_config}})()
+        if self.table == "academic_change_events":
+            self.db.events.extend(self.values)
+            return type("Res", (), {"data": self.values})()
+        rows = self.db.cache_rows
+        if self.op == "upsert":
+            for values in self.values:
+                key = (values["user_id"], values["data_type"], values["semester"])
+                # Như Postgres: NULL không bao giờ trùng trong UNIQUE (mặc định NULLS DISTINCT)
+                self.db.cache_rows = [
+                    r for r in self.db.cache_rows
+                    if None in key or (r["user_id"], r["data_type"], r["semester"]) != key
+                ]
+                self.db.cache_rows.append({"id": f"row-{len(self.db.calls)}-{key[1]}", **values})
+            return type("Res", (), {"data": self.values})()
+        matched = [r for r in rows if all(f(r) for f in self.filters)]
+        if self.op == "delete":
+            self.db.cache_rows = [r for r in rows if r not in matched]
+        elif self.op == "update":
+            for r in matched:
+                r.update(self.values)
+        if self._order:
+            column, desc = self._order
+            matched = sorted(matched, key=lambda r: str(r.get(column) or ""), reverse=desc)
+        if self._limit is not None:
+            matched = matched[: self._limit]
+        return type("Res", (), {"data": matched})()
+
+
+class FakeDB:
+    def __init__(self, agent_config=None):
+        self.agent_config = agent_config or {}
+        self.cache_rows: list[dict] = []
+        self.events: list[dict] = []
+        self.calls: list[tuple] = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def _row(data, hours_ago, data_type="grades", semester=None):
+    synced = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
+    return {"id": f"seed-{data_type}", "user_id": "u1", "data_type": data_type, "semester": semester,
+            "raw_data": data, "last_synced_at": synced.isoformat()}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = AcademicCache(max_entries=16)
+    monkeypatch.setattr(academic_service, "get_academic_cache", lambda: cache)
+    return cache
+
+
+def _service(db, fetched):
+    service = AcademicService(db)
+
+    async def fetch_grades(user_id, operation):
+        fetched.append(user_id)
+        return {"ds_diem_hocky": [{"hoc_ky": "20252", "ten_hoc_ky": "HK mới"}]}
+
+    service._with_client = fetch_grades
+    return service
+
+
+class TestTwoTierCache:
+    def test_memory_tier_and_memoized_ttl_skip_postgrest(self, cache):
+        db, fetched = FakeDB(), []
+        db.cache_rows.append(_row({"ds_diem_hocky": [{"hoc_ky": "20251"}]}, hours_ago=1))
+        service = _service(db, fetched)
+
+        async def main():
+            for _ in range(5):
+                await service.get_grades("u1")
+
+        asyncio.run(main())
+        assert fetched == []
+        assert db.calls == [("users", "select"), ("academic_sync_cache", "select")]
+        assert cache.stats["memory_hits"] == 4
+
+    def test_stale_data_is_served_while_refreshing_both_tiers(self, cache):
+        db, fetched = FakeDB(), []
+        db.cache_rows.append(_row({"ds_diem_hocky": [{"hoc_ky": "20251"}]}, hours_ago=30))
+        service = _service(db, fetched)
+
+        async def main():
+            first = await service.get_grades("u1")
+            await cache.wait_for_refreshes()
+            second = await service.get_grades("u1")
+            return first, second
+
+        first, second = asyncio.run(main())
+        assert first[0].semester_code == "20251"
+        assert second[0].semester_code == "20252"
+        assert fetched == ["u1"]
+        assert db.cache_rows[-1]["raw_data"]["ds_diem_hocky"][0]["hoc_ky"] == "20252"
+
+    def test_too_old_or_ttl_zero_blocks_on_fetch(self, cache):
+        db, fetched = FakeDB(agent_config={"cache_ttl_hours": 0}), []
+        db.cache_rows.append(_row({"ds_diem_hocky": [{"hoc_ky": "20251"}]}, hours_ago=1))
+        service = _service(db, fetched)
+        assert asyncio.run(service.get_grades("u1"))[0].semester_code == "20252"
+
+        # Đổi cấu hình → TTL memo bị xóa; dữ liệu quá hạn stale tối đa → chờ fetch
+        db.agent_config = {"cache_ttl_hours": 1}
+        cache.invalidate_ttl("u1")
+        cache.clear()
+        db.cache_rows = [_row({"ds_diem_hocky": [{"hoc_ky": "20251"}]}, hours_ago=24 * 30)]
+        assert asyncio.run(service.get_grades("u1"))[0].semester_code == "20252"
+        assert fetched == ["u1", "u1"]
+
+    def test_invalidate_clears_memory_and_rows(self, cache):
+        db = FakeDB()
+        service = _service(db, [])
+        asyncio.run(service.get_grades("u1"))
+        assert service.invalidate_cache("u1", "grades") == 1
+        assert cache.get(("u1", "grades", None)) is None and db.cache_rows == []
+
+    def test_error_response_is_not_cached(self, cache):
+        db = FakeDB()
+        service = AcademicService(db)
+
+        async def failing(user_id, operation):
+            return {"code": 500, "result": False, "message": "Lỗi hệ thống"}
+
+        service._with_client = failing
+        with pytest.raises(ValueError):
+            asyncio.run(service.get_grades("u1"))
+        assert db.cache_rows == [] and cache.get(("u1", "grades", None)) is None
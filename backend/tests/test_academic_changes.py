@@ -0,0 +1,150 @@
+"""
+Unit tests for academic content hashing, structural diffs and the skip-unchanged write path.
+"""
+
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.background import academic_changes, scheduler
+from app.features.academic import service as academic_service
+from app.features.academic.cache import AcademicCache
+from app.features.academic.changes import (
+    content_hash,
+    diff_grades,
+    diff_timetable,
+    format_change_event,
+    is_diffable,
+)
+from app.features.academic.service import AcademicService
+from tests.test_academic_cache import FakeDB
+
+
+def _grades(*courses):
+    return {"ds_diem_hocky": [{"hoc_ky": "20252", "ten_hoc_ky": "HK2 2025-2026", "ds_diem_mon_hoc": list(courses)}]}
+
+
+def _course(code, grade=None):
+    return {"ma_mon": code, "ten_mon": f"Môn {code}", "diem_tk": grade, "diem_tk_chu": "A" if grade else ""}
+
+
+def _timetable(*slots):
+    return {"ds_tuan_tkb": [{"tuan_hoc_ky": 1, "ds_thoi_khoa_bieu": list(slots)}]}
+
+
+def _slot(day, room="B21.101", cancelled=False):
+    return {"ngay_hoc": day, "tiet_bat_dau": 1, "ma_mon": "CS101", "ten_mon": "Lập trình",
+            "ma_phong": room, "is_nghi_day": cancelled}
+
+
+class TestDiffs:
+    def test_hash_ignores_key_order(self):
+        assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+        assert content_hash({"a": 1}) != content_hash({"a": 2})
+
+    def test_grades_posted_and_changed(self):
+        old = _grades(_course("CS101"), _course("MA101", "7.5"), _course("PH101", "6"))
+        new = _grades(_course("CS101", "8.5"), _course("MA101", "8.0"), _course("PH101", "6"))
+        events = {e["subject_code"]: e for e in diff_grades(old, new)}
+        assert set(events) == {"CS101", "MA101"}
+        assert events["CS101"]["event_type"] == "grade_posted" and events["CS101"]["grade_10"] == "8.5"
+        assert events["MA101"]["event_type"] == "grade_changed" and events["MA101"]["old_grade_10"] == "7.5"
+
+    def test_timetable_room_change_and_cancellation_skip_past_days(self):
+        old = _timetable(_slot("2026-10-20T00:00:00"), _slot("2026-10-27T00:00:00"), _slot("2026-10-13T00:00:00"))
+        new = _timetable(
+            _slot("2026-10-20T00:00:00", cancelled=True),
+            _slot("2026-10-27T00:00:00", room="C11.202"),
+            _slot("2026-10-13T00:00:00", cancelled=True),
+        )
+        events = diff_timetable(old, new, today=date(2026, 10, 19))
+        assert [e["event_type"] for e in events] == ["class_cancelled", "room_changed"]
+        assert format_change_event(events[1]) == "🏫 Đổi phòng: Lập trình ngày 27/10/2026: B21.101 → C11.202"
+
+    def test_only_personal_views_are_diffed(self):
+        assert is_diffable("timetable", "current") and is_diffable("grades", None)
+        assert not is_diffable("timetable", "20252_type2") and not is_diffable("tuition", None)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = AcademicCache(max_entries=16)
+    monkeypatch.setattr(academic_service, "get_academic_cache", lambda: cache)
+    return cache
+
+
+class TestWritePath:
+    def test_unchanged_rows_skip_upsert_and_changes_emit_events(self, cache):
+        db = FakeDB()
+        service = AcademicService(db)
+        first = service._write_cache_batch("u1", [("grades", None, _grades(_course("CS101")))])[("grades", None)]
+        assert db.events == []  # Lần sync đầu: không có bản cũ để so
+        service._write_cache_batch("u1", [("grades", None, _grades(_course("CS101")))])
+        assert [op for _, op in db.calls].count("upsert") == 1
+        assert cache.get(("u1", "grades", None))["raw_data"] is first  # giữ object cũ
+
+        service._write_cache_batch("u1", [("grades", None, _grades(_course("CS101", "9")))])
+        assert [op for _, op in db.calls].count("upsert") == 2
+        assert [e["event_type"] for e in db.events] == ["grade_posted"]
+        assert db.cache_rows[-1]["content_hash"] == content_hash(_grades(_course("CS101", "9")))
+
+    def test_duplicate_null_semester_rows_diff_against_the_newest(self, cache):
+        db = FakeDB()
+        graded = _grades(_course("CS101", "9"))
+        # Dòng trùng còn sót (semester NULL trước migration 013), mới nhất KHÔNG đứng cuối
+        db.cache_rows += [
+            {"id": "new", "user_id": "u1", "data_type": "grades", "semester": None, "raw_data": graded,
+             "content_hash": content_hash(graded), "last_synced_at": "2026-10-19T08:00:00+00:00"},
+            {"id": "old", "user_id": "u1", "data_type": "grades", "semester": None,
+             "raw_data": _grades(_course("CS101")), "content_hash": "stale",
+             "last_synced_at": "2026-10-18T08:00:00+00:00"},
+        ]
+        AcademicService(db)._write_cache_batch("u1", [("grades", None, _grades(_course("CS101", "9")))])
+        assert db.events == []  # Không gửi lại grade_posted
+        assert [op for _, op in db.calls].count("upsert") == 0
+
+    def test_push_sends_one_message_and_marks_notified(self, monkeypatch):
+        sent = []
+
+        class PushDB(FakeDB):
+            def table(self, name):
+                query = super().table(name)
+                if name == "academic_change_events":
+                    rows = self.events
+                    query.execute = lambda: type("Res", (), {"data": _apply(query, rows)})()
+                return query
+
+        def _apply(query, rows):
+            matched = [r for r in rows if all(f(r) for f in query.filters)]
+            if query.op == "update":
+                for r in matched:
+                    r.update(query.values)
+            elif query.op == "delete":
+                rows[:] = [r for r in rows if r not in matched]
+            return matched
+
+        db = PushDB()
+        db.events = [
+            {"id": "e1", "user_id": "u1", "event_type": "grade_posted", "notified_at": None,
+             "payload": {"subject": "Lập trình", "grade_10": "9", "grade_letter": "A"}},
+            {"id": "e2", "user_id": "u1", "event_type": "class_cancelled", "notified_at": None,
+             "payload": {"subject": "Toán", "date": "2026-10-20T00:00:00", "start_period": 1}},
+            {"id": "e3", "user_id": "u2", "event_type": "grade_posted", "notified_at": None,
+             "payload": {"subject": "Vật lý", "grade_10": "8", "grade_letter": "B+"}},
+        ]
+
+        async def fake_send(text, chat_id=None):
+            sent.append(text)
+            return True
+
+        monkeypatch.setattr(academic_changes, "get_supabase_client", lambda: db)
+        monkeypatch.setattr(academic_changes, "send_zalo_message", fake_send)
+        monkeypatch.setattr(scheduler, "_get_owner_user_id", lambda: "u1")
+
+        assert asyncio.run(academic_changes.push_academic_changes()) == 2
+        assert asyncio.run(academic_changes.push_academic_changes()) == 0
+        assert len(sent) == 1
+        assert "📝 Có điểm mới: Lập trình — 9 (A)" in sent[0] and "🚫 Báo nghỉ: Toán ngày 20/10/2026" in sent[0]
+        assert "Vật lý" not in sent[0]
+        assert [e["id"] for e in db.events] == ["e1", "e2"]  # Sự kiện không gửi được của u2 bị xóa
@@ -0,0 +1,84 @@
+"""
+Unit tests for projection-on-write of academic_sync_cache payloads.
+"""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.features.academic import service as academic_service
+from app.features.academic.cache import AcademicCache
+from app.features.academic.projection import SCHEMA_VERSION, project_dataset
+from app.features.academic.service import AcademicService
+from tests.test_academic_cache import FakeDB
+
+NOISE = {"id_noi_bo": "c0ffee", "is_hien_thi": True, "ghi_chu_html": "<p>" + "x" * 200 + "</p>"}
+
+TIMETABLE = {
+    "total_items": 1, "ds_tiet_trong_ngay": [{"tiet": i, **NOISE} for i in range(1, 16)],
+    "ds_tuan_tkb": [{
+        "tuan_hoc_ky": 7, "ngay_bat_dau": "13/10/2026", "ngay_ket_thuc": "19/10/2026", **NOISE,
+        "ds_thoi_khoa_bieu": [{
+            "thu_kieu_so": 2, "tiet_bat_dau": 1, "so_tiet": 3, "ma_mon": "CS101", "ten_mon": "Lập trình",
+            "ten_mon_eg": "Programming", "so_tin_chi": "3", "ten_giang_vien": "Nguyễn Văn A",
+            "ma_phong": "B21.101", "ten_lop": "DA22TTA", "ngay_hoc": "2026-10-13T00:00:00",
+            "is_nghi_day": False, **NOISE,
+        }],
+    }],
+}
+
+GRADES = {
+    "ds_diem_hocky": [{
+        "hoc_ky": "20251", "ten_hoc_ky": "HK1 2025-2026", "dtb_hk_he10": "7.5", "dtb_hk_he4": "3.0",
+        "dtb_tich_luy_he_10": "7.5", "dtb_tich_luy_he_4": "3.0", "so_tin_chi_dat_hk": "3",
+        "xep_loai_tkb_hk": "Khá", **NOISE,
+        "ds_diem_mon_hoc": [{
+            "ma_mon": "CS101", "ten_mon": "Lập trình", "ten_mon_eg": "Programming", "so_tin_chi": "3",
+            "diem_tk": "7.5", "diem_tk_so": "3", "diem_tk_chu": "B", "ket_qua": 1,
+            "ds_diem_thanh_phan": [{"ky_hieu": "GK", "diem_thanh_phan": "7"}], **NOISE,
+        }],
+    }],
+}
+
+
+class TestProjection:
+    def test_drops_unread_fields_and_is_idempotent(self):
+        projected = project_dataset("timetable", TIMETABLE)
+        assert set(projected) == {"ds_tuan_tkb"}
+        assert "id_noi_bo" not in projected["ds_tuan_tkb"][0]["ds_thoi_khoa_bieu"][0]
+        assert project_dataset("timetable", projected) == projected
+        assert len(json.dumps(projected)) < len(json.dumps(TIMETABLE)) / 2
+        assert project_dataset("unknown_type", TIMETABLE) is TIMETABLE
+
+    def test_parsers_see_the_same_data(self):
+        parse = AcademicService._parse_timetable
+        assert parse(project_dataset("timetable", TIMETABLE)["ds_tuan_tkb"]) == parse(TIMETABLE["ds_tuan_tkb"])
+        parse = AcademicService._parse_grades
+        assert parse(project_dataset("grades", GRADES)["ds_diem_hocky"]) == parse(GRADES["ds_diem_hocky"])
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = AcademicCache(max_entries=16)
+    monkeypatch.setattr(academic_service, "get_academic_cache", lambda: cache)
+    return cache
+
+
+class TestCacheRows:
+    def test_write_stores_projection_with_schema_version(self, cache):
+        db = FakeDB()
+        stored = AcademicService(db)._write_cache_batch("u1", [("grades", None, GRADES)])[("grades", None)]
+        row = db.cache_rows[0]
+        assert row["raw_data"] == stored == project_dataset("grades", GRADES)
+        assert row["schema_version"] == SCHEMA_VERSION
+        assert cache.get(("u1", "grades", None))["raw_data"] is stored
+
+    def test_legacy_rows_are_projected_on_read(self, cache):
+        db = FakeDB()
+        db.cache_rows.append({
+            "id": "legacy", "user_id": "u1", "data_type": "timetable", "semester": "current",
+            "raw_data": TIMETABLE, "last_synced_at": datetime.now(timezone.utc).isoformat(),
+        })
+        entry = AcademicService(db)._lookup_cache("u1", "timetable", "current", 24)
+        assert entry["raw_data"] == project_dataset("timetable", TIMETABLE)
@@ -0,0 +1,132 @@
+"""
+Unit tests for the concurrent multi-dataset academic sync (one login, one upsert batch).
+"""
+
+import asyncio
+
+import pytest
+
+from app.features.academic import service as academic_service
+from app.features.academic.cache import AcademicCache
+from app.features.academic.service import SYNC_DATASETS, AcademicService
+
+
+class FakeSchoolClient:
+    def __init__(self, delay=0.05, failing=()):
+        self.delay, self.failing = delay, set(failing)
+        self.active = self.max_active = 0
+        self.calls: list[tuple] = []
+
+    async def _respond(self, name, data, *args):
+        self.calls.append((name, *args))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if name in self.failing:
+                return {"code": 500, "result": False, "message": f"{name} lỗi"}
+            return data
+        finally:
+            self.active -= 1
+
+    async def get_semesters(self):
+        return await self._respond("semesters", {"hoc_ky_theo_ngay_hien_tai": 20252, "ds_hoc_ky": []})
+
+    async def get_weekly_timetable(self, semester_id=None, timetable_type=1):
+        return await self._respond("timetable", {"ds_tuan_tkb": []}, semester_id)
+
+    async def get_grades(self):
+        return await self._respond("grades", {"ds_diem_hocky": []})
+
+    async def get_student_info(self):
+        return await self._respond("student_info", {"ma_sv": "110122221"})
+
+    async def get_tuition_summary(self):
+        return await self._respond("tuition", {"ds_hoc_phi_hoc_ky": []})
+
+    async def get_semester_result(self, semester_id):
+        return await self._respond("semester_result", {"ds_du_lieu": []}, semester_id)
+
+    async def get_semester_timetable_overview(self, semester_id):
+        return await self._respond("semester_tkb_overview", {"ds_nhom_to": []}, semester_id)
+
+
+class FakeDB:
+    data: list = []  # Chưa có dòng cache nào → mọi dataset đều là "thay đổi"
+
+    def __init__(self):
+        self.upserts: list[list[dict]] = []
+
+    def table(self, name):
+        return self
+
+    def select(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def in_(self, *args):
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.upserts.append(rows)
+        return self
+
+    def execute(self):
+        return self
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    monkeypatch.setattr(academic_service, "get_academic_cache", lambda: AcademicCache(max_entries=32))
+
+    def make(client):
+        db = FakeDB()
+        service = AcademicService(db)
+        logins = []
+
+        async def with_client(user_id, operation):
+            logins.append(user_id)
+            return await operation(client)
+
+        service._with_client = with_client
+        return service, db, logins
+
+    return make
+
+
+class TestSyncDatasets:
+    def test_fetches_all_concurrently_with_one_login_and_one_upsert(self, setup):
+        client = FakeSchoolClient()
+        service, db, logins = setup(client)
+        result = asyncio.run(service.sync_datasets("u1"))
+
+        assert result["synced"] == list(SYNC_DATASETS) and result["errors"] == []
+        assert logins == ["u1"]
+        assert client.max_active == len(SYNC_DATASETS)
+        assert len(db.upserts) == 1
+        keys = {(r["data_type"], r["semester"]) for r in db.upserts[0]}
+        assert ("timetable", "current") in keys and ("semester_result", "sem_result_20252") in keys
+        assert ("semesters", None) in keys
+        assert set(result["timings_ms"]) == {"semesters", *SYNC_DATASETS}
+        # ~2 vòng round-trip (semesters + lô song song), không phải 7 vòng tuần tự
+        assert result["total_ms"] < 7 * 50
+
+    def test_partial_failure_and_explicit_semester(self, setup):
+        client = FakeSchoolClient(delay=0, failing={"grades"})
+        service, db, _ = setup(client)
+        result = asyncio.run(service.sync_datasets("u1", ["grades", "semester_result", "grades"], 20251))
+
+        assert result["synced"] == ["semester_result"]
+        assert result["errors"] == [{"type": "grades", "error": "API trường trả lỗi: grades lỗi"}]
+        assert ("semester_result", 20251) in client.calls
+        assert {r["data_type"] for r in db.upserts[0]} == {"semesters", "semester_result"}
+
+    def test_rejects_unknown_dataset(self, setup):
+        service, _, _ = setup(FakeSchoolClient())
+        with pytest.raises(ValueError):
+            asyncio.run(service.sync_datasets("u1", ["timetable", "weather"]))
@@ -0,0 +1,91 @@
+"""
+Unit tests for the merged agenda (timetable + tasks + events): ordering, conflicts, free slots.
+"""
+
+from datetime import date
+
+from app.features.academic.service import AcademicService
+from app.features.academic.timetable_index import ParsedTimetable
+from app.features.agenda.service import build_day_agendas, format_agenda
+
+MONDAY = date(2026, 3, 9)
+
+TIMETABLE = ParsedTimetable(AcademicService._parse_timetable([{
+    "tuan_hoc_ky": 10, "ngay_bat_dau": "09/03/2026", "ngay_ket_thuc": "15/03/2026",
+    "ds_thoi_khoa_bieu": [
+        {"thu_kieu_so": 2, "tiet_bat_dau": 1, "so_tiet": 4, "ten_mon": "Lập trình Python", "ma_phong": "C.201"},
+        {"thu_kieu_so": 2, "tiet_bat_dau": 6, "so_tiet": 3, "ten_mon": "Mạng máy tính", "ma_phong": "B.105",
+         "is_nghi_day": True},
+        {"thu_kieu_so": 3, "tiet_bat_dau": 6, "so_tiet": 5, "ten_mon": "CSDL", "ma_phong": "A.301"},
+    ],
+}]))
+
+EVENTS = [
+    # 09:30–11:00 giờ VN, trùng buổi học sáng thứ 2
+    {"id": "e1", "title": "Họp CLB", "start_time": "2026-03-09T02:30:00+00:00", "end_time": "2026-03-09T04:00:00+00:00"},
+    {"id": "e2", "title": "Sinh nhật Lan", "start_time": "2026-03-10T00:00:00+07:00", "is_all_day": True},
+]
+TASKS = [
+    {"id": "t1", "title": "Nộp báo cáo", "due_date": "2026-03-09T00:00:00+00:00", "priority": "high"},
+    {"id": "t2", "title": "Gửi mail thầy", "due_date": "2026-03-10T20:30:00+07:00"},
+]
+
+
+def _week():
+    return build_day_agendas(MONDAY, 7, TIMETABLE, TASKS, EVENTS)
+
+
+class TestBuildAgenda:
+    def test_items_are_merged_and_sorted_per_day(self):
+        monday, tuesday = _week()[:2]
+        assert [i["title"] for i in monday.items] == ["Nộp báo cáo", "Lập trình Python", "Họp CLB", "Mạng máy tính"]
+        assert [i["kind"] for i in tuesday.items] == ["event", "task", "class"]
+        assert tuesday.items[1]["due"] == "20:30"
+        assert monday.items[0]["due"] is None  # Task chỉ có ngày
+
+    def test_conflicts_ignore_cancelled_classes(self):
+        monday = _week()[0]
+        assert [(a["title"], b["title"]) for a, b in monday.conflicts()] == [("Lập trình Python", "Họp CLB")]
+        assert monday.busy == [(7 * 60, 11 * 60)]
+        assert monday.is_busy(10 * 60 + 45) and not monday.is_busy(14 * 60)
+
+    def test_free_slots(self):
+        monday, tuesday = _week()[:2]
+        assert monday.to_dict()["free"] == ["06:00–07:00", "11:00–22:00"]
+        assert tuesday.to_dict()["free"] == ["06:00–13:00", "17:15–22:00"]
+
+    def test_event_started_before_range_is_split_per_day(self):
+        # 20:00 Chủ nhật → 10:00 thứ 3 (giờ VN), agenda bắt đầu từ thứ 2
+        trip = {"id": "e3", "title": "Dã ngoại", "start_time": "2026-03-08T20:00:00+07:00",
+                "end_time": "2026-03-10T10:00:00+07:00"}
+        monday, tuesday, wednesday = build_day_agendas(MONDAY, 3, None, [], [trip])
+        assert [(i["start"], i["end"]) for i in monday.items] == [(0, 24 * 60)]
+        assert [(i["start"], i["end"]) for i in tuesday.items] == [(0, 10 * 60)]
+        assert wednesday.items == []
+
+    def test_event_ending_at_midnight_stays_on_its_day(self):
+        late = {"id": "e4", "title": "Xem phim", "start_time": "2026-03-09T21:00:00+07:00",
+                "end_time": "2026-03-10T00:00:00+07:00"}
+        monday, tuesday = build_day_agendas(MONDAY, 2, None, [], [late])
+        assert [(i["start"], i["end"]) for i in monday.items] == [(21 * 60, 24 * 60)]
+        assert tuesday.items == []
+
+    def test_without_timetable(self):
+        monday = build_day_agendas(MONDAY, 1, None, TASKS, EVENTS)[0]
+        assert [i["kind"] for i in monday.items] == ["task", "event"]
+
+
+class TestFormat:
+    def test_compact_text(self):
+        text = format_agenda(_week()[:2], overdue=[{"title": "Bài tập 1"}], note=None)
+        assert text.splitlines()[0] == "⚠️ 1 task quá hạn: Bài tập 1"
+        assert "📅 Thứ 2 09/03/2026" in text
+        assert "  07:00–10:30 🎓 Lập trình Python @ C.201" in text
+        assert "  ⚠️ Trùng lịch: Lập trình Python ↔ Họp CLB" in text
+        assert "  13:00–15:45 🎓 Mạng máy tính @ B.105 [NGHỈ]" in text
+        assert "  Cả ngày 📌 Sinh nhật Lan" in text
+
+    def test_overdue_total_comes_from_count(self):
+        preview = [{"title": f"Bài {i}"} for i in range(5)]
+        text = format_agenda([], overdue=preview, overdue_count=12)
+        assert text == "⚠️ 12 task quá hạn: Bài 0, Bài 1, Bài 2, Bài 3, Bài 4 (+7)"
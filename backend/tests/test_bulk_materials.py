@@ -0,0 +1,148 @@
+"""
+Unit tests for bulk knowledge-base operations.
+Supabase (tables + storage) is replaced by an in-memory fake that records calls.
+"""
+
+import pytest
+
+from app.features.knowledge import bulk
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db, self.table, self.filters, self.op, self.values = db, table, [], "select", None
+
+    def select(self, *args):
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def update(self, values):
+        self.op, self.values = "update", values
+        return self
+
+    def insert(self, rows):
+        self.op, self.values = "insert", rows
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def execute(self):
+        self.db.calls.append((self.table, self.op))
+        rows = self.db.rows
+        matched = [r for r in rows if all(f(r) for f in self.filters)]
+        if self.op == "delete":
+            self.db.rows = [r for r in rows if r not in matched]
+        elif self.op == "update":
+            for r in matched:
+                r.update(self.values)
+        elif self.op == "insert":
+            matched = [{"id": f"new-{len(rows) + i}", **row} for i, row in enumerate(self.values)]
+            rows.extend(matched)
+        return type("Res", (), {"data": matched})()
+
+
+class FakeDB:
+    def __init__(self, rows, fail_remove=False, missing_temp=()):
+        self.rows = rows
+        self.calls: list[tuple] = []
+        self.fail_remove = fail_remove
+        self.missing_temp = set(missing_temp)
+        self.storage = self
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def from_(self, bucket):
+        return self
+
+    def remove(self, paths):
+        self.calls.append(("storage", "remove", tuple(paths)))
+        if self.fail_remove:
+            raise RuntimeError("storage down")
+
+    def move(self, src, dst):
+        self.calls.append(("storage", "move", src))
+        if src in self.missing_temp:
+            raise RuntimeError("not found")
+
+
+def _material(mid, user="u1", status="success", url=None):
+    return {"id": mid, "user_id": user, "file_name": f"{mid}.pdf",
+            "file_url": url or f"{user}/study/{mid}.pdf", "processing_status": status}
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    keys = []
+    monkeypatch.setattr(bulk, "_enqueue_ingest", lambda mid, user_id, key: keys.append(key))
+    return keys
+
+
+class TestBulkDelete:
+    def test_one_remove_and_one_delete(self):
+        db = FakeDB([_material("a"), _material("b"), _material("c", user="other")])
+        results = bulk.bulk_delete_materials(db, "u1", ["a", "b", "c", "a"])
+
+        assert [r["status"] for r in results] == ["deleted", "deleted", "not_found"]
+        assert [c for c in db.calls if c[0] == "storage"] == [("storage", "remove", ("u1/study/a.pdf", "u1/study/b.pdf"))]
+        assert db.calls.count(("study_materials", "delete")) == 1
+        assert [r["id"] for r in db.rows] == ["c"]
+
+    def test_storage_failure_keeps_rows_with_files(self):
+        db = FakeDB([_material("a"), _material("b", url="https://legacy/b.pdf")], fail_remove=True)
+        results = bulk.bulk_delete_materials(db, "u1", ["a", "b"])
+
+        assert [r["status"] for r in results] == ["error", "deleted"]
+        assert [r["id"] for r in db.rows] == ["a"]
+
+    def test_limits(self):
+        with pytest.raises(ValueError):
+            bulk.bulk_delete_materials(FakeDB([]), "u1", [])
+        with pytest.raises(ValueError):
+            bulk.bulk_delete_materials(FakeDB([]), "u1", [str(i) for i in range(bulk.MAX_BULK_ITEMS + 1)])
+
+
+class TestBulkPromote:
+    def test_single_insert_and_per_item_results(self, enqueued):
+        db = FakeDB([], missing_temp={"u1/temp/gone.pdf"})
+        results = bulk.bulk_promote_temp_files(db, "u1", [
+            {"storage_path": "u1/temp/a.pdf", "domain": "study"},
+            {"storage_path": "u1/temp/gone.pdf", "domain": "study"},
+            {"storage_path": "u2/temp/x.pdf", "domain": "study"},
+            {"storage_path": "u1/temp/b.md", "domain": "nope"},
+            {"storage_path": "u1/temp/c.md", "domain": "work"},
+        ])
+
+        assert [r["status"] for r in results] == ["queued", "error", "error", "error", "queued"]
+        assert db.calls.count(("study_materials", "insert")) == 1
+        assert {r["file_url"]: r["file_type"] for r in db.rows} == {
+            "u1/study/a.pdf": "application/pdf", "u1/work/c.md": "text/markdown",
+        }
+        assert enqueued == [f"ingest:{results[0]['material_id']}", f"ingest:{results[4]['material_id']}"]
+
+
+class TestBulkReindex:
+    def test_queues_with_reindex_key_and_skips_processing(self, enqueued):
+        db = FakeDB([_material("a", status="failed"), _material("b", status="processing")])
+        results = bulk.bulk_reindex_materials(db, "u1", ["a", "b", "zzz"])
+
+        assert [r["status"] for r in results] == ["queued", "skipped", "not_found"]
+        assert db.rows[0]["processing_status"] == "processing"
+        assert len(enqueued) == 1 and enqueued[0].startswith("ingest:a:reindex:")
+
+    def test_skips_materials_without_a_stored_file(self, enqueued):
+        imported = {**_material("c"), "file_url": None}  # Nhập từ snapshot
+        db = FakeDB([imported])
+        results = bulk.bulk_reindex_materials(db, "u1", ["c"])
+
+        assert results[0]["status"] == "skipped"
+        assert db.rows[0]["processing_status"] == "success" and enqueued == []
@@ -0,0 +1,107 @@
+"""
+Unit tests for the token-aware chunker, plus a savings report on the fixture corpus
+against the previous RecursiveCharacterTextSplitter(1000, 200).
+
+Run with `pytest -s tests/test_chunker.py` to print the report.
+"""
+
+import math
+import textwrap
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.features.knowledge.chunker import TokenAwareChunker, estimate_tokens
+
+CORPUS_DIR = Path(__file__).parent / "fixtures" / "corpus"
+EMBED_BATCH_SIZE = 50  # Như BATCH_SIZE trong document_tasks
+
+
+def _pdf_like_pages(lines_per_page: int = 45, width: int = 90) -> list[Document]:
+    """Fixture corpus laid out like pypdf output: hard-wrapped lines, no blank lines."""
+    text = " ".join(p.read_text(encoding="utf-8") for p in sorted(CORPUS_DIR.glob("*.md")))
+    lines = textwrap.wrap(" ".join(text.split()), width)
+    return [
+        Document(page_content="\n".join(lines[i:i + lines_per_page]), metadata={"page": i // lines_per_page})
+        for i in range(0, len(lines), lines_per_page)
+    ]
+
+
+def _stats(chunks: list[Document]) -> dict:
+    tokens = [estimate_tokens(c.page_content) for c in chunks]
+    return {
+        "chunks": len(chunks),
+        "embed_calls": math.ceil(len(chunks) / EMBED_BATCH_SIZE),
+        "tokens": sum(tokens),
+        "max_tokens": max(tokens),
+    }
+
+
+class TestEstimateTokens:
+    def test_diacritics_cost_more_per_character(self):
+        assert estimate_tokens("người nghiên cứu") > estimate_tokens("nguoi nghien cuu")
+
+    def test_punctuation_and_empty(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("a, b.") == 4
+
+
+class TestTokenAwareChunker:
+    def test_chunks_respect_token_budget(self):
+        chunker = TokenAwareChunker(target_tokens=120, overlap_tokens=12)
+        for chunk in chunker.split_documents(_pdf_like_pages()):
+            assert estimate_tokens(chunk.page_content) <= 120
+
+    def test_no_text_is_lost(self):
+        page = _pdf_like_pages()[0]
+        chunks = TokenAwareChunker(target_tokens=120, overlap_tokens=12).split_text(page.page_content)
+        assert set(page.page_content.split()) == set(" ".join(chunks).split())
+
+    def test_overlap_carries_previous_tail(self):
+        text = "\n\n".join(f"Câu số {i} nói về cấu trúc dữ liệu." for i in range(20))
+        chunks = TokenAwareChunker(target_tokens=40, overlap_tokens=12).split_text(text)
+        assert len(chunks) > 1
+        for prev, nxt in zip(chunks, chunks[1:]):
+            first_unit = nxt.split("\n\n")[0]
+            assert prev.endswith(first_unit)
+
+    def test_splits_at_paragraphs_first(self):
+        text = "Đoạn một ngắn.\n\nĐoạn hai ngắn."
+        chunks = TokenAwareChunker(target_tokens=8, overlap_tokens=0).split_text(text)
+        assert chunks == ["Đoạn một ngắn.", "Đoạn hai ngắn."]
+
+    def test_metadata_is_copied(self):
+        docs = [Document(page_content="Nội dung. " * 200, metadata={"page": 3, "heading": "Chương 1"})]
+        chunks = TokenAwareChunker(target_tokens=50, overlap_tokens=5).split_documents(docs)
+        assert len(chunks) > 1
+        assert all(c.metadata == {"page": 3, "heading": "Chương 1"} for c in chunks)
+
+    def test_overlap_must_be_smaller_than_target(self):
+        with pytest.raises(ValueError):
+            TokenAwareChunker(target_tokens=100, overlap_tokens=100)
+
+
+class TestCorpusReport:
+    def test_fewer_embedded_tokens_and_calls_than_character_splitter(self):
+        docs = _pdf_like_pages() * 6  # ~12 trang mỗi file giáo trình
+        baseline = _stats(RecursiveCharacterTextSplitter(
+            chunk_size=1000, chunk_overlap=200, separators=["\n\n", "\n", " ", ""]
+        ).split_documents(docs))
+        tokenized = _stats(TokenAwareChunker().split_documents(docs))
+        raw_tokens = sum(estimate_tokens(d.page_content) for d in docs)
+
+        print(
+            f"\nCorpus: {len(docs)} pages, {raw_tokens} tokens"
+            f"\n  char 1000/200 : {baseline}"
+            f"\n  token 450/32  : {tokenized}"
+            f"\n  saved         : {baseline['chunks'] - tokenized['chunks']} embedded texts, "
+            f"{baseline['tokens'] - tokenized['tokens']} tokens "
+            f"({(baseline['tokens'] - tokenized['tokens']) / baseline['tokens']:.0%})"
+        )
+
+        assert tokenized["chunks"] < baseline["chunks"]
+        assert tokenized["embed_calls"] <= baseline["embed_calls"]
+        assert tokenized["tokens"] < baseline["tokens"]
+        assert tokenized["max_tokens"] <= 450
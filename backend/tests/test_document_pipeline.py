@@ -0,0 +1,143 @@
+"""
+Unit tests for the streaming ingestion pipeline in document_tasks.
+Embedding and Supabase are replaced by in-memory fakes.
+"""
+
+import pytest
+
+from app.background import document_tasks
+
+
+class FakeDB:
+    def __init__(self):
+        self.inserted: list[dict] = []
+
+    def table(self, name):
+        return self
+
+    def insert(self, rows):
+        self.inserted.extend(rows)
+        return self
+
+    def update(self, values):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def execute(self):
+        return self
+
+
+class FakeProgress:
+    def __init__(self):
+        self.updates: list[dict] = []
+
+    def update(self, stage=None, **counters):
+        self.updates.append({"stage": stage, **counters})
+
+    def finish(self, status, error=None):
+        self.updates.append({"stage": status})
+
+
+@pytest.fixture
+def fake_embed(monkeypatch):
+    calls = []
+
+    def embed(texts, lane=None):
+        calls.append(len(texts))
+        return [[0.0] for _ in texts]
+
+    monkeypatch.setattr(document_tasks, "embed_texts_batched", embed)
+    return calls
+
+
+class TestIngestDocument:
+    def test_chunks_are_embedded_while_extracting(self, tmp_path, fake_embed):
+        path = tmp_path / "doc.md"
+        sections = [f"# Phần {i}\n" + ("Nội dung dài. " * 3000) for i in range(4)]
+        path.write_text("\n".join(sections), encoding="utf-8")
+
+        db, progress = FakeDB(), FakeProgress()
+        count = document_tasks._ingest_document(db, "m1", str(path), "doc.md", progress)
+
+        assert count == len(db.inserted)
+        assert [r["chunk_index"] for r in db.inserted] == list(range(count))
+        assert {r["section_title"] for r in db.inserted} == {f"Phần {i}" for i in range(4)}
+        assert all(r["page_number"] == 1 for r in db.inserted)
+
+        # Mẻ đầu được embed trước khi extraction kết thúc
+        done_at = next(i for i, u in enumerate(progress.updates) if u.get("extraction_done"))
+        assert any("chunks_embedded" in u for u in progress.updates[:done_at])
+
+    def test_empty_document_raises(self, tmp_path, fake_embed):
+        path = tmp_path / "empty.txt"
+        path.write_text("   \n")
+        with pytest.raises(ValueError):
+            document_tasks._ingest_document(FakeDB(), "m1", str(path), "empty.txt", FakeProgress())
+
+
+class JobDB:
+    """study_materials row + recorded writes for run_ingest_document_job."""
+
+    def __init__(self, material: dict):
+        self.material = material
+        self.ops: list[tuple] = []
+
+    def table(self, name):
+        db = self
+
+        class Query:
+            def select(self, *args):
+                self.op = "select"
+                return self
+
+            def update(self, values):
+                self.op = "update"
+                db.material.update(values)
+                return self
+
+            def delete(self):
+                self.op = "delete"
+                return self
+
+            def eq(self, *args):
+                return self
+
+            def execute(self):
+                db.ops.append((name, self.op))
+                return type("Res", (), {"data": [dict(db.material)] if self.op == "select" else []})()
+
+        return Query()
+
+
+@pytest.fixture
+def job_db(monkeypatch):
+    def make(material):
+        db = JobDB(material)
+        monkeypatch.setattr(document_tasks, "get_supabase_client", lambda: db)
+        monkeypatch.setattr(document_tasks, "IngestionProgress", lambda *a: FakeProgress())
+        return db
+    return make
+
+
+class TestIngestJob:
+    def test_failed_download_keeps_existing_chunks(self, job_db, monkeypatch):
+        db = job_db({"file_url": "u1/study/a.pdf", "file_name": "a.pdf", "chunk_count": 12})
+
+        def broken_download(*args):
+            raise RuntimeError("storage down")
+
+        monkeypatch.setattr(document_tasks, "download_to_tempfile", broken_download)
+        with pytest.raises(RuntimeError):
+            document_tasks.run_ingest_document_job({"material_id": "m1"}, {"attempts": 1, "max_attempts": 3})
+        assert ("material_chunks", "delete") not in db.ops
+
+    def test_material_without_stored_file_is_skipped(self, job_db, monkeypatch):
+        db = job_db({"file_url": None, "file_name": "a.pdf", "chunk_count": 12, "processing_status": "processing"})
+        monkeypatch.setattr(document_tasks, "download_to_tempfile", pytest.fail)
+
+        result = document_tasks.run_ingest_document_job({"material_id": "m1"}, {"attempts": 1, "max_attempts": 3})
+        assert result == {"skipped": "no stored file"}
+        assert ("material_chunks", "delete") not in db.ops
+        assert db.material["processing_status"] == "success"
@@ -0,0 +1,90 @@
+"""
+Unit tests for the micro-batching embedding service (knowledge feature).
+Uses a fake embed function so no embedding API is called.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.features.knowledge.embedding_batcher import LANE_BULK, EmbeddingBatcher
+
+
+class FakeEmbedder:
+    def __init__(self, fail: bool = False):
+        self.calls: list[list[str]] = []
+        self.fail = fail
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return [[float(len(t))] for t in texts]
+
+
+class TestEmbeddingBatcher:
+    def test_concurrent_requests_share_one_call(self):
+        fake = FakeEmbedder()
+        batcher = EmbeddingBatcher(window_ms=100, max_batch_size=50, embed_fn=fake)
+        results = {}
+
+        def worker(text):
+            results[text] = batcher.submit(text).result(timeout=5)
+
+        threads = [threading.Thread(target=worker, args=("x" * n,)) for n in range(1, 6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(fake.calls) == 1
+        assert results == {"x" * n: [float(n)] for n in range(1, 6)}
+
+    def test_max_batch_size_splits_calls(self):
+        fake = FakeEmbedder()
+        batcher = EmbeddingBatcher(window_ms=50, max_batch_size=2, embed_fn=fake)
+        futures = batcher.submit_many(["a", "bb", "ccc"])
+        assert [f.result(timeout=5) for f in futures] == [[1.0], [2.0], [3.0]]
+        assert [len(c) for c in fake.calls] == [2, 1]
+
+    def test_duplicate_texts_embedded_once(self):
+        fake = FakeEmbedder()
+        batcher = EmbeddingBatcher(window_ms=50, embed_fn=fake)
+        futures = batcher.submit_many(["same", "same"])
+        assert [f.result(timeout=5) for f in futures] == [[4.0], [4.0]]
+        assert fake.calls == [["same"]]
+
+    def test_failure_propagates_to_every_caller(self):
+        batcher = EmbeddingBatcher(window_ms=20, embed_fn=FakeEmbedder(fail=True))
+        futures = batcher.submit_many(["a", "b"])
+        for f in futures:
+            with pytest.raises(RuntimeError):
+                f.result(timeout=5)
+
+    def test_async_callers_can_await(self):
+        fake = FakeEmbedder()
+        batcher = EmbeddingBatcher(window_ms=50, embed_fn=fake)
+
+        async def run():
+            return await asyncio.gather(*(asyncio.wrap_future(batcher.submit(t)) for t in ["a", "bb"]))
+
+        assert asyncio.run(run()) == [[1.0], [2.0]]
+        assert len(fake.calls) == 1
+
+    def test_bulk_lane_does_not_block_interactive_requests(self):
+        release = threading.Event()
+
+        def embed(texts):
+            if texts == ["chunk"]:
+                release.wait(timeout=5)  # Ingest đang retry / backoff
+            return [[float(len(t))] for t in texts]
+
+        batcher = EmbeddingBatcher(window_ms=10, embed_fn=embed)
+        bulk = batcher.submit("chunk", lane=LANE_BULK)
+        try:
+            assert batcher.submit("note").result(timeout=2) == [4.0]
+            assert not bulk.done()
+        finally:
+            release.set()
+        assert bulk.result(timeout=5) == [5.0]
@@ -0,0 +1,72 @@
+"""
+Unit tests for batched note embedding (background/embedding_tasks).
+The embedding batcher and Supabase are replaced by in-memory fakes.
+"""
+
+from concurrent.futures import Future
+
+import pytest
+
+from app.background import embedding_tasks
+
+
+class FakeBatcher:
+    def submit_many(self, texts):
+        futures = []
+        for text in texts:
+            future = Future()
+            future.set_result([float(len(text))])
+            futures.append(future)
+        return futures
+
+
+class FakeDB:
+    def __init__(self, fail_rpc=False):
+        self.fail_rpc = fail_rpc
+        self.rows = [{"id": "n1", "content": "hello"}, {"id": "n2", "content": "hi"}]
+        self.written: list[dict] = []
+
+    def table(self, name):
+        return self
+
+    def select(self, *args):
+        return self
+
+    def update(self, values):
+        return self
+
+    def in_(self, *args):
+        return self
+
+    def rpc(self, name, params):
+        if self.fail_rpc:
+            raise RuntimeError("rpc down")
+        self.written.extend(params["updates"])
+        return self
+
+    def execute(self):
+        return type("Res", (), {"data": self.rows})()
+
+
+@pytest.fixture
+def patch_db(monkeypatch):
+    def make(**kwargs):
+        db = FakeDB(**kwargs)
+        monkeypatch.setattr(embedding_tasks, "get_supabase_client", lambda: db)
+        monkeypatch.setattr(embedding_tasks, "get_embedding_batcher", FakeBatcher)
+        return db
+    return make
+
+
+class TestEmbedNotesJob:
+    def test_batch_written_with_one_rpc(self, patch_db):
+        db = patch_db()
+        stats = embedding_tasks.run_embed_notes_job({"note_ids": ["n1", "n2"]}, {})
+        assert stats == {"success": 2, "failed": 0}
+        assert [u["embedding_status"] for u in db.written] == ["success", "success"]
+
+    def test_failed_bulk_write_fails_the_job(self, patch_db):
+        patch_db(fail_rpc=True)
+        # Không được báo success khi chưa ghi được gì → job queue retry
+        with pytest.raises(RuntimeError):
+            embedding_tasks.run_embed_notes_job({"note_ids": ["n1", "n2"]}, {})
@@ -0,0 +1,87 @@
+"""
+Unit tests for the streaming extractor registry (knowledge feature).
+Builds small DOCX / PPTX / MD / TXT fixtures on the fly.
+"""
+
+import types
+
+import pytest
+
+from app.features.knowledge.extractors import iter_documents, supported_extensions
+from app.features.knowledge import extractors
+
+
+class TestRegistry:
+    def test_supported_formats(self):
+        assert {"pdf", "docx", "pptx", "md", "txt"} <= supported_extensions()
+
+    def test_unknown_extension(self, tmp_path):
+        path = tmp_path / "a.xyz"
+        path.write_text("x")
+        with pytest.raises(ValueError):
+            list(iter_documents(str(path), "a.xyz"))
+
+    def test_is_lazy(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("hello")
+        assert isinstance(iter_documents(str(path), "a.txt"), types.GeneratorType)
+
+
+class TestMarkdown:
+    def test_sections_by_heading(self, tmp_path):
+        path = tmp_path / "notes.md"
+        path.write_text(
+            "Intro text\n\n# Chương 1\nNội dung 1\n\n```\n# not a heading\n```\n## Mục 1.1\nNội dung 1.1\n",
+            encoding="utf-8",
+        )
+        docs = list(iter_documents(str(path), "notes.md"))
+        assert [d.metadata["heading"] for d in docs] == [None, "Chương 1", "Mục 1.1"]
+        assert "# not a heading" in docs[1].page_content
+
+
+class TestText:
+    def test_splits_large_text_on_blank_lines(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(extractors, "TEXT_SECTION_CHARS", 50)
+        path = tmp_path / "big.txt"
+        path.write_text(("a" * 40 + "\n" + "b" * 40 + "\n\n") * 3)
+        docs = list(iter_documents(str(path), "big.txt"))
+        assert len(docs) == 3
+        assert all("page" not in d.metadata for d in docs)
+
+
+class TestDocx:
+    def test_sections_by_heading_style(self, tmp_path):
+        import docx
+
+        document = docx.Document()
+        document.add_paragraph("Lời nói đầu")
+        document.add_heading("Chương 1", level=1)
+        document.add_paragraph("Biến và kiểu dữ liệu")
+        document.add_heading("Chương 2", level=1)
+        document.add_paragraph("Vòng lặp")
+        path = tmp_path / "doc.docx"
+        document.save(path)
+
+        docs = list(iter_documents(str(path), "doc.docx"))
+        assert [d.metadata["heading"] for d in docs] == [None, "Chương 1", "Chương 2"]
+        assert "Vòng lặp" in docs[2].page_content
+
+
+class TestPptx:
+    def test_one_document_per_slide(self, tmp_path):
+        from pptx import Presentation
+
+        presentation = Presentation()
+        for title, body in [("Giới thiệu", "PHP là gì"), ("Cú pháp", "echo, biến")]:
+            slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+            slide.shapes.title.text = title
+            slide.placeholders[1].text = body
+        presentation.slides[1].notes_slide.notes_text_frame.text = "Nhấn mạnh dấu $"
+        path = tmp_path / "deck.pptx"
+        presentation.save(path)
+
+        docs = list(iter_documents(str(path), "deck.pptx"))
+        assert [d.metadata["slide_number"] for d in docs] == [1, 2]
+        assert [d.metadata["heading"] for d in docs] == ["Giới thiệu", "Cú pháp"]
+        assert docs[1].metadata["page"] == 1 and docs[1].metadata["total_pages"] == 2
+        assert "Nhấn mạnh dấu $" in docs[1].page_content
@@ -0,0 +1,69 @@
+"""
+Unit tests for precomputed grade analytics (GPA, credits, failed/retake lists, subject lookup).
+"""
+
+import asyncio
+
+from app.features.academic import service as academic_service
+from app.features.academic.cache import AcademicCache
+from app.features.academic.grade_analytics import GradeAnalytics, GradeAnalyticsCache, normalize_name
+from app.features.academic.service import AcademicService
+
+
+def _course(code, name, credits, grade_10=None, letter="", grade_4=None):
+    return {"ma_mon": code, "ten_mon": name, "so_tin_chi": str(credits),
+            "diem_tk": "" if grade_10 is None else str(grade_10),
+            "diem_tk_chu": letter, "diem_tk_so": "" if grade_4 is None else str(grade_4)}
+
+
+RAW = [  # Mới nhất trước, như portal trả về
+    {"hoc_ky": "20252", "ten_hoc_ky": "HK2 2025-2026", "ds_diem_mon_hoc": [
+        _course("MA101", "Giải tích 1", 3, 6.5, "C+"),
+        _course("CS102", "Cấu trúc dữ liệu", 3),
+    ]},
+    {"hoc_ky": "20251", "ten_hoc_ky": "HK1 2025-2026", "ds_diem_mon_hoc": [
+        _course("CS101", "Lập trình Python", 4, 8.5, "A", 4),
+        _course("MA101", "Giải tích 1", 3, 3.0, "F"),
+        _course("PH101", "Vật lý đại cương", 2, 2.5, "F"),
+    ]},
+]
+
+
+class TestGradeAnalytics:
+    def test_normalize_strips_vietnamese_diacritics(self):
+        assert normalize_name("Đại số TUYẾN TÍNH!") == "dai so tuyen tinh"
+
+    def test_computed_gpa_credits_failed_and_retakes(self):
+        analytics = GradeAnalytics(RAW)
+        # Tích lũy: lần tốt nhất của môn đạt → CS101 (8.5, 4 TC) + MA101 (6.5, 3 TC)
+        assert analytics.cumulative == {"gpa_10": 7.64, "gpa_4": 3.36, "source": "computed"}
+        assert analytics.credits == {"passed": 7.0, "failed": 2.0, "pending": 3.0}
+        assert [c["code"] for c in analytics.failed] == ["PH101"]
+        assert analytics.retakes == [{"code": "MA101", "name": "Giải tích 1", "attempts": 2, "best_grade_10": 6.5}]
+        assert analytics.semesters[1]["gpa_10"] == round((8.5 * 4 + 3 * 3 + 2.5 * 2) / 9, 2)
+
+    def test_portal_cumulative_wins_when_reported(self):
+        raw = [{**RAW[0], "dtb_tich_luy_he_10": "7,10", "dtb_tich_luy_he_4": "2.95"}, RAW[1]]
+        assert GradeAnalytics(raw).summary()["cumulative"] == {"gpa_10": 7.1, "gpa_4": 2.95, "source": "portal"}
+
+    def test_find_by_code_or_accentless_name(self):
+        analytics = GradeAnalytics(RAW)
+        assert [a["grade_10"] for a in analytics.find("ma101")[0]] == [6.5, 3.0]
+        assert analytics.find("lap trinh python")[0][0]["code"] == "CS101"
+        assert [m[0]["code"] for m in analytics.find("vat ly")] == ["PH101"]
+        assert analytics.find("hóa học") == []
+
+    def test_built_once_per_sync_and_served_from_cache(self, monkeypatch):
+        cache = AcademicCache(max_entries=8)
+        index = GradeAnalyticsCache()
+        monkeypatch.setattr(academic_service, "get_academic_cache", lambda: cache)
+        monkeypatch.setattr(academic_service, "get_grade_analytics_cache", lambda: index)
+        cache.set_ttl("u1", 24)
+        cache.put(("u1", "grades", None), {"ds_diem_hocky": RAW})
+
+        service = AcademicService(db=None)
+        first = asyncio.run(service.get_grade_analytics("u1"))
+        assert asyncio.run(service.get_grade_analytics("u1")) is first
+        cache.put(("u1", "grades", None), {"ds_diem_hocky": list(RAW)})  # sync mới → object mới
+        assert asyncio.run(service.get_grade_analytics("u1")) is not first
+        assert index.stats == {"hits": 1, "builds": 2}
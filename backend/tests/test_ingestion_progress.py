@@ -0,0 +1,119 @@
+"""
+Unit tests for ingestion progress tracking (knowledge feature).
+Covers weighted percent/ETA and throttled persistence of stage counters.
+"""
+
+import pytest
+
+from app.features.knowledge.progress import (
+    IngestionProgress,
+    get_live_progress,
+    get_progress,
+    overall_fraction,
+    with_eta,
+)
+
+
+class FakeDB:
+    """Records study_materials.progress updates."""
+
+    def __init__(self):
+        self.writes: list[dict] = []
+
+    def table(self, name):
+        return self
+
+    def update(self, values):
+        self.writes.append(dict(values["progress"]))
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def execute(self):
+        return self
+
+
+class TestOverallFraction:
+    def test_extraction_only(self):
+        assert overall_fraction({"pages_total": 10, "pages_extracted": 5}) == pytest.approx(0.075)
+
+    def test_embedding_halfway(self):
+        progress = {"chunks_total": 100, "chunks_embedded": 50, "rows_inserted": 0, "extraction_done": True}
+        assert overall_fraction(progress) == pytest.approx(0.15 + 0.35)
+
+    def test_streamed_embedding_is_scaled_by_extraction(self):
+        # Nửa file đã parse, toàn bộ chunk hiện có đã embed → ~nửa công việc embed
+        progress = {"pages_total": 10, "pages_extracted": 5, "chunks_total": 40, "chunks_embedded": 40}
+        assert overall_fraction(progress) == pytest.approx(0.075 + 0.35)
+
+    def test_success_is_complete(self):
+        assert overall_fraction({"stage": "success"}) == 1.0
+
+
+class TestWithEta:
+    def test_eta_extrapolates_from_elapsed(self):
+        progress = {"stage": "embedding", "chunks_total": 100, "chunks_embedded": 50,
+                    "extraction_done": True, "started_ts": 1000.0}
+        result = with_eta(progress, now=1010.0)
+        assert result["percent"] == 50.0
+        assert result["eta_seconds"] == pytest.approx(10.0)
+
+    def test_no_eta_before_any_progress(self):
+        assert with_eta({"stage": "extracting", "started_ts": 1000.0}, now=1005.0)["eta_seconds"] is None
+
+    def test_terminal_stage_has_zero_eta(self):
+        assert with_eta({"stage": "failed"})["eta_seconds"] == 0
+
+
+class TestIngestionProgress:
+    def test_counter_updates_are_throttled_but_stage_changes_persist(self):
+        db = FakeDB()
+        progress = IngestionProgress(db, "m1", persist_interval=60)
+        progress.update(chunks_embedded=10)
+        progress.update(chunks_embedded=20)
+        progress.update(stage="embedding")
+        assert [w["stage"] for w in db.writes] == ["extracting", "embedding"]
+        assert db.writes[-1]["chunks_embedded"] == 20
+
+    def test_live_snapshot_until_finished(self):
+        db = FakeDB()
+        progress = IngestionProgress(db, "m2")
+        progress.update(stage="embedding", chunks_total=4, chunks_embedded=2)
+        assert get_live_progress("m2")["stage"] == "embedding"
+
+        progress.finish("success")
+        assert get_live_progress("m2") is None
+        assert db.writes[-1]["stage"] == "success"
+
+
+class MaterialRowDB:
+    """Returns one study_materials row for get_progress()."""
+
+    def __init__(self, row: dict):
+        self.row = row
+
+    def table(self, name):
+        return self
+
+    def select(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def execute(self):
+        return type("Res", (), {"data": [self.row]})()
+
+
+class TestGetProgress:
+    def test_terminal_status_overrides_stale_stage(self):
+        # Worker chết giữa chừng: progress kẹt "embedding", sweeper đã đặt 'failed'
+        db = MaterialRowDB({"processing_status": "failed", "chunk_count": 0,
+                            "progress": {"stage": "embedding", "chunks_total": 10, "chunks_embedded": 3}})
+        result = get_progress(db, "dead-worker", "u1")
+        assert result["stage"] == "failed" and result["eta_seconds"] == 0
+
+    def test_processing_keeps_persisted_stage(self):
+        db = MaterialRowDB({"processing_status": "processing", "progress": {"stage": "embedding"}})
+        assert get_progress(db, "other-process", "u1")["stage"] == "embedding"
@@ -0,0 +1,214 @@
+"""
+Unit tests for the durable background job queue worker.
+Uses an in-memory JobStore stand-in so no database is needed.
+"""
+
+import asyncio
+
+import pytest
+
+from app.background.job_queue import JobWorker, compute_backoff
+
+
+class MemoryStore:
+    """Minimal in-memory replacement for JobStore."""
+
+    def __init__(self, jobs: list[dict]):
+        self.queued = list(jobs)
+        self.claim_limits: list[int] = []
+        self.completed: dict[str, dict | None] = {}
+        self.retried: dict[str, float] = {}
+        self.buried: dict[str, str] = {}
+
+    def claim(self, worker_id, limit, lease_seconds):
+        self.claim_limits.append(limit)
+        claimed, self.queued = self.queued[:limit], self.queued[limit:]
+        for job in claimed:
+            job["attempts"] = job.get("attempts", 0) + 1
+        return claimed
+
+    def extend_lease(self, job_id, worker_id, lease_seconds):
+        pass
+
+    def complete(self, job_id, result):
+        self.completed[job_id] = result
+
+    def retry(self, job_id, error, delay_seconds):
+        self.retried[job_id] = delay_seconds
+
+    def bury(self, job_id, error):
+        self.buried[job_id] = error
+
+
+def _job(job_id: str, job_type: str = "echo", attempts: int = 0, max_attempts: int = 3) -> dict:
+    return {"id": job_id, "job_type": job_type, "payload": {"value": job_id},
+            "attempts": attempts, "max_attempts": max_attempts}
+
+
+def _run(store: MemoryStore, handlers: dict, concurrency: int = 2):
+    async def main():
+        worker = JobWorker(store, handlers, concurrency=concurrency, poll_interval=0.01)
+        worker.start()
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if not store.queued and not worker._running:
+                break
+        await worker.stop(timeout=1)
+    asyncio.run(main())
+
+
+class TestJobWorker:
+    def test_sync_and_async_handlers_succeed(self):
+        async def async_echo(payload, job):
+            return {"echo": payload["value"]}
+
+        store = MemoryStore([_job("a"), _job("b", job_type="async_echo")])
+        _run(store, {"echo": lambda payload, job: {"echo": payload["value"]}, "async_echo": async_echo})
+        assert store.completed == {"a": {"echo": "a"}, "b": {"echo": "b"}}
+
+    def test_failure_is_retried_with_backoff(self):
+        def boom(payload, job):
+            raise RuntimeError("temporary")
+
+        store = MemoryStore([_job("a", attempts=0, max_attempts=3)])
+        _run(store, {"echo": boom})
+        assert "a" in store.retried and store.retried["a"] > 0
+        assert not store.buried
+
+    def test_last_attempt_is_buried(self):
+        def boom(payload, job):
+            raise RuntimeError("permanent")
+
+        store = MemoryStore([_job("a", attempts=2, max_attempts=3)])
+        _run(store, {"echo": boom})
+        assert "permanent" in store.buried["a"]
+        assert not store.retried
+
+    def test_unknown_job_type_fails(self):
+        store = MemoryStore([_job("a", job_type="missing", attempts=4, max_attempts=5)])
+        _run(store, {})
+        assert "No handler" in store.buried["a"]
+
+    def test_claims_never_exceed_concurrency(self):
+        async def slow(payload, job):
+            await asyncio.sleep(0.05)
+
+        store = MemoryStore([_job(str(i)) for i in range(5)])
+        _run(store, {"echo": slow}, concurrency=2)
+        assert len(store.completed) == 5
+        assert max(store.claim_limits) <= 2
+
+
+class TestComputeBackoff:
+    @pytest.mark.parametrize("attempt,base,upper", [(1, 10, 10), (3, 10, 40), (20, 10, 600)])
+    def test_bounds(self, attempt, base, upper):
+        delay = compute_backoff(attempt, base)
+        assert upper / 2 <= delay <= upper
+
+
+class SweepDB:
+    """Just enough of the Supabase client for sweep_stuck_jobs()."""
+
+    def __init__(self, materials: list[dict], jobs: list[dict]):
+        self.tables = {"study_materials": materials, "background_jobs": jobs, "quick_notes": []}
+
+    def rpc(self, name, params=None):
+        return type("Call", (), {"execute": lambda _: self._result([])})()
+
+    def table(self, name):
+        db, rows = self, self.tables[name]
+
+        class Query:
+            def __init__(self):
+                self.filters, self.values = [], None
+
+            def select(self, *args):
+                return self
+
+            def update(self, values):
+                self.values = values
+                return self
+
+            def eq(self, column, value):
+                self.filters.append(lambda r: r.get(column) == value)
+                return self
+
+            def in_(self, column, values):
+                if column == "embedding_status":
+                    return self
+                if column == "payload->>material_id":
+                    self.filters.append(lambda r: r["payload"].get("material_id") in values)
+                else:
+                    self.filters.append(lambda r: r.get(column) in values)
+                return self
+
+            def lt(self, column, value):
+                return self
+
+            def order(self, column, desc=False):
+                return self
+
+            def limit(self, n):
+                return self
+
+            def execute(self):
+                matched = [r for r in rows if all(f(r) for f in self.filters)]
+                for r in matched:
+                    r.update(self.values or {})
+                return db._result(matched)
+
+        return Query()
+
+    @staticmethod
+    def _result(data):
+        return type("Res", (), {"data": data})()
+
+
+class TestSweepStuckMaterials:
+    def test_requeues_only_materials_without_a_live_job(self, monkeypatch):
+        from app.background import job_queue
+
+        def _material(mid):
+            return {"id": mid, "user_id": "u1", "file_name": f"{mid}.pdf", "processing_status": "processing"}
+
+        def _ingest(mid, status):
+            return {"id": f"job-{mid}-{status}", "job_type": job_queue.JOB_INGEST_DOCUMENT,
+                    "status": status, "payload": {"material_id": mid}}
+
+        materials = [_material(m) for m in ("fresh", "running", "dead", "done", "looping")]
+        jobs = [
+            _ingest("running", "running"),
+            _ingest("dead", "dead"),
+            _ingest("done", "succeeded"),
+            *[_ingest("looping", "succeeded") for _ in range(job_queue.STUCK_MAX_REQUEUES + 1)],
+        ]
+        db = SweepDB(materials, jobs)
+        enqueued = []
+        monkeypatch.setattr(job_queue, "get_supabase_client", lambda: db)
+        monkeypatch.setattr(job_queue, "enqueue_job", lambda *a, **kw: enqueued.append(kw["idempotency_key"]))
+
+        stats = job_queue.sweep_stuck_jobs()
+
+        assert enqueued == ["ingest:fresh", "ingest:done:sweep:1"]
+        assert stats["materials_requeued"] == 2 and stats["materials_failed"] == 2
+        status = {m["id"]: m["processing_status"] for m in materials}
+        assert status == {"fresh": "processing", "running": "processing", "dead": "failed",
+                          "done": "processing", "looping": "failed"}
+
+    def test_notes_with_a_live_job_are_not_requeued(self, monkeypatch):
+        from app.background import job_queue
+
+        db = SweepDB([], [
+            {"id": "j1", "job_type": job_queue.JOB_EMBED_NOTES, "status": "queued",
+             "payload": {"note_ids": ["n1"]}},
+            {"id": "j2", "job_type": job_queue.JOB_EMBED_NOTES, "status": "dead",
+             "payload": {"note_ids": ["n2"]}},
+        ])
+        db.tables["quick_notes"] = [{"id": "n1"}, {"id": "n2"}]
+        enqueued = []
+        monkeypatch.setattr(job_queue, "get_supabase_client", lambda: db)
+        monkeypatch.setattr(job_queue, "enqueue_job", lambda job_type, payload, **kw: enqueued.append(payload))
+
+        stats = job_queue.sweep_stuck_jobs()
+        assert enqueued == [{"note_ids": ["n2"]}]
+        assert stats["notes_requeued"] == 1
@@ -0,0 +1,183 @@
+"""
+Unit tests for knowledge-base snapshot export/import (NPZ, float16 vectors, zstd text).
+"""
+
+import io
+import json
+
+import numpy as np
+import pytest
+
+from app.features.knowledge import snapshot
+
+DIM = 8
+
+
+def _vector(seed: int) -> str:
+    # PostgREST trả pgvector dạng chuỗi JSON
+    return json.dumps(np.random.default_rng(seed).normal(size=DIM).round(4).tolist())
+
+
+MATERIALS = [
+    {"id": "m1", "file_name": "Giải tích.pdf", "domain": "study", "processing_status": "success", "tags": ["toán"]},
+    {"id": "m2", "file_name": "dang-xu-ly.pdf", "domain": "study", "processing_status": "processing"},
+]
+CHUNKS = [
+    {"id": f"c{i}", "material_id": "m1", "content": f"Đạo hàm riêng phần {i}", "chunk_index": i,
+     "page_number": 1, "section_title": "Chương 1", "embedding": _vector(i)}
+    for i in range(3)
+]
+NOTES = [
+    {"id": "n1", "content": "Mật khẩu wifi là abc123", "tags": ["wifi"], "embedding": _vector(9)},
+    {"id": "n2", "content": "Chưa embed", "tags": [], "embedding": None},
+]
+
+
+class FakeDB:
+    def __init__(self, fail_on: str | None = None):
+        self.inserts: list[tuple[str, int]] = []
+        self.rows: dict[str, list] = {}
+        self.fail_on = fail_on
+        self._table = None
+        self._op = None
+        self._filters = []
+
+    def table(self, name):
+        self._table, self._op, self._filters = name, None, []
+        return self
+
+    def insert(self, rows):
+        if self._table == self.fail_on:
+            raise RuntimeError("insert failed")
+        self.inserts.append((self._table, len(rows)))
+        self.rows.setdefault(self._table, []).extend(rows)
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        self._filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def execute(self):
+        if self._op == "delete":
+            rows = self.rows.get(self._table, [])
+            self.rows[self._table] = [r for r in rows if not all(f(r) for f in self._filters)]
+        return self
+
+
+def _bundle() -> io.BytesIO:
+    buf = io.BytesIO()
+    snapshot.write_snapshot(buf, "u-old", DIM, MATERIALS, CHUNKS, NOTES)
+    buf.seek(0)
+    return buf
+
+
+def _rewrite(buf: io.BytesIO, **arrays) -> io.BytesIO:
+    bundle = dict(np.load(buf, allow_pickle=False))
+    bundle.update(arrays)
+    out = io.BytesIO()
+    np.savez(out, **bundle)
+    out.seek(0)
+    return out
+
+
+class TestSnapshotFormat:
+    def test_round_trip_keeps_text_and_float16_vectors(self):
+        data = snapshot.read_snapshot(_bundle())
+        assert data["manifest"]["counts"] == {"materials": 2, "chunks": 3, "notes": 2}
+        assert data["materials"][0]["file_name"] == "Giải tích.pdf"
+        assert data["chunks"][2]["content"] == "Đạo hàm riêng phần 2"
+        original = np.array(json.loads(CHUNKS[1]["embedding"]))
+        assert np.allclose(data["chunks"][1]["embedding"], original, atol=1e-2)
+        assert data["notes"][1]["embedding"] is None
+
+    def test_rejects_other_files(self):
+        buf = io.BytesIO()
+        np.savez(buf, something=np.zeros(3))
+        buf.seek(0)
+        with pytest.raises(ValueError):
+            snapshot.read_snapshot(buf)
+
+    def test_rejects_manifest_without_dimension(self):
+        manifest = json.loads(np.load(_bundle())["manifest"].tobytes())
+        del manifest["dim"]
+        raw = np.frombuffer(json.dumps(manifest).encode(), dtype=np.uint8)
+        with pytest.raises(ValueError):
+            snapshot.read_snapshot(_rewrite(_bundle(), manifest=raw))
+
+    def test_rejects_missing_arrays_and_shape_mismatch(self):
+        bundle = dict(np.load(_bundle()))
+        del bundle["notes_embedding"]
+        buf = io.BytesIO()
+        np.savez(buf, **bundle)
+        buf.seek(0)
+        with pytest.raises(ValueError):
+            snapshot.read_snapshot(buf)
+        with pytest.raises(ValueError):
+            snapshot.read_snapshot(_rewrite(_bundle(), chunks_embedding=np.zeros((1, DIM), dtype=np.float16)))
+
+    def test_decompressed_text_is_capped(self):
+        assert snapshot.read_snapshot(_bundle(), max_text_bytes=1 << 20)["chunks"]
+        with pytest.raises(ValueError):
+            snapshot.read_snapshot(_bundle(), max_text_bytes=64)
+
+
+class TestImport:
+    def test_batched_insert_with_new_ids(self, monkeypatch):
+        monkeypatch.setattr(snapshot, "IMPORT_BATCH_SIZE", 2)
+        db = FakeDB()
+        counts = snapshot.import_snapshot(db, "u-new", _bundle(), DIM)
+
+        assert counts == {"materials": 2, "chunks": 3, "notes": 2}
+        assert db.inserts == [
+            ("study_materials", 2), ("material_chunks", 2), ("material_chunks", 1), ("quick_notes", 2),
+        ]
+        materials = {m["file_name"]: m for m in db.rows["study_materials"]}
+        m1 = materials["Giải tích.pdf"]
+        assert m1["id"] != "m1" and m1["user_id"] == "u-new"
+        assert m1["processing_status"] == "success" and m1["chunk_count"] == 3
+        assert materials["dang-xu-ly.pdf"]["processing_status"] == "failed"
+        assert {c["material_id"] for c in db.rows["material_chunks"]} == {m1["id"]}
+        assert [n["embedding_status"] for n in db.rows["quick_notes"]] == ["success", "pending"]
+
+    def test_untrusted_rows_are_confined_to_the_importing_user(self, monkeypatch):
+        bundle = snapshot.read_snapshot(_bundle())
+        bundle["materials"][0].update(file_url="victim-id/secret.pdf", user_id="victim-id")
+        bundle["chunks"].append({**bundle["chunks"][0], "id": "evil", "material_id": "victim-material"})
+        bundle["notes"][0]["is_admin"] = True
+        monkeypatch.setattr(snapshot, "read_snapshot", lambda fileobj, max_text_bytes=None: bundle)
+
+        for keep_ids in (False, True):
+            db = FakeDB()
+            counts = snapshot.import_snapshot(db, "u-new", None, DIM, keep_ids=keep_ids)
+            assert counts["chunks"] == 3
+            assert "victim-material" not in {c["material_id"] for c in db.rows["material_chunks"]}
+            assert all(m["file_url"] is None and m["user_id"] == "u-new" for m in db.rows["study_materials"])
+            assert "is_admin" not in db.rows["quick_notes"][0]
+
+    def test_keep_ids_and_dimension_check(self):
+        db = FakeDB()
+        snapshot.import_snapshot(db, "u-new", _bundle(), DIM, keep_ids=True)
+        assert [c["id"] for c in db.rows["material_chunks"]] == ["c0", "c1", "c2"]
+        with pytest.raises(ValueError):
+            snapshot.import_snapshot(FakeDB(), "u-new", _bundle(), DIM * 2)
+
+    def test_failed_insert_rolls_back_written_rows(self):
+        db = FakeDB(fail_on="material_chunks")
+        with pytest.raises(RuntimeError):
+            snapshot.import_snapshot(db, "u-new", _bundle(), DIM)
+        assert db.inserts == [("study_materials", 2)]
+        assert db.rows["study_materials"] == []
+
+        db = FakeDB(fail_on="quick_notes")
+        with pytest.raises(RuntimeError):
+            snapshot.import_snapshot(db, "u-new", _bundle(), DIM)
+        # Chunk trong DB thật đi theo CASCADE khi xóa tài liệu
+        assert db.rows["study_materials"] == []
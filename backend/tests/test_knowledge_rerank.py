@@ -0,0 +1,107 @@
+"""
+Unit tests for MMR re-ranking and adjacent-chunk merging in KnowledgeService.
+Tests the pure functions _mmr_select, _rrf_relevance, _join_overlapping and _merge_adjacent_chunks.
+"""
+
+import numpy as np
+
+from app.features.knowledge.service import (
+    _join_overlapping,
+    _merge_adjacent_chunks,
+    _mmr_select,
+    _rrf_relevance,
+)
+
+
+# -- _mmr_select --
+
+class TestMmrSelect:
+    def test_first_pick_is_most_relevant(self):
+        vectors = np.eye(3, dtype=np.float32)
+        relevance = np.array([0.2, 0.9, 0.5], dtype=np.float32)
+        assert _mmr_select(relevance, vectors, k=1) == [1]
+
+    def test_skips_near_duplicate(self):
+        # b is almost identical to a; c is different but slightly less relevant
+        vectors = np.array([[1, 0], [0.99, 0.01], [0, 1]], dtype=np.float32)
+        relevance = np.array([0.90, 0.89, 0.80], dtype=np.float32)
+        assert _mmr_select(relevance, vectors, k=2) == [0, 2]
+
+    def test_lambda_one_is_pure_relevance(self):
+        vectors = np.array([[1, 0], [0.99, 0.01], [0, 1]], dtype=np.float32)
+        relevance = np.array([0.90, 0.89, 0.80], dtype=np.float32)
+        assert _mmr_select(relevance, vectors, k=2, lambda_mult=1.0) == [0, 1]
+
+    def test_k_larger_than_candidates(self):
+        vectors = np.eye(2, dtype=np.float32)
+        assert sorted(_mmr_select(np.array([0.5, 0.4]), vectors, k=10)) == [0, 1]
+
+    def test_empty(self):
+        assert _mmr_select(np.array([]), np.zeros((0, 3)), k=5) == []
+
+
+# -- _join_overlapping --
+
+class TestJoinOverlapping:
+    def test_removes_shared_overlap(self):
+        prev = "Chương 1. Giới thiệu về lập trình PHP căn bản"
+        nxt = "lập trình PHP căn bản và cú pháp biến"
+        assert _join_overlapping(prev, nxt) == "Chương 1. Giới thiệu về lập trình PHP căn bản và cú pháp biến"
+
+    def test_short_accidental_overlap_is_not_merged(self):
+        assert _join_overlapping("abc def", "def ghi") == "abc def\ndef ghi"
+
+
+# -- _rrf_relevance --
+
+class TestRrfRelevance:
+    def test_scaled_by_best_fused_score(self):
+        rows = [{"rrf_score": 1 / 61, "similarity": 0.2}, {"rrf_score": 2 / 61, "similarity": 0.9}, {}]
+        assert np.allclose(_rrf_relevance(rows), [0.5, 1.0, 0.0])
+
+    def test_lexical_only_match_outranks_vector_similarity(self):
+        # Chỉ khớp từ khóa (similarity thấp) nhưng đứng đầu RRF → MMR vẫn chọn trước
+        rows = [{"rrf_score": 0.03, "similarity": 0.1}, {"rrf_score": 0.01, "similarity": 0.9}]
+        vectors = np.array([[1.0, 0.0], [0.0, 1.0]])
+        assert _mmr_select(_rrf_relevance(rows), vectors, k=1) == [0]
+
+    def test_no_scores(self):
+        assert _rrf_relevance([]).size == 0
+        assert np.allclose(_rrf_relevance([{}, {}]), [0, 0])
+
+
+# -- _merge_adjacent_chunks --
+
+def _row(material_id: str, idx: int, content: str, similarity: float, page: int = 1) -> dict:
+    return {
+        "material_id": material_id, "file_name": f"{material_id}.pdf", "domain": "study",
+        "chunk_index": idx, "page_number": page, "content": content, "similarity": similarity,
+    }
+
+
+class TestMergeAdjacentChunks:
+    def test_consecutive_chunks_become_one_passage(self):
+        overlap = "x" * 30
+        rows = [
+            _row("m1", 4, overlap + " tail", 0.7, page=3),
+            _row("m1", 3, "head " + overlap, 0.8, page=2),
+        ]
+        passages = _merge_adjacent_chunks(rows)
+        assert len(passages) == 1
+        p = passages[0]
+        assert (p["chunk_start"], p["chunk_end"]) == (3, 4)
+        assert (p["page_number"], p["page_end"]) == (2, 3)
+        assert p["content"] == "head " + overlap + " tail"
+        assert p["similarity"] == 0.8
+
+    def test_gap_or_other_material_stays_separate(self):
+        rows = [_row("m1", 1, "a", 0.5), _row("m1", 5, "b", 0.9), _row("m2", 2, "c", 0.7)]
+        passages = _merge_adjacent_chunks(rows)
+        assert [p["content"] for p in passages] == ["b", "c", "a"]
+
+    def test_passages_follow_fused_rank_not_cosine(self):
+        lexical_hit = {**_row("m1", 1, "exact keyword", 0.2), "rrf_score": 0.03}
+        semantic_hit = {**_row("m2", 1, "similar meaning", 0.9), "rrf_score": 0.016}
+        passages = _merge_adjacent_chunks([semantic_hit, lexical_hit])
+        assert [p["content"] for p in passages] == ["exact keyword", "similar meaning"]
+        assert passages[0]["rrf_score"] == 0.03
@@ -0,0 +1,209 @@
+"""
+Unit tests for the embedded local vector index (knowledge feature).
+Covers top-k search, filters, incremental upserts/deletes, snapshot round-trip,
+material sync reconciliation and the in-process hybrid search path.
+"""
+
+import numpy as np
+import pytest
+
+from app.features.knowledge.local_index import LocalVectorIndex, CORPUS_NOTES, CORPUS_MATERIALS
+
+
+DIM = 4
+
+
+def _note(note_id: str, tags: list[str] | None = None) -> dict:
+    return {"id": note_id, "content": f"note {note_id}", "note_type": "memory", "tags": tags or []}
+
+
+@pytest.fixture
+def notes_index(tmp_path):
+    index = LocalVectorIndex("user-1", CORPUS_NOTES, base_dir=tmp_path, dim=DIM)
+    index.apply_changes([
+        ("a", _note("a", ["wifi"]), [1, 0, 0, 0]),
+        ("b", _note("b", ["school"]), [0, 1, 0, 0]),
+        ("c", _note("c", ["wifi", "home"]), [0.9, 0.1, 0, 0]),
+    ])
+    return index
+
+
+class TestSearch:
+    def test_returns_top_k_sorted_by_similarity(self, notes_index):
+        results = notes_index.search([1, 0, 0, 0], top_k=2)
+        assert [r["id"] for r in results] == ["a", "c"]
+        assert results[0]["similarity"] == pytest.approx(1.0, abs=1e-6)
+        assert results[0]["similarity"] >= results[1]["similarity"]
+
+    def test_top_k_larger_than_index(self, notes_index):
+        assert len(notes_index.search([1, 1, 0, 0], top_k=10)) == 3
+
+    def test_tag_filter(self, notes_index):
+        results = notes_index.search([0, 1, 0, 0], top_k=5, tags=["wifi"])
+        assert {r["id"] for r in results} == {"a", "c"}
+
+    def test_domain_filter(self, tmp_path):
+        index = LocalVectorIndex("user-1", CORPUS_MATERIALS, base_dir=tmp_path, dim=DIM)
+        index.apply_changes([
+            ("x", {"chunk_id": "x", "domain": "study"}, [1, 0, 0, 0]),
+            ("y", {"chunk_id": "y", "domain": "work"}, [1, 0, 0, 0]),
+        ])
+        results = index.search([1, 0, 0, 0], top_k=5, domain="work")
+        assert [r["chunk_id"] for r in results] == ["y"]
+
+    def test_empty_index(self, tmp_path):
+        index = LocalVectorIndex("user-1", CORPUS_NOTES, base_dir=tmp_path, dim=DIM)
+        assert index.search([1, 0, 0, 0]) == []
+
+
+class TestApplyChanges:
+    def test_upsert_replaces_vector_in_place(self, notes_index):
+        notes_index.apply_changes([("b", _note("b"), [1, 0, 0, 0])])
+        assert len(notes_index) == 3
+        assert notes_index.search([1, 0, 0, 0], top_k=1)[0]["similarity"] == pytest.approx(1.0, abs=1e-6)
+
+    def test_delete(self, notes_index):
+        notes_index.apply_changes([], {"a"})
+        assert len(notes_index) == 2
+        assert "a" not in {r["id"] for r in notes_index.search([1, 0, 0, 0], top_k=5)}
+
+    def test_noop_returns_false(self, notes_index):
+        assert notes_index.apply_changes([], {"missing"}) is False
+
+
+class TestSnapshot:
+    def test_round_trip_is_float16_and_mmap(self, notes_index, tmp_path):
+        notes_index._watermark = "2026-01-01T00:00:00+00:00"
+        notes_index.save_snapshot()
+
+        stored = np.load(tmp_path / "user-1" / "notes.npy", mmap_mode="r")
+        assert stored.dtype == np.float16
+        assert stored.shape == (3, DIM)
+
+        restored = LocalVectorIndex("user-1", CORPUS_NOTES, base_dir=tmp_path, dim=DIM)
+        assert restored.load_snapshot() is True
+        assert restored.is_ready
+        assert restored._watermark == "2026-01-01T00:00:00+00:00"
+        assert [r["id"] for r in restored.search([1, 0, 0, 0], top_k=2)] == ["a", "c"]
+
+    def test_dim_mismatch_ignores_snapshot(self, notes_index, tmp_path):
+        notes_index.save_snapshot()
+        other = LocalVectorIndex("user-1", CORPUS_NOTES, base_dir=tmp_path, dim=DIM + 1)
+        assert other.load_snapshot() is False
+
+
+class FakeChunksDB:
+    """material_chunks / study_materials just deep enough for LocalVectorIndex.sync()."""
+
+    def __init__(self, chunks: list[dict]):
+        self.chunks = chunks
+
+    def table(self, name):
+        db = self
+
+        class Query:
+            def __init__(self):
+                self.material_id, self.window = None, None
+
+            def select(self, *args):
+                return self
+
+            def eq(self, column, value):
+                if column == "material_id":
+                    self.material_id = value
+                return self
+
+            def or_(self, *args):
+                return self
+
+            def order(self, *args, **kwargs):
+                return self
+
+            def limit(self, n):
+                return self
+
+            def range(self, start, end):
+                self.window = (start, end + 1)
+                return self
+
+            def execute(self):
+                if name == "study_materials":
+                    rows = [{"id": mid} for mid in {c["material_id"] for c in db.chunks}]
+                elif self.material_id is not None:
+                    rows = [{"id": c["id"]} for c in db.chunks if c["material_id"] == self.material_id]
+                else:
+                    rows = db.pending
+                    db.pending = []
+                if self.window:
+                    rows = rows[self.window[0]:self.window[1]]
+                return type("Res", (), {"data": rows})()
+
+        return Query()
+
+
+def _chunk(chunk_id: str, material_id: str, created_at: str) -> dict:
+    return {"id": chunk_id, "material_id": material_id, "created_at": created_at, "content": chunk_id,
+            "embedding": [1, 0, 0, 0], "study_materials": {"file_name": "a.pdf", "domain": "study"}}
+
+
+class TestSync:
+    def test_later_insert_batch_keeps_earlier_chunks(self, tmp_path):
+        index = LocalVectorIndex("user-1", CORPUS_MATERIALS, base_dir=tmp_path, dim=DIM)
+        first = [_chunk("c1", "m1", "2026-01-01T00:00:01"), _chunk("c2", "m1", "2026-01-01T00:00:01")]
+        db = FakeChunksDB(list(first))
+        db.pending = list(first)
+        index.sync(db)
+
+        # Mẻ insert thứ hai của cùng lần ingest (created_at muộn hơn) tới ở lần sync sau
+        second = [_chunk("c3", "m1", "2026-01-01T00:00:05")]
+        db.chunks += second
+        db.pending = list(second)
+        index.sync(db)
+        assert sorted(r["chunk_id"] for r in index._rows) == ["c1", "c2", "c3"]
+
+    def test_reindex_drops_chunks_deleted_in_db(self, tmp_path):
+        index = LocalVectorIndex("user-1", CORPUS_MATERIALS, base_dir=tmp_path, dim=DIM)
+        old = [_chunk("c1", "m1", "2026-01-01T00:00:01"), _chunk("c2", "m1", "2026-01-01T00:00:01")]
+        db = FakeChunksDB(list(old))
+        db.pending = list(old)
+        index.sync(db)
+
+        new = [_chunk("n1", "m1", "2026-01-02T00:00:00")]
+        db.chunks = list(new)  # Re-index: xóa hết chunk cũ rồi insert lại
+        db.pending = list(new)
+        index.sync(db)
+        assert [r["chunk_id"] for r in index._rows] == ["n1"]
+
+
+class TestLookup:
+    def test_similarity_and_vector_for_known_ids(self, notes_index):
+        found = notes_index.lookup(["a", "missing"], [2, 0, 0, 0])
+        assert set(found) == {"a"}
+        similarity, vector = found["a"]
+        assert similarity == pytest.approx(1.0, abs=1e-6)
+        assert vector == pytest.approx([1, 0, 0, 0])
+
+
+class TestHybridWithLocalIndex:
+    def test_vector_branch_served_locally_and_fused_with_lexical(self, notes_index, monkeypatch):
+        from app.features.knowledge import service as knowledge_service
+        from app.features.knowledge.service import KnowledgeService
+
+        calls = []
+
+        class LexicalDB:
+            def rpc(self, name, params):
+                calls.append(name)
+                rows = [{"id": "b", "content": "note b", "lexical_rank": 1}]
+                return type("Call", (), {"execute": lambda _: type("Res", (), {"data": rows})()})()
+
+        notes_index.is_ready = True
+        monkeypatch.setattr(knowledge_service, "get_local_index", lambda user_id, corpus: notes_index)
+        monkeypatch.setattr(knowledge_service, "embed_text_batched", lambda text: [1, 0, 0, 0])
+
+        results = KnowledgeService(LexicalDB()).hybrid_search_notes("user-1", "b", top_k=2)
+        assert calls == ["lexical_search_notes"]  # Không gọi hybrid_search_notes (pgvector)
+        # b: lexical #1 + vector #3 > a: chỉ vector #1
+        assert [r["id"] for r in results] == ["b", "a"]
+        assert results[0]["lexical_rank"] == 1 and results[0]["vector_rank"] == 3
+        assert results[1]["similarity"] == pytest.approx(1.0, abs=1e-6)
@@ -0,0 +1,58 @@
+"""
+Unit tests for NotesService.search_notes (hybrid RPC ranking + full-row read-back).
+"""
+
+from app.features.notes import service as notes_service
+from app.features.notes.service import NotesService
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+
+    def table(self, name):
+        self.filters = []
+        return self
+
+    def select(self, *args):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def ilike(self, *args):
+        raise AssertionError("search must not fall back to ILIKE")
+
+    def execute(self):
+        return type("Res", (), {"data": [r for r in self.rows if all(f(r) for f in self.filters)]})()
+
+
+class FakeKnowledge:
+    calls = []
+
+    def __init__(self, db):
+        pass
+
+    def hybrid_search_notes(self, user_id, query, top_k=5, tags=None):
+        self.calls.append((user_id, query, top_k, tags))
+        return [{"id": "n2", "rrf_score": 0.03}, {"id": "n1", "rrf_score": 0.02}, {"id": "gone", "rrf_score": 0.01}]
+
+
+class TestSearchNotes:
+    def test_rows_follow_hybrid_rank(self, monkeypatch):
+        monkeypatch.setattr(notes_service, "KnowledgeService", FakeKnowledge)
+        db = FakeDB([
+            {"id": "n1", "user_id": "u1", "content": "wifi nhà", "url": None},
+            {"id": "n2", "user_id": "u1", "content": "mật khẩu wifi", "url": "http://x"},
+        ])
+        notes = NotesService(db).search_notes("u1", "wifi", tags=["home"])
+
+        assert [n["id"] for n in notes] == ["n2", "n1"]  # Bản ghi đã xóa giữa chừng bị bỏ
+        assert notes[0]["url"] == "http://x"
+        assert FakeKnowledge.calls[-1] == ("u1", "wifi", 10, ["home"])
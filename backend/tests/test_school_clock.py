@@ -0,0 +1,57 @@
+"""
+Unit tests for the cached school clock offset and timetable type list.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from app.features.academic import school_clock
+from app.features.academic.school_clock import VN_TZ, SchoolClock
+
+
+class TestSchoolClock:
+    def test_offset_is_measured_once_and_applied_without_network(self, monkeypatch):
+        calls = []
+
+        async def server_time():
+            calls.append(1)
+            return (datetime.now(VN_TZ) + timedelta(minutes=3)).replace(tzinfo=None)
+
+        monkeypatch.setattr(school_clock.SchoolAPIClient, "get_server_time", server_time)
+        clock = SchoolClock()
+        assert asyncio.run(clock.refresh_offset()) is True
+        assert abs(clock.offset_seconds - 180) < 2
+
+        for _ in range(3):
+            drift = (clock.now() - datetime.now(VN_TZ)).total_seconds()
+            assert abs(drift - 180) < 2
+        assert len(calls) == 1 and clock.now().utcoffset() == timedelta(hours=7)
+
+    def test_failed_or_implausible_refresh_keeps_previous_offset(self, monkeypatch):
+        clock = SchoolClock()
+        clock.offset_seconds = 42.0
+
+        async def down():
+            raise ConnectionError("portal down")
+
+        async def garbage():
+            return datetime(2001, 1, 1)
+
+        monkeypatch.setattr(school_clock.SchoolAPIClient, "get_server_time", down)
+        assert asyncio.run(clock.refresh_offset()) is False
+        monkeypatch.setattr(school_clock.SchoolAPIClient, "get_server_time", garbage)
+        assert asyncio.run(clock.refresh_offset()) is False
+        assert clock.offset_seconds == 42.0
+
+    def test_timetable_types_cached_and_kept_on_empty_response(self, monkeypatch):
+        responses = [[{"loai_doi_tuong": 1, "ten_doi_tuong": "Cá nhân"}], []]
+
+        async def types():
+            return responses.pop(0)
+
+        monkeypatch.setattr(school_clock.SchoolAPIClient, "get_timetable_types", types)
+        clock = SchoolClock()
+        assert asyncio.run(clock.refresh_timetable_types()) is True
+        assert asyncio.run(clock.refresh_timetable_types()) is False
+        assert clock.timetable_types == [{"loai_doi_tuong": 1, "ten_doi_tuong": "Cá nhân"}]
+        assert clock.snapshot()["timetable_types"] == 1
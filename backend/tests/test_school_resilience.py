@@ -0,0 +1,122 @@
+"""
+Unit tests for the school portal resilience layer (breaker, token bucket, retries) and cache failover.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.features.academic import resilience
+from app.features.academic import service as academic_service
+from app.features.academic.cache import AcademicCache
+from app.features.academic.resilience import CircuitBreaker, SchoolAPIGuard, SchoolAPIUnavailable, TokenBucket
+from app.features.academic.service import AcademicService
+from tests.test_academic_cache import FakeDB
+
+
+def _guard(**overrides):
+    options = dict(
+        failure_threshold=2, reset_seconds=60, rate_per_second=0, burst=1,
+        max_retries=2, retry_base_seconds=0, attempt_timeout=1, total_timeout=5,
+    )
+    options.update(overrides)
+    return SchoolAPIGuard(**options)
+
+
+def _sender(*outcomes):
+    """send(timeout) replaying status codes / exceptions in order."""
+    calls = []
+
+    async def send(timeout):
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(timeout)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome)
+
+    return send, calls
+
+
+class TestSchoolAPIGuard:
+    def test_retries_transient_errors_then_succeeds(self):
+        guard = _guard()
+        send, calls = _sender(httpx.ConnectTimeout("slow"), 503, 200)
+        response = asyncio.run(guard.call("srm/grades", send))
+        assert response.status_code == 200 and len(calls) == 3
+        assert guard.breaker("srm/grades").state == CircuitBreaker.CLOSED
+
+    def test_client_errors_are_not_retried_and_count_as_alive(self):
+        guard = _guard()
+        send, calls = _sender(401)
+        assert asyncio.run(guard.call("sch/tkb", send)).status_code == 401
+        assert len(calls) == 1
+
+    def test_breaker_opens_fails_fast_and_probes_after_reset(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+        guard = _guard(max_retries=0)
+        failing, calls = _sender(httpx.ConnectError("down"))
+
+        for _ in range(2):
+            with pytest.raises(SchoolAPIUnavailable):
+                asyncio.run(guard.call("sch/tkb", failing))
+        with pytest.raises(SchoolAPIUnavailable, match="circuit open"):
+            asyncio.run(guard.call("sch/tkb", failing))
+        assert len(calls) == 2  # lần thứ 3 không chạm mạng
+        assert guard.snapshot()["status"] == "degraded"
+        assert guard.snapshot()["breakers"]["sch/tkb"]["state"] == "open"
+
+        # Endpoint khác không bị ảnh hưởng
+        ok, _ = _sender(200)
+        assert asyncio.run(guard.call("srm/grades", ok)).status_code == 200
+
+        now[0] += 61  # half-open → 1 request thăm dò thành công → đóng lại
+        assert asyncio.run(guard.call("sch/tkb", ok)).status_code == 200
+        assert guard.snapshot()["status"] == "ok"
+
+    def test_token_bucket_rejects_when_wait_exceeds_budget(self):
+        bucket = TokenBucket(rate=1, capacity=1)
+
+        async def main():
+            return [await bucket.acquire(max_wait=0.01), await bucket.acquire(max_wait=0.01)]
+
+        assert asyncio.run(main()) == [True, False]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = AcademicCache(max_entries=16)
+    monkeypatch.setattr(academic_service, "get_academic_cache", lambda: cache)
+    return cache
+
+
+class TestCacheFailover:
+    def test_outage_serves_expired_cache_with_stale_marker(self, cache):
+        db = FakeDB()
+        synced = datetime.now(timezone.utc) - timedelta(days=30)
+        db.cache_rows.append({"id": "r1", "user_id": "u1", "data_type": "grades", "semester": None,
+                              "raw_data": {"ds_diem_hocky": [{"hoc_ky": "20251"}]},
+                              "last_synced_at": synced.isoformat()})
+        service = AcademicService(db)
+
+        async def portal_down(user_id, operation):
+            raise SchoolAPIUnavailable("srm/w-locdsdiemsinhvien", "circuit open")
+
+        service._with_client = portal_down
+        grades = asyncio.run(service.get_grades("u1"))
+        assert grades[0].semester_code == "20251"
+        assert cache.stats["failovers"] == 1
+        assert "Hệ thống trường đang không phản hồi" in service.stale_note()
+
+    def test_outage_without_cache_raises_connection_error(self, cache):
+        service = AcademicService(FakeDB())
+
+        async def portal_down(user_id, operation):
+            raise SchoolAPIUnavailable("pn-signin", "ConnectTimeout")
+
+        service._with_client = portal_down
+        with pytest.raises(ConnectionError):
+            asyncio.run(service.get_grades("u1"))
+        assert service.stale_note() == ""
@@ -0,0 +1,130 @@
+"""
+Unit tests for the per-user school session pool (reuse, single-flight login, 401 re-login).
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.features.academic import service as academic_service
+from app.features.academic.service import AcademicService
+from app.features.academic.session_pool import SchoolSessionPool
+
+
+class FakeClient:
+    def __init__(self, token_expires_at=None):
+        self.token_expires_at = token_expires_at
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class CountingLogin:
+    def __init__(self, fail=False, delay=0.02):
+        self.calls = 0
+        self.clients: list[FakeClient] = []
+        self.fail, self.delay = fail, delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ValueError("Login failed")
+        client = FakeClient()
+        self.clients.append(client)
+        return client
+
+
+async def _use(pool, user_id, login):
+    async with pool.session(user_id, login) as client:
+        await asyncio.sleep(0)
+        return client
+
+
+class TestSessionPool:
+    def test_concurrent_callers_share_one_login(self):
+        pool, login = SchoolSessionPool(max_sessions=4, default_ttl_seconds=600), CountingLogin()
+
+        async def main():
+            clients = await asyncio.gather(*[_use(pool, "u1", login) for _ in range(10)])
+            clients.append(await _use(pool, "u1", login))
+            return clients
+
+        clients = asyncio.run(main())
+        assert login.calls == 1
+        assert all(c is clients[0] for c in clients)
+        assert not clients[0].closed
+
+    def test_failed_login_is_shared_and_not_cached(self):
+        pool, login = SchoolSessionPool(max_sessions=4, default_ttl_seconds=600), CountingLogin(fail=True)
+
+        async def main():
+            return await asyncio.gather(*[_use(pool, "u1", login) for _ in range(5)], return_exceptions=True)
+
+        results = asyncio.run(main())
+        assert login.calls == 1 and all(isinstance(r, ValueError) for r in results)
+        assert len(pool) == 0
+
+    def test_expired_token_relogs_and_closes_old_client(self):
+        pool, login = SchoolSessionPool(max_sessions=4, default_ttl_seconds=600), CountingLogin()
+
+        async def main():
+            first = await _use(pool, "u1", login)
+            pool._sessions["u1"]["expires_at"] = 0  # token đã hết hạn
+            return first, await _use(pool, "u1", login)
+
+        first, second = asyncio.run(main())
+        assert login.calls == 2 and first is not second
+        assert first.closed and not second.closed
+
+    def test_lru_eviction_and_close_all(self):
+        pool, login = SchoolSessionPool(max_sessions=2, default_ttl_seconds=600), CountingLogin(delay=0)
+
+        async def main():
+            for user in ("a", "b", "c"):
+                await _use(pool, user, login)
+            evicted = [c.closed for c in login.clients]
+            await pool.close_all()
+            return evicted
+
+        assert asyncio.run(main()) == [True, False, False]
+        assert all(c.closed for c in login.clients) and len(pool) == 0
+
+
+class TestServiceWithClient:
+    def test_401_invalidates_and_retries_once(self, monkeypatch):
+        pool = SchoolSessionPool(max_sessions=4, default_ttl_seconds=600)
+        monkeypatch.setattr(academic_service, "get_school_session_pool", lambda: pool)
+        service = AcademicService(db=None)
+        login = CountingLogin(delay=0)
+        monkeypatch.setattr(service, "_get_authenticated_client", lambda user_id: login())
+
+        calls = []
+
+        async def operation(client):
+            calls.append(client)
+            if len(calls) == 1:
+                request = httpx.Request("POST", "https://school/api")
+                raise httpx.HTTPStatusError("401", request=request, response=httpx.Response(401, request=request))
+            return "ok"
+
+        assert asyncio.run(service._with_client("u1", operation)) == "ok"
+        assert login.calls == 2
+        assert calls[0].closed and calls[1] is not calls[0]
+
+    def test_other_http_errors_are_not_retried(self, monkeypatch):
+        pool = SchoolSessionPool(max_sessions=4, default_ttl_seconds=600)
+        monkeypatch.setattr(academic_service, "get_school_session_pool", lambda: pool)
+        service = AcademicService(db=None)
+        login = CountingLogin(delay=0)
+        monkeypatch.setattr(service, "_get_authenticated_client", lambda user_id: login())
+
+        async def operation(client):
+            request = httpx.Request("POST", "https://school/api")
+            raise httpx.HTTPStatusError("500", request=request, response=httpx.Response(500, request=request))
+
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(service._with_client("u1", operation))
+        assert login.calls == 1 and len(pool) == 1
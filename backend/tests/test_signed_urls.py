@@ -0,0 +1,76 @@
+"""
+Unit tests for batched, cached signed URL generation.
+"""
+
+import pytest
+
+from app.features.knowledge import signed_urls
+from app.features.knowledge.signed_urls import SignedUrlCache, get_signed_urls
+
+
+class FakeBucket:
+    def __init__(self, calls: list, fail_paths=()):
+        self.calls = calls
+        self.fail_paths = set(fail_paths)
+
+    def create_signed_urls(self, paths, expires_in):
+        self.calls.append(list(paths))
+        return [
+            {"path": p, "error": "Object not found", "signedURL": None} if p in self.fail_paths
+            else {"path": p, "error": None, "signedURL": f"https://cdn/{p}?token=t"}
+            for p in paths
+        ]
+
+
+class FakeDB:
+    def __init__(self, fail_paths=()):
+        self.calls: list[list[str]] = []
+        self.fail_paths = fail_paths
+        self.storage = self
+
+    def from_(self, bucket):
+        return FakeBucket(self.calls, self.fail_paths)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(signed_urls, "_cache", SignedUrlCache())
+
+
+class TestGetSignedUrls:
+    def test_one_storage_call_per_page(self):
+        db = FakeDB()
+        paths = [f"u/study/{i}.pdf" for i in range(50)]
+        urls = get_signed_urls(db, "knowledge-base", paths)
+        assert len(db.calls) == 1
+        assert urls["u/study/7.pdf"] == "https://cdn/u/study/7.pdf?token=t"
+
+    def test_cached_paths_are_not_resigned(self):
+        db = FakeDB()
+        get_signed_urls(db, "knowledge-base", ["a.pdf", "b.pdf"])
+        get_signed_urls(db, "knowledge-base", ["a.pdf", "b.pdf", "c.pdf"])
+        assert db.calls == [["a.pdf", "b.pdf"], ["c.pdf"]]
+
+    def test_failed_paths_return_none_and_are_not_cached(self):
+        db = FakeDB(fail_paths={"gone.pdf"})
+        urls = get_signed_urls(db, "knowledge-base", ["gone.pdf", "ok.pdf"])
+        assert urls == {"gone.pdf": None, "ok.pdf": "https://cdn/ok.pdf?token=t"}
+        get_signed_urls(db, "knowledge-base", ["gone.pdf", "ok.pdf"])
+        assert db.calls[-1] == ["gone.pdf"]
+
+
+class TestSignedUrlCache:
+    def test_entries_expire_before_url_does(self):
+        cache = SignedUrlCache(refresh_margin=300)
+        cache.put("b", "p", "url", expires_at=1000.0)
+        assert cache.get("b", "p", now=650.0) == "url"
+        assert cache.get("b", "p", now=701.0) is None
+
+    def test_lru_bound_and_invalidate(self):
+        cache = SignedUrlCache(max_entries=2)
+        for path in ("a", "b", "c"):
+            cache.put("b", path, path, expires_at=10**12)
+        assert cache.get("b", "a") is None
+        cache.invalidate("b", "c")
+        assert cache.get("b", "c") is None
+        assert cache.get("b", "b") == "b"
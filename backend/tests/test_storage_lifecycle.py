@@ -0,0 +1,127 @@
+"""
+Unit tests for the storage lifecycle collector (paginated listing, bulk removes, resume).
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.background import temp_cleanup
+
+NOW = 1_800_000_000.0
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FakeBucket:
+    """Honours limit/offset and created_at ordering like Storage's /object/list."""
+
+    def __init__(self, objects: dict[str, dict], calls: list):
+        self.objects, self.calls = objects, calls
+
+    def list(self, prefix, options):
+        self.calls.append(("list", prefix, options["offset"]))
+        base = f"{prefix}/" if prefix else ""
+        items = []
+        for path, meta in self.objects.items():
+            if path.startswith(base) and "/" not in path[len(base):]:
+                items.append({"name": path[len(base):], "id": "x", **meta})
+        items.sort(key=lambda o: o.get("created_at") or "")
+        return items[options["offset"]:options["offset"] + options["limit"]]
+
+    def remove(self, paths):
+        self.calls.append(("remove", len(paths)))
+        for p in paths:
+            self.objects.pop(p, None)
+
+
+class FakeStorage:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.calls: list = []
+
+    def from_(self, bucket):
+        return FakeBucket(self.buckets[bucket], self.calls)
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(temp_cleanup, "PAGE_SIZE", 10)
+    monkeypatch.setattr(temp_cleanup, "_resume_from", None)
+
+
+def _objects(count: int, age: float, prefix: str = "u1/temp", start: int = 0) -> dict:
+    return {f"{prefix}/{start + i:04d}.pdf": {"created_at": _iso(NOW - age - i)} for i in range(count)}
+
+
+class TestCollectPrefix:
+    def test_deletes_beyond_first_page_in_bulk(self):
+        objects = {**_objects(25, age=48 * 3600), **_objects(5, age=60, start=100)}
+        storage = FakeStorage({"kb": objects})
+        stats = temp_cleanup.collect_prefix(storage, "kb", "u1/temp", 24 * 3600, budget=1000, now=NOW)
+
+        assert stats == {"deleted": 25, "kept": 0, "errors": 0, "exhausted": True}
+        assert len(objects) == 5
+        assert [c for c in storage.calls if c[0] == "remove"] == [("remove", 10), ("remove", 10), ("remove", 5)]
+
+    def test_unknown_age_is_kept_and_skipped(self):
+        objects = {"u1/temp/readme": {}, **_objects(3, age=48 * 3600)}
+        storage = FakeStorage({"kb": objects})
+        stats = temp_cleanup.collect_prefix(storage, "kb", "u1/temp", 3600, budget=1000, now=NOW)
+        assert stats["deleted"] == 3 and stats["kept"] == 1
+        assert list(objects) == ["u1/temp/readme"]
+
+    def test_name_timestamp_fallback(self):
+        objects = {
+            f"gen/{int(NOW) - 90000}_a.png": {"created_at": None},
+            "gen/20200101_120000_c.png": {"created_at": None},  # Không phải unix ts → giữ
+            f"gen/{int(NOW)}_b.png": {"created_at": None},
+        }
+        storage = FakeStorage({"img": objects})
+        temp_cleanup.collect_prefix(storage, "img", "gen", 86400, budget=10, now=NOW)
+        assert set(objects) == {"gen/20200101_120000_c.png", f"gen/{int(NOW)}_b.png"}
+
+    def test_budget_stops_early(self):
+        objects = _objects(25, age=48 * 3600)
+        storage = FakeStorage({"kb": objects})
+        stats = temp_cleanup.collect_prefix(storage, "kb", "u1/temp", 3600, budget=12, now=NOW)
+        assert stats["deleted"] == 12 and stats["exhausted"] is False
+        assert len(objects) == 13
+
+
+class TestCollectAllPolicies:
+    def test_resumes_where_previous_run_stopped(self, monkeypatch):
+        buckets = {
+            "knowledge-base": {**_objects(8, age=10 ** 6, prefix="u1/temp"), **_objects(8, age=10 ** 6, prefix="u2/temp")},
+            "chat-uploads": _objects(3, age=10 ** 9, prefix="u1"),
+            "generated-images": {},
+        }
+        storage = FakeStorage(buckets)
+
+        class DB:
+            def __init__(self):
+                self.storage = storage
+
+            def table(self, name):
+                return self
+
+            def select(self, *args):
+                return self
+
+            def execute(self):
+                return type("Res", (), {"data": [{"id": "u1"}, {"id": "u2"}]})()
+
+        monkeypatch.setattr(temp_cleanup, "get_supabase_client", lambda: DB())
+        monkeypatch.setattr(temp_cleanup.time, "time", lambda: NOW)
+        settings = temp_cleanup.get_settings()
+        monkeypatch.setattr(settings, "STORAGE_GC_MAX_DELETES_PER_RUN", 10)
+
+        first = temp_cleanup.collect_expired_storage_objects()
+        assert first["deleted"] == 10 and first["complete"] is False
+        assert temp_cleanup._resume_from == ("knowledge-base", "u2/temp")
+
+        second = temp_cleanup.collect_expired_storage_objects()
+        assert second["deleted"] == 9 and second["complete"] is True
+        assert not buckets["knowledge-base"] and not buckets["chat-uploads"]
@@ -0,0 +1,77 @@
+"""
+Unit tests for the parsed, date-indexed timetable and its cache.
+"""
+
+from datetime import date, timedelta
+
+from app.features.academic.service import AcademicService
+from app.features.academic.timetable_index import ParsedTimetable, TimetableIndexCache, period_to_time
+
+SEMESTER_START = date(2026, 1, 5)  # Thứ 2
+
+
+def _raw_week(n: int, with_slots: bool = True) -> dict:
+    start = SEMESTER_START + timedelta(weeks=n - 1)
+    slots = [{
+        "thu_kieu_so": 2, "tiet_bat_dau": 1, "so_tiet": 4, "ma_mon": f"M{n}", "ten_mon": f"Môn {n}",
+        "ma_phong": "C.201", "ten_giang_vien": "GV A", "ten_lop": "DA22TTA", "is_nghi_day": n == 3,
+    }] if with_slots else []
+    return {
+        "tuan_hoc_ky": n,
+        "ngay_bat_dau": start.strftime("%d/%m/%Y"),
+        "ngay_ket_thuc": (start + timedelta(days=6)).strftime("%d/%m/%Y"),
+        "ds_thoi_khoa_bieu": slots,
+    }
+
+
+# Tuần 5-6 nghỉ Tết (không có lịch)
+RAW = [_raw_week(n, with_slots=n not in (5, 6)) for n in range(1, 11)]
+
+
+def _parsed() -> ParsedTimetable:
+    return ParsedTimetable(AcademicService._parse_timetable(RAW))
+
+
+class TestWeekLookup:
+    def test_date_inside_semester(self):
+        t = _parsed()
+        assert t.week_index(SEMESTER_START) == 0
+        assert t.week_index(SEMESTER_START + timedelta(days=20)) == 2
+        assert t.week_index(SEMESTER_START + timedelta(weeks=9, days=6)) == 9
+
+    def test_before_and_after_semester(self):
+        t = _parsed()
+        assert t.week_index(SEMESTER_START - timedelta(days=30)) == 0
+        assert t.week_index(SEMESTER_START + timedelta(weeks=20)) == 0
+
+    def test_unparsable_dates_are_skipped(self):
+        raw = [{**RAW[0], "ngay_bat_dau": "??"}, *RAW[1:3]]
+        t = ParsedTimetable(AcademicService._parse_timetable(raw))
+        assert t.week_index(SEMESTER_START) == 1  # Tuần 1 lỗi ngày → tuần có lịch kế tiếp
+
+
+class TestWindow:
+    def test_previous_week_skips_holiday_weeks(self):
+        t = _parsed()
+        text = t.format_window(6, max_weeks=4)  # Tuần 7
+        assert text.startswith("Tuần 4 [TUẦN TRƯỚC]")
+        assert "Tuần 7 [TUẦN NÀY]" in text and "Tuần 9 (" in text and "Tuần 10" not in text
+
+    def test_rendered_block(self):
+        text = _parsed().format_window(2, max_weeks=2)
+        assert "  Thứ 2 | 07:00–10:30 (Tiết 1-4) | Môn 3 | Phòng C.201 | GV: GV A | Lớp: DA22TTA [NGHỈ]" in text
+        assert _parsed().format_window(4, max_weeks=2).endswith("Không có lịch học")
+
+    def test_period_to_time(self):
+        assert period_to_time(1, 5) == "07:00–11:15"
+        assert period_to_time(6, 4) == "13:00–16:30"
+
+
+class TestIndexCache:
+    def test_reused_until_raw_object_changes(self):
+        cache = TimetableIndexCache(max_entries=2)
+        first = cache.get(("u1", "current"), RAW, AcademicService._parse_timetable)
+        assert cache.get(("u1", "current"), RAW, AcademicService._parse_timetable) is first
+        refreshed = cache.get(("u1", "current"), list(RAW), AcademicService._parse_timetable)
+        assert refreshed is not first
+        assert cache.stats == {"hits": 1, "builds": 2}
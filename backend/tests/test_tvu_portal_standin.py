@@ -0,0 +1,76 @@
+"""
+Unit tests for the local TVU portal stand-in, the in-memory DB and the load-test percentile helper.
+"""
+
+import asyncio
+import base64
+import json
+
+import httpx
+
+from app.dev.academic_loadtest import percentile
+from app.dev.memory_db import MemoryDB
+from app.dev.tvu_portal import PortalBehavior, create_portal_app
+from app.features.academic.school_client import SchoolAPIClient
+
+
+def _portal(**behavior):
+    portal = create_portal_app(PortalBehavior(latency_ms=0, jitter_ms=0, seed=1, **behavior))
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=portal), base_url="http://portal.local")
+    return portal, client
+
+
+class TestPortalStandIn:
+    def test_signin_redirect_is_understood_by_the_real_client(self):
+        portal, client = _portal()
+        code = base64.b64encode(json.dumps({"username": "110122221", "password": "x"}).encode()).decode()
+
+        async def main():
+            async with client:
+                signin = await client.get("/api/pn-signin", params={"code": code})
+                parser = SchoolAPIClient()
+                token = parser._extract_token_from_redirect(signin.headers["location"])
+                await parser.close()
+                denied = await client.post("/public/api/srm/w-locdsdiemsinhvien", json={})
+                grades = await client.post(
+                    "/public/api/srm/w-locdsdiemsinhvien", json={}, headers={"Authorization": f"Bearer {token}"}
+                )
+                return signin, parser, token, denied, grades
+
+        signin, parser, token, denied, grades = asyncio.run(main())
+        assert signin.status_code == 302 and token.startswith("tok-1-")
+        assert parser.user_info["username"] == "110122221" and parser.token_expires_at is not None
+        assert denied.status_code == 401
+        assert grades.json()["data"]["ds_diem_hocky"][0]["ds_diem_mon_hoc"]
+        assert portal.state.stats["logins"] == 1 and portal.state.stats["unauthorized"] == 1
+
+    def test_error_injection(self):
+        def call(**behavior):
+            _, client = _portal(**behavior)
+
+            async def main():
+                async with client:
+                    return await client.post("/public/api/sch/w-locdsdoituongthoikhoabieu", json={})
+
+            return asyncio.run(main())
+
+        assert call(error_rate=1.0).status_code == 503
+        app_error = call(app_error_rate=1.0)
+        assert app_error.status_code == 200 and app_error.json()["code"] == 500
+
+
+class TestMemoryDB:
+    def test_upsert_on_conflict_filters_and_single(self):
+        db = MemoryDB()
+        db.table("cache").upsert([{"user_id": "u1", "k": "a", "v": 1}, {"user_id": "u1", "k": "b", "v": 2}],
+                                 on_conflict="user_id,k").execute()
+        db.table("cache").upsert({"user_id": "u1", "k": "a", "v": 3}, on_conflict="user_id,k").execute()
+        rows = db.table("cache").select("*").eq("user_id", "u1").order("v", desc=True).execute().data
+        assert [r["v"] for r in rows] == [3, 2]
+        assert db.table("cache").select("*").in_("k", ["b"]).single().execute().data["v"] == 2
+        assert db.table("cache").select("*").eq("k", "zzz").single().execute().data is None
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50 and percentile(values, 99) == 99 and percentile([], 99) == 0.0
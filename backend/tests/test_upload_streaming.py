@@ -0,0 +1,87 @@
+"""
+Unit tests for bounded-memory knowledge-base uploads.
+Covers the body-limit middleware and chunked spooling to disk.
+"""
+
+import asyncio
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from app.core.upload_limit import UploadLimitMiddleware, MULTIPART_OVERHEAD_BYTES
+from app.features.knowledge.file_io import spool_upload
+
+
+def _make_app(limit: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, limits={"/upload": limit})
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.post("/other")
+    async def other(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return app
+
+
+class TestUploadLimitMiddleware:
+    def test_within_limit_passes(self):
+        client = TestClient(_make_app(limit=1024))
+        res = client.post("/upload", files={"file": ("a.txt", b"x" * 1000)})
+        assert res.status_code == 200
+        assert res.json() == {"size": 1000}
+
+    def test_declared_length_over_limit_is_rejected(self):
+        client = TestClient(_make_app(limit=1024))
+        res = client.post("/upload", files={"file": ("a.txt", b"x" * (MULTIPART_OVERHEAD_BYTES + 4096))})
+        assert res.status_code == 413
+
+    def test_chunked_body_over_limit_is_rejected(self):
+        client = TestClient(_make_app(limit=1024))
+
+        def body():
+            for _ in range(200):
+                yield b"x" * 1024
+
+        res = client.post("/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=b"})
+        assert res.status_code == 413
+
+    def test_other_paths_are_not_limited(self):
+        client = TestClient(_make_app(limit=1024))
+        res = client.post("/other", files={"file": ("a.txt", b"x" * (MULTIPART_OVERHEAD_BYTES + 4096))})
+        assert res.status_code == 200
+
+
+def _upload(data: bytes, name: str = "doc.txt", size: int | None = None) -> UploadFile:
+    return UploadFile(io.BytesIO(data), size=size, filename=name, headers=Headers({}))
+
+
+class TestSpoolUpload:
+    def test_copies_to_temp_file(self):
+        path, size = asyncio.run(spool_upload(_upload(b"hello world"), max_bytes=100, limit_label="100B"))
+        try:
+            assert size == 11
+            assert path.endswith(".txt")
+            with open(path, "rb") as f:
+                assert f.read() == b"hello world"
+        finally:
+            os.remove(path)
+
+    def test_rejects_when_limit_crossed_mid_stream(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(spool_upload(_upload(b"x" * 5000), max_bytes=4096, limit_label="4KB"))
+        assert exc.value.status_code == 413
+        assert list(tmp_path.iterdir()) == []  # partial temp file cleaned up
+
+    def test_rejects_known_size_without_reading(self):
+        upload = _upload(b"", size=10_000)
+        with pytest.raises(HTTPException):
+            asyncio.run(spool_upload(upload, max_bytes=100, limit_label="100B"))
@@ -0,0 +1,99 @@
+"""
+Unit tests for the Zalo outbox: shared client, per-chat ordering and 429-aware pacing.
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.core import zalo
+from app.core.zalo_outbox import ZaloOutbox
+
+
+class FakeZalo:
+    """MockTransport handler recording (method, text) and replaying scripted replies."""
+
+    def __init__(self, replies=None):
+        self.sent: list[tuple[str, str]] = []
+        self.replies = list(replies or [])
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.sent.append((request.url.path.rsplit("/", 1)[-1], body.get("text") or body.get("photo")))
+        if self.replies:
+            return self.replies.pop(0)
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": len(self.sent)}})
+
+
+def _outbox(fake, base_interval=0.0, max_retries=2):
+    return ZaloOutbox(base_interval=base_interval, max_interval=1, max_retries=max_retries,
+                      transport=httpx.MockTransport(fake))
+
+
+class TestZaloOutbox:
+    def test_batches_to_one_chat_are_not_interleaved(self):
+        fake = FakeZalo()
+        outbox = _outbox(fake)
+
+        async def main():
+            long_message = [("sendMessage", {"chat_id": "c1", "text": f"part {i}"}) for i in range(3)]
+            await asyncio.gather(
+                outbox.send("c1", long_message),
+                outbox.send("c1", [("sendPhoto", {"chat_id": "c1", "photo": "img"})]),
+            )
+            await outbox.close()
+
+        asyncio.run(main())
+        assert [text for _, text in fake.sent] == ["part 0", "part 1", "part 2", "img"]
+        assert outbox.stats["sent"] == 4
+
+    def test_rate_limit_backs_off_and_retries(self):
+        fake = FakeZalo([
+            httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 0.05}}),
+            httpx.Response(200, json={"ok": False, "error_code": 429, "description": "Too Many Requests"}),
+        ])
+        outbox = _outbox(fake)
+
+        async def main():
+            started = time.monotonic()
+            [data] = await outbox.send("c1", [("sendMessage", {"chat_id": "c1", "text": "hi"})])
+            await outbox.close()
+            return data, time.monotonic() - started
+
+        data, elapsed = asyncio.run(main())
+        assert data["ok"] and len(fake.sent) == 3
+        assert elapsed >= 0.05  # Retry-After được tôn trọng
+        assert outbox.stats == {"sent": 1, "failed": 0, "rate_limited": 2, "retries": 2}
+
+    def test_paces_consecutive_sends(self):
+        outbox = _outbox(FakeZalo(), base_interval=0.05)
+
+        async def main():
+            started = time.monotonic()
+            await outbox.send("c1", [("sendMessage", {"chat_id": "c1", "text": str(i)}) for i in range(3)])
+            await outbox.close()
+            return time.monotonic() - started
+
+        assert asyncio.run(main()) >= 0.1
+
+
+def test_send_zalo_message_stops_at_first_failed_chunk(monkeypatch):
+    fake = FakeZalo([
+        httpx.Response(200, json={"ok": True, "result": {"message_id": 1}}),
+        httpx.Response(200, json={"ok": False, "error_code": 400, "description": "bad"}),
+    ])
+    outbox = _outbox(fake)
+    monkeypatch.setattr(zalo, "get_zalo_outbox", lambda: outbox)
+    monkeypatch.setattr(zalo, "split_text_for_zalo", lambda text: ["a", "b", "c"])
+    settings = zalo.get_settings()
+    monkeypatch.setattr(settings, "ZALO_BOT_TOKEN", "token")
+
+    async def main():
+        ok = await zalo.send_zalo_message("long text", chat_id="c1")
+        await outbox.close()
+        return ok
+
+    assert asyncio.run(main()) is False
+    assert [text for _, text in fake.sent] == ["a", "b"]